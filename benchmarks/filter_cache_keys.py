@@ -0,0 +1,83 @@
+# benchmarks/filter_cache_keys.py
+
+"""
+Mensimulasikan sesi pengguna di halaman transportasi dan membandingkan cache hit rate
+loader panel dengan kunci filter apa adanya (urutan klik) vs. kunci kanonik
+(src/utils/filters.py).
+
+Setiap langkah, pengguna mengaktifkan/menonaktifkan satu opsi di salah satu filter
+(kadang mengosongkan semua filter), lalu halaman memanggil loader dengan kombinasi
+filter saat itu. Cache dipakai bersama oleh semua sesi, seperti st.cache_data.
+Opsi dipilih dengan bobot (beberapa fakultas/moda lebih populer), sehingga sesi
+berbeda sering sampai di kombinasi yang sama lewat urutan klik yang berbeda.
+
+Jalankan dari root repo:
+    python benchmarks/filter_cache_keys.py
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.filters import canonical_filter
+
+SESSIONS = 50
+STEPS_PER_SESSION = 30
+CLEAR_PROBABILITY = 0.1
+SEED = 42
+
+DAY_ORDER = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+FILTERS = {
+    # nama filter: (opsi, bobot, urutan kanonik)
+    'modes': (['Motor', 'Mobil', 'Bus', 'Jalan kaki', 'Sepeda', 'Ojek Online'], [5, 4, 3, 2, 1, 1], None),
+    'fakultas': (['STEI', 'FTI', 'FMIPA', 'SBM', 'FTSL', 'SAPPK', 'FSRD'], [5, 4, 3, 2, 2, 1, 1], None),
+    'days': (DAY_ORDER, [3, 3, 3, 3, 3, 1, 1], DAY_ORDER),
+}
+
+def simulate_session(rng: random.Random):
+    """Daftar kombinasi filter (dict nama -> list urutan klik) untuk setiap rerun satu sesi."""
+    state = {name: [] for name in FILTERS}
+    reruns = []
+    for _ in range(STEPS_PER_SESSION):
+        if rng.random() < CLEAR_PROBABILITY:
+            state = {name: [] for name in FILTERS}
+        else:
+            name = rng.choice(list(FILTERS))
+            options, weights, _ = FILTERS[name]
+            value = rng.choices(options, weights)[0]
+            if value in state[name]:
+                state[name].remove(value)
+            else:
+                state[name].append(value)
+        reruns.append({name: list(values) for name, values in state.items()})
+    return reruns
+
+def hit_rate(reruns: list, make_key) -> tuple:
+    cache = set()
+    hits = 0
+    for filters in reruns:
+        key = make_key(filters)
+        if key in cache:
+            hits += 1
+        else:
+            cache.add(key)
+    return hits / len(reruns), len(cache)
+
+def main():
+    rng = random.Random(SEED)
+    reruns = [filters for _ in range(SESSIONS) for filters in simulate_session(rng)]
+
+    raw_rate, raw_entries = hit_rate(reruns, lambda filters: tuple(
+        tuple(filters[name]) for name in FILTERS))
+    canonical_rate, canonical_entries = hit_rate(reruns, lambda filters: tuple(
+        tuple(canonical_filter(filters[name], FILTERS[name][2])) for name in FILTERS))
+
+    print(f"{SESSIONS} sesi x {STEPS_PER_SESSION} rerun = {len(reruns)} pemanggilan loader\n")
+    print(f"{'Kunci urutan klik':<24} hit rate {raw_rate:6.1%}   {raw_entries:5d} entri cache")
+    print(f"{'Kunci kanonik':<24} hit rate {canonical_rate:6.1%}   {canonical_entries:5d} entri cache")
+    print(f"\nPeningkatan: +{(canonical_rate - raw_rate) * 100:.1f} poin, "
+          f"{raw_entries - canonical_entries} entri (dan query) lebih sedikit")
+
+if __name__ == "__main__":
+    main()
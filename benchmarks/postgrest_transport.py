@@ -0,0 +1,216 @@
+# benchmarks/postgrest_transport.py
+
+"""
+Membandingkan klien PostgREST bawaan supabase-py dengan PostgrestTransport
+(HTTP/2 + kompresi) terhadap server PostgREST tiruan di localhost.
+
+Server tiruan menjawab POST /rest/v1/rpc/exec_sql dengan payload JSON sintetis
+setelah jeda LATENCY_MS (meniru waktu eksekusi query), mengompres respons dengan
+gzip jika diminta, dan mencatat jumlah koneksi serta byte yang dikirim.
+
+Jalankan dari root repo:
+    python benchmarks/postgrest_transport.py
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import h2.config
+import h2.connection
+import h2.events
+from postgrest import SyncPostgrestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.http_transport import PostgrestTransport
+
+LATENCY_MS = 20
+PAYLOAD_ROWS = 2000 # Kurang lebih sebesar hasil query data mentah halaman
+PANEL_QUERIES = 6 # Jumlah panel per halaman
+ROUNDS = 10
+
+H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+def build_payload(n_rows: int) -> bytes:
+    rng = random.Random(0)
+    fakultas = ['FTI', 'STEI', 'FMIPA', 'SBM', 'FSRD', 'SAPPK', 'FTSL', 'FTMD']
+    modes = ['Motor', 'Mobil', 'Jalan Kaki', 'Sepeda', 'Angkutan Umum', 'Ojek Online']
+    days = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+    rows = [{
+        "id_mahasiswa": i,
+        "fakultas": rng.choice(fakultas),
+        "transportasi": rng.choice(modes),
+        "hari_datang": ", ".join(sorted(rng.sample(days, rng.randint(1, 5)), key=days.index)),
+        "jarak": round(rng.random() * 25, 1),
+        "emisi_transportasi": round(rng.random() * 3, 2),
+    } for i in range(n_rows)]
+    return json.dumps(rows).encode()
+
+class StandInServer:
+    """Server PostgREST tiruan (HTTP/1.1 keep-alive dan HTTP/2 cleartext)."""
+
+    def __init__(self, payload: bytes):
+        self.payload = payload
+        self.payload_gzip = gzip.compress(payload)
+        self.connections = 0
+        self.bytes_sent = 0
+        self.loop = None
+        self.port = None
+        self._ready = threading.Event()
+
+    def _body_for(self, accept_encoding: str):
+        if "gzip" in accept_encoding:
+            return self.payload_gzip, [("content-encoding", "gzip")]
+        return self.payload, []
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        first = await reader.readexactly(len(H2_PREFACE))
+        if first == H2_PREFACE:
+            await self._handle_h2(first, reader, writer)
+        else:
+            await self._handle_h1(first, reader, writer)
+
+    def _write(self, writer, data: bytes):
+        self.bytes_sent += len(data)
+        writer.write(data)
+
+    async def _handle_h1(self, first, reader, writer):
+        buffer = first
+        try:
+            while True:
+                while b"\r\n\r\n" not in buffer:
+                    chunk = await reader.read(65536)
+                    if not chunk:
+                        return
+                    buffer += chunk
+                head, buffer = buffer.split(b"\r\n\r\n", 1)
+                headers = {}
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                while len(buffer) < length:
+                    buffer += await reader.read(65536)
+                buffer = buffer[length:]
+                await asyncio.sleep(LATENCY_MS / 1000)
+                body, extra = self._body_for(headers.get("accept-encoding", ""))
+                response = [b"HTTP/1.1 200 OK", b"content-type: application/json",
+                            f"content-length: {len(body)}".encode()]
+                response += [f"{k}: {v}".encode() for k, v in extra]
+                self._write(writer, b"\r\n".join(response) + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_h2(self, first, reader, writer):
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        self._write(writer, conn.data_to_send())
+        window_open = asyncio.Event()
+        request_headers = {}
+
+        async def respond(stream_id, headers):
+            await asyncio.sleep(LATENCY_MS / 1000)
+            body, extra = self._body_for(headers.get("accept-encoding", ""))
+            conn.send_headers(stream_id, [(":status", "200"), ("content-type", "application/json"),
+                                          ("content-length", str(len(body)))] + extra)
+            while body:
+                size = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size, len(body))
+                if size <= 0:
+                    window_open.clear()
+                    await window_open.wait()
+                    continue
+                conn.send_data(stream_id, body[:size], end_stream=size == len(body))
+                body = body[size:]
+                self._write(writer, conn.data_to_send())
+            self._write(writer, conn.data_to_send())
+
+        data = first
+        try:
+            while data:
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        request_headers[event.stream_id] = {
+                            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                            for k, v in event.headers}
+                    elif isinstance(event, h2.events.DataReceived):
+                        conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        asyncio.ensure_future(respond(event.stream_id, request_headers.pop(event.stream_id)))
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        window_open.set()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                self._write(writer, conn.data_to_send())
+                await writer.drain()
+                data = await reader.read(65536)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def start(self):
+        def run():
+            self.loop = asyncio.new_event_loop()
+            server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            self.loop.run_forever()
+        threading.Thread(target=run, daemon=True).start()
+        self._ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+def measure(server: StandInServer, label: str, fn):
+    connections_before = server.connections
+    fn() # Pemanasan: membuka koneksi
+    bytes_before = server.bytes_sent
+    latencies = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<48} median {statistics.median(latencies):7.1f} ms   "
+          f"{(server.bytes_sent - bytes_before) / ROUNDS / 1024:8.1f} KiB/ronde   "
+          f"{server.connections - connections_before} koneksi")
+
+def main():
+    server = StandInServer(build_payload(PAYLOAD_ROWS))
+    url = server.start()
+    key = "bench-key"
+    params = {"query": "SELECT 1"}
+    print(f"Payload {len(server.payload) / 1024:.0f} KiB ({len(server.payload_gzip) / 1024:.0f} KiB gzip), "
+          f"latensi server {LATENCY_MS} ms, {PANEL_QUERIES} query per ronde, {ROUNDS} ronde\n")
+
+    # Klien bawaan supabase-py (tanpa TLS: HTTP/1.1, tanpa kompresi dari gateway)
+    baseline = SyncPostgrestClient(f"{url}/rest/v1", headers={"apikey": key, "Accept-Encoding": "identity"})
+    pool = ThreadPoolExecutor(max_workers=PANEL_QUERIES)
+    measure(server, "supabase-py, berurutan", lambda: [
+        baseline.rpc("exec_sql", params).execute() for _ in range(PANEL_QUERIES)])
+    measure(server, "supabase-py, thread paralel", lambda: list(pool.map(
+        lambda _: baseline.rpc("exec_sql", params).execute(), range(PANEL_QUERIES))))
+
+    transport = PostgrestTransport(url, key, http1=False)
+    measure(server, "PostgrestTransport, berurutan", lambda: [
+        transport.rpc("exec_sql", params) for _ in range(PANEL_QUERIES)])
+    measure(server, "PostgrestTransport, thread paralel (multipleks)", lambda: list(pool.map(
+        lambda _: transport.rpc("exec_sql", params), range(PANEL_QUERIES))))
+
+    loop = asyncio.new_event_loop()
+    measure(server, "PostgrestTransport, asyncio (agather_rpc)", lambda: loop.run_until_complete(
+        transport.agather_rpc([("exec_sql", params)] * PANEL_QUERIES)))
+    loop.run_until_complete(transport.aclose())
+    transport.close()
+    pool.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# benchmarks/readonly_cache.py
+
+"""
+Mengukur biaya per rerun halaman overview untuk dua sumber datanya
+(get_all_student_periodic_emissions dan get_daily_activity_emissions_for_trend, tanpa filter):
+- st.cache_data: hasil di-pickle saat disimpan dan di-unpickle menjadi salinan baru di setiap
+  cache hit;
+- versioned_cache_data(readonly=True): frame hanya-baca disimpan sekali per proses
+  (src/utils/readonly_frame.py) dan setiap rerun menerima objek yang sama.
+
+Setiap rerun mengambil kedua frame lalu menjalankan build_overview_view seperti show().
+Memori diukur dengan tracemalloc (alokasi numpy ikut terhitung): puncak alokasi per rerun,
+dan memori yang ditahan jika beberapa sesi masih memegang frame hasil rerun terakhirnya.
+
+Jalankan dari root repo:
+    python benchmarks/readonly_cache.py
+"""
+
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.disable(logging.WARNING) # peringatan "No runtime found" Streamlit di luar `streamlit run`
+import streamlit as st
+from src.pages.overview import DAY_ORDER, build_overview_view
+from src.utils.readonly_frame import ReadOnlyFrameError, frame_nbytes, freeze_frame
+from src.utils.result_schema import apply_schema
+from src.utils.swr import FRESH, SwrStore
+
+STUDENT_COUNTS = [2_000, 20_000, 100_000]
+RERUNS = 20
+SESSIONS = 8
+SEED = 42
+
+FAKULTAS = ['STEI', 'FTI', 'FMIPA', 'SBM', 'FTSL', 'SAPPK', 'FSRD', 'Unknown']
+KATEGORI = ['Transportasi', 'Elektronik', 'Sampah']
+
+def make_frames(students: int, rng: np.random.Generator):
+    """Frame sintetis dengan bentuk dan tipe kolom yang sama seperti hasil query overview."""
+    ids = np.arange(1, students + 1)
+    fakultas = rng.choice(FAKULTAS, students)
+    periodic = pd.DataFrame({
+        'id_mahasiswa': ids,
+        'fakultas': fakultas,
+        'transportasi': rng.gamma(2.0, 3.0, students),
+        'elektronik': rng.gamma(2.0, 1.0, students),
+        'sampah_makanan': rng.gamma(2.0, 0.5, students),
+    })
+    # Rata-rata ~3 hari x 3 kategori per mahasiswa.
+    rows = students * 9
+    pick = rng.integers(0, students, rows)
+    daily = pd.DataFrame({
+        'id_mahasiswa': ids[pick],
+        'fakultas': fakultas[pick],
+        'hari': rng.choice(DAY_ORDER, rows),
+        'kategori': rng.choice(KATEGORI, rows),
+        'emisi': rng.gamma(2.0, 0.5, rows),
+    }).drop_duplicates(['id_mahasiswa', 'hari', 'kategori'])
+    return apply_schema(periodic, 'overview.periodic'), apply_schema(daily.reset_index(drop=True), 'overview.daily')
+
+def cache_data_getters(periodic: pd.DataFrame, daily: pd.DataFrame):
+    @st.cache_data
+    def get_periodic(students):
+        return periodic
+
+    @st.cache_data
+    def get_daily(students, selected_fakultas, selected_days, selected_categories):
+        return daily
+
+    return get_periodic, get_daily
+
+def readonly_getters(periodic: pd.DataFrame, daily: pd.DataFrame):
+    # Jalur cache hit _store_cache_data di db_connector: lookup di SwrStore, tanpa salinan.
+    store = SwrStore(256)
+    store.set("periodic", 1, freeze_frame(periodic.copy()))
+    store.set("daily", 1, freeze_frame(daily.copy()))
+
+    def get(key):
+        value, state = store.lookup(key, 1)
+        assert state == FRESH
+        return value
+
+    return (lambda students: get("periodic"),
+            lambda students, selected_fakultas, selected_days, selected_categories: get("daily"))
+
+def fetch(getters, students: int):
+    get_periodic, get_daily = getters
+    return get_periodic(students), get_daily(students, [], [], [])
+
+def rerun(getters, students: int):
+    periodic_df, daily_df = fetch(getters, students)
+    return periodic_df, daily_df, build_overview_view(periodic_df, daily_df, [], [], [])
+
+def median_ms(fn, *args):
+    timings = []
+    for _ in range(RERUNS):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def measure(getters, students: int):
+    """
+    (median ms kedua cache hit, median ms per rerun, puncak alokasi MB per rerun,
+    MB ditahan oleh SESSIONS sesi).
+    """
+    rerun(getters, students) # mengisi cache
+    fetch_ms = median_ms(fetch, getters, students)
+    rerun_ms = median_ms(rerun, getters, students)
+
+    tracemalloc.start()
+    rerun(getters, students)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    held = [rerun(getters, students) for _ in range(SESSIONS)]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return fetch_ms, rerun_ms, peak / 1024 / 1024, (retained - baseline) / 1024 / 1024
+
+def _format_row(row):
+    fetch_ms, rerun_ms, peak, retained = row
+    return f"{fetch_ms:>9.2f} {rerun_ms:>9.2f} {peak:>10.1f} {retained:>11.1f}"
+
+def check_mutation_refused(periodic: pd.DataFrame):
+    frozen = freeze_frame(periodic.copy())
+    try:
+        frozen['total_emisi'] = 0.0
+    except ReadOnlyFrameError:
+        return True
+    return False
+
+def main():
+    rng = np.random.default_rng(SEED)
+    print(f"Per rerun overview tanpa filter (median {RERUNS} rerun), memori ditahan oleh {SESSIONS} sesi\n")
+    print(f"{'Mahasiswa':>10} {'Ukuran frame':>13}   {'Mode':<12} {'ms ambil':>9} {'ms/rerun':>9} "
+          f"{'puncak MB':>10} {'ditahan MB':>11}")
+    for students in STUDENT_COUNTS:
+        periodic, daily = make_frames(students, rng)
+        size = (frame_nbytes(periodic) + frame_nbytes(daily)) / 1024 / 1024
+        st.cache_data.clear()
+        results = {
+            'cache_data': measure(cache_data_getters(periodic, daily), students),
+            'readonly': measure(readonly_getters(periodic, daily), students),
+        }
+        for mode, row in results.items():
+            label = f"{students:>10,} {size:>10.1f} MB" if mode == 'cache_data' else " " * 24
+            print(f"{label}   {mode:<12} " + _format_row(row))
+        saved = tuple(copy - ro for copy, ro in zip(results['cache_data'], results['readonly']))
+        print(f"{'':>24}   {'hemat':<12} " + _format_row(saved) + "\n")
+
+    print("Mutasi frame bersama (df['total_emisi'] = ...) ditolak:", check_mutation_refused(periodic))
+
+if __name__ == "__main__":
+    main()
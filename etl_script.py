@@ -10,6 +10,8 @@ import numpy as np
 import random
 import re
 import time 
+import asyncio
+from src.utils.http_transport import PostgrestTransport, format_transport_stats
 
 load_dotenv()
 
@@ -20,6 +22,7 @@ SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/au
 CREDS_FILE = 'credentials.json'
 SHEET_URL = "https://docs.google.com/spreadsheets/d/11Y7cx9SqtLeG5S09F34nDQSnwaZDfUkZKVnNwRLi8V4"
 RAW_DATA_WORKSHEET_NAME = "Form Responses 1 RAW (Dummy)" # Menggunakan sheet dummy untuk data besar
+INSERT_CONCURRENCY = 4 # Jumlah batch INSERT yang dikirim bersamaan di satu koneksi HTTP/2
 
 def connect_to_gsheet(url, worksheet_name):
     try:
@@ -74,7 +77,7 @@ def clear_supabase_tables(supabase: Client):
     print("✅ Proses pembersihan tabel selesai.")
 
 
-def load_to_supabase(supabase: Client, table_name: str, df: pd.DataFrame, pk_column: str, is_log=False):
+def load_to_supabase(supabase: Client, transport: PostgrestTransport, table_name: str, df: pd.DataFrame, pk_column: str, is_log=False):
     if df.empty:
         print(f"Tidak ada data untuk dimuat ke '{table_name}'.")
         return
@@ -104,18 +107,10 @@ def load_to_supabase(supabase: Client, table_name: str, df: pd.DataFrame, pk_col
                         pass
                 
             print("   - Memasukkan log baru (batching INSERT)...")
-            for i in range(0, len(records), batch_size_insert):
-                batch_records = records[i:i + batch_size_insert]
-                try:
-                    supabase.table(table_name).insert(batch_records).execute()
-                    print(f"     -> Berhasil memasukkan batch {i//batch_size_insert + 1} dari {len(records)//batch_size_insert + 1} ({len(batch_records)} records).")
-                    time.sleep(0.1)
-                except Exception as batch_e:
-                    print(f"     -> Gagal memasukkan batch {i//batch_size_insert + 1} (records {i}-{i+len(batch_records)-1}): {batch_e}")
-                    pass
+            asyncio.run(insert_batches(transport, table_name, records, batch_size_insert))
             
         else:
-            supabase.table(table_name).upsert(records, on_conflict=pk_column).execute()
+            transport.insert(table_name, records, upsert_on=pk_column)
         print(f"   -> Berhasil.")
     except Exception as e:
         print(f"   -> Gagal total saat memuat ke '{table_name}': {e}")
@@ -309,12 +304,32 @@ def transform_all_data(df_raw):
         "aktivitas_harian": df_aktivitas
     }
 
+async def insert_batches(transport: PostgrestTransport, table_name: str, records: list, batch_size: int):
+    """Mengirim batch INSERT secara bersamaan (maks. INSERT_CONCURRENCY) lewat transport HTTP/2."""
+    semaphore = asyncio.Semaphore(INSERT_CONCURRENCY)
+    n_batches = len(records)//batch_size + 1
+
+    async def insert_one(i):
+        batch_records = records[i:i + batch_size]
+        async with semaphore:
+            try:
+                await transport.ainsert(table_name, batch_records)
+                print(f"     -> Berhasil memasukkan batch {i//batch_size + 1} dari {n_batches} ({len(batch_records)} records).")
+            except Exception as batch_e:
+                print(f"     -> Gagal memasukkan batch {i//batch_size + 1} (records {i}-{i+len(batch_records)-1}): {batch_e}")
+
+    try:
+        await asyncio.gather(*(insert_one(i) for i in range(0, len(records), batch_size)))
+    finally:
+        await transport.aclose()
+
 def main():
     print("Memulai proses ETL...\n")
     
     if not (SUPABASE_URL and SUPABASE_KEY):
         print("Kredensial Supabase tidak ditemukan. Harap atur di file .env"); return
     supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    transport = PostgrestTransport(SUPABASE_URL, SUPABASE_KEY)
 
     # Langkah 1: Ekstraksi data dari Google Sheet
     worksheet = connect_to_gsheet(SHEET_URL, RAW_DATA_WORKSHEET_NAME)
@@ -338,10 +353,12 @@ def main():
         df = transformed_data.get(table_name)
         if df is not None:
             is_log_table = table_name == "aktivitas_harian"
-            load_to_supabase(supabase, table_name, df, 'id_mahasiswa', is_log=is_log_table)
+            load_to_supabase(supabase, transport, table_name, df, 'id_mahasiswa', is_log=is_log_table)
         else:
             print(f"Peringatan: DataFrame untuk tabel '{table_name}' tidak ditemukan.")
     
+    print(f"Transfer ke Supabase: {format_transport_stats(transport)}")
+    transport.close()
     print("\n🎉 Semua proses ETL selesai.")
 
 if __name__ == "__main__":
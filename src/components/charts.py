@@ -0,0 +1,82 @@
+import json
+import logging
+
+import plotly.io
+import streamlit as st
+
+from src.utils.db_connector import get_figure_cache
+
+# Jalur cepat memakai bagian dalam st.plotly_chart yang hanya diperiksa di Streamlit 1.46
+# (st._main, compute_and_register_element_id, DeltaGenerator._enqueue, field proto PlotlyChart).
+# Di versi lain, atau jika bagian itu berubah, figure dari cache dikirim lewat st.plotly_chart biasa.
+PLOTLY_SPEC_STREAMLIT_VERSIONS = ("1.46.",)
+_PLOTLY_PROTO_FIELDS = {"use_container_width", "theme", "form_id", "spec", "config", "id"}
+
+try:
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.utils import compute_and_register_element_id
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+except ImportError:
+    PlotlyChartProto = None
+
+def _plotly_spec_fast_path() -> bool:
+    """True jika bagian dalam Streamlit yang dipakai _enqueue_plotly_spec cocok dengan versi terpasang."""
+    if PlotlyChartProto is None or not st.__version__.startswith(PLOTLY_SPEC_STREAMLIT_VERSIONS):
+        return False
+    return (hasattr(st, "_main") and hasattr(DeltaGenerator, "_enqueue")
+            and _PLOTLY_PROTO_FIELDS <= set(PlotlyChartProto.DESCRIPTOR.fields_by_name))
+
+PLOTLY_SPEC_FAST_PATH = _plotly_spec_fast_path()
+if not PLOTLY_SPEC_FAST_PATH:
+    logging.warning(f"CHARTS: Streamlit {st.__version__} internals not supported, cached figures are sent with st.plotly_chart")
+
+def plotly_chart_cached(panel_id: str, data, build, config: dict = None, use_container_width: bool = True) -> bool:
+    """
+    Seperti st.plotly_chart(build(), config=config, use_container_width=...), tetapi JSON figure
+    disimpan per panel dan sidik jari `data` (lihat src/utils/figure_cache.py). Cache hit melewati
+    pembuatan figure dan serialisasinya.
+
+    Args:
+        panel_id (str): Id panel yang unik di seluruh aplikasi, mis. 'transportation.trend'.
+        data: Semua masukan figure (DataFrame panel, filter, ...); build() tidak boleh memakai yang lain.
+        build: Fungsi tanpa argumen yang mengembalikan go.Figure, atau None jika tidak ada figure.
+
+    Returns:
+        bool: False jika build() tidak menghasilkan figure (tidak ada yang ditampilkan).
+    """
+    spec = get_figure_cache().spec(panel_id, data, build)
+    if spec is None:
+        return False
+    if not PLOTLY_SPEC_FAST_PATH:
+        st.plotly_chart(plotly.io.from_json(spec), config=config or {}, use_container_width=use_container_width)
+    else:
+        _enqueue_plotly_spec(spec, config or {}, use_container_width)
+    return True
+
+def _enqueue_plotly_spec(spec: str, config: dict, use_container_width: bool):
+    """Jalur st.plotly_chart tanpa on_select, dengan JSON figure yang sudah diserialisasi."""
+    dg = st._main # sama seperti st.plotly_chart; elemen masuk ke container aktif (blok `with`)
+    config = dict(config)
+    config.setdefault("showLink", False)
+    config.setdefault("linkText", False)
+
+    proto = PlotlyChartProto()
+    proto.use_container_width = use_container_width
+    proto.theme = "streamlit"
+    proto.form_id = current_form_id(dg)
+    proto.spec = spec
+    proto.config = json.dumps(config)
+    proto.id = compute_and_register_element_id(
+        "plotly_chart",
+        user_key=None,
+        form_id=proto.form_id,
+        dg=dg,
+        plotly_spec=proto.spec,
+        plotly_config=proto.config,
+        selection_mode=("points", "box", "lasso"),
+        is_selection_activated=False,
+        theme="streamlit",
+        use_container_width=use_container_width,
+    )
+    dg._enqueue("plotly_chart", proto)
@@ -11,13 +11,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 try:
     from src.auth.auth import is_logged_in, get_current_user, is_admin, logout
-    from src.utils.db_connector import init_supabase_connection 
+    from src.utils.db_connector import init_supabase_connection, begin_query_rerun, stale_results_served_since, log_stats
+    from src.utils.cache_warmer import get_cache_warmer
     auth_available = True
 except ImportError as e:
     logging.error(f"Initial import error: {e}. Trying fallback path.")
     try:
         from auth.auth import is_logged_in, get_current_user, is_admin, logout
-        from utils.db_connector import init_supabase_connection
+        from utils.db_connector import init_supabase_connection, begin_query_rerun, stale_results_served_since, log_stats
+        from utils.cache_warmer import get_cache_warmer
         auth_available = True
     except ImportError as e_fallback:
         st.error(f"Error: Tidak dapat mengimport modul auth atau db_connector. Periksa struktur folder dan PYTHONPATH Anda.")
@@ -163,6 +165,10 @@ SUPABASE_KEY = "your-anon-public-key"
         st.session_state.is_initial_page_load = False 
         
     create_sidebar() # Sidebar dibuat hanya jika user sudah login
+    get_cache_warmer() # Rerun pertama pengguna yang sudah login setelah proses start memicu pemanasan cache di latar
+
+    begin_query_rerun() # Batalkan query rerun sebelumnya yang masih berjalan
+    data_notice = st.empty() # Diisi setelah halaman dirender jika ada data stale (circuit breaker)
 
     try:
         if current_page_id == 'overview':
@@ -204,9 +210,13 @@ SUPABASE_KEY = "your-anon-public-key"
         st.error(f"Error mengimport page '{current_page_id}': {e}")
         st.write("Periksa struktur folder dan nama file.")
 
+    if stale_results_served_since(start_main_time):
+        data_notice.warning("Koneksi ke database sedang bermasalah. Sebagian data yang ditampilkan adalah data terakhir yang berhasil dimuat.")
+
     end_main_time = time.time()
     elapsed_main_time = end_main_time - start_main_time
     logging.info(f"MAIN: Total script execution for '{current_page_id}' rerun: {elapsed_main_time:.2f} seconds")
+    log_stats()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,8 +4,16 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 from src.components.loading import loading, loading_decorator
+from src.components.charts import plotly_chart_cached
 import time
-from src.utils.db_connector import run_sql
+from src.utils.db_connector import run_sql, run_sql_batch, run_rpc_batch, split_grouped_result, PANEL_QUERY_MODE, versioned_cache_data, get_partial_aggregate_cache, get_fact_engine
+from src.utils.panel_loader import PanelLoader
+from src.utils.column_registry import build_export_select, EXPORT_PROFILE_LABELS, DEFAULT_EXPORT_PROFILE
+from src.utils.result_schema import apply_schema
+from src.utils.filters import canonical_filter, session_filter, top_value_views, facet_slot, show_facet_counts
+from src.utils.partial_aggregates import PanelAggregate, PartialAggregateSpec
+from src.utils.fact_engine import facet_counts
+from src.utils.emission_factors import PERSONAL_DEVICE_POWER, personal_emission, personal_emission_sql
 from io import BytesIO
 from xhtml2pdf import pisa
 
@@ -17,7 +25,7 @@ DAY_ORDER = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
 PERSONAL_DEVICES = ['HP', 'Laptop', 'Tablet']
 FACILITY_DEVICES = ['AC', 'Lampu']
 
-@st.cache_data(ttl=3600)
+@st.cache_data(show_spinner=False)
 def build_universal_where_clause(selected_fakultas, selected_days):
     elektronik_conditions = []
     aktivitas_conditions = []
@@ -39,12 +47,7 @@ def build_universal_where_clause(selected_fakultas, selected_days):
 def _get_dynamic_emission_clauses(selected_devices):
     if not selected_devices:
         selected_devices = PERSONAL_DEVICES + FACILITY_DEVICES
-    personal_terms = []
-    if 'HP' in selected_devices: personal_terms.append("COALESCE(t.durasi_hp, 0)*4")
-    if 'Laptop' in selected_devices: personal_terms.append("COALESCE(t.durasi_laptop, 0)*50")
-    if 'Tablet' in selected_devices: personal_terms.append("COALESCE(t.durasi_tab, 0)*10")
-    personal_sum_expr = ' + '.join(personal_terms) if personal_terms else '0'
-    personal_sum_clause = f"(({personal_sum_expr}) * 0.829 / 1000)"
+    personal_sum_clause = personal_emission_sql(selected_devices)
     
     facility_terms = []
     if 'AC' in selected_devices: facility_terms.append("COALESCE(a.emisi_ac, 0)")
@@ -56,12 +59,10 @@ def _get_dynamic_emission_clauses(selected_devices):
     include_facility = any(d in selected_devices for d in FACILITY_DEVICES)
     return personal_sum_clause, facility_sum_clause, include_personal, include_facility
 
-# electronic.py - get_daily_trend_data
-@st.cache_data(ttl=3600)
-def get_daily_trend_data(where_elektronik, where_aktivitas, join_needed, selected_devices):
+def _daily_trend_query(where_elektronik, where_aktivitas, join_needed, selected_devices):
     personal_sum, facility_sum, include_personal, include_facility = _get_dynamic_emission_clauses(selected_devices)
     if not include_personal and not include_facility: 
-        return pd.DataFrame(columns=['hari', 'total_emisi'])
+        return None
     
     join_elektronik_sql = "JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
     join_aktivitas_sql = "JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
@@ -87,18 +88,18 @@ def get_daily_trend_data(where_elektronik, where_aktivitas, join_needed, selecte
         query = f"WITH personal_daily AS ({personal_cte}) SELECT hari, emisi as total_emisi FROM personal_daily"
     else: # include_facility
         query = f"WITH facility_daily AS ({facility_cte}) SELECT hari, emisi as total_emisi FROM facility_daily"
-        
-    df = run_sql(query)
-    if not df.empty:
-        df['order'] = pd.Categorical(df['hari'], categories=DAY_ORDER, ordered=True)
-        df = df.sort_values('order').drop(columns=['order'])
-        df = df.dropna(subset=['total_emisi']) 
+    return query
+
+def _prepare_daily_trend(df):
+    if df.empty:
+        return pd.DataFrame(columns=['hari', 'total_emisi'])
+    df = df.sort_values('hari')
+    df = df.dropna(subset=['total_emisi']) 
     return df
 
-@st.cache_data(ttl=3600)
-def get_faculty_data(where_elektronik, where_aktivitas, selected_devices):
+def _faculty_query(where_elektronik, where_aktivitas, selected_devices):
     personal_sum, facility_sum, include_personal, include_facility = _get_dynamic_emission_clauses(selected_devices)
-    if not include_personal and not include_facility: return pd.DataFrame(columns=['fakultas', 'total_emisi', 'total_count'])
+    if not include_personal and not include_facility: return None
     personal_sum_weekly = f"{personal_sum} * COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0)"
     personal_cte = f"SELECT r.fakultas, SUM({personal_sum_weekly}) as emisi FROM elektronik t JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa {where_elektronik} GROUP BY r.fakultas"
     facility_cte = f"SELECT r.fakultas, SUM({facility_sum}) as emisi FROM aktivitas_harian a JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa {where_aktivitas} GROUP BY r.fakultas"
@@ -109,66 +110,434 @@ def get_faculty_data(where_elektronik, where_aktivitas, selected_devices):
         query = f"WITH personal_agg AS ({personal_cte}), {responden_count_cte} SELECT p.fakultas, p.emisi as total_emisi, rc.total_count FROM personal_agg p JOIN responden_count rc ON rc.fakultas = p.fakultas ORDER BY total_emisi ASC"
     else:
         query = f"WITH facility_agg AS ({facility_cte}), {responden_count_cte} SELECT f.fakultas, f.emisi as total_emisi, rc.total_count FROM facility_agg f JOIN responden_count rc ON rc.fakultas = f.fakultas ORDER BY total_emisi ASC"
-    df = run_sql(query)
-    if 'total_emisi' in df.columns and not df.empty and 'total_count' not in df.columns:
+    return query
+
+def _prepare_faculty(df):
+    if df.empty:
+        return pd.DataFrame(columns=['fakultas', 'total_emisi', 'total_count'])
+    if 'total_emisi' in df.columns and 'total_count' not in df.columns:
         fakultas_list_str = "','".join(df['fakultas'].unique())
         count_df = run_sql(f"SELECT fakultas, COUNT(DISTINCT id_mahasiswa) as total_count FROM v_informasi_fakultas_mahasiswa WHERE fakultas IN ('{fakultas_list_str}') GROUP BY fakultas")
         if not count_df.empty: df = pd.merge(df, count_df, on='fakultas', how='left')
     return df
 
-@st.cache_data(ttl=3600)
-def get_device_emissions_data(where_elektronik, where_aktivitas, join_needed):
+def _device_emissions_query(where_elektronik, where_aktivitas, join_needed):
     join_elektronik_sql = "JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
     join_aktivitas_sql = "JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
+    personal_devices = " UNION ALL\n        ".join(
+        f"SELECT '{device}' as device, SUM({personal_emission_sql([device])} * COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0)) as emisi FROM elektronik t {join_elektronik_sql} {where_elektronik}"
+        for device in ['Laptop', 'HP', 'Tablet'])
+    return f"""
     WITH personal_devices AS (
-        SELECT 'Laptop' as device, SUM((COALESCE(t.durasi_laptop, 0) * 50 * 0.829 / 1000) * COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0)) as emisi FROM elektronik t {join_elektronik_sql} {where_elektronik} UNION ALL
-        SELECT 'HP' as device, SUM((COALESCE(t.durasi_hp, 0) * 4 * 0.829 / 1000) * COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0)) as emisi FROM elektronik t {join_elektronik_sql} {where_elektronik} UNION ALL
-        SELECT 'Tablet' as device, SUM((COALESCE(t.durasi_tab, 0) * 10 * 0.829 / 1000) * COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0)) as emisi FROM elektronik t {join_elektronik_sql} {where_elektronik}
+        {personal_devices}
     ), facility_devices AS (
         SELECT 'AC' as device, SUM(COALESCE(a.emisi_ac, 0)) as emisi FROM aktivitas_harian a {join_aktivitas_sql} {where_aktivitas} UNION ALL
         SELECT 'Lampu' as device, SUM(COALESCE(a.emisi_lampu, 0)) as emisi FROM aktivitas_harian a {join_aktivitas_sql} {where_aktivitas}
     )
     SELECT device, emisi FROM personal_devices UNION ALL SELECT device, emisi FROM facility_devices
     """
-    return run_sql(query)
 
-@st.cache_data(ttl=3600)
-def get_heatmap_data(where_aktivitas, join_needed, selected_devices):
+def _heatmap_query(where_aktivitas, join_needed, selected_devices):
     _, facility_sum, _, include_facility = _get_dynamic_emission_clauses(selected_devices)
-    if not include_facility: return pd.DataFrame(columns=['hari', 'time_range', 'total_emisi'])
+    if not include_facility: return None
     join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
+    return f"""
     SELECT a.hari, CONCAT(SPLIT_PART(a.waktu, '-', 1), ':00-', SPLIT_PART(a.waktu, '-', 2), ':00') as time_range, SUM({facility_sum}) as total_emisi
     FROM aktivitas_harian a {join_sql} {where_aktivitas}
     GROUP BY a.hari, time_range
     """
-    return run_sql(query)
 
-@st.cache_data(ttl=3600)
-def get_classroom_data(where_aktivitas, join_needed, selected_devices):
+def _prepare_heatmap(df):
+    if df.empty:
+        return pd.DataFrame(columns=['hari', 'time_range', 'total_emisi'])
+    return df
+
+def _classroom_query(where_aktivitas, join_needed, selected_devices):
     _, facility_sum, _, include_facility = _get_dynamic_emission_clauses(selected_devices)
-    if not include_facility: return pd.DataFrame(columns=['lokasi', 'session_count', 'total_emisi'])
+    if not include_facility: return None
     join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
     class_condition = "a.kegiatan ILIKE '%kelas%'"
     final_where_classroom = f"{where_aktivitas} AND {class_condition}" if where_aktivitas else f"WHERE {class_condition}"
-    query = f"""
+    return f"""
     SELECT a.lokasi, COUNT(*) as session_count, SUM({facility_sum}) as total_emisi
     FROM aktivitas_harian a {join_sql}
     {final_where_classroom}
     GROUP BY a.lokasi ORDER BY session_count DESC LIMIT 10
     """
-    df = run_sql(query)
+
+def _prepare_classroom(df):
+    if df.empty and 'lokasi' not in df.columns:
+        df = pd.DataFrame(columns=['lokasi', 'session_count', 'total_emisi'])
     if not df.empty and 'total_emisi' in df.columns and 'session_count' in df.columns and df['session_count'].sum() > 0:
         df['avg_emisi_per_session'] = df['total_emisi'] / df['session_count']
     else: df['avg_emisi_per_session'] = 0
     return df
 
-@st.cache_data(ttl=3600)
-def get_filtered_elektronik_data(selected_fakultas, selected_days):
+def _unique_students_query(where_elektronik, where_aktivitas):
+    return f"""
+    WITH FilteredStudents AS (
+        SELECT t.id_mahasiswa FROM elektronik t
+        LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+        {where_elektronik} AND (COALESCE(t.durasi_hp, 0) > 0 OR COALESCE(t.durasi_laptop, 0) > 0 OR COALESCE(t.durasi_tab, 0) > 0)
+        UNION
+        SELECT a.id_mahasiswa FROM aktivitas_harian a
+        LEFT JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa
+        {where_aktivitas} AND (COALESCE(a.emisi_ac, 0) > 0 OR COALESCE(a.emisi_lampu, 0) > 0)
+    )
+    SELECT COUNT(DISTINCT id_mahasiswa) as count FROM FilteredStudents
+    """
+
+def build_panel_queries(where_elektronik, where_aktivitas, join_needed, selected_devices):
+    """Menyusun SQL untuk setiap panel (dan KPI laporan) halaman elektronik.
+    Panel yang tidak relevan dengan perangkat terpilih bernilai None."""
+    return {
+        'daily': _daily_trend_query(where_elektronik, where_aktivitas, join_needed, selected_devices),
+        'faculty': _faculty_query(where_elektronik, where_aktivitas, selected_devices),
+        'devices': _device_emissions_query(where_elektronik, where_aktivitas, join_needed),
+        'heatmap': _heatmap_query(where_aktivitas, join_needed, selected_devices),
+        'classroom': _classroom_query(where_aktivitas, join_needed, selected_devices),
+        'unique_students': _unique_students_query(where_elektronik, where_aktivitas),
+    }
+
+PANEL_NAMES = ['daily', 'faculty', 'devices', 'heatmap', 'classroom', 'unique_students']
+
+PANEL_PREPARERS = {
+    'daily': _prepare_daily_trend,
+    'faculty': _prepare_faculty,
+    'heatmap': _prepare_heatmap,
+    'classroom': _prepare_classroom,
+}
+
+def build_panel_rpc_calls(selected_fakultas, selected_days, selected_devices, panel_names):
+    """Menyusun panggilan fungsi bertipe (mode RPC) untuk panel di `panel_names`; padanan build_panel_queries."""
+    params = {'p_fakultas': list(selected_fakultas or []), 'p_days': list(selected_days or [])}
+    device_params = {**params, 'p_devices': list(selected_devices or PERSONAL_DEVICES + FACILITY_DEVICES)}
+    calls = {
+        'daily': ('electronic_daily_trend_v1', device_params),
+        'faculty': ('electronic_faculty_emissions_v1', device_params),
+        'devices': ('electronic_device_emissions_v1', params),
+        'heatmap': ('electronic_heatmap_v1', device_params),
+        'classroom': ('electronic_classroom_v1', device_params),
+        'unique_students': ('electronic_unique_students_v1', params),
+    }
+    return {name: call for name, call in calls.items() if name in panel_names}
+
+def build_fused_panel_query(where_elektronik, where_aktivitas, selected_devices):
+    """
+    Satu query untuk semua panel: elektronik dan aktivitas_harian masing-masing dibaca sekali
+    (CTE personal/facility), lalu setiap panel menjadi satu grouping set berlabel kolom `panel`.
+    Bagian pribadi dan fasilitas digabung di klien oleh split_fused_panel_data.
+    """
+    personal_sum, facility_sum, _, _ = _get_dynamic_emission_clauses(selected_devices)
+    # Sama dengan _unique_students_query: syarat pemakaian > 0 hanya berlaku jika ada filter.
+    personal_used = "(COALESCE(durasi_hp, 0) > 0 OR COALESCE(durasi_laptop, 0) > 0 OR COALESCE(durasi_tab, 0) > 0)" if where_elektronik else "TRUE"
+    facility_used = "(COALESCE(emisi_ac, 0) > 0 OR COALESCE(emisi_lampu, 0) > 0)" if where_aktivitas else "TRUE"
+    return f"""
+    WITH personal AS (
+        SELECT
+            t.id_mahasiswa, t.hari_datang, t.durasi_hp, t.durasi_laptop, t.durasi_tab,
+            {personal_sum} AS emisi_harian,
+            COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) AS n_hari,
+            r.fakultas, r.id_mahasiswa IS NOT NULL AS has_fakultas
+        FROM elektronik t
+        LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+        {where_elektronik}
+    ), facility AS (
+        SELECT
+            a.id_mahasiswa, a.hari, a.kegiatan, a.lokasi, a.emisi_ac, a.emisi_lampu,
+            CONCAT(SPLIT_PART(a.waktu, '-', 1), ':00-', SPLIT_PART(a.waktu, '-', 2), ':00') AS time_range,
+            {facility_sum} AS emisi,
+            r.fakultas, r.id_mahasiswa IS NOT NULL AS has_fakultas
+        FROM aktivitas_harian a
+        LEFT JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa
+        {where_aktivitas}
+    )
+    SELECT
+        CASE WHEN GROUPING(fakultas) = 0 THEN 'personal_faculty' ELSE 'personal_devices' END AS panel,
+        NULL AS hari, fakultas, has_fakultas, NULL AS time_range, NULL AS lokasi,
+        SUM(emisi_harian * n_hari) AS emisi,
+        NULL::bigint AS n_baris,
+        SUM({personal_emission_sql(['Laptop'], alias='')} * n_hari) AS laptop,
+        SUM({personal_emission_sql(['HP'], alias='')} * n_hari) AS hp,
+        SUM({personal_emission_sql(['Tablet'], alias='')} * n_hari) AS tablet,
+        NULL::double precision AS ac,
+        NULL::double precision AS lampu
+    FROM personal
+    GROUP BY GROUPING SETS ((has_fakultas, fakultas), ())
+    UNION ALL
+    SELECT 'personal_daily', d.hari, NULL, NULL, NULL, NULL, SUM(emisi_harian), NULL, NULL, NULL, NULL, NULL, NULL
+    FROM personal
+    CROSS JOIN LATERAL (SELECT TRIM(unnest(string_to_array(personal.hari_datang, ','))) AS hari) d
+    WHERE personal.hari_datang IS NOT NULL AND TRIM(personal.hari_datang) <> ''
+    GROUP BY d.hari
+    UNION ALL
+    SELECT
+        CASE WHEN GROUPING(time_range) = 0 THEN 'heatmap'
+             WHEN GROUPING(hari) = 0 THEN 'facility_daily'
+             WHEN GROUPING(fakultas) = 0 THEN 'facility_faculty'
+             WHEN GROUPING(lokasi) = 0 THEN 'classroom'
+             ELSE 'facility_devices' END,
+        hari, fakultas, has_fakultas, time_range, lokasi,
+        CASE WHEN GROUPING(lokasi) = 0 THEN SUM(emisi) FILTER (WHERE kegiatan ILIKE '%kelas%') ELSE SUM(emisi) END,
+        CASE WHEN GROUPING(lokasi) = 0 THEN COUNT(*) FILTER (WHERE kegiatan ILIKE '%kelas%') ELSE COUNT(*) END,
+        NULL, NULL, NULL,
+        SUM(COALESCE(emisi_ac, 0)),
+        SUM(COALESCE(emisi_lampu, 0))
+    FROM facility
+    GROUP BY GROUPING SETS ((hari), (has_fakultas, fakultas), (hari, time_range), (lokasi), ())
+    UNION ALL
+    SELECT 'responden', NULL, fakultas, NULL, NULL, NULL, NULL, COUNT(DISTINCT id_mahasiswa), NULL, NULL, NULL, NULL, NULL
+    FROM v_informasi_fakultas_mahasiswa
+    GROUP BY fakultas
+    UNION ALL
+    SELECT 'unique_students', NULL, NULL, NULL, NULL, NULL, NULL, COUNT(DISTINCT id_mahasiswa), NULL, NULL, NULL, NULL, NULL
+    FROM (
+        SELECT id_mahasiswa FROM personal WHERE {personal_used}
+        UNION
+        SELECT id_mahasiswa FROM facility WHERE {facility_used}
+    ) s
+    """
+
+def _combine_personal_facility(personal, facility, key, include_personal, include_facility):
+    """Padanan FULL OUTER JOIN personal/facility pada query SQL per panel."""
+    if include_personal and include_facility:
+        merged = pd.merge(personal, facility, on=key, how='outer', suffixes=('_p', '_f'), sort=False)
+        merged['total_emisi'] = merged['emisi_p'].fillna(0) + merged['emisi_f'].fillna(0)
+        return merged[[key, 'total_emisi']]
+    source = personal if include_personal else facility
+    return source.rename(columns={'emisi': 'total_emisi'})[[key, 'total_emisi']]
+
+def split_fused_panel_data(df, selected_devices):
+    """Memecah hasil build_fused_panel_query menjadi DataFrame per panel (kolom sama dengan build_panel_queries)."""
+    _, _, include_personal, include_facility = _get_dynamic_emission_clauses(selected_devices)
+
+    personal_daily = split_grouped_result(df, 'personal_daily', {'hari': 'hari', 'emisi': 'emisi'})
+    facility_daily = split_grouped_result(df, 'facility_daily', {'hari': 'hari', 'emisi': 'emisi'})
+    facility_daily = facility_daily[facility_daily['hari'].notna() & (facility_daily['hari'].str.strip() != '')]
+
+    faculty_columns = {'fakultas': 'fakultas', 'has_fakultas': 'has_fakultas', 'emisi': 'emisi'}
+    personal_faculty = split_grouped_result(df, 'personal_faculty', faculty_columns)
+    facility_faculty = split_grouped_result(df, 'facility_faculty', faculty_columns)
+    personal_faculty = personal_faculty[personal_faculty['has_fakultas'] == True].drop(columns=['has_fakultas'])
+    facility_faculty = facility_faculty[facility_faculty['has_fakultas'] == True].drop(columns=['has_fakultas'])
+    responden = split_grouped_result(df, 'responden', {'fakultas': 'fakultas', 'n_baris': 'total_count'}, ['total_count'])
+    faculty = _combine_personal_facility(personal_faculty, facility_faculty, 'fakultas', include_personal, include_facility)
+    faculty = pd.merge(faculty.dropna(subset=['fakultas']), responden.dropna(subset=['fakultas']), on='fakultas', how='inner')
+    faculty = faculty.sort_values('total_emisi', kind='stable').reset_index(drop=True)
+
+    personal_devices = split_grouped_result(df, 'personal_devices', {'laptop': 'Laptop', 'hp': 'HP', 'tablet': 'Tablet'})
+    facility_devices = split_grouped_result(df, 'facility_devices', {'ac': 'AC', 'lampu': 'Lampu'})
+    device_totals = {**personal_devices.iloc[0].to_dict(), **facility_devices.iloc[0].to_dict()} if not (personal_devices.empty or facility_devices.empty) else {}
+    devices = pd.DataFrame([{'device': device, 'emisi': device_totals.get(device)} for device in ['Laptop', 'HP', 'Tablet', 'AC', 'Lampu']])
+
+    classroom = split_grouped_result(df, 'classroom', {'lokasi': 'lokasi', 'n_baris': 'session_count', 'emisi': 'total_emisi'}, ['session_count'])
+    classroom = classroom[classroom['session_count'] > 0]
+    classroom = classroom.sort_values('session_count', ascending=False, kind='stable').head(10).reset_index(drop=True)
+
+    return {
+        'daily': _combine_personal_facility(personal_daily, facility_daily, 'hari', include_personal, include_facility),
+        'faculty': faculty,
+        'devices': devices,
+        'heatmap': split_grouped_result(df, 'heatmap', {'hari': 'hari', 'time_range': 'time_range', 'emisi': 'total_emisi'}),
+        'classroom': classroom,
+        'unique_students': split_grouped_result(df, 'unique_students', {'n_baris': 'count'}, ['count']),
+    }
+
+# Fact table mode local (lihat src/utils/fact_engine.py): baris CTE personal/facility
+# build_fused_panel_query tanpa filter, dan jumlah responden per fakultas.
+PERSONAL_FACT_SQL = """
+SELECT
+    t.id_mahasiswa, t.hari_datang, t.durasi_hp, t.durasi_laptop, t.durasi_tab,
+    COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) AS n_hari,
+    r.fakultas, r.id_mahasiswa IS NOT NULL AS has_fakultas
+FROM elektronik t
+LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+"""
+FACILITY_FACT_SQL = """
+SELECT
+    a.id_mahasiswa, a.hari, a.lokasi, a.emisi_ac, a.emisi_lampu,
+    a.kegiatan ILIKE '%kelas%' AS is_kelas,
+    CONCAT(SPLIT_PART(a.waktu, '-', 1), ':00-', SPLIT_PART(a.waktu, '-', 2), ':00') AS time_range,
+    r.fakultas, r.id_mahasiswa IS NOT NULL AS has_fakultas
+FROM aktivitas_harian a
+LEFT JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa
+"""
+RESPONDEN_FACT_SQL = "SELECT fakultas, COUNT(DISTINCT id_mahasiswa) AS n_baris FROM v_informasi_fakultas_mahasiswa GROUP BY fakultas"
+# Nama fact table -> (query, kolom dimensi)
+FACT_TABLES = {
+    'electronic.personal': (PERSONAL_FACT_SQL, ['fakultas']),
+    'electronic.facility': (FACILITY_FACT_SQL, ['fakultas', 'hari', 'is_kelas']),
+    'electronic.responden': (RESPONDEN_FACT_SQL, []),
+}
+
+def get_fact_table(engine, name):
+    """Fact table `name` dari FACT_TABLES (dimuat sekali per versi data); None jika tidak bisa dimuat."""
+    sql, dimensions = FACT_TABLES[name]
+    return engine.table(name, lambda: run_sql(sql), dimensions=dimensions)
+
+def build_local_panel_result(selected_fakultas, selected_days, selected_devices):
+    """
+    Hasil build_fused_panel_query yang dihitung di proses dari fact table elektronik dan
+    aktivitas_harian (mode local). DataFrame kosong jika fact table tidak bisa dimuat.
+    """
+    engine = get_fact_engine()
+    personal = get_fact_table(engine, 'electronic.personal')
+    facility = get_fact_table(engine, 'electronic.facility')
+    responden = get_fact_table(engine, 'electronic.responden')
+    if personal is None or facility is None or responden is None:
+        return pd.DataFrame()
+    devices = selected_devices or PERSONAL_DEVICES + FACILITY_DEVICES
+    filtered = bool(selected_fakultas or selected_days)
+    with engine.measure_query():
+        personal_mask = personal.where(isin={'fakultas': selected_fakultas}, ilike_any={'hari_datang': selected_days})
+        facility_mask = facility.where(isin={'fakultas': selected_fakultas, 'hari': selected_days})
+
+        n_hari = personal.values('n_hari')
+        durations = {device: np.nan_to_num(personal.values(column)) for device, (column, _) in PERSONAL_DEVICE_POWER.items()}
+        device_daily = {device: personal_emission(durations, [device]) for device in PERSONAL_DEVICE_POWER}
+        emisi_harian = np.zeros(len(personal)) + personal_emission(durations, devices) # skalar 0 tanpa perangkat pribadi
+        ac, lampu = np.nan_to_num(facility.values('emisi_ac')), np.nan_to_num(facility.values('emisi_lampu'))
+        emisi_facility = np.zeros(len(facility))
+        if 'AC' in devices:
+            emisi_facility = emisi_facility + ac
+        if 'Lampu' in devices:
+            emisi_facility = emisi_facility + lampu
+
+        hari_datang = pd.Series(personal.column('hari_datang'), dtype='string').str.strip(' ')
+        days = personal.explode('hari_datang', 'hari')
+        days_mask = days.from_parent(personal_mask & (hari_datang.fillna('') != '').to_numpy(dtype=bool))
+        # Syarat pemakaian > 0 di unique_students hanya berlaku jika ada filter (lihat build_fused_panel_query).
+        personal_used = np.logical_or.reduce([durations[device] > 0 for device in durations]) if filtered else True
+        facility_used = (ac > 0) | (lampu > 0) if filtered else True
+        ids = np.concatenate([personal.values('id_mahasiswa')[personal_mask & personal_used],
+                              facility.values('id_mahasiswa')[facility_mask & facility_used]])
+        return pd.concat([
+            personal.grouping_sets({'personal_faculty': ['has_fakultas', 'fakultas'], 'personal_devices': []}, personal_mask,
+                                   emisi=('sum', emisi_harian * n_hari),
+                                   laptop=('sum', device_daily['Laptop'] * n_hari),
+                                   hp=('sum', device_daily['HP'] * n_hari),
+                                   tablet=('sum', device_daily['Tablet'] * n_hari)),
+            days.grouping_sets({'personal_daily': ['hari']}, days_mask, emisi=('sum', days.from_parent(emisi_harian))),
+            facility.grouping_sets({'heatmap': ['hari', 'time_range'], 'facility_daily': ['hari'],
+                                    'facility_faculty': ['has_fakultas', 'fakultas'], 'facility_devices': []}, facility_mask,
+                                   emisi=('sum', emisi_facility), n_baris=('size', None),
+                                   ac=('sum', ac), lampu=('sum', lampu)),
+            facility.grouping_sets({'classroom': ['lokasi']}, facility_mask & facility.bitmap('is_kelas', True),
+                                   emisi=('sum', emisi_facility), n_baris=('size', None)),
+            responden.frame.assign(panel='responden'),
+            pd.DataFrame({'panel': ['unique_students'], 'n_baris': [len(np.unique(ids[~np.isnan(ids)]))]}),
+        ], ignore_index=True)
+
+def get_facet_counts(selected_fakultas, selected_days, selected_devices):
+    """
+    Jumlah mahasiswa per opsi filter (fakultas, hari, perangkat) di bawah filter lain yang aktif: mahasiswa
+    dengan pemakaian > 0 salah satu perangkat terpilih (semua perangkat jika kosong), dari perangkat
+    pribadi atau fasilitas. Dihitung dari bitmap fact table elektronik dan aktivitas_harian (satu query
+    per versi data, bukan per opsi). {} jika fact table tidak bisa dimuat.
+    """
+    engine = get_fact_engine()
+    personal = get_fact_table(engine, 'electronic.personal')
+    facility = get_fact_table(engine, 'electronic.facility')
+    if personal is None or facility is None:
+        return {}
+    used = {device: (personal, np.nan_to_num(personal.values(column)) > 0) for device, (column, _) in PERSONAL_DEVICE_POWER.items()}
+    used['AC'] = (facility, np.nan_to_num(facility.values('emisi_ac')) > 0)
+    used['Lampu'] = (facility, np.nan_to_num(facility.values('emisi_lampu')) > 0)
+
+    def count(selection):
+        masks = {personal: personal.where(isin={'fakultas': selection['fakultas']}, ilike_any={'hari_datang': selection['days']}),
+                 facility: facility.where(isin={'fakultas': selection['fakultas'], 'hari': selection['days']})}
+        ids = [table.values('id_mahasiswa')[masks[table] & rows]
+               for device, (table, rows) in used.items() if device in (selection['devices'] or used)]
+        ids = np.concatenate(ids)
+        return len(np.unique(ids[~np.isnan(ids)]))
+
+    with engine.measure_query():
+        return facet_counts({'fakultas': sorted(set(personal.distinct('fakultas')) | set(facility.distinct('fakultas'))),
+                             'days': DAY_ORDER, 'devices': list(DEVICE_COLORS)},
+                            {'fakultas': selected_fakultas, 'days': selected_days, 'devices': selected_devices}, count)
+
+# Panel yang bisa disusun dari partial per fakultas (lihat src/utils/partial_aggregates.py).
+# Filter hari tidak: di tabel elektronik satu baris cocok dengan beberapa hari (ILIKE). Filter
+# perangkat mengubah rumus emisi, jadi tetap bagian kunci partial. Kelas (10 teratas) selalu lewat query.
+PANEL_PARTIALS = PartialAggregateSpec('electronic', dimensions={'fakultas': True}, panels={
+    'daily': PanelAggregate(keys=['hari'], sums=['total_emisi']),
+    'faculty': PanelAggregate(keys=['fakultas'], sums=['total_emisi'], distinct=['total_count'], order_by=('total_emisi', True)),
+    'devices': PanelAggregate(keys=['device'], sums=['emisi']),
+    'heatmap': PanelAggregate(keys=['hari', 'time_range'], sums=['total_emisi']),
+    'unique_students': PanelAggregate(distinct=['count']),
+})
+
+def _query_panel_data(filters, skip=()):
+    """
+    Data mentah (sebelum skema) semua panel kecuali `skip`; panel yang tidak relevan dengan
+    perangkat terpilih bernilai None. Di mode RPC tiap panel memanggil fungsi bertipe,
+    di mode fused semua panel diambil dengan satu query GROUPING SETS, di mode local semua
+    panel dihitung dari fact table di proses.
+    Panel yang gagal (mis. fungsi belum dimigrasikan) diambil lewat SQL batch.
+    """
+    selected_fakultas, selected_days, selected_devices = filters['fakultas'], filters['days'], filters['devices']
+    where_elektronik, where_aktivitas, join_needed = build_universal_where_clause(selected_fakultas, selected_days)
+    queries = {name: sql for name, sql in build_panel_queries(where_elektronik, where_aktivitas, join_needed, selected_devices).items()
+               if name not in skip}
+    active = {name: sql for name, sql in queries.items() if sql is not None}
+
+    results = {}
+    if PANEL_QUERY_MODE == 'rpc':
+        results = run_rpc_batch(build_panel_rpc_calls(selected_fakultas, selected_days, selected_devices, active))
+    elif PANEL_QUERY_MODE == 'fused' and not skip:
+        fused_df = run_sql(build_fused_panel_query(where_elektronik, where_aktivitas, selected_devices))
+        if not fused_df.empty:
+            results = {name: df for name, df in split_fused_panel_data(fused_df, selected_devices).items() if name in active}
+    elif PANEL_QUERY_MODE == 'local':
+        local_df = build_local_panel_result(selected_fakultas, selected_days, selected_devices)
+        if not local_df.empty:
+            results = {name: df for name, df in split_fused_panel_data(local_df, selected_devices).items() if name in active}
+    missing = {name: sql for name, sql in active.items() if results.get(name) is None}
+    if missing:
+        results.update(run_sql_batch(missing))
+    return {name: results.get(name) for name in queries}
+
+def get_panel_data(selected_fakultas, selected_days, selected_devices):
+    """
+    Mengambil data semua panel. Pilihan beberapa fakultas disusun dari partial per fakultas
+    jika tersedia (get_partial_aggregate_cache), selain itu diambil lewat _query_panel_data.
+    """
+    filters = {'fakultas': selected_fakultas, 'days': selected_days, 'devices': selected_devices}
+    results = get_partial_aggregate_cache().get_panels(PANEL_PARTIALS, filters, _query_panel_data)
+
+    panel_data = {}
+    for name in PANEL_NAMES:
+        df = results.get(name)
+        df = pd.DataFrame() if df is None else apply_schema(df, f"electronic.{name}")
+        prepare = PANEL_PREPARERS.get(name)
+        panel_data[name] = prepare(df) if prepare else df
+    return panel_data
+
+def get_daily_trend_data(selected_fakultas, selected_days, selected_devices):
+    return get_panel_data(selected_fakultas, selected_days, selected_devices)['daily']
+
+def get_faculty_data(selected_fakultas, selected_days, selected_devices):
+    return get_panel_data(selected_fakultas, selected_days, selected_devices)['faculty']
+
+def get_device_emissions_data(selected_fakultas, selected_days, selected_devices):
+    return get_panel_data(selected_fakultas, selected_days, selected_devices)['devices']
+
+def get_heatmap_data(selected_fakultas, selected_days, selected_devices):
+    return get_panel_data(selected_fakultas, selected_days, selected_devices)['heatmap']
+
+def get_classroom_data(selected_fakultas, selected_days, selected_devices):
+    return get_panel_data(selected_fakultas, selected_days, selected_devices)['classroom']
+
+def get_fakultas_options():
+    """Opsi filter fakultas."""
+    return run_sql("SELECT DISTINCT fakultas FROM v_informasi_fakultas_mahasiswa WHERE fakultas IS NOT NULL AND fakultas <> '' ORDER BY fakultas")
+
+@versioned_cache_data
+def get_filtered_elektronik_data(selected_fakultas, selected_days, profile=DEFAULT_EXPORT_PROFILE):
     """
     Mengambil data mentah dari tabel 'elektronik' yang difilter oleh fakultas dan hari datang.
-    Digunakan untuk tombol 'Data'.
+    Digunakan untuk tombol 'Data'; kolom mengikuti profil ekspor (lihat column_registry).
     """
     clauses = []
     join_sql = "LEFT JOIN v_informasi_fakultas_mahasiswa r ON e.id_mahasiswa = r.id_mahasiswa"
@@ -184,34 +553,28 @@ def get_filtered_elektronik_data(selected_fakultas, selected_days):
 
     query = f"""
     SELECT
-        e.id_mahasiswa,
-        COALESCE(r.fakultas, 'N/A') as fakultas,
-        e.hari_datang,
-        COALESCE(e.durasi_hp, 0) as durasi_hp,
-        COALESCE(e.durasi_laptop, 0) as durasi_laptop,
-        COALESCE(e.durasi_tab, 0) as durasi_tab,
-        COALESCE(e.emisi_elektronik_pribadi, 0) as emisi_elektronik_pribadi,
-        COALESCE(e.emisi_elektronik, 0) as emisi_elektronik
+        {build_export_select('electronic', profile)}
     FROM
         elektronik e
     {join_sql}
     {where_sql}
     """
-    return run_sql(query)
+    return run_sql(query, heavy=True)
 
-@st.cache_data(ttl=3600)
+@versioned_cache_data
 @loading_decorator()
-def generate_pdf_report(where_elektronik, where_aktivitas, join_needed, selected_days, selected_devices):
+def generate_pdf_report(selected_fakultas, selected_days, selected_devices):
     from datetime import datetime
     import time # Pastikan ini sudah diimpor di bagian atas file
     
     time.sleep(0.6)
     
-    df_daily = get_daily_trend_data(where_elektronik, where_aktivitas, join_needed, selected_devices)
-    df_faculty = get_faculty_data(where_elektronik, where_aktivitas, selected_devices)
-    df_devices = get_device_emissions_data(where_elektronik, where_aktivitas, join_needed)
-    df_heatmap = get_heatmap_data(where_aktivitas, join_needed, selected_devices)
-    df_classrooms = get_classroom_data(where_aktivitas, join_needed, selected_devices)
+    panel_data = get_panel_data(selected_fakultas, selected_days, selected_devices)
+    df_daily = panel_data['daily']
+    df_faculty = panel_data['faculty']
+    df_devices = panel_data['devices']
+    df_heatmap = panel_data['heatmap']
+    df_classrooms = panel_data['classroom']
     
     # Filter df_devices based on selected_devices for accurate total_emisi
     df_devices_filtered = df_devices[df_devices['device'].isin(selected_devices)] if selected_devices else df_devices
@@ -221,19 +584,7 @@ def generate_pdf_report(where_elektronik, where_aktivitas, join_needed, selected
     
     total_mahasiswa_unik = 0
     try:
-        unique_mhs_query = f"""
-        WITH FilteredStudents AS (
-            SELECT t.id_mahasiswa FROM elektronik t
-            LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
-            {where_elektronik} AND (COALESCE(t.durasi_hp, 0) > 0 OR COALESCE(t.durasi_laptop, 0) > 0 OR COALESCE(t.durasi_tab, 0) > 0)
-            UNION
-            SELECT a.id_mahasiswa FROM aktivitas_harian a
-            LEFT JOIN v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa
-            {where_aktivitas} AND (COALESCE(a.emisi_ac, 0) > 0 OR COALESCE(a.emisi_lampu, 0) > 0)
-        )
-        SELECT COUNT(DISTINCT id_mahasiswa) as count FROM FilteredStudents
-        """
-        result = run_sql(unique_mhs_query)
+        result = panel_data['unique_students']
         if not result.empty and 'count' in result.columns:
             total_mahasiswa_unik = result.iloc[0,0]
     except Exception as e:
@@ -256,8 +607,7 @@ def generate_pdf_report(where_elektronik, where_aktivitas, join_needed, selected
     # Judul: Tren Emisi Harian
     if not df_daily.empty and df_daily['total_emisi'].sum() > 0:
         df_daily_filtered_by_selection = df_daily[df_daily['hari'].isin(selected_days)] if selected_days else df_daily
-        df_daily_filtered_by_selection['order'] = pd.Categorical(df_daily_filtered_by_selection['hari'], categories=DAY_ORDER, ordered=True)
-        daily_df_sorted = df_daily_filtered_by_selection.sort_values('order')
+        daily_df_sorted = df_daily_filtered_by_selection.sort_values('hari')
         daily_trend_table_html = "".join([f"<tr><td>{row['hari']}</td><td style='text-align:right;'>{row['total_emisi']:.1f}</td></tr>" for _, row in daily_df_sorted.iterrows()])
         
         if len(daily_df_sorted) > 1:
@@ -321,7 +671,7 @@ def generate_pdf_report(where_elektronik, where_aktivitas, join_needed, selected
     # --- 4. Pola Penggunaan Fasilitas Kampus ---
     # Judul: Pola Penggunaan Fasilitas Kampus
     if not df_heatmap.empty and df_heatmap['total_emisi'].sum() > 0:
-        pivot_df = df_heatmap.pivot_table(index='hari', columns='time_range', values='total_emisi', fill_value=0)
+        pivot_df = df_heatmap.pivot_table(index='hari', columns='time_range', values='total_emisi', fill_value=0, observed=True)
         try:
             sorted_columns = sorted(pivot_df.columns, key=lambda x: int(x.split(':')[0].split('-')[0]))
             pivot_df = pivot_df[sorted_columns]
@@ -419,6 +769,16 @@ def generate_pdf_report(where_elektronik, where_aktivitas, join_needed, selected
 
     return pdf_bytes
 
+def get_warmup_views(limit):
+    """Filter yang dipanaskan cache_warmer: tanpa filter dan `limit` fakultas/hari/perangkat dengan mahasiswa terbanyak."""
+    return top_value_views(get_facet_counts([], [], []), ['fakultas', 'days', 'devices'], limit)
+
+def warm_view(selected_fakultas, selected_days, selected_devices):
+    """Mengisi cache data panel dan ekspor CSV satu tampilan (laporan PDF tetap dibuat saat diminta)."""
+    selected_devices = selected_devices or PERSONAL_DEVICES + FACILITY_DEVICES
+    get_panel_data(selected_fakultas, selected_days, selected_devices)
+    get_filtered_elektronik_data(selected_fakultas, selected_days, DEFAULT_EXPORT_PROFILE)
+
 def show():
     st.markdown("""
         <style> .wow-header { position: relative; overflow: hidden; } </style>
@@ -427,40 +787,63 @@ def show():
             <div class="header-content"><h1 class="header-title">Emisi Elektronik</h1></div>
         </div>
         """, unsafe_allow_html=True)
+
+    # Nilai filter sudah ada di session_state sebelum widget dirender, jadi semua query
+    # halaman bisa dikirim paralel sejak awal rerun.
+    loader = PanelLoader()
+    loader.submit('options', get_fakultas_options)
+    prefetch_fakultas = session_filter('electronic_fakultas_filter')
+    prefetch_days = session_filter('electronic_day_filter', DAY_ORDER)
+    prefetch_devices = session_filter('electronic_device_filter', list(DEVICE_COLORS)) or PERSONAL_DEVICES + FACILITY_DEVICES
+    loader.submit('panels', get_panel_data, prefetch_fakultas, prefetch_days, prefetch_devices)
+    loader.submit('export', get_filtered_elektronik_data, prefetch_fakultas, prefetch_days,
+                  st.session_state.get('electronic_export_profile', DEFAULT_EXPORT_PROFILE))
+    # Jumlah mahasiswa per opsi filter (caption di bawah multiselect), dari fact table (tanpa query per opsi).
+    loader.submit('facets', get_facet_counts, prefetch_fakultas, prefetch_days,
+                  session_filter('electronic_device_filter', list(DEVICE_COLORS)))
     time.sleep(0.25)
     
     filter_col1, filter_col2, filter_col3, export_col1, export_col2 = st.columns([1.8, 1.8, 1.8, 1, 1])
 
     with filter_col1:
-        selected_days = st.multiselect("Hari:", options=DAY_ORDER, placeholder="Pilih Opsi", key='electronic_day_filter')
+        selected_days = canonical_filter(st.multiselect("Hari:", options=DAY_ORDER, placeholder="Pilih Opsi", key='electronic_day_filter'), DAY_ORDER)
+        facet_slots = {'days': facet_slot(DAY_ORDER)}
     with filter_col2:
         device_options = list(DEVICE_COLORS.keys())
-        selected_devices_input = st.multiselect("Perangkat:", options=device_options, placeholder="Pilih Opsi", key='electronic_device_filter')
+        selected_devices_input = canonical_filter(st.multiselect("Perangkat:", options=device_options, placeholder="Pilih Opsi", key='electronic_device_filter'), device_options)
+        facet_slots['devices'] = facet_slot(device_options)
         if not selected_devices_input: 
             selected_devices = PERSONAL_DEVICES + FACILITY_DEVICES 
         else:
             selected_devices = selected_devices_input
     with filter_col3:
-        fakultas_df = run_sql("SELECT DISTINCT fakultas FROM v_informasi_fakultas_mahasiswa WHERE fakultas IS NOT NULL AND fakultas <> '' ORDER BY fakultas")
+        fakultas_df = loader.result('options')
         available_fakultas = fakultas_df['fakultas'].tolist() if not fakultas_df.empty else []
-        selected_fakultas = st.multiselect("Fakultas:", options=available_fakultas, placeholder="Pilih Opsi", key='electronic_fakultas_filter')
+        selected_fakultas = canonical_filter(st.multiselect("Fakultas:", options=available_fakultas, placeholder="Pilih Opsi", key='electronic_fakultas_filter'))
+        facet_slots['fakultas'] = facet_slot(available_fakultas)
 
-    where_elektronik, where_aktivitas, join_needed = build_universal_where_clause(selected_fakultas, selected_days)
+    # Tidak mengirim ulang jika sama dengan hasil prefetch di atas.
+    loader.submit('panels', get_panel_data, selected_fakultas, selected_days, selected_devices)
 
     with export_col1:
-        # Ambil data mentah yang difilter untuk diunduh
-        data_df = get_filtered_elektronik_data(selected_fakultas, selected_days)
-        st.download_button(
-            "Data", 
-            data=data_df.to_csv(index=False), # Pastikan ini adalah data yang valid
-            file_name=f"electronic_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv",
-            use_container_width=True,
-            disabled=(data_df.empty) # Tombol aktif jika ada data
-        )
+        with st.popover("Data", use_container_width=True):
+            export_profile = st.radio("Kolom:", options=list(EXPORT_PROFILE_LABELS), format_func=EXPORT_PROFILE_LABELS.get,
+                                      horizontal=True, key='electronic_export_profile')
+            # Ambil data mentah yang difilter untuk diunduh
+            loader.submit('export', get_filtered_elektronik_data, selected_fakultas, selected_days, export_profile)
+            data_df = loader.result('export')
+            st.download_button(
+                "Unduh CSV", 
+                data=data_df.to_csv(index=False), # Pastikan ini adalah data yang valid
+                file_name=f"electronic_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv",
+                use_container_width=True,
+                disabled=(data_df.empty) # Tombol aktif jika ada data
+            )
+    panel_data = loader.result('panels')
     with export_col2:
         try:
-            pdf_data = generate_pdf_report(where_elektronik, where_aktivitas, join_needed, selected_days, selected_devices)
+            pdf_data = generate_pdf_report(selected_fakultas, selected_days, selected_devices)
             
             if pdf_data: 
                 st.download_button(
@@ -479,57 +862,62 @@ def show():
     with loading():
         col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
-            daily_df = get_daily_trend_data(where_elektronik, where_aktivitas, join_needed, selected_devices)
+            daily_df = panel_data['daily']
             if not daily_df.empty:
-                if selected_days: daily_df = daily_df[daily_df['hari'].str.strip().isin(selected_days)]
+                if selected_days: daily_df = daily_df[daily_df['hari'].isin(selected_days)]
                 if not daily_df.empty:
-                    daily_df['order'] = pd.Categorical(daily_df['hari'], categories=DAY_ORDER, ordered=True)
-                    daily_df = daily_df.sort_values('order')
-                    fig_trend = go.Figure(go.Scatter(x=daily_df['hari'], y=daily_df['total_emisi'], fill='tonexty', mode='lines+markers', line=dict(color='#3288bd', width=2, shape='spline'), marker=dict(size=6, color='#3288bd'), fillcolor="rgba(102, 194, 165, 0.3)", hovertemplate='<b>%{x}</b><br>%{y:.1f} kg CO₂<extra></extra>', showlegend=False))
-                    fig_trend.update_layout(height=270, margin=dict(t=25, b=0, l=0, r=20), title=dict(text="<b>Tren Emisi Harian</b>", x=0.38, y=0.95, font=dict(size=12)), xaxis_title="Hari", yaxis_title="Emisi (kg CO₂)", font=dict(size=10))
-                    st.plotly_chart(fig_trend, config=MODEBAR_CONFIG, use_container_width=True)
+                    daily_df = daily_df.sort_values('hari')
+                    def build_trend():
+                        fig_trend = go.Figure(go.Scatter(x=daily_df['hari'], y=daily_df['total_emisi'], fill='tonexty', mode='lines+markers', line=dict(color='#3288bd', width=2, shape='spline'), marker=dict(size=6, color='#3288bd'), fillcolor="rgba(102, 194, 165, 0.3)", hovertemplate='<b>%{x}</b><br>%{y:.1f} kg CO₂<extra></extra>', showlegend=False))
+                        fig_trend.update_layout(height=270, margin=dict(t=25, b=0, l=0, r=20), title=dict(text="<b>Tren Emisi Harian</b>", x=0.38, y=0.95, font=dict(size=12)), xaxis_title="Hari", yaxis_title="Emisi (kg CO₂)", font=dict(size=10))
+                        return fig_trend
+                    plotly_chart_cached('electronic.trend', (daily_df,), build_trend, config=MODEBAR_CONFIG)
                 else: st.info("Tidak ada data tren untuk filter ini.")
             else: st.info("Tidak ada data tren untuk filter ini.")
         
         with col2:
-            fakultas_stats = get_faculty_data(where_elektronik, where_aktivitas, selected_devices)
+            fakultas_stats = panel_data['faculty']
             if not fakultas_stats.empty and 'total_emisi' in fakultas_stats.columns and fakultas_stats['total_emisi'].sum() > 0:
-                fakultas_stats_display = fakultas_stats.sort_values('total_emisi', ascending=True).tail(13)
-                fig_fakultas = go.Figure()
-                max_emisi, min_emisi = fakultas_stats_display['total_emisi'].max(), fakultas_stats_display['total_emisi'].min()
-                for _, row in fakultas_stats_display.iterrows():
-                    color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
-                    ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
-                    color = color_palette[int(ratio * (len(color_palette) - 1))]
-                    fig_fakultas.add_trace(go.Bar(x=[row['total_emisi']], y=[row['fakultas']], orientation='h', marker=dict(color=color), showlegend=False, text=[f"{row['total_emisi']:.1f}"], textposition='inside', textfont=dict(color='white'), hovertemplate=f'<b>{row["fakultas"]}</b><br>Total: {row["total_emisi"]:.1f} kg CO₂<br>Responden: {int(row.get("total_count", 0))}<extra></extra>'))
-                fig_fakultas.update_layout(height=270, margin=dict(t=40, b=0, l=0, r=20), title=dict(text="<b>Emisi per Fakultas</b>", x=0.4, y=0.95, font=dict(size=12)), xaxis_title="Emisi (kg CO₂)", yaxis_title="Fakultas", font=dict(size=8))
-                st.plotly_chart(fig_fakultas, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_fakultas():
+                    fakultas_stats_display = fakultas_stats.sort_values('total_emisi', ascending=True).tail(13)
+                    fig_fakultas = go.Figure()
+                    max_emisi, min_emisi = fakultas_stats_display['total_emisi'].max(), fakultas_stats_display['total_emisi'].min()
+                    for _, row in fakultas_stats_display.iterrows():
+                        color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
+                        ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
+                        color = color_palette[int(ratio * (len(color_palette) - 1))]
+                        fig_fakultas.add_trace(go.Bar(x=[row['total_emisi']], y=[row['fakultas']], orientation='h', marker=dict(color=color), showlegend=False, text=[f"{row['total_emisi']:.1f}"], textposition='inside', textfont=dict(color='white'), hovertemplate=f'<b>{row["fakultas"]}</b><br>Total: {row["total_emisi"]:.1f} kg CO₂<br>Responden: {int(row.get("total_count", 0))}<extra></extra>'))
+                    fig_fakultas.update_layout(height=270, margin=dict(t=40, b=0, l=0, r=20), title=dict(text="<b>Emisi per Fakultas</b>", x=0.4, y=0.95, font=dict(size=12)), xaxis_title="Emisi (kg CO₂)", yaxis_title="Fakultas", font=dict(size=8))
+                    return fig_fakultas
+                plotly_chart_cached('electronic.fakultas', (fakultas_stats,), build_fakultas, config=MODEBAR_CONFIG)
             else: st.info("Tidak ada data fakultas untuk filter ini.")
             
         with col3:
-            device_emissions_df = get_device_emissions_data(where_elektronik, where_aktivitas, join_needed)
+            device_emissions_df = panel_data['devices']
             if not device_emissions_df.empty:
                 display_devices = device_emissions_df.copy()
                 # Tidak perlu filter di sini karena _get_dynamic_emission_clauses sudah menggunakan selected_devices
                 # dan selected_devices sudah di-default di atas.
                 
                 if not display_devices.empty and display_devices['emisi'].sum() > 0:
-                    colors = [DEVICE_COLORS.get(d, '#cccccc') for d in display_devices['device']]
-                    fig_devices = go.Figure(data=[go.Pie(labels=display_devices['device'], values=display_devices['emisi'], hole=0.45, marker=dict(colors=colors), textposition='outside', textinfo='label+percent', hovertemplate='<b>%{label}</b><br>%{value:.2f} kg CO₂ (%{percent})<extra></extra>')])
-                    total_emisi_val = display_devices['emisi'].sum()
-                    center_text = f"<b style='font-size:14px'>{total_emisi_val:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
-                    fig_devices.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
-                    fig_devices.update_layout(height=270, margin=dict(t=40, b=10, l=0, r=0), showlegend=False, title=dict(text="<b>Proporsi Emisi per Perangkat</b>", x=0.32, y=0.95, font=dict(size=12)))
-                    st.plotly_chart(fig_devices, config=MODEBAR_CONFIG, use_container_width=True)
+                    def build_devices():
+                        colors = [DEVICE_COLORS.get(d, '#cccccc') for d in display_devices['device']]
+                        fig_devices = go.Figure(data=[go.Pie(labels=display_devices['device'], values=display_devices['emisi'], hole=0.45, marker=dict(colors=colors), textposition='outside', textinfo='label+percent', hovertemplate='<b>%{label}</b><br>%{value:.2f} kg CO₂ (%{percent})<extra></extra>')])
+                        total_emisi_val = display_devices['emisi'].sum()
+                        center_text = f"<b style='font-size:14px'>{total_emisi_val:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
+                        fig_devices.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
+                        fig_devices.update_layout(height=270, margin=dict(t=40, b=10, l=0, r=0), showlegend=False, title=dict(text="<b>Proporsi Emisi per Perangkat</b>", x=0.32, y=0.95, font=dict(size=12)))
+                        return fig_devices
+                    plotly_chart_cached('electronic.devices', (display_devices,), build_devices, config=MODEBAR_CONFIG)
                 else: st.info("Tidak ada data untuk perangkat dipilih.")
             else: st.info("Tidak ada data emisi perangkat.")
 
     with loading():
         col1, col2 = st.columns([1, 1])
         with col1:
-            heatmap_df = get_heatmap_data(where_aktivitas, join_needed, selected_devices)
+            heatmap_df = panel_data['heatmap']
             if not heatmap_df.empty:
-                pivot_df = heatmap_df.pivot_table(index='hari', columns='time_range', values='total_emisi', fill_value=0)
+                pivot_df = heatmap_df.pivot_table(index='hari', columns='time_range', values='total_emisi', fill_value=0, observed=True)
                 try: 
                     sorted_columns = sorted(pivot_df.columns, key=lambda x: int(x.split(':')[0].split('-')[0]))
                     pivot_df = pivot_df[sorted_columns]
@@ -537,29 +925,36 @@ def show():
                 pivot_df = pivot_df.reindex(index=DAY_ORDER, fill_value=0)
                 if selected_days: pivot_df = pivot_df.loc[selected_days]
                 if not pivot_df.empty and pivot_df.sum().sum() > 0:
-                    fig_heatmap = go.Figure(data=go.Heatmap(z=pivot_df.values, x=pivot_df.columns, y=pivot_df.index, colorscale=[[0, '#fee08b'], [0.25, '#fdae61'], [0.5, '#f46d43'], [0.75, '#d53e4f'], [1, '#9e0142']], hoverongaps=False, hovertemplate='<b>%{y}</b><br>Jam: %{x}<br>Emisi: %{z:.2f} kg CO₂<extra></extra>', xgap=1, ygap=1, colorbar=dict(title=dict(text="Emisi", font=dict(size=9)), tickfont=dict(size=10), thickness=15, len=0.7)))
-                    fig_heatmap.update_layout(height=270, margin=dict(t=30, b=0, l=0, r=0), title=dict(text="<b>Heatmap Emisi Harian per Jam</b>", x=0.3, y=0.95, font=dict(size=12)), xaxis_title="Hari", yaxis_title="Waktu", font=dict(size=8))
-                    st.plotly_chart(fig_heatmap, config=MODEBAR_CONFIG, use_container_width=True)
+                    def build_heatmap():
+                        fig_heatmap = go.Figure(data=go.Heatmap(z=pivot_df.values, x=pivot_df.columns, y=pivot_df.index, colorscale=[[0, '#fee08b'], [0.25, '#fdae61'], [0.5, '#f46d43'], [0.75, '#d53e4f'], [1, '#9e0142']], hoverongaps=False, hovertemplate='<b>%{y}</b><br>Jam: %{x}<br>Emisi: %{z:.2f} kg CO₂<extra></extra>', xgap=1, ygap=1, colorbar=dict(title=dict(text="Emisi", font=dict(size=9)), tickfont=dict(size=10), thickness=15, len=0.7)))
+                        fig_heatmap.update_layout(height=270, margin=dict(t=30, b=0, l=0, r=0), title=dict(text="<b>Heatmap Emisi Harian per Jam</b>", x=0.3, y=0.95, font=dict(size=12)), xaxis_title="Hari", yaxis_title="Waktu", font=dict(size=8))
+                        return fig_heatmap
+                    plotly_chart_cached('electronic.heatmap', (pivot_df,), build_heatmap, config=MODEBAR_CONFIG)
                 else: st.info("Tidak ada data heatmap untuk filter ini.")
             else: st.info("Tidak ada data heatmap untuk filter ini.")
 
         with col2:
-            classroom_df = get_classroom_data(where_aktivitas, join_needed, selected_devices)
+            classroom_df = panel_data['classroom']
             if not classroom_df.empty:
-                fig_location = go.Figure()
-                classroom_df = classroom_df.sort_values('total_emisi', ascending=False)
-                max_emisi, min_emisi = classroom_df['total_emisi'].max(), classroom_df['total_emisi'].min()
-                for i, (_, row) in enumerate(classroom_df.iterrows()):
-                    color_palette = ['#e6f598', '#abdda4', '#66c2a5', '#3288bd', '#d53e4f']
-                    ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
-                    color = color_palette[int(ratio * (len(color_palette) - 1))]
-                    display_name = row['lokasi'] if len(row['lokasi']) <= 12 else row['lokasi'][:10] + '..'
-                    fig_location.add_trace(go.Bar(x=[display_name], y=[row['total_emisi']], marker=dict(color=color), showlegend=False, text=[f"{row['total_emisi']:.1f}"], textposition='auto', hovertemplate=f'<b>{row["lokasi"]}</b><br>Total Emisi: {row["total_emisi"]:.2f} kg CO₂<br>Jumlah Sesi: {row["session_count"]}<extra></extra>', name=row['lokasi']))
-                avg_emisi_loc = classroom_df['total_emisi'].mean()
-                fig_location.add_hline(y=avg_emisi_loc, line_dash="dash", line_color="#5e4fa2", line_width=2, annotation_text=f"Rata-rata: {avg_emisi_loc:.1f}")
-                fig_location.update_layout(height=270, margin=dict(t=25, b=0, l=0, r=0), title=dict(text="<b>Emisi per Lokasi</b>", x=0.5   , y=0.95, font=dict(size=12)), xaxis_title="Lokasi", yaxis_title="Emisi (kg CO₂)", font=dict(size=8))
-                st.plotly_chart(fig_location, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_location():
+                    fig_location = go.Figure()
+                    classroom_sorted = classroom_df.sort_values('total_emisi', ascending=False)
+                    max_emisi, min_emisi = classroom_sorted['total_emisi'].max(), classroom_sorted['total_emisi'].min()
+                    for i, (_, row) in enumerate(classroom_sorted.iterrows()):
+                        color_palette = ['#e6f598', '#abdda4', '#66c2a5', '#3288bd', '#d53e4f']
+                        ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
+                        color = color_palette[int(ratio * (len(color_palette) - 1))]
+                        display_name = row['lokasi'] if len(row['lokasi']) <= 12 else row['lokasi'][:10] + '..'
+                        fig_location.add_trace(go.Bar(x=[display_name], y=[row['total_emisi']], marker=dict(color=color), showlegend=False, text=[f"{row['total_emisi']:.1f}"], textposition='auto', hovertemplate=f'<b>{row["lokasi"]}</b><br>Total Emisi: {row["total_emisi"]:.2f} kg CO₂<br>Jumlah Sesi: {row["session_count"]}<extra></extra>', name=row['lokasi']))
+                    avg_emisi_loc = classroom_sorted['total_emisi'].mean()
+                    fig_location.add_hline(y=avg_emisi_loc, line_dash="dash", line_color="#5e4fa2", line_width=2, annotation_text=f"Rata-rata: {avg_emisi_loc:.1f}")
+                    fig_location.update_layout(height=270, margin=dict(t=25, b=0, l=0, r=0), title=dict(text="<b>Emisi per Lokasi</b>", x=0.5   , y=0.95, font=dict(size=12)), xaxis_title="Lokasi", yaxis_title="Emisi (kg CO₂)", font=dict(size=8))
+                    return fig_location
+                plotly_chart_cached('electronic.classroom', (classroom_df,), build_location, config=MODEBAR_CONFIG)
             else: st.info("Tidak ada data aktivitas kelas untuk filter ini.")
 
+    # Diisi terakhir supaya pemuatan fact table tidak menahan render filter dan panel.
+    show_facet_counts(facet_slots, loader.result('facets'))
+
 if __name__ == "__main__":
     show()
\ No newline at end of file
@@ -4,8 +4,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 from src.components.loading import loading, loading_decorator
+from src.components.charts import plotly_chart_cached
 import time
-from src.utils.db_connector import run_sql
+from src.utils.db_connector import run_sql, run_sql_batch, run_rpc_batch, split_grouped_result, PANEL_QUERY_MODE, versioned_cache_data, get_partial_aggregate_cache, get_fact_engine
+from src.utils.panel_loader import PanelLoader
+from src.utils.column_registry import build_export_select, EXPORT_PROFILE_LABELS, DEFAULT_EXPORT_PROFILE
+from src.utils.result_schema import apply_panel_schemas
+from src.utils.filters import canonical_filter, session_filter, top_value_views, facet_slot, show_facet_counts
+from src.utils.partial_aggregates import PanelAggregate, PartialAggregateSpec
+from src.utils.fact_engine import facet_counts
 from io import BytesIO
 from xhtml2pdf import pisa
 
@@ -14,6 +21,7 @@ MAIN_PALETTE = ['#9e0142', '#d53e4f', '#f46d43', '#fdae61', '#fee08b', '#e6f598'
 PERIOD_COLORS = { 'Pagi': '#66c2a5', 'Siang': '#fdae61', 'Sore': '#f46d43', 'Malam': '#5e4fa2' }
 MODEBAR_CONFIG = { 'displayModeBar': True, 'displaylogo': False, 'modeBarButtonsToRemove': [ 'pan2d', 'pan3d', 'select2d', 'lasso2d', 'zoom2d', 'zoom3d', 'zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d', 'resetScale3d', 'hoverClosestCartesian', 'hoverCompareCartesian', 'toggleSpikelines', 'hoverClosest3d', 'orbitRotation', 'tableRotation', 'resetCameraDefault3d', 'resetCameraLastSave3d' ], 'toImageButtonOptions': { 'format': 'png', 'filename': 'carbon_emission_chart', 'height': 600, 'width': 800, 'scale': 2 } }
 DAY_ORDER = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+PERIOD_ORDER = ['Pagi', 'Siang', 'Sore', 'Malam']
 
 OFFICIAL_CANTEENS = [
     'Kantin SBM', 'Pratama Corner', 'Kantin GKU Barat', 'Kantin Tunnel', 
@@ -36,7 +44,7 @@ CANTEEN_DISPLAY_NAMES = {
     'Koperasi': 'Koperasi',
 }
 
-@st.cache_data(ttl=3600)
+@st.cache_data(show_spinner=False)
 def build_food_where_clause(selected_days, selected_periods, selected_fakultas):
     clauses = []
     join_needed = bool(selected_fakultas)
@@ -56,76 +64,228 @@ def build_food_where_clause(selected_days, selected_periods, selected_fakultas):
     where_sql = "WHERE " + " AND ".join(clauses) if clauses else ""
     return where_sql, join_needed
 
-@st.cache_data(ttl=3600)
-def get_daily_trend_data(where_clause, join_needed):
+def build_panel_queries(where_clause, join_needed):
+    """Menyusun SQL untuk setiap panel halaman sampah makanan."""
     join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
-    SELECT m.hari, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi, COUNT(m.id_mahasiswa) as activity_count
-    FROM v_aktivitas_makanan m {join_sql} {where_clause}
-    GROUP BY m.hari
-    """
-    return run_sql(query)
 
-@st.cache_data(ttl=3600)
-def get_faculty_data(where_clause):
-    query = f"""
-    SELECT r.fakultas, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi, COUNT(m.id_mahasiswa) as activity_count
-    FROM v_aktivitas_makanan m
-    JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa
-    {where_clause}
-    GROUP BY r.fakultas
-    ORDER BY total_emisi ASC
+    canteens_str = "','".join(OFFICIAL_CANTEENS)
+    location_filter = f"m.lokasi IN ('{canteens_str}')"
+    canteen_where_clause = f"{where_clause} AND {location_filter}" if where_clause else f"WHERE {location_filter}"
+
+    return {
+        'daily': f"""
+        SELECT m.hari, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi, COUNT(m.id_mahasiswa) as activity_count
+        FROM v_aktivitas_makanan m {join_sql} {where_clause}
+        GROUP BY m.hari
+        """,
+        'faculty': f"""
+        SELECT r.fakultas, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi, COUNT(m.id_mahasiswa) as activity_count
+        FROM v_aktivitas_makanan m
+        JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa
+        {where_clause}
+        GROUP BY r.fakultas
+        ORDER BY total_emisi ASC
+        """,
+        'period': f"""
+        SELECT m.meal_period, COUNT(m.id_mahasiswa) as activity_count, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi
+        FROM v_aktivitas_makanan m {join_sql} {where_clause}
+        GROUP BY m.meal_period
+        """,
+        'heatmap': f"""
+        SELECT m.lokasi, m.time_slot, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi
+        FROM v_aktivitas_makanan m {join_sql} {canteen_where_clause}
+        GROUP BY m.lokasi, m.time_slot
+        """,
+        'canteen': f"""
+        SELECT m.lokasi, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi, AVG(m.emisi_sampah_makanan_per_waktu) as avg_emisi, COUNT(m.id_mahasiswa) as activity_count
+        FROM v_aktivitas_makanan m {join_sql} {canteen_where_clause}
+        GROUP BY m.lokasi
+        ORDER BY total_emisi DESC
+        """,
+    }
+
+def build_panel_rpc_calls(selected_days, selected_periods, selected_fakultas):
+    """Menyusun panggilan fungsi bertipe (mode RPC) untuk setiap panel; padanan build_panel_queries."""
+    params = {
+        'p_days': list(selected_days or []),
+        'p_periods': list(selected_periods or []),
+        'p_fakultas': list(selected_fakultas or []),
+    }
+    canteen_params = {**params, 'p_canteens': OFFICIAL_CANTEENS}
+    return {
+        'daily': ('food_daily_trend_v1', params),
+        'faculty': ('food_faculty_emissions_v1', params),
+        'period': ('food_period_v1', params),
+        'heatmap': ('food_canteen_heatmap_v1', canteen_params),
+        'canteen': ('food_canteen_emissions_v1', canteen_params),
+    }
+
+def build_fused_panel_query(where_clause):
+    """
+    Satu query untuk semua panel: v_aktivitas_makanan dibaca sekali (CTE base), lalu setiap
+    panel menjadi satu grouping set. Baris hasil diberi label kolom `panel`.
+    """
+    return f"""
+    WITH base AS (
+        SELECT
+            m.id_mahasiswa, m.hari, m.meal_period, m.lokasi, m.time_slot, m.emisi_sampah_makanan_per_waktu,
+            r.fakultas,
+            r.id_mahasiswa IS NOT NULL AS has_fakultas
+        FROM v_aktivitas_makanan m
+        LEFT JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa
+        {where_clause}
+    )
+    SELECT
+        CASE WHEN GROUPING(hari) = 0 THEN 'daily'
+             WHEN GROUPING(fakultas) = 0 THEN 'faculty'
+             WHEN GROUPING(meal_period) = 0 THEN 'period'
+             WHEN GROUPING(time_slot) = 0 THEN 'heatmap'
+             ELSE 'canteen' END AS panel,
+        hari, fakultas, has_fakultas, meal_period, lokasi, time_slot,
+        SUM(emisi_sampah_makanan_per_waktu) AS total_emisi,
+        AVG(emisi_sampah_makanan_per_waktu) AS avg_emisi,
+        COUNT(id_mahasiswa) AS activity_count
+    FROM base
+    GROUP BY GROUPING SETS ((hari), (has_fakultas, fakultas), (meal_period), (lokasi, time_slot), (lokasi))
     """
-    return run_sql(query)
 
-@st.cache_data(ttl=3600)
-def get_period_data(where_clause, join_needed):
-    join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
-    SELECT m.meal_period, COUNT(m.id_mahasiswa) as activity_count, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi
-    FROM v_aktivitas_makanan m {join_sql} {where_clause}
-    GROUP BY m.meal_period
+def split_fused_panel_data(df):
+    """Memecah hasil build_fused_panel_query menjadi DataFrame per panel (kolom sama dengan build_panel_queries)."""
+    faculty = split_grouped_result(df, 'faculty', {'fakultas': 'fakultas', 'total_emisi': 'total_emisi', 'activity_count': 'activity_count', 'has_fakultas': 'has_fakultas'}, ['activity_count'])
+    faculty = faculty[faculty['has_fakultas'] == True].drop(columns=['has_fakultas']).sort_values('total_emisi', kind='stable').reset_index(drop=True)
+    heatmap = split_grouped_result(df, 'heatmap', {'lokasi': 'lokasi', 'time_slot': 'time_slot', 'total_emisi': 'total_emisi'})
+    heatmap = heatmap[heatmap['lokasi'].isin(OFFICIAL_CANTEENS)].reset_index(drop=True)
+    canteen = split_grouped_result(df, 'canteen', {'lokasi': 'lokasi', 'total_emisi': 'total_emisi', 'avg_emisi': 'avg_emisi', 'activity_count': 'activity_count'}, ['activity_count'])
+    canteen = canteen[canteen['lokasi'].isin(OFFICIAL_CANTEENS)].sort_values('total_emisi', ascending=False, kind='stable').reset_index(drop=True)
+    return {
+        'daily': split_grouped_result(df, 'daily', {'hari': 'hari', 'total_emisi': 'total_emisi', 'activity_count': 'activity_count'}, ['activity_count']),
+        'faculty': faculty,
+        'period': split_grouped_result(df, 'period', {'meal_period': 'meal_period', 'activity_count': 'activity_count', 'total_emisi': 'total_emisi'}, ['activity_count']),
+        'heatmap': heatmap,
+        'canteen': canteen,
+    }
+
+# Fact table mode local (lihat src/utils/fact_engine.py): baris CTE base build_fused_panel_query tanpa filter.
+FACT_TABLE_SQL = """
+SELECT
+    m.id_mahasiswa, m.hari, m.meal_period, m.lokasi, m.time_slot, m.emisi_sampah_makanan_per_waktu,
+    r.fakultas,
+    r.id_mahasiswa IS NOT NULL AS has_fakultas
+FROM v_aktivitas_makanan m
+LEFT JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa
+"""
+
+def get_fact_table(engine):
+    """Fact table aktivitas makan (dimuat sekali per versi data); None jika tidak bisa dimuat."""
+    return engine.table('food_drink_waste', lambda: run_sql(FACT_TABLE_SQL), dimensions=['hari', 'meal_period', 'fakultas'])
+
+def build_local_panel_result(selected_days, selected_periods, selected_fakultas):
+    """
+    Hasil build_fused_panel_query yang dihitung di proses dari fact table aktivitas makan (mode local).
+    DataFrame kosong jika fact table tidak bisa dimuat.
+    """
+    engine = get_fact_engine()
+    facts = get_fact_table(engine)
+    if facts is None:
+        return pd.DataFrame()
+    with engine.measure_query():
+        mask = facts.where(isin={'hari': selected_days, 'meal_period': selected_periods, 'fakultas': selected_fakultas})
+        return facts.grouping_sets({'daily': ['hari'], 'faculty': ['has_fakultas', 'fakultas'], 'period': ['meal_period'],
+                                    'heatmap': ['lokasi', 'time_slot'], 'canteen': ['lokasi']}, mask,
+                                   total_emisi=('sum', 'emisi_sampah_makanan_per_waktu'),
+                                   avg_emisi=('mean', 'emisi_sampah_makanan_per_waktu'),
+                                   activity_count=('count', 'id_mahasiswa'))
+
+def get_facet_counts(selected_days, selected_periods, selected_fakultas):
     """
-    return run_sql(query)
+    Jumlah mahasiswa per opsi filter (hari, waktu makan, fakultas) di bawah filter lain yang aktif,
+    dihitung dari bitmap fact table aktivitas makan (satu query per versi data, bukan per opsi).
+    {} jika fact table tidak bisa dimuat.
+    """
+    engine = get_fact_engine()
+    facts = get_fact_table(engine)
+    if facts is None:
+        return {}
+
+    def count(selection):
+        mask = facts.where(isin={'hari': selection['days'], 'meal_period': selection['periods'], 'fakultas': selection['fakultas']})
+        return facts.count_distinct('id_mahasiswa', mask)
+
+    with engine.measure_query():
+        return facet_counts({'days': DAY_ORDER, 'periods': PERIOD_ORDER, 'fakultas': facts.distinct('fakultas')},
+                            {'days': selected_days, 'periods': selected_periods, 'fakultas': selected_fakultas}, count)
+
+# Panel yang bisa disusun dari partial per hari/waktu makan/fakultas (lihat
+# src/utils/partial_aggregates.py): setiap baris aktivitas makan punya satu hari, satu waktu makan,
+# dan satu fakultas, dan panel ini hanya memakai SUM/COUNT. Kantin (AVG) selalu lewat query.
+PANEL_PARTIALS = PartialAggregateSpec('food_drink_waste', dimensions={'days': False, 'periods': False, 'fakultas': True}, panels={
+    'daily': PanelAggregate(keys=['hari'], sums=['total_emisi', 'activity_count']),
+    'faculty': PanelAggregate(keys=['fakultas'], sums=['total_emisi', 'activity_count'], order_by=('total_emisi', True)),
+    'period': PanelAggregate(keys=['meal_period'], sums=['activity_count', 'total_emisi']),
+    'heatmap': PanelAggregate(keys=['lokasi', 'time_slot'], sums=['total_emisi']),
+})
+
+def _query_panel_data(filters, skip=()):
+    """
+    Data mentah (sebelum skema) semua panel kecuali `skip`. Di mode RPC tiap panel memanggil
+    fungsi bertipe, di mode fused semua panel diambil dengan satu query GROUPING SETS, di mode
+    local semua panel dihitung dari fact table di proses.
+    Panel yang gagal (mis. fungsi belum dimigrasikan) diambil lewat SQL batch.
+    """
+    selected_days, selected_periods, selected_fakultas = filters['days'], filters['periods'], filters['fakultas']
+    where_clause, join_needed = build_food_where_clause(selected_days, selected_periods, selected_fakultas)
+    panel_data = {}
+    if PANEL_QUERY_MODE == 'rpc':
+        calls = build_panel_rpc_calls(selected_days, selected_periods, selected_fakultas)
+        panel_data = run_rpc_batch({name: call for name, call in calls.items() if name not in skip})
+    elif PANEL_QUERY_MODE == 'fused' and not skip:
+        fused_df = run_sql(build_fused_panel_query(where_clause))
+        if not fused_df.empty:
+            panel_data = split_fused_panel_data(fused_df)
+    elif PANEL_QUERY_MODE == 'local':
+        local_df = build_local_panel_result(selected_days, selected_periods, selected_fakultas)
+        if not local_df.empty:
+            panel_data = {name: df for name, df in split_fused_panel_data(local_df).items() if name not in skip}
+
+    queries = build_panel_queries(where_clause, join_needed)
+    missing = {name: sql for name, sql in queries.items() if name not in skip and panel_data.get(name) is None}
+    if missing:
+        panel_data.update(run_sql_batch(missing))
+    return panel_data
+
+def get_panel_data(selected_days, selected_periods, selected_fakultas):
+    """
+    Mengambil data semua panel. Pilihan beberapa hari/waktu makan/fakultas disusun dari partial
+    per nilai jika tersedia (get_partial_aggregate_cache), selain itu diambil lewat _query_panel_data.
+    """
+    filters = {'days': selected_days, 'periods': selected_periods, 'fakultas': selected_fakultas}
+    panel_data = get_partial_aggregate_cache().get_panels(PANEL_PARTIALS, filters, _query_panel_data)
+    return apply_panel_schemas(panel_data, 'food_drink_waste')
 
-@st.cache_data(ttl=3600)
-def get_heatmap_data(where_clause, join_needed):
-    join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    
-    canteens_str = "','".join(OFFICIAL_CANTEENS)
-    location_filter = f"m.lokasi IN ('{canteens_str}')"
-    
-    final_where_clause = f"{where_clause} AND {location_filter}" if where_clause else f"WHERE {location_filter}"
+def get_daily_trend_data(selected_days, selected_periods, selected_fakultas):
+    return get_panel_data(selected_days, selected_periods, selected_fakultas)['daily']
 
-    query = f"""
-    SELECT m.lokasi, m.time_slot, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi
-    FROM v_aktivitas_makanan m {join_sql} {final_where_clause}
-    GROUP BY m.lokasi, m.time_slot
-    """
-    return run_sql(query)
+def get_faculty_data(selected_days, selected_periods, selected_fakultas):
+    return get_panel_data(selected_days, selected_periods, selected_fakultas)['faculty']
 
-@st.cache_data(ttl=3600)
-def get_canteen_data(where_clause, join_needed):
-    join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
+def get_period_data(selected_days, selected_periods, selected_fakultas):
+    return get_panel_data(selected_days, selected_periods, selected_fakultas)['period']
 
-    canteens_str = "','".join(OFFICIAL_CANTEENS)
-    location_filter = f"m.lokasi IN ('{canteens_str}')"
+def get_heatmap_data(selected_days, selected_periods, selected_fakultas):
+    return get_panel_data(selected_days, selected_periods, selected_fakultas)['heatmap']
 
-    final_where_clause = f"{where_clause} AND {location_filter}" if where_clause else f"WHERE {location_filter}"
+def get_canteen_data(selected_days, selected_periods, selected_fakultas):
+    return get_panel_data(selected_days, selected_periods, selected_fakultas)['canteen']
 
-    query = f"""
-    SELECT m.lokasi, SUM(m.emisi_sampah_makanan_per_waktu) as total_emisi, AVG(m.emisi_sampah_makanan_per_waktu) as avg_emisi, COUNT(m.id_mahasiswa) as activity_count
-    FROM v_aktivitas_makanan m {join_sql} {final_where_clause}
-    GROUP BY m.lokasi
-    ORDER BY total_emisi DESC
-    """
-    return run_sql(query)
+def get_fakultas_options():
+    """Opsi filter fakultas."""
+    return run_sql("SELECT DISTINCT fakultas FROM v_informasi_fakultas_mahasiswa WHERE fakultas IS NOT NULL AND fakultas <> '' ORDER BY fakultas")
 
-@st.cache_data(ttl=3600)
-def get_filtered_food_waste_data(selected_fakultas, selected_days):
+@versioned_cache_data
+def get_filtered_food_waste_data(selected_fakultas, selected_days, profile=DEFAULT_EXPORT_PROFILE):
     """
     Mengambil data mentah dari tabel 'sampah_makanan' yang difilter oleh fakultas dan hari datang.
-    Digunakan untuk tombol 'Data'.
+    Digunakan untuk tombol 'Data'; kolom mengikuti profil ekspor (lihat column_registry).
     """
     clauses = []
     join_sql = "LEFT JOIN v_informasi_fakultas_mahasiswa r ON s.id_mahasiswa = r.id_mahasiswa"
@@ -141,37 +301,28 @@ def get_filtered_food_waste_data(selected_fakultas, selected_days):
 
     query = f"""
     SELECT
-        s.id_mahasiswa,
-        COALESCE(r.fakultas, 'N/A') as fakultas,
-        s.hari_datang,
-        s.tempat_makan,
-        s.emisi_sampah_makanan_senin,
-        s.emisi_sampah_makanan_selasa,
-        s.emisi_sampah_makanan_rabu,
-        s.emisi_sampah_makanan_kamis,
-        s.emisi_sampah_makanan_jumat,
-        s.emisi_sampah_makanan_sabtu,
-        s.emisi_sampah_makanan_minggu
+        {build_export_select('food_drink_waste', profile)}
     FROM
         sampah_makanan s
     {join_sql}
     {where_sql}
     """
-    return run_sql(query)
+    return run_sql(query, heavy=True)
 
-@st.cache_data(ttl=3600)
+@versioned_cache_data
 @loading_decorator()
-def generate_pdf_report(where_clause, join_needed):
+def generate_pdf_report(selected_days, selected_periods, selected_fakultas):
     from datetime import datetime
     import time 
     
     time.sleep(0.6)
 
-    daily_stats = get_daily_trend_data(where_clause, join_needed)
-    fakultas_stats = get_faculty_data(where_clause) 
-    period_stats = get_period_data(where_clause, join_needed)
-    heatmap_data = get_heatmap_data(where_clause, join_needed)
-    canteen_stats = get_canteen_data(where_clause, join_needed)
+    panel_data = get_panel_data(selected_days, selected_periods, selected_fakultas)
+    daily_stats = panel_data['daily']
+    fakultas_stats = panel_data['faculty']
+    period_stats = panel_data['period']
+    heatmap_data = panel_data['heatmap']
+    canteen_stats = panel_data['canteen']
     
     total_emisi = daily_stats['total_emisi'].sum() if 'total_emisi' in daily_stats.columns and not daily_stats.empty else 0
     total_activities = daily_stats['activity_count'].sum() if 'activity_count' in daily_stats.columns and not daily_stats.empty else 0
@@ -190,8 +341,7 @@ def generate_pdf_report(where_clause, join_needed):
     # --- 1. Tren Emisi Harian ---
     # Judul: Tren Emisi Harian
     if not daily_stats.empty and daily_stats['total_emisi'].sum() > 0:
-        daily_stats['day_order'] = pd.Categorical(daily_stats['hari'], categories=DAY_ORDER, ordered=True)
-        daily_stats_sorted = daily_stats.sort_values('day_order')
+        daily_stats_sorted = daily_stats.sort_values('hari')
         daily_trend_table_html = "".join([f"<tr><td>{row['hari']}</td><td style='text-align:right;'>{row['total_emisi']:.1f}</td><td style='text-align:center;'>{row['activity_count']}</td></tr>" for _, row in daily_stats_sorted.iterrows()])
         
         if len(daily_stats_sorted) > 1:
@@ -252,7 +402,7 @@ def generate_pdf_report(where_clause, join_needed):
     # --- 4. Pola Emisi (Lokasi & Waktu) ---
     # Judul: Pola Emisi (Lokasi & Waktu)
     if not heatmap_data.empty and heatmap_data['total_emisi'].sum() > 0:
-        pivot_df = heatmap_data.pivot_table(index='lokasi', columns='time_slot', values='total_emisi', fill_value=0)
+        pivot_df = heatmap_data.pivot_table(index='lokasi', columns='time_slot', values='total_emisi', fill_value=0, observed=True)
         if not pivot_df.empty:
             try:
                 sorted_columns = sorted(pivot_df.columns, key=lambda x: int(x.split(':')[0].split('-')[0]))
@@ -366,6 +516,15 @@ def generate_pdf_report(where_clause, join_needed):
 
     return pdf_bytes
 
+def get_warmup_views(limit):
+    """Filter yang dipanaskan cache_warmer: tanpa filter dan `limit` hari/waktu/fakultas dengan mahasiswa terbanyak."""
+    return top_value_views(get_facet_counts([], [], []), ['days', 'periods', 'fakultas'], limit)
+
+def warm_view(selected_days, selected_periods, selected_fakultas):
+    """Mengisi cache data panel dan ekspor CSV satu tampilan (laporan PDF tetap dibuat saat diminta)."""
+    get_panel_data(selected_days, selected_periods, selected_fakultas)
+    get_filtered_food_waste_data(selected_fakultas, selected_days, DEFAULT_EXPORT_PROFILE)
+
 def show():
     st.markdown("""
         <div class="wow-header">
@@ -373,39 +532,59 @@ def show():
             <div class="header-content"><h1 class="header-title">Emisi Sampah Makanan</h1></div>
         </div>
         """, unsafe_allow_html=True)
+
+    # Nilai filter sudah ada di session_state sebelum widget dirender, jadi semua query
+    # halaman bisa dikirim paralel sejak awal rerun.
+    loader = PanelLoader()
+    loader.submit('options', get_fakultas_options)
+    prefetch_days = session_filter('food_day_filter', DAY_ORDER)
+    prefetch_fakultas = session_filter('food_fakultas_filter')
+    loader.submit('panels', get_panel_data, prefetch_days, session_filter('food_period_filter', PERIOD_ORDER), prefetch_fakultas)
+    loader.submit('export', get_filtered_food_waste_data, prefetch_fakultas, prefetch_days,
+                  st.session_state.get('food_export_profile', DEFAULT_EXPORT_PROFILE))
+    # Jumlah mahasiswa per opsi filter (caption di bawah multiselect), dari fact table (tanpa query per opsi).
+    loader.submit('facets', get_facet_counts, prefetch_days, session_filter('food_period_filter', PERIOD_ORDER), prefetch_fakultas)
     time.sleep(0.25)  
 
     filter_col1, filter_col2, filter_col3, export_col1, export_col2 = st.columns([1.8, 1.8, 1.8, 1, 1])
 
     with filter_col1:
-        selected_days = st.multiselect("Hari:", options=DAY_ORDER, placeholder="Pilih Opsi", key='food_day_filter')
+        selected_days = canonical_filter(st.multiselect("Hari:", options=DAY_ORDER, placeholder="Pilih Opsi", key='food_day_filter'), DAY_ORDER)
+        facet_slots = {'days': facet_slot(DAY_ORDER)}
     
     with filter_col2:
-        period_options = ['Pagi', 'Siang', 'Sore', 'Malam']
-        selected_periods = st.multiselect("Waktu:", options=period_options, placeholder="Pilih Opsi", key='food_period_filter')
+        selected_periods = canonical_filter(st.multiselect("Waktu:", options=PERIOD_ORDER, placeholder="Pilih Opsi", key='food_period_filter'), PERIOD_ORDER)
+        facet_slots['periods'] = facet_slot(PERIOD_ORDER)
     
     with filter_col3:
-        fakultas_df = run_sql("SELECT DISTINCT fakultas FROM v_informasi_fakultas_mahasiswa WHERE fakultas IS NOT NULL AND fakultas <> '' ORDER BY fakultas")
+        fakultas_df = loader.result('options')
         available_fakultas = fakultas_df['fakultas'].tolist() if not fakultas_df.empty else []
-        selected_fakultas = st.multiselect("Fakultas:", options=available_fakultas, placeholder="Pilih Opsi", key='food_fakultas_filter')
+        selected_fakultas = canonical_filter(st.multiselect("Fakultas:", options=available_fakultas, placeholder="Pilih Opsi", key='food_fakultas_filter'))
+        facet_slots['fakultas'] = facet_slot(available_fakultas)
 
-    where_clause, join_needed = build_food_where_clause(selected_days, selected_periods, selected_fakultas)
+    # Tidak mengirim ulang jika sama dengan hasil prefetch di atas.
+    loader.submit('panels', get_panel_data, selected_days, selected_periods, selected_fakultas)
     
     with export_col1:
-        # Ambil data mentah yang difilter untuk diunduh
-        data_df = get_filtered_food_waste_data(selected_fakultas, selected_days)
-        st.download_button(
-            "Data", 
-            data=data_df.to_csv(index=False), 
-            file_name=f"food_waste_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv", 
-            mime="text/csv", 
-            use_container_width=True,
-            disabled=(data_df.empty) # Tombol aktif jika ada data
-        )
+        with st.popover("Data", use_container_width=True):
+            export_profile = st.radio("Kolom:", options=list(EXPORT_PROFILE_LABELS), format_func=EXPORT_PROFILE_LABELS.get,
+                                      horizontal=True, key='food_export_profile')
+            # Ambil data mentah yang difilter untuk diunduh
+            loader.submit('export', get_filtered_food_waste_data, selected_fakultas, selected_days, export_profile)
+            data_df = loader.result('export')
+            st.download_button(
+                "Unduh CSV", 
+                data=data_df.to_csv(index=False), 
+                file_name=f"food_waste_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv", 
+                mime="text/csv", 
+                use_container_width=True,
+                disabled=(data_df.empty) # Tombol aktif jika ada data
+            )
+    panel_data = loader.result('panels')
     
     with export_col2:
         try:
-            pdf_data = generate_pdf_report(where_clause, join_needed)
+            pdf_data = generate_pdf_report(selected_days, selected_periods, selected_fakultas)
             
             if pdf_data: 
                 st.download_button(
@@ -425,56 +604,60 @@ def show():
         col1, col2, col3 = st.columns([1, 1, 1])
 
         with col1: 
-            daily_trend_df = get_daily_trend_data(where_clause, join_needed)
+            daily_trend_df = panel_data['daily']
             if not daily_trend_df.empty:
-                daily_trend_df['day_order'] = pd.Categorical(daily_trend_df['hari'], categories=DAY_ORDER, ordered=True)
-                daily_trend_df = daily_trend_df.sort_values('day_order')
-                fig_trend = go.Figure(go.Scatter(x=daily_trend_df['hari'], y=daily_trend_df['total_emisi'], fill='tonexty', mode='lines+markers', line=dict(color='#3288bd', width=2, shape='spline'), marker=dict(size=6, color='#3288bd'), fillcolor="rgba(102, 194, 165, 0.3)", hovertemplate='<b>%{x}</b><br>%{y:.1f} kg CO₂<extra></extra>', showlegend=False))
-                fig_trend.update_layout(height=270, margin=dict(t=30, b=0, l=0, r=20), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', title=dict(text="<b>Tren Emisi Harian</b>", x=0.38, y=0.95, font=dict(size=12)), xaxis_title="Hari", yaxis_title="Emisi (kg CO₂)", font=dict(size=8))
-                st.plotly_chart(fig_trend, config=MODEBAR_CONFIG, use_container_width=True)
+                daily_trend_df = daily_trend_df.sort_values('hari')
+                def build_trend():
+                    fig_trend = go.Figure(go.Scatter(x=daily_trend_df['hari'], y=daily_trend_df['total_emisi'], fill='tonexty', mode='lines+markers', line=dict(color='#3288bd', width=2, shape='spline'), marker=dict(size=6, color='#3288bd'), fillcolor="rgba(102, 194, 165, 0.3)", hovertemplate='<b>%{x}</b><br>%{y:.1f} kg CO₂<extra></extra>', showlegend=False))
+                    fig_trend.update_layout(height=270, margin=dict(t=30, b=0, l=0, r=20), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', title=dict(text="<b>Tren Emisi Harian</b>", x=0.38, y=0.95, font=dict(size=12)), xaxis_title="Hari", yaxis_title="Emisi (kg CO₂)", font=dict(size=8))
+                    return fig_trend
+                plotly_chart_cached('food_drink_waste.trend', (daily_trend_df,), build_trend, config=MODEBAR_CONFIG)
             else:
                 st.info("Tidak ada data tren harian untuk filter ini.")
 
         with col2: 
-            faculty_where = where_clause.replace("WHERE", "AND") if "WHERE" in where_clause else ""
-            faculty_df = get_faculty_data(faculty_where)
+            faculty_df = panel_data['faculty']
             if not faculty_df.empty:
-                faculty_df_display = faculty_df.sort_values('total_emisi', ascending=True).tail(13)
-                fig_fakultas = go.Figure()
-                max_emisi, min_emisi = faculty_df_display['total_emisi'].max(), faculty_df_display['total_emisi'].min()
-                for _, row in faculty_df_display.iterrows():
-                    color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
-                    ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
-                    color = color_palette[int(ratio * (len(color_palette) - 1))]
-                    fig_fakultas.add_trace(go.Bar(x=[row['total_emisi']], y=[row['fakultas']], orientation='h', marker=dict(color=color), showlegend=False, text=[f"{row['total_emisi']:.1f}"], textposition='inside', textfont=dict(color='white', size=10, weight='bold'), hovertemplate=f'<b>{row["fakultas"]}</b><br>Total: {row["total_emisi"]:.1f} kg CO₂<br>Aktivitas: {row["activity_count"]}<extra></extra>'))
-                fig_fakultas.update_layout(height=270, margin=dict(t=40, b=0, l=0, r=20), title=dict(text="<b>Emisi per Fakultas</b>", x=0.39, y=0.95, font=dict(size=12)), xaxis_title="Emisi (kg CO₂)", yaxis_title="Fakultas", font=dict(size=8))
-                st.plotly_chart(fig_fakultas, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_fakultas():
+                    faculty_df_display = faculty_df.sort_values('total_emisi', ascending=True).tail(13)
+                    fig_fakultas = go.Figure()
+                    max_emisi, min_emisi = faculty_df_display['total_emisi'].max(), faculty_df_display['total_emisi'].min()
+                    for _, row in faculty_df_display.iterrows():
+                        color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
+                        ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
+                        color = color_palette[int(ratio * (len(color_palette) - 1))]
+                        fig_fakultas.add_trace(go.Bar(x=[row['total_emisi']], y=[row['fakultas']], orientation='h', marker=dict(color=color), showlegend=False, text=[f"{row['total_emisi']:.1f}"], textposition='inside', textfont=dict(color='white', size=10, weight='bold'), hovertemplate=f'<b>{row["fakultas"]}</b><br>Total: {row["total_emisi"]:.1f} kg CO₂<br>Aktivitas: {row["activity_count"]}<extra></extra>'))
+                    fig_fakultas.update_layout(height=270, margin=dict(t=40, b=0, l=0, r=20), title=dict(text="<b>Emisi per Fakultas</b>", x=0.39, y=0.95, font=dict(size=12)), xaxis_title="Emisi (kg CO₂)", yaxis_title="Fakultas", font=dict(size=8))
+                    return fig_fakultas
+                plotly_chart_cached('food_drink_waste.fakultas', (faculty_df,), build_fakultas, config=MODEBAR_CONFIG)
             else:
                 st.info("Tidak ada data fakultas untuk filter ini.")
 
         with col3: 
-            period_data_df = get_period_data(where_clause, join_needed)
+            period_data_df = panel_data['period']
             if not period_data_df.empty:
                 period_data_df = period_data_df.set_index('meal_period')
-                colors = [PERIOD_COLORS.get(period, '#cccccc') for period in period_data_df.index]
-                
-                fig_period = go.Figure(data=[go.Pie(
-                    labels=period_data_df.index, 
-                    values=period_data_df['activity_count'], 
-                    hole=0.45, 
-                    marker=dict(colors=colors, line=dict(color='#FFFFFF', width=2)), 
-                    textposition='outside', 
-                    textinfo='label+percent', 
-                    hovertemplate='<b>%{label}</b><br>%{value} aktivitas (%{percent})<br>Total Emisi: %{customdata:.2f} kg CO₂<extra></extra>',
-                    customdata=period_data_df['total_emisi'] 
-                )])
-
-                total_emisi_chart = period_data_df['total_emisi'].sum()
-                center_text = f"<b style='font-size:14px'>{total_emisi_chart:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
-                
-                fig_period.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
-                fig_period.update_layout(height=270, margin=dict(t=30, b=35, l=5, r=5), showlegend=False, title=dict(text="<b>Proporsi Emisi per Waktu</b>", x=0.33, y=0.95, font=dict(size=12)))
-                st.plotly_chart(fig_period, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_period():
+                    colors = [PERIOD_COLORS.get(period, '#cccccc') for period in period_data_df.index]
+
+                    fig_period = go.Figure(data=[go.Pie(
+                        labels=period_data_df.index, 
+                        values=period_data_df['activity_count'], 
+                        hole=0.45, 
+                        marker=dict(colors=colors, line=dict(color='#FFFFFF', width=2)), 
+                        textposition='outside', 
+                        textinfo='label+percent', 
+                        hovertemplate='<b>%{label}</b><br>%{value} aktivitas (%{percent})<br>Total Emisi: %{customdata:.2f} kg CO₂<extra></extra>',
+                        customdata=period_data_df['total_emisi'] 
+                    )])
+
+                    total_emisi_chart = period_data_df['total_emisi'].sum()
+                    center_text = f"<b style='font-size:14px'>{total_emisi_chart:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
+
+                    fig_period.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
+                    fig_period.update_layout(height=270, margin=dict(t=30, b=35, l=5, r=5), showlegend=False, title=dict(text="<b>Proporsi Emisi per Waktu</b>", x=0.33, y=0.95, font=dict(size=12)))
+                    return fig_period
+                plotly_chart_cached('food_drink_waste.period', (period_data_df,), build_period, config=MODEBAR_CONFIG)
             else:
                 st.info("Tidak ada data periode untuk filter ini.")
 
@@ -482,97 +665,103 @@ def show():
         col1, col2 = st.columns([1, 1])
 
         with col1: 
-            heatmap_df = get_heatmap_data(where_clause, join_needed)
+            heatmap_df = panel_data['heatmap']
             if not heatmap_df.empty:
-                pivot_df = heatmap_df.pivot_table(index='lokasi', columns='time_slot', values='total_emisi', fill_value=0)
+                pivot_df = heatmap_df.pivot_table(index='lokasi', columns='time_slot', values='total_emisi', fill_value=0, observed=True)
                 if not pivot_df.empty:
                     try:
                         sorted_columns = sorted(pivot_df.columns, key=lambda x: int(x.split(':')[0].split('-')[0]))
                         pivot_df = pivot_df[sorted_columns]
                     except (ValueError, IndexError): pass
                     
-                    original_locations = pivot_df.index.tolist()
-                    display_locations_truncated = [CANTEEN_DISPLAY_NAMES.get(loc, loc) for loc in original_locations]
-                    # Fallback truncation for any unmapped or still too long names
-                    display_locations_truncated = [name if len(name) <= 15 else name[:13] + '..' for name in display_locations_truncated]
-
-                    fig_heatmap = go.Figure(data=go.Heatmap(
-                        z=pivot_df.values,
-                        x=pivot_df.columns,
-                        y=original_locations, # Use original locations as tickvals for correct hover mapping
-                        colorscale=[[0, '#fee08b'], [0.25, '#fdae61'], [0.5, '#f46d43'], [0.75, '#d53e4f'], [1, '#9e0142']],
-                        hoverongaps=False,
-                        hovertemplate='<b>%{y}</b><br>Jam: %{x}<br>Emisi: %{z:.2f} kg CO₂<extra></extra>',
-                        xgap=1, ygap=1,
-                        colorbar=dict(title=dict(text="Emisi", font=dict(size=9)), thickness=15, len=0.7)
-                    ))
-                    
-                    fig_heatmap.update_layout(
-                        height=270, 
-                        margin=dict(t=30, b=20, l=20, r=20), 
-                        title=dict(text="<b>Heatmap Emisi Lokasi per Jam</b>", x=0.35, y=0.95, font=dict(size=12)),
-                        xaxis=dict(tickangle=25),
-                        yaxis=dict(
-                            tickvals=original_locations,
-                            ticktext=display_locations_truncated,
-                            automargin=True, 
-                        ),
-                        xaxis_title="Waktu", yaxis_title="Lokasi", font=dict(size=8)
-                    )
-                    
-                    st.plotly_chart(fig_heatmap, config=MODEBAR_CONFIG, use_container_width=True)
+                    def build_heatmap():
+                        original_locations = pivot_df.index.tolist()
+                        display_locations_truncated = [CANTEEN_DISPLAY_NAMES.get(loc, loc) for loc in original_locations]
+                        # Fallback truncation for any unmapped or still too long names
+                        display_locations_truncated = [name if len(name) <= 15 else name[:13] + '..' for name in display_locations_truncated]
+
+                        fig_heatmap = go.Figure(data=go.Heatmap(
+                            z=pivot_df.values,
+                            x=pivot_df.columns,
+                            y=original_locations, # Use original locations as tickvals for correct hover mapping
+                            colorscale=[[0, '#fee08b'], [0.25, '#fdae61'], [0.5, '#f46d43'], [0.75, '#d53e4f'], [1, '#9e0142']],
+                            hoverongaps=False,
+                            hovertemplate='<b>%{y}</b><br>Jam: %{x}<br>Emisi: %{z:.2f} kg CO₂<extra></extra>',
+                            xgap=1, ygap=1,
+                            colorbar=dict(title=dict(text="Emisi", font=dict(size=9)), thickness=15, len=0.7)
+                        ))
+
+                        fig_heatmap.update_layout(
+                            height=270, 
+                            margin=dict(t=30, b=20, l=20, r=20), 
+                            title=dict(text="<b>Heatmap Emisi Lokasi per Jam</b>", x=0.35, y=0.95, font=dict(size=12)),
+                            xaxis=dict(tickangle=25),
+                            yaxis=dict(
+                                tickvals=original_locations,
+                                ticktext=display_locations_truncated,
+                                automargin=True, 
+                            ),
+                            xaxis_title="Waktu", yaxis_title="Lokasi", font=dict(size=8)
+                        )
+                        return fig_heatmap
+                    plotly_chart_cached('food_drink_waste.heatmap', (pivot_df,), build_heatmap, config=MODEBAR_CONFIG)
                 else:
                     st.info("Tidak ada data heatmap untuk pivot.")
             else:
                 st.info("Tidak ada data heatmap untuk kantin yang dipilih.")
 
         with col2: 
-            canteen_df = get_canteen_data(where_clause, join_needed)
+            canteen_df = panel_data['canteen']
             if not canteen_df.empty:
-                canteen_df = canteen_df.sort_values('total_emisi', ascending=False)
-                fig_canteen = go.Figure()
-                
-                max_emisi, min_emisi = canteen_df['total_emisi'].max(), canteen_df['total_emisi'].min()
-                colors = []
-                for _, row in canteen_df.iterrows():
-                    ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
-                    if ratio < 0.2: colors.append('#66c2a5')
-                    elif ratio < 0.4: colors.append('#abdda4')
-                    elif ratio < 0.6: colors.append('#fdae61')
-                    elif ratio < 0.8: colors.append('#f46d43')
-                    else: colors.append('#d53e4f')
-                
-                display_names = canteen_df['lokasi'].apply(lambda x: CANTEEN_DISPLAY_NAMES.get(x, x)) 
-                display_names = display_names.apply(lambda x: x if len(x) <= 12 else x[:12] + '..') 
-                
-                custom_data = canteen_df[['avg_emisi', 'activity_count', 'lokasi']].values
-                
-                fig_canteen.add_trace(go.Bar(
-                    x=display_names,
-                    y=canteen_df['total_emisi'],
-                    marker=dict(color=colors, line=dict(color='white', width=1.5), opacity=0.85),
-                    showlegend=False, 
-                    text=[f"{val:.1f}" for val in canteen_df['total_emisi']], 
-                    textposition='inside', 
-                    textfont=dict(size=10, color='#2d3748', weight='bold'),
-                    hovertemplate='<b>%{customdata[2]}</b><br>Total Emisi: %{y:.2f} kg CO₂<br>Rata-rata: %{customdata[0]:.2f} kg CO₂<br>Aktivitas: %{customdata[1]}<extra></extra>',
-                    customdata=custom_data 
-                ))
-                
-                avg_emisi_canteen = canteen_df['total_emisi'].mean()
-                fig_canteen.add_hline(y=avg_emisi_canteen, line_dash="dash", line_color="#5e4fa2", line_width=2, annotation_text=f"Rata-rata: {avg_emisi_canteen:.1f}")
-                
-                fig_canteen.update_layout(
-                    height=270, 
-                    margin=dict(t=30, b=0, l=0, r=0), 
-                    title=dict(text="<b>Emisi per Kantin</b>", x=0.45, y=0.95, font=dict(size=12)), 
-                    yaxis_title="Total Emisi (kg CO2)",
-                    xaxis=dict(tickangle=-15),
-                    xaxis_title="Lokasi",
-                )
-                st.plotly_chart(fig_canteen, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_canteen():
+                    canteen_sorted = canteen_df.sort_values('total_emisi', ascending=False)
+                    fig_canteen = go.Figure()
+
+                    max_emisi, min_emisi = canteen_sorted['total_emisi'].max(), canteen_sorted['total_emisi'].min()
+                    colors = []
+                    for _, row in canteen_sorted.iterrows():
+                        ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
+                        if ratio < 0.2: colors.append('#66c2a5')
+                        elif ratio < 0.4: colors.append('#abdda4')
+                        elif ratio < 0.6: colors.append('#fdae61')
+                        elif ratio < 0.8: colors.append('#f46d43')
+                        else: colors.append('#d53e4f')
+
+                    display_names = canteen_sorted['lokasi'].apply(lambda x: CANTEEN_DISPLAY_NAMES.get(x, x)) 
+                    display_names = display_names.apply(lambda x: x if len(x) <= 12 else x[:12] + '..') 
+
+                    custom_data = canteen_sorted[['avg_emisi', 'activity_count', 'lokasi']].values
+
+                    fig_canteen.add_trace(go.Bar(
+                        x=display_names,
+                        y=canteen_sorted['total_emisi'],
+                        marker=dict(color=colors, line=dict(color='white', width=1.5), opacity=0.85),
+                        showlegend=False, 
+                        text=[f"{val:.1f}" for val in canteen_sorted['total_emisi']], 
+                        textposition='inside', 
+                        textfont=dict(size=10, color='#2d3748', weight='bold'),
+                        hovertemplate='<b>%{customdata[2]}</b><br>Total Emisi: %{y:.2f} kg CO₂<br>Rata-rata: %{customdata[0]:.2f} kg CO₂<br>Aktivitas: %{customdata[1]}<extra></extra>',
+                        customdata=custom_data 
+                    ))
+
+                    avg_emisi_canteen = canteen_sorted['total_emisi'].mean()
+                    fig_canteen.add_hline(y=avg_emisi_canteen, line_dash="dash", line_color="#5e4fa2", line_width=2, annotation_text=f"Rata-rata: {avg_emisi_canteen:.1f}")
+
+                    fig_canteen.update_layout(
+                        height=270, 
+                        margin=dict(t=30, b=0, l=0, r=0), 
+                        title=dict(text="<b>Emisi per Kantin</b>", x=0.45, y=0.95, font=dict(size=12)), 
+                        yaxis_title="Total Emisi (kg CO2)",
+                        xaxis=dict(tickangle=-15),
+                        xaxis_title="Lokasi",
+                    )
+                    return fig_canteen
+                plotly_chart_cached('food_drink_waste.canteen', (canteen_df,), build_canteen, config=MODEBAR_CONFIG)
             else:
                 st.info("Tidak ada data kantin untuk filter ini.")
 
+    # Diisi terakhir supaya pemuatan fact table tidak menahan render filter dan panel.
+    show_facet_counts(facet_slots, loader.result('facets'))
+
 if __name__ == "__main__":
     show()
\ No newline at end of file
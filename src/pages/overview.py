@@ -4,10 +4,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 from src.components.loading import loading, loading_decorator
+from src.components.charts import plotly_chart_cached
 import time
 import warnings
 warnings.filterwarnings('ignore')
-from src.utils.db_connector import run_sql
+from src.utils.db_connector import run_sql, versioned_cache_data, PANEL_QUERY_MODE, get_fact_engine
+from src.utils.panel_loader import PanelLoader
+from src.utils.result_schema import apply_schema, CSV_FLOAT_FORMAT
+from src.utils.readonly_frame import frame_fingerprint
+from src.utils.filters import canonical_filter, session_filter, top_value_views
 from io import BytesIO
 from xhtml2pdf import pisa
 
@@ -36,7 +41,7 @@ MODEBAR_CONFIG = {
 }
 DAY_ORDER = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
 
-@st.cache_data(ttl=3600)
+@versioned_cache_data(readonly=True)
 def get_all_student_periodic_emissions() -> pd.DataFrame:
     """
     Mengambil total emisi per kategori per mahasiswa dari v_emisi_per_mahasiswa.
@@ -55,18 +60,21 @@ def get_all_student_periodic_emissions() -> pd.DataFrame:
     LEFT JOIN
         v_informasi_fakultas_mahasiswa vim ON ve.id_mahasiswa = vim.id_mahasiswa
     """
-    df = run_sql(query)
-    df['fakultas'] = df['fakultas'].str.strip()
-    return df
+    df = run_sql(query, heavy=True)
+    return apply_schema(df, 'overview.periodic')
 
-@st.cache_data(ttl=3600)
+@versioned_cache_data(readonly=True)
 def get_daily_activity_emissions_for_trend(selected_fakultas: list, selected_days: list, selected_categories: list) -> pd.DataFrame:
     """
     Mengambil emisi harian berdasarkan aktivitas dari tabel-tabel detail.
     Ini adalah sumber data granular utama untuk chart Tren Emisi Harian (selalu).
     Ini juga menjadi sumber data utama untuk semua visualisasi jika ada filter 'Hari' yang aktif.
-    Filter langsung diterapkan di level SQL.
+    Filter langsung diterapkan di level SQL; di mode local, baris disaring dari hasil tanpa filter.
     """
+    if PANEL_QUERY_MODE == 'local' and (selected_fakultas or selected_days or selected_categories):
+        local_df = _filter_daily_activity_local(selected_fakultas, selected_days, selected_categories)
+        if local_df is not None:
+            return local_df
     
     where_clauses = []
     
@@ -151,9 +159,25 @@ def get_daily_activity_emissions_for_trend(selected_fakultas: list, selected_day
     {final_where_sql}
     GROUP BY de.id_mahasiswa, vim.fakultas, de.hari, de.kategori
     """
-    df = run_sql(daily_query)
-    df['fakultas'] = df['fakultas'].str.strip()
-    return df
+    df = run_sql(daily_query, heavy=True)
+    return apply_schema(df, 'overview.daily')
+
+def _filter_daily_activity_local(selected_fakultas, selected_days, selected_categories):
+    """
+    Mode local (lihat src/utils/fact_engine.py): hasil get_daily_activity_emissions_for_trend tanpa
+    filter menjadi fact table per versi data, lalu filter dijawab dengan bitmap hari/kategori/fakultas.
+    Semua kolom filter adalah kunci GROUP BY query, jadi hasilnya sama dengan filter di SQL.
+    None jika fact table tidak bisa dimuat.
+    """
+    engine = get_fact_engine()
+    facts = engine.table('overview.daily', lambda: get_daily_activity_emissions_for_trend([], [], []),
+                         dimensions=['hari', 'kategori', 'fakultas'])
+    if facts is None:
+        return None
+    with engine.measure_query():
+        mask = facts.where(isin={'hari': selected_days, 'kategori': selected_categories,
+                                 'fakultas': [f.strip() for f in selected_fakultas or []]})
+        return facts.take(mask)
 
 
 def create_behavior_profile(row, thresholds):
@@ -176,7 +200,87 @@ def create_behavior_profile(row, thresholds):
     if f_level == "Tinggi": return "Boros Pangan"
     return "Profil Campuran"
 
-@st.cache_data(ttl=3600)
+def build_overview_view(periodic_df: pd.DataFrame, daily_df: pd.DataFrame, selected_fakultas: list, selected_days: list, selected_categories: list):
+    """
+    Menghitung data KPI/segmen halaman overview dari hasil get_all_student_periodic_emissions
+    dan get_daily_activity_emissions_for_trend. Dipakai show() dan cache_warmer.
+
+    Returns:
+        tuple: (filtered_overall_data_for_metrics, daily_pivot, fakultas_stats, num_responden_unique_kpi)
+    """
+    if not selected_days: 
+        # periodic_df dibagikan dari cache dan hanya-baca; salinan dangkal (tanpa menyalin data)
+        # supaya kolom total_emisi bisa ditambahkan.
+        main_source_for_kpis_segments = periodic_df.copy(deep=False)
+
+        if selected_fakultas:
+            main_source_for_kpis_segments = main_source_for_kpis_segments[main_source_for_kpis_segments['fakultas'].isin(selected_fakultas)]
+        
+        if selected_categories:
+            temp_df_for_category_filter = main_source_for_kpis_segments.copy()
+            if 'Transportasi' not in selected_categories:
+                temp_df_for_category_filter['transportasi'] = 0.0
+            if 'Elektronik' not in selected_categories:
+                temp_df_for_category_filter['elektronik'] = 0.0
+            if 'Sampah' not in selected_categories:
+                temp_df_for_category_filter['sampah_makanan'] = 0.0
+            main_source_for_kpis_segments = temp_df_for_category_filter 
+        
+        main_source_for_kpis_segments['total_emisi'] = main_source_for_kpis_segments[['transportasi', 'elektronik', 'sampah_makanan']].sum(axis=1)
+
+        daily_pivot = daily_df.groupby(
+            ['hari', 'kategori'], observed=True
+        )['emisi'].sum().unstack(fill_value=0.0).reindex(DAY_ORDER).fillna(0.0)
+
+    else: 
+        main_source_for_kpis_segments = daily_df.groupby(['id_mahasiswa', 'fakultas', 'kategori'], observed=True)['emisi'].sum().unstack(fill_value=0.0).reset_index()
+        
+        for cat in ['Transportasi', 'Elektronik', 'Sampah']:
+            if cat not in main_source_for_kpis_segments.columns:
+                main_source_for_kpis_segments[cat] = 0.0
+
+        main_source_for_kpis_segments = main_source_for_kpis_segments.rename(columns={
+            'Transportasi': 'transportasi',
+            'Elektronik': 'elektronik',
+            'Sampah': 'sampah_makanan'
+        })
+        
+        main_source_for_kpis_segments['total_emisi'] = main_source_for_kpis_segments[['transportasi', 'elektronik', 'sampah_makanan']].sum(axis=1)
+
+        daily_pivot = daily_df.groupby(
+            ['hari', 'kategori'], observed=True
+        )['emisi'].sum().unstack(fill_value=0.0).reindex(DAY_ORDER).fillna(0.0) 
+
+    for cat in ['Transportasi', 'Elektronik', 'Sampah']:
+        if cat not in daily_pivot.columns:
+            daily_pivot[cat] = 0.0 
+
+    filtered_overall_data_for_metrics = main_source_for_kpis_segments
+
+    if filtered_overall_data_for_metrics.empty:
+        filtered_overall_data_for_metrics = pd.DataFrame(columns=['id_mahasiswa', 'fakultas', 'transportasi', 'elektronik', 'sampah_makanan', 'total_emisi']) 
+        fakultas_stats = pd.DataFrame(columns=['fakultas', 'total_emisi', 'count'])
+        num_responden_unique_kpi = 0 
+    else:
+        fakultas_stats = filtered_overall_data_for_metrics.groupby('fakultas', observed=True).agg(
+            total_emisi=('total_emisi', 'sum'),
+            count=('id_mahasiswa', 'nunique')
+        ).reset_index()
+
+        num_responden_unique_kpi = filtered_overall_data_for_metrics['id_mahasiswa'].nunique()
+
+    return filtered_overall_data_for_metrics, daily_pivot, fakultas_stats, num_responden_unique_kpi
+
+def overview_report_key(periodic_df, daily_df, selected_fakultas, selected_days, selected_categories):
+    """
+    Kunci generate_overview_pdf_report.by_key: argumen laporan sepenuhnya ditentukan oleh kedua
+    frame sumber dan filter. Frame sumber hanya-baca dari cache menyimpan sidik jarinya, jadi kunci
+    ini O(1), bukan hash isi ketiga frame laporan di setiap rerun.
+    """
+    return ('overview', frame_fingerprint(periodic_df), frame_fingerprint(daily_df),
+            list(selected_fakultas or []), list(selected_days or []), list(selected_categories or []))
+
+@versioned_cache_data
 @loading_decorator()
 def generate_overview_pdf_report(filtered_agg_df_for_report, daily_pivot_for_report, fakultas_stats_for_report, num_responden_unique_pdf: int):
     """
@@ -401,16 +505,36 @@ def generate_overview_pdf_report(filtered_agg_df_for_report, daily_pivot_for_rep
     pdf_buffer.close()
     return pdf_bytes
 
+def get_warmup_views(limit):
+    """Filter yang dipanaskan cache_warmer: tanpa filter dan `limit` fakultas dengan mahasiswa terbanyak (semua jenis)."""
+    student_counts = get_all_student_periodic_emissions()['fakultas'].value_counts().to_dict()
+    return top_value_views({'fakultas': student_counts}, ['fakultas', 'days'], limit)
+
+def warm_view(selected_fakultas, selected_days):
+    """Mengisi cache data satu tampilan (laporan PDF tetap dibuat saat diminta)."""
+    get_all_student_periodic_emissions()
+    get_daily_activity_emissions_for_trend(selected_fakultas, selected_days, [])
+
 def show():
     """Fungsi untuk menampilkan halaman Dashboard Utama."""
     st.markdown("""
         <style>.kpi-card{padding:1rem;border-radius:8px;text-align:center;background-color:#f8f9fa}.kpi-value{font-size:2em;font-weight:600}.kpi-label{font-size:0.9em;color:#555}.primary{border-left:4px solid #10b981}.primary .kpi-value{color:#059669}.secondary{border-left:4px solid #3b82f6}.secondary .kpi-value{color:#3b82f6}</style>
         <div class="wow-header"><div class="header-bg-pattern"></div><div class="header-float-1"></div><div class="header-float-2"></div><div class="header-float-3"></div><div class="header-float-4"></div><div class="header-float-5"></div><div class="header-content"><h1 class="header-title">Dashboard Utama</h1></div></div>
         """, unsafe_allow_html=True)
+
+    # Nilai filter sudah ada di session_state sebelum widget dirender, jadi kedua sumber
+    # data halaman bisa dikirim paralel sejak awal rerun.
+    loader = PanelLoader()
+    loader.submit('periodic', get_all_student_periodic_emissions)
+    prefetch_days = session_filter('overview_day_filter', DAY_ORDER)
+    # Fakultas dibandingkan dengan TRIM(fakultas) di SQL, jadi aman di-strip.
+    prefetch_fakultas = session_filter('overview_fakultas_filter', strip=True)
+    loader.submit('daily', get_daily_activity_emissions_for_trend, prefetch_fakultas, prefetch_days,
+                  session_filter('overview_category_filter', list(CATEGORY_COLORS)))
     time.sleep(0.25)
 
     with loading():
-        base_all_student_data_for_fakultas_list = get_all_student_periodic_emissions()
+        base_all_student_data_for_fakultas_list = loader.result('periodic')
         available_fakultas = sorted(base_all_student_data_for_fakultas_list['fakultas'].unique())
         if 'Unknown' in available_fakultas:
             available_fakultas.remove('Unknown') 
@@ -419,86 +543,33 @@ def show():
     
     filter_col1, filter_col2, filter_col3, export_col1, export_col2 = st.columns([1.8, 1.8, 1.8, 1, 1])
     with filter_col1:
-        selected_days = st.multiselect("Hari:", DAY_ORDER, placeholder="Pilih Opsi", key='overview_day_filter')
+        selected_days = canonical_filter(st.multiselect("Hari:", DAY_ORDER, placeholder="Pilih Opsi", key='overview_day_filter'), DAY_ORDER)
     with filter_col2:
-        selected_categories = st.multiselect("Jenis:", ['Transportasi', 'Elektronik', 'Sampah'], placeholder="Pilih Opsi", key='overview_category_filter')
+        selected_categories = canonical_filter(st.multiselect("Jenis:", list(CATEGORY_COLORS), placeholder="Pilih Opsi", key='overview_category_filter'), list(CATEGORY_COLORS))
     with filter_col3:
         selected_fakultas = st.multiselect("Fakultas:", available_fakultas, placeholder="Pilih Opsi", key='overview_fakultas_filter')
     
-    cleaned_selected_fakultas = [f.strip() for f in selected_fakultas] if selected_fakultas else []
+    cleaned_selected_fakultas = canonical_filter(selected_fakultas, strip=True)
+    # Tidak mengirim ulang jika sama dengan hasil prefetch di atas.
+    loader.submit('daily', get_daily_activity_emissions_for_trend, cleaned_selected_fakultas, selected_days, selected_categories)
 
     with loading():
-        if not selected_days: 
-            main_source_for_kpis_segments = get_all_student_periodic_emissions()
-
-            if cleaned_selected_fakultas:
-                main_source_for_kpis_segments = main_source_for_kpis_segments[main_source_for_kpis_segments['fakultas'].isin(cleaned_selected_fakultas)]
-            
-            if selected_categories:
-                temp_df_for_category_filter = main_source_for_kpis_segments.copy()
-                if 'Transportasi' not in selected_categories:
-                    temp_df_for_category_filter['transportasi'] = 0.0
-                if 'Elektronik' not in selected_categories:
-                    temp_df_for_category_filter['elektronik'] = 0.0
-                if 'Sampah' not in selected_categories:
-                    temp_df_for_category_filter['sampah_makanan'] = 0.0
-                main_source_for_kpis_segments = temp_df_for_category_filter 
-            
-            main_source_for_kpis_segments['total_emisi'] = main_source_for_kpis_segments[['transportasi', 'elektronik', 'sampah_makanan']].sum(axis=1)
-
-            daily_trend_data = get_daily_activity_emissions_for_trend(cleaned_selected_fakultas, [], selected_categories)
-            daily_pivot = daily_trend_data.groupby(
-                ['hari', 'kategori']
-            )['emisi'].sum().unstack(fill_value=0.0).reindex(DAY_ORDER).fillna(0.0)
-
-        else: 
-            daily_filtered_data_for_all = get_daily_activity_emissions_for_trend(cleaned_selected_fakultas, selected_days, selected_categories)
-            
-            main_source_for_kpis_segments = daily_filtered_data_for_all.groupby(['id_mahasiswa', 'fakultas', 'kategori'])['emisi'].sum().unstack(fill_value=0.0).reset_index()
-            
-            for cat in ['Transportasi', 'Elektronik', 'Sampah']:
-                if cat not in main_source_for_kpis_segments.columns:
-                    main_source_for_kpis_segments[cat] = 0.0
-
-            main_source_for_kpis_segments = main_source_for_kpis_segments.rename(columns={
-                'Transportasi': 'transportasi',
-                'Elektronik': 'elektronik',
-                'Sampah': 'sampah_makanan'
-            })
-            
-            main_source_for_kpis_segments['total_emisi'] = main_source_for_kpis_segments[['transportasi', 'elektronik', 'sampah_makanan']].sum(axis=1)
-
-            daily_pivot = daily_filtered_data_for_all.groupby(
-                ['hari', 'kategori']
-            )['emisi'].sum().unstack(fill_value=0.0).reindex(DAY_ORDER).fillna(0.0) 
-
-        for cat in ['Transportasi', 'Elektronik', 'Sampah']:
-            if cat not in daily_pivot.columns:
-                daily_pivot[cat] = 0.0 
-
-        filtered_overall_data_for_metrics = main_source_for_kpis_segments
+        filtered_overall_data_for_metrics, daily_pivot, fakultas_stats, num_responden_unique_kpi = build_overview_view(
+            loader.result('periodic'), loader.result('daily'), cleaned_selected_fakultas, selected_days, selected_categories)
+        # Sidik jari tampilan ini (O(1)): kunci laporan PDF dan figure halaman.
+        view_key = overview_report_key(loader.result('periodic'), loader.result('daily'),
+                                       cleaned_selected_fakultas, selected_days, selected_categories)
 
         if filtered_overall_data_for_metrics.empty:
             st.warning("Tidak ada data yang sesuai dengan filter yang dipilih. Silakan sesuaikan filter Anda.")
             st.session_state.overview_empty_data = True
-            
-            filtered_overall_data_for_metrics = pd.DataFrame(columns=['id_mahasiswa', 'fakultas', 'transportasi', 'elektronik', 'sampah_makanan', 'total_emisi']) 
-            fakultas_stats = pd.DataFrame(columns=['fakultas', 'total_emisi', 'count'])
-            num_responden_unique_kpi = 0 
         else:
             st.session_state.overview_empty_data = False 
 
-            fakultas_stats = filtered_overall_data_for_metrics.groupby('fakultas').agg(
-                total_emisi=('total_emisi', 'sum'),
-                count=('id_mahasiswa', 'nunique')
-            ).reset_index()
-
-            num_responden_unique_kpi = filtered_overall_data_for_metrics['id_mahasiswa'].nunique()
-
     with export_col1:
         st.download_button(
             "Data", 
-            filtered_overall_data_for_metrics.to_csv(index=False), 
+            filtered_overall_data_for_metrics.to_csv(index=False, float_format=CSV_FLOAT_FORMAT), 
             file_name=f"overview_data{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv",
             use_container_width=True,
@@ -507,7 +578,9 @@ def show():
         )
     with export_col2:
         try:
-            pdf_data = generate_overview_pdf_report(filtered_overall_data_for_metrics, daily_pivot, fakultas_stats, num_responden_unique_kpi)
+            pdf_data = generate_overview_pdf_report.by_key(
+                view_key,
+                lambda: (filtered_overall_data_for_metrics, daily_pivot, fakultas_stats, num_responden_unique_kpi))
             if pdf_data: 
                 st.download_button(
                     label="Laporan",
@@ -537,45 +610,47 @@ def show():
             fakultas_stats_display = fakultas_stats[fakultas_stats['total_emisi'] > 0].sort_values('total_emisi', ascending=True).tail(13)
             
             if not fakultas_stats_display.empty:
-                fig_fakultas = go.Figure()
-                
-                max_emisi = fakultas_stats_display['total_emisi'].max()
-                min_emisi = fakultas_stats_display['total_emisi'].min()
-                
-                for _, row in fakultas_stats_display.iterrows():
-                    color = CATEGORY_COLORS['Sampah'] 
-                    if max_emisi != min_emisi: 
-                        ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi)
-                        color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
-                        color_idx = min(int(ratio * (len(color_palette) - 1)), len(color_palette) - 1) 
-                        color = color_palette[color_idx]
-                    
-                    fig_fakultas.add_trace(go.Bar(
-                        x=[row['total_emisi']],
-                        y=[row['fakultas']],
-                        orientation='h',
-                        marker=dict(color=color),
+                def build_fakultas():
+                    fig_fakultas = go.Figure()
+
+                    max_emisi = fakultas_stats_display['total_emisi'].max()
+                    min_emisi = fakultas_stats_display['total_emisi'].min()
+
+                    for _, row in fakultas_stats_display.iterrows():
+                        color = CATEGORY_COLORS['Sampah'] 
+                        if max_emisi != min_emisi: 
+                            ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi)
+                            color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
+                            color_idx = min(int(ratio * (len(color_palette) - 1)), len(color_palette) - 1) 
+                            color = color_palette[color_idx]
+
+                        fig_fakultas.add_trace(go.Bar(
+                            x=[row['total_emisi']],
+                            y=[row['fakultas']],
+                            orientation='h',
+                            marker=dict(color=color),
+                            showlegend=False,
+                            text=[f"{row['total_emisi']:.1f}"],
+                            textposition='inside',
+                            textfont=dict(color='white', size=10, weight='bold'),
+                            hovertemplate=f'<b>{row["fakultas"]}</b><br>Total Emisi: %{{x:.1f}} kg CO₂<br>Jumlah Mahasiswa: {row["count"]}<extra></extra>'
+                        ))
+
+                    fig_fakultas.update_layout(
+                        height=382,
+                        title_text="<b>Emisi per Fakultas</b>",
+                        title_x=0.32,
+                        margin=dict(t=40, b=0, l=0, r=20),
+                        xaxis_title="Total Emisi (kg CO₂)",
+                        yaxis_title="Fakultas",
                         showlegend=False,
-                        text=[f"{row['total_emisi']:.1f}"],
-                        textposition='inside',
-                        textfont=dict(color='white', size=10, weight='bold'),
-                        hovertemplate=f'<b>{row["fakultas"]}</b><br>Total Emisi: %{{x:.1f}} kg CO₂<br>Jumlah Mahasiswa: {row["count"]}<extra></extra>'
-                    ))
-
-                fig_fakultas.update_layout(
-                    height=382,
-                    title_text="<b>Emisi per Fakultas</b>",
-                    title_x=0.32,
-                    margin=dict(t=40, b=0, l=0, r=20),
-                    xaxis_title="Total Emisi (kg CO₂)",
-                    yaxis_title="Fakultas",
-                    showlegend=False,
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    xaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)'),
-                    yaxis=dict(showgrid=False)
-                )
-                st.plotly_chart(fig_fakultas, config=MODEBAR_CONFIG, use_container_width=True)
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        xaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)'),
+                        yaxis=dict(showgrid=False)
+                    )
+                    return fig_fakultas
+                plotly_chart_cached('overview.fakultas', (view_key,), build_fakultas, config=MODEBAR_CONFIG)
             else:
                 st.info("Tidak ada data emisi per fakultas untuk filter yang dipilih.")
         else:
@@ -583,26 +658,28 @@ def show():
 
     with col2:
         if not daily_pivot.empty and daily_pivot.sum().sum() > 0:
-            fig_trend = go.Figure()
-            all_categories = ['Transportasi', 'Elektronik', 'Sampah']
-            
-            for cat in all_categories:
-                if cat in daily_pivot.columns and daily_pivot[cat].sum() > 0: 
-                    fig_trend.add_trace(go.Scatter(
-                        x=daily_pivot.index, 
-                        y=daily_pivot[cat], 
-                        name=cat, 
-                        mode='lines+markers', 
-                        line=dict(color=CATEGORY_COLORS.get(cat, '#cccccc')),
-                        hovertemplate='<b>%{x}</b><br>' + cat + ': %{y:.1f} kg CO₂<extra></extra>'
-                    ))
-            
-            if fig_trend.data: 
+            def build_trend():
+                fig_trend = go.Figure()
+                all_categories = ['Transportasi', 'Elektronik', 'Sampah']
+
+                for cat in all_categories:
+                    if cat in daily_pivot.columns and daily_pivot[cat].sum() > 0: 
+                        fig_trend.add_trace(go.Scatter(
+                            x=daily_pivot.index, 
+                            y=daily_pivot[cat], 
+                            name=cat, 
+                            mode='lines+markers', 
+                            line=dict(color=CATEGORY_COLORS.get(cat, '#cccccc')),
+                            hovertemplate='<b>%{x}</b><br>' + cat + ': %{y:.1f} kg CO₂<extra></extra>'
+                        ))
+
+                if not fig_trend.data:
+                    return None
                 fig_trend.update_layout(height=265, title_text="<b>Tren Emisi Harian</b>", title_x=0.32, title_y=0.95,
                     margin=dict(t=30, b=0, l=0, r=0), legend_title_text='', yaxis_title="Emisi (kg CO₂)", xaxis_title="Hari",
                     legend=dict(orientation="h", yanchor="bottom", y=-0.4, xanchor="center", x=0.5, font_size=9))
-                st.plotly_chart(fig_trend, config=MODEBAR_CONFIG, use_container_width=True)
-            else:
+                return fig_trend
+            if not plotly_chart_cached('overview.trend', (view_key,), build_trend, config=MODEBAR_CONFIG):
                 st.info("Tidak ada data tren harian untuk filter yang dipilih.")
         else: 
             st.info("Tidak ada data tren harian untuk filter yang dipilih.")
@@ -622,59 +699,64 @@ def show():
                 final_pie_values.append(value)
         
         if final_pie_values and sum(final_pie_values) > 0:
-            fig_composition = go.Figure(go.Pie(
-                labels=final_pie_labels,
-                values=final_pie_values,
-                hole=0.45,
-                marker=dict(
-                    colors=[CATEGORY_COLORS.get(cat) for cat in final_pie_labels],
-                    line=dict(color='#FFFFFF', width=2)
-                ),
-                textposition='outside',
-                textinfo='label+percent',
-                textfont=dict(size=10, family="Poppins"),
-                hovertemplate='<b>%{label}</b><br>Emisi: %{value:.1f} kg CO₂ (%{percent})<extra></extra>'
-            ))
-
-            total_emisi_pie = sum(final_pie_values)
-            center_text = f"<b style='font-size:14px'>{total_emisi_pie:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
-            fig_composition.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
-            
-            fig_composition.update_layout(
-                height=280,
-                title_text="<b>Komposisi Emisi</b>",
-                title_x=0.32,
-                title_y=0.95,
-                margin=dict(t=65, b=30, l=0, r=0),
-                showlegend=False
-            )
-            st.plotly_chart(fig_composition, config=MODEBAR_CONFIG, use_container_width=True)
+            def build_composition():
+                fig_composition = go.Figure(go.Pie(
+                    labels=final_pie_labels,
+                    values=final_pie_values,
+                    hole=0.45,
+                    marker=dict(
+                        colors=[CATEGORY_COLORS.get(cat) for cat in final_pie_labels],
+                        line=dict(color='#FFFFFF', width=2)
+                    ),
+                    textposition='outside',
+                    textinfo='label+percent',
+                    textfont=dict(size=10, family="Poppins"),
+                    hovertemplate='<b>%{label}</b><br>Emisi: %{value:.1f} kg CO₂ (%{percent})<extra></extra>'
+                ))
+
+                total_emisi_pie = sum(final_pie_values)
+                center_text = f"<b style='font-size:14px'>{total_emisi_pie:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
+                fig_composition.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
+
+                fig_composition.update_layout(
+                    height=280,
+                    title_text="<b>Komposisi Emisi</b>",
+                    title_x=0.32,
+                    title_y=0.95,
+                    margin=dict(t=65, b=30, l=0, r=0),
+                    showlegend=False
+                )
+                return fig_composition
+            plotly_chart_cached('overview.composition', (view_key,), build_composition, config=MODEBAR_CONFIG)
         else:
             st.info("Tidak ada data emisi yang ditemukan untuk kategori yang dipilih.")
     
     with col3:
         if num_responden_unique_kpi > 5 and not filtered_overall_data_for_metrics.empty: 
-            median_transportasi = filtered_overall_data_for_metrics['transportasi'].median() if 'transportasi' in filtered_overall_data_for_metrics.columns else 0.0
-            median_elektronik = filtered_overall_data_for_metrics['elektronik'].median() if 'elektronik' in filtered_overall_data_for_metrics.columns else 0.0
-            median_sampah = filtered_overall_data_for_metrics['sampah_makanan'].median() if 'sampah_makanan' in filtered_overall_data_for_metrics.columns else 0.0
+            # Segmentasi per mahasiswa ikut di-cache bersama figure (lihat plotly_chart_cached).
+            def build_treemap():
+                median_transportasi = filtered_overall_data_for_metrics['transportasi'].median() if 'transportasi' in filtered_overall_data_for_metrics.columns else 0.0
+                median_elektronik = filtered_overall_data_for_metrics['elektronik'].median() if 'elektronik' in filtered_overall_data_for_metrics.columns else 0.0
+                median_sampah = filtered_overall_data_for_metrics['sampah_makanan'].median() if 'sampah_makanan' in filtered_overall_data_for_metrics.columns else 0.0
+
+                median_transportasi = 0.0 if pd.isna(median_transportasi) else median_transportasi
+                median_elektronik = 0.0 if pd.isna(median_elektronik) else median_elektronik
+                median_sampah = 0.0 if pd.isna(median_sampah) else median_sampah
+
+                thresholds = {
+                    'transportasi': median_transportasi,
+                    'elektronik': median_elektronik,
+                    'sampah_makanan': median_sampah
+                }
 
-            median_transportasi = 0.0 if pd.isna(median_transportasi) else median_transportasi
-            median_elektronik = 0.0 if pd.isna(median_elektronik) else median_elektronik
-            median_sampah = 0.0 if pd.isna(median_sampah) else median_sampah
+                agg_df_for_segmentation = filtered_overall_data_for_metrics.copy()
+                agg_df_for_segmentation['profil_perilaku'] = agg_df_for_segmentation.apply(lambda row: create_behavior_profile(row, thresholds), axis=1)
 
-            thresholds = {
-                'transportasi': median_transportasi,
-                'elektronik': median_elektronik,
-                'sampah_makanan': median_sampah
-            }
-            
-            agg_df_for_segmentation = filtered_overall_data_for_metrics.copy()
-            agg_df_for_segmentation['profil_perilaku'] = agg_df_for_segmentation.apply(lambda row: create_behavior_profile(row, thresholds), axis=1)
-            
-            profile_counts = agg_df_for_segmentation['profil_perilaku'].value_counts().reset_index()
-            profile_counts.columns = ['profil', 'jumlah']
+                profile_counts = agg_df_for_segmentation['profil_perilaku'].value_counts().reset_index()
+                profile_counts.columns = ['profil', 'jumlah']
 
-            if not profile_counts.empty:
+                if profile_counts.empty:
+                    return None
                 fig_treemap = px.treemap(
                     profile_counts,
                     path=[px.Constant("Semua Profil"), 'profil'],
@@ -683,7 +765,7 @@ def show():
                     color_discrete_map=PROFILE_COLOR_MAP,
                     custom_data=['jumlah']
                 )
-                
+
                 fig_treemap.update_traces(
                     texttemplate="<b>%{label}</b><br>%{value} Mahasiswa",
                     hovertemplate="<b>%{label}</b><br>Jumlah: %{customdata[0]} mahasiswa<extra></extra>",
@@ -691,16 +773,15 @@ def show():
                     insidetextfont=dict(size=16, color='black'),
                     marker=dict(line=dict(width=2, color='white'))
                 )
-                
+
                 fig_treemap.update_layout(
                     height=570,
                     title_text="<b>Segmentasi Profil</b>",
                     title_x=0.33,
                     margin = dict(t=30, l=5, r=5, b=10)
                 )
-                
-                st.plotly_chart(fig_treemap, use_container_width=True, config=MODEBAR_CONFIG)
-            else:
+                return fig_treemap
+            if not plotly_chart_cached('overview.treemap', (view_key,), build_treemap, config=MODEBAR_CONFIG):
                 st.info("Tidak ada profil perilaku yang ditemukan untuk filter yang dipilih.")
         else:
             st.info("Data tidak cukup untuk membuat segmentasi perilaku (minimal 6 responden unik diperlukan setelah filter diterapkan).")
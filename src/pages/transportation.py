@@ -4,8 +4,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 from src.components.loading import loading, loading_decorator
+from src.components.charts import plotly_chart_cached
 import time
-from src.utils.db_connector import run_sql
+from src.utils.db_connector import run_sql, run_sql_batch, run_rpc_batch, split_grouped_result, PANEL_QUERY_MODE, versioned_cache_data, get_partial_aggregate_cache, get_fact_engine
+from src.utils.panel_loader import PanelLoader
+from src.utils.column_registry import build_export_select, EXPORT_PROFILE_LABELS, DEFAULT_EXPORT_PROFILE
+from src.utils.result_schema import apply_panel_schemas
+from src.utils.filters import canonical_filter, session_filter, top_value_views, facet_slot, show_facet_counts
+from src.utils.partial_aggregates import PanelAggregate, PartialAggregateSpec
+from src.utils.fact_engine import facet_counts
 from io import BytesIO
 from xhtml2pdf import pisa
 
@@ -14,7 +21,7 @@ TRANSPORT_COLORS = { 'Sepeda': '#66c2a5', 'Jalan kaki': '#abdda4', 'Bike': '#66c
 MODEBAR_CONFIG = { 'displayModeBar': True, 'displaylogo': False, 'modeBarButtonsToRemove': [ 'pan2d', 'pan3d', 'select2d', 'lasso2d', 'zoom2d', 'zoom3d', 'zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d', 'resetScale3d', 'hoverClosestCartesian', 'hoverCompareCartesian', 'toggleSpikelines', 'hoverClosest3d', 'orbitRotation', 'tableRotation', 'resetCameraDefault3d', 'resetCameraLastSave3d' ], 'toImageButtonOptions': { 'format': 'png', 'filename': 'carbon_emission_chart', 'height': 600, 'width': 800, 'scale': 2 } }
 DAY_ORDER = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
 
-@st.cache_data(ttl=3600)
+@st.cache_data(show_spinner=False)
 def build_transport_where_clause(selected_modes, selected_fakultas, selected_days):
     """Membangun klausa WHERE SQL secara dinamis dan aman, termasuk filter hari."""
     clauses = []
@@ -33,117 +40,308 @@ def build_transport_where_clause(selected_modes, selected_fakultas, selected_day
     where_sql = "WHERE " + " AND ".join(clauses) if clauses else ""
     return where_sql, join_needed
 
-@st.cache_data(ttl=3600)
-def get_filtered_data(where_clause, join_needed):
-    """Query untuk mengambil data mentah sesuai filter untuk di-download."""
-    join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
+@versioned_cache_data
+def get_filtered_data(where_clause, join_needed, profile=DEFAULT_EXPORT_PROFILE):
+    """Query untuk mengambil data mentah sesuai filter untuk di-download (kolom sesuai profil ekspor)."""
     query = f"""
     SELECT 
-        t.*,
-        COALESCE(r.fakultas, 'N/A') as fakultas,
-        COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi as emisi_mingguan
+        {build_export_select('transportation', profile)}
     FROM transportasi t
     LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
     {where_clause}
     """
-    return run_sql(query)
+    return run_sql(query, heavy=True)
+
+def get_filter_options():
+    """Mengambil opsi filter moda dan fakultas dalam satu round trip."""
+    return run_sql_batch({
+        'modes': "SELECT DISTINCT transportasi FROM transportasi WHERE transportasi IS NOT NULL ORDER BY transportasi",
+        'fakultas': "SELECT DISTINCT fakultas FROM v_informasi_fakultas_mahasiswa WHERE fakultas IS NOT NULL AND fakultas <> '' ORDER BY fakultas",
+    })
 
-@st.cache_data(ttl=3600)
-def get_daily_trend_data(where_clause, join_needed):
-    """Query data untuk chart Tren Emisi Harian."""
+def build_panel_queries(where_clause, join_needed):
+    """Menyusun SQL untuk setiap panel (dan KPI laporan) halaman transportasi."""
     join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
-    SELECT 
-        TRIM(unnest(string_to_array(t.hari_datang, ','))) AS hari,
-        SUM(t.emisi_transportasi) AS emisi
-    FROM transportasi t
-    {join_sql}
-    {where_clause}
-    GROUP BY hari
+    return {
+        # Tren Emisi Harian
+        'daily': f"""
+        SELECT 
+            TRIM(unnest(string_to_array(t.hari_datang, ','))) AS hari,
+            SUM(t.emisi_transportasi) AS emisi
+        FROM transportasi t
+        {join_sql}
+        {where_clause}
+        GROUP BY hari
+        """,
+        # Emisi per Fakultas
+        'faculty': f"""
+        SELECT
+            r.fakultas,
+            SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) AS total_emisi,
+            COUNT(DISTINCT t.id_mahasiswa) as count
+        FROM transportasi t
+        JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+        {where_clause}
+        GROUP BY r.fakultas
+        ORDER BY total_emisi ASC
+        """,
+        # Komposisi Moda
+        'composition': f"""
+        SELECT
+            t.transportasi,
+            COUNT(DISTINCT t.id_mahasiswa) as total_users,
+            SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) as total_emisi
+        FROM transportasi t
+        {join_sql}
+        {where_clause}
+        GROUP BY t.transportasi
+        """,
+        # Heatmap
+        'heatmap': f"""
+        SELECT 
+            TRIM(unnest(string_to_array(t.hari_datang, ','))) AS hari,
+            t.transportasi,
+            COUNT(t.id_mahasiswa) as pengguna
+        FROM transportasi t
+        {join_sql}
+        {where_clause}
+        GROUP BY hari, t.transportasi
+        """,
+        # Emisi per Kecamatan
+        'kecamatan': f"""
+        SELECT
+            t.kecamatan,
+            AVG(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) as rata_rata_emisi,
+            COUNT(DISTINCT t.id_mahasiswa) as jumlah_mahasiswa,
+            SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) as total_emisi
+        FROM transportasi t
+        {join_sql}
+        {where_clause}
+        {'AND' if where_clause else 'WHERE'} t.kecamatan IS NOT NULL AND t.kecamatan <> ''
+        GROUP BY t.kecamatan
+        ORDER BY jumlah_mahasiswa DESC
+        LIMIT 8
+        """,
+        # Jumlah mahasiswa unik untuk KPI laporan
+        'unique_students': f"""
+        SELECT COUNT(DISTINCT t.id_mahasiswa) as count FROM transportasi t
+        LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+        {where_clause}
+        """,
+    }
+
+def build_panel_rpc_calls(selected_modes, selected_fakultas, selected_days):
+    """Menyusun panggilan fungsi bertipe (mode RPC) untuk setiap panel; padanan build_panel_queries."""
+    params = {
+        'p_modes': list(selected_modes or []),
+        'p_fakultas': list(selected_fakultas or []),
+        'p_days': list(selected_days or []),
+    }
+    return {
+        'daily': ('transport_daily_trend_v1', params),
+        'faculty': ('transport_faculty_emissions_v1', params),
+        'composition': ('transport_composition_v1', params),
+        'heatmap': ('transport_heatmap_v1', params),
+        'kecamatan': ('transport_kecamatan_v1', params),
+        'unique_students': ('transport_unique_students_v1', params),
+    }
+
+def build_fused_panel_query(where_clause):
     """
-    return run_sql(query)
-
-@st.cache_data(ttl=3600)
-def get_faculty_data(where_clause):
-    """Query data untuk chart Emisi per Fakultas."""
-    query = f"""
-    SELECT
-        r.fakultas,
-        SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) AS total_emisi,
-        COUNT(DISTINCT t.id_mahasiswa) as count
-    FROM transportasi t
-    JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
-    {where_clause}
-    GROUP BY r.fakultas
-    ORDER BY total_emisi ASC
+    Satu query untuk semua panel: transportasi dibaca sekali (CTE base), lalu setiap
+    panel menjadi satu grouping set. Baris hasil diberi label kolom `panel`.
     """
-    return run_sql(query)
-
-@st.cache_data(ttl=3600)
-def get_transport_composition_data(where_clause, join_needed):
-    """Query data untuk chart Komposisi Moda."""
-    join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
+    return f"""
+    WITH base AS (
+        SELECT
+            t.id_mahasiswa, t.transportasi, t.kecamatan, t.hari_datang, t.emisi_transportasi,
+            COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi AS emisi_mingguan,
+            r.fakultas,
+            r.id_mahasiswa IS NOT NULL AS has_fakultas
+        FROM transportasi t
+        LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+        {where_clause}
+    )
     SELECT
-        t.transportasi,
-        COUNT(DISTINCT t.id_mahasiswa) as total_users,
-        SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) as total_emisi
-    FROM transportasi t
-    {join_sql}
-    {where_clause}
-    GROUP BY t.transportasi
+        CASE WHEN GROUPING(transportasi) = 0 THEN 'composition'
+             WHEN GROUPING(fakultas) = 0 THEN 'faculty'
+             WHEN GROUPING(kecamatan) = 0 THEN 'kecamatan'
+             ELSE 'unique_students' END AS panel,
+        NULL AS hari, transportasi, fakultas, has_fakultas, kecamatan,
+        NULL::double precision AS emisi,
+        SUM(emisi_mingguan) AS total_emisi,
+        AVG(emisi_mingguan) AS rata_rata_emisi,
+        COUNT(DISTINCT id_mahasiswa) AS n_mahasiswa,
+        NULL::bigint AS n_baris
+    FROM base
+    GROUP BY GROUPING SETS ((transportasi), (has_fakultas, fakultas), (kecamatan), ())
+    UNION ALL
+    SELECT
+        CASE WHEN GROUPING(transportasi) = 0 THEN 'heatmap' ELSE 'daily' END AS panel,
+        hari, transportasi, NULL, NULL, NULL,
+        SUM(emisi_transportasi), NULL, NULL, NULL,
+        COUNT(id_mahasiswa)
+    FROM base
+    CROSS JOIN LATERAL (SELECT TRIM(unnest(string_to_array(base.hari_datang, ','))) AS hari) d
+    GROUP BY GROUPING SETS ((hari), (hari, transportasi))
     """
-    return run_sql(query)
 
-@st.cache_data(ttl=3600)
-def get_heatmap_data(where_clause, join_needed):
-    """Query data untuk Heatmap."""
-    join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
-    SELECT 
-        TRIM(unnest(string_to_array(t.hari_datang, ','))) AS hari,
-        t.transportasi,
-        COUNT(t.id_mahasiswa) as pengguna
-    FROM transportasi t
-    {join_sql}
-    {where_clause}
-    GROUP BY hari, t.transportasi
+def split_fused_panel_data(df):
+    """Memecah hasil build_fused_panel_query menjadi DataFrame per panel (kolom sama dengan build_panel_queries)."""
+    faculty = split_grouped_result(df, 'faculty', {'fakultas': 'fakultas', 'total_emisi': 'total_emisi', 'n_mahasiswa': 'count', 'has_fakultas': 'has_fakultas'}, ['count'])
+    faculty = faculty[faculty['has_fakultas'] == True].drop(columns=['has_fakultas']).sort_values('total_emisi').reset_index(drop=True)
+    kecamatan = split_grouped_result(df, 'kecamatan', {'kecamatan': 'kecamatan', 'rata_rata_emisi': 'rata_rata_emisi', 'n_mahasiswa': 'jumlah_mahasiswa', 'total_emisi': 'total_emisi'}, ['jumlah_mahasiswa'])
+    kecamatan = kecamatan[kecamatan['kecamatan'].notna() & (kecamatan['kecamatan'] != '')]
+    kecamatan = kecamatan.sort_values('jumlah_mahasiswa', ascending=False, kind='stable').head(8).reset_index(drop=True)
+    return {
+        'daily': split_grouped_result(df, 'daily', {'hari': 'hari', 'emisi': 'emisi'}),
+        'faculty': faculty,
+        'composition': split_grouped_result(df, 'composition', {'transportasi': 'transportasi', 'n_mahasiswa': 'total_users', 'total_emisi': 'total_emisi'}, ['total_users']),
+        'heatmap': split_grouped_result(df, 'heatmap', {'hari': 'hari', 'transportasi': 'transportasi', 'n_baris': 'pengguna'}, ['pengguna']),
+        'kecamatan': kecamatan,
+        'unique_students': split_grouped_result(df, 'unique_students', {'n_mahasiswa': 'count'}, ['count']),
+    }
+
+# Fact table mode local (lihat src/utils/fact_engine.py): baris CTE base build_fused_panel_query tanpa filter.
+FACT_TABLE_SQL = """
+SELECT
+    t.id_mahasiswa, t.transportasi, t.kecamatan, t.hari_datang, t.emisi_transportasi,
+    COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi AS emisi_mingguan,
+    r.fakultas,
+    r.id_mahasiswa IS NOT NULL AS has_fakultas
+FROM transportasi t
+LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+"""
+
+def get_fact_table(engine):
+    """Fact table transportasi (dimuat sekali per versi data); None jika tidak bisa dimuat."""
+    return engine.table('transportation', lambda: run_sql(FACT_TABLE_SQL), dimensions=['transportasi', 'fakultas'])
+
+def build_local_panel_result(selected_modes, selected_fakultas, selected_days):
     """
-    return run_sql(query)
-
-@st.cache_data(ttl=3600)
-def get_kecamatan_data(where_clause, join_needed):
-    """Query data untuk chart Emisi per Kecamatan."""
-    join_sql = "JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa" if join_needed else ""
-    query = f"""
-    SELECT
-        t.kecamatan,
-        AVG(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) as rata_rata_emisi,
-        COUNT(DISTINCT t.id_mahasiswa) as jumlah_mahasiswa,
-        SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi) as total_emisi
-    FROM transportasi t
-    {join_sql}
-    {where_clause}
-    {'AND' if where_clause else 'WHERE'} t.kecamatan IS NOT NULL AND t.kecamatan <> ''
-    GROUP BY t.kecamatan
-    ORDER BY jumlah_mahasiswa DESC
-    LIMIT 8
+    Hasil build_fused_panel_query yang dihitung di proses dari fact table transportasi (mode local).
+    DataFrame kosong jika fact table tidak bisa dimuat.
+    """
+    engine = get_fact_engine()
+    facts = get_fact_table(engine)
+    if facts is None:
+        return pd.DataFrame()
+    with engine.measure_query():
+        mask = facts.where(isin={'transportasi': selected_modes, 'fakultas': selected_fakultas},
+                           ilike_any={'hari_datang': selected_days})
+        days = facts.explode('hari_datang', 'hari')
+        return pd.concat([
+            facts.grouping_sets({'composition': ['transportasi'], 'faculty': ['has_fakultas', 'fakultas'],
+                                 'kecamatan': ['kecamatan'], 'unique_students': []}, mask,
+                                total_emisi=('sum', 'emisi_mingguan'), rata_rata_emisi=('mean', 'emisi_mingguan'),
+                                n_mahasiswa=('nunique', 'id_mahasiswa')),
+            days.grouping_sets({'heatmap': ['hari', 'transportasi'], 'daily': ['hari']}, days.from_parent(mask),
+                               emisi=('sum', 'emisi_transportasi'), n_baris=('count', 'id_mahasiswa')),
+        ], ignore_index=True)
+
+def get_facet_counts(selected_modes, selected_fakultas, selected_days):
+    """
+    Jumlah mahasiswa per opsi filter (moda, fakultas, hari) di bawah filter lain yang aktif, dihitung
+    dari bitmap fact table transportasi (satu query per versi data, bukan per opsi). {} jika fact
+    table tidak bisa dimuat.
+    """
+    engine = get_fact_engine()
+    facts = get_fact_table(engine)
+    if facts is None:
+        return {}
+
+    def count(selection):
+        mask = facts.where(isin={'transportasi': selection['modes'], 'fakultas': selection['fakultas']},
+                           ilike_any={'hari_datang': selection['days']})
+        return facts.count_distinct('id_mahasiswa', mask)
+
+    with engine.measure_query():
+        return facet_counts({'modes': facts.distinct('transportasi'), 'fakultas': facts.distinct('fakultas'), 'days': DAY_ORDER},
+                            {'modes': selected_modes, 'fakultas': selected_fakultas, 'days': selected_days}, count)
+
+# Panel yang bisa disusun dari partial per moda/fakultas (lihat src/utils/partial_aggregates.py).
+# Setiap mahasiswa punya satu moda dan satu fakultas, jadi kedua filter membagi mahasiswa. Filter
+# hari tidak: satu baris cocok dengan beberapa hari (hari_datang ILIKE ANY). Kecamatan (AVG, 8
+# teratas) selalu lewat query.
+PANEL_PARTIALS = PartialAggregateSpec('transportation', dimensions={'modes': True, 'fakultas': True}, panels={
+    'daily': PanelAggregate(keys=['hari'], sums=['emisi']),
+    'faculty': PanelAggregate(keys=['fakultas'], sums=['total_emisi'], distinct=['count'], order_by=('total_emisi', True)),
+    'composition': PanelAggregate(keys=['transportasi'], sums=['total_emisi'], distinct=['total_users']),
+    'heatmap': PanelAggregate(keys=['hari', 'transportasi'], sums=['pengguna']),
+    'unique_students': PanelAggregate(distinct=['count']),
+})
+
+def _query_panel_data(filters, skip=()):
+    """
+    Data mentah (sebelum skema) semua panel kecuali `skip`. Di mode RPC tiap panel memanggil
+    fungsi bertipe, di mode fused semua panel diambil dengan satu query GROUPING SETS, di mode
+    local semua panel dihitung dari fact table di proses.
+    Panel yang gagal (mis. fungsi belum dimigrasikan) diambil lewat SQL batch.
     """
-    return run_sql(query)
+    selected_modes, selected_fakultas, selected_days = filters['modes'], filters['fakultas'], filters['days']
+    where_clause, join_needed = build_transport_where_clause(selected_modes, selected_fakultas, selected_days)
+    panel_data = {}
+    if PANEL_QUERY_MODE == 'rpc':
+        calls = build_panel_rpc_calls(selected_modes, selected_fakultas, selected_days)
+        panel_data = run_rpc_batch({name: call for name, call in calls.items() if name not in skip})
+    elif PANEL_QUERY_MODE == 'fused' and not skip:
+        fused_df = run_sql(build_fused_panel_query(where_clause))
+        if not fused_df.empty:
+            panel_data = split_fused_panel_data(fused_df)
+    elif PANEL_QUERY_MODE == 'local':
+        local_df = build_local_panel_result(selected_modes, selected_fakultas, selected_days)
+        if not local_df.empty:
+            panel_data = {name: df for name, df in split_fused_panel_data(local_df).items() if name not in skip}
+
+    queries = build_panel_queries(where_clause, join_needed)
+    missing = {name: sql for name, sql in queries.items() if name not in skip and panel_data.get(name) is None}
+    if missing:
+        panel_data.update(run_sql_batch(missing))
+    return panel_data
+
+def get_panel_data(selected_modes, selected_fakultas, selected_days):
+    """
+    Mengambil data semua panel. Pilihan beberapa moda/fakultas disusun dari partial per nilai
+    jika tersedia (get_partial_aggregate_cache), selain itu diambil lewat _query_panel_data.
+    """
+    filters = {'modes': selected_modes, 'fakultas': selected_fakultas, 'days': selected_days}
+    panel_data = get_partial_aggregate_cache().get_panels(PANEL_PARTIALS, filters, _query_panel_data)
+    return apply_panel_schemas(panel_data, 'transportation')
+
+def get_daily_trend_data(selected_modes, selected_fakultas, selected_days):
+    """Data untuk chart Tren Emisi Harian."""
+    return get_panel_data(selected_modes, selected_fakultas, selected_days)['daily']
+
+def get_faculty_data(selected_modes, selected_fakultas, selected_days):
+    """Data untuk chart Emisi per Fakultas."""
+    return get_panel_data(selected_modes, selected_fakultas, selected_days)['faculty']
+
+def get_transport_composition_data(selected_modes, selected_fakultas, selected_days):
+    """Data untuk chart Komposisi Moda."""
+    return get_panel_data(selected_modes, selected_fakultas, selected_days)['composition']
+
+def get_heatmap_data(selected_modes, selected_fakultas, selected_days):
+    """Data untuk Heatmap."""
+    return get_panel_data(selected_modes, selected_fakultas, selected_days)['heatmap']
+
+def get_kecamatan_data(selected_modes, selected_fakultas, selected_days):
+    """Data untuk chart Emisi per Kecamatan."""
+    return get_panel_data(selected_modes, selected_fakultas, selected_days)['kecamatan']
     
 
-@st.cache_data(ttl=3600)
+@versioned_cache_data
 @loading_decorator()
-def generate_pdf_report(where_clause, join_needed):
+def generate_pdf_report(selected_modes, selected_fakultas, selected_days):
     from datetime import datetime
     import time 
     
     time.sleep(0.6) 
-    df_daily = get_daily_trend_data(where_clause, join_needed)
-    df_faculty = get_faculty_data(where_clause) 
-    df_composition = get_transport_composition_data(where_clause, join_needed) 
-    df_heatmap = get_heatmap_data(where_clause, join_needed) 
-    df_kecamatan = get_kecamatan_data(where_clause, join_needed) 
+    panel_data = get_panel_data(selected_modes, selected_fakultas, selected_days)
+    df_daily = panel_data['daily']
+    df_faculty = panel_data['faculty']
+    df_composition = panel_data['composition']
+    df_heatmap = panel_data['heatmap']
+    df_kecamatan = panel_data['kecamatan']
     
     # KPI Calculation for PDF
     total_emisi = df_composition['total_emisi'].sum() if 'total_emisi' in df_composition.columns and not df_composition.empty else 0
@@ -151,11 +349,7 @@ def generate_pdf_report(where_clause, join_needed):
     unique_students_in_filtered_data = 0
     if not df_composition.empty and 'total_users' in df_composition.columns: # Menggunakan total_users
         try:
-            unique_students_query_result = run_sql(f"""
-                SELECT COUNT(DISTINCT t.id_mahasiswa) as count FROM transportasi t
-                LEFT JOIN v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
-                {where_clause}
-            """)
+            unique_students_query_result = panel_data['unique_students']
             if not unique_students_query_result.empty and 'count' in unique_students_query_result.columns:
                 unique_students_in_filtered_data = unique_students_query_result.iloc[0,0]
         except Exception as e:
@@ -249,7 +443,7 @@ def generate_pdf_report(where_clause, join_needed):
     # --- 4. Heatmap Penggunaan Moda per Hari ---
     # Judul: Heatmap Penggunaan Moda per Hari (sesuai visualisasi dashboard)
     if not df_heatmap.empty and df_heatmap['pengguna'].sum() > 0: # Menggunakan 'pengguna'
-        pivot_df = df_heatmap.pivot_table(index='hari', columns='transportasi', values='pengguna', aggfunc='sum').fillna(0) # Menggunakan 'pengguna'
+        pivot_df = df_heatmap.pivot_table(index='hari', columns='transportasi', values='pengguna', aggfunc='sum', observed=True).fillna(0).astype(float) # Menggunakan 'pengguna'
         pivot_df = pivot_df.reindex(index=DAY_ORDER, fill_value=0) # Memastikan urutan hari benar
         
         top_modes_in_data = pivot_df.sum(axis=0).nlargest(6).index.tolist() # Pilih top 6 mode yang paling banyak digunakan untuk heatmap
@@ -352,6 +546,16 @@ def generate_pdf_report(where_clause, join_needed):
 
     return pdf_bytes
 
+def get_warmup_views(limit):
+    """Filter yang dipanaskan cache_warmer: tanpa filter dan `limit` moda/fakultas/hari dengan mahasiswa terbanyak."""
+    return top_value_views(get_facet_counts([], [], []), ['modes', 'fakultas', 'days'], limit)
+
+def warm_view(selected_modes, selected_fakultas, selected_days):
+    """Mengisi cache data panel dan ekspor CSV satu tampilan (laporan PDF tetap dibuat saat diminta)."""
+    get_panel_data(selected_modes, selected_fakultas, selected_days)
+    where_clause, join_needed = build_transport_where_clause.__wrapped__(selected_modes, selected_fakultas, selected_days)
+    get_filtered_data(where_clause, join_needed, DEFAULT_EXPORT_PROFILE)
+
 def show():
     st.markdown("""
     <div class="wow-header">
@@ -366,39 +570,65 @@ def show():
         </div>
     </div>
     """, unsafe_allow_html=True)
+
+    # Nilai filter sudah ada di session_state sebelum widget dirender, jadi semua query
+    # halaman bisa dikirim paralel sejak awal rerun.
+    loader = PanelLoader()
+    loader.submit('options', get_filter_options)
+    prefetch_filters = (
+        session_filter('transport_mode_filter'),
+        session_filter('transport_fakultas_filter'),
+        session_filter('transport_day_filter', DAY_ORDER))
+    prefetch_where, prefetch_join = build_transport_where_clause(*prefetch_filters)
+    loader.submit('panels', get_panel_data, *prefetch_filters)
+    loader.submit('export', get_filtered_data, prefetch_where, prefetch_join,
+                  st.session_state.get('transport_export_profile', DEFAULT_EXPORT_PROFILE))
+    # Jumlah mahasiswa per opsi filter (caption di bawah multiselect), dari fact table (tanpa query per opsi).
+    loader.submit('facets', get_facet_counts, *prefetch_filters)
     time.sleep(0.25)
     
     filter_col1, filter_col2, filter_col3, export_col1, export_col2 = st.columns([1.8, 1.8, 1.8, 1, 1])
     with filter_col1:
-        day_options = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
-        selected_days = st.multiselect("Hari:", options=day_options, placeholder="Pilih Opsi", key='transport_day_filter')
+        selected_days = canonical_filter(st.multiselect("Hari:", options=DAY_ORDER, placeholder="Pilih Opsi", key='transport_day_filter'), DAY_ORDER)
+        facet_slots = {'days': facet_slot(DAY_ORDER)}
     
+    filter_options = loader.result('options')
+
     with filter_col2:
-        transport_modes_df = run_sql("SELECT DISTINCT transportasi FROM transportasi WHERE transportasi IS NOT NULL ORDER BY transportasi")
+        transport_modes_df = filter_options['modes']
         available_modes = transport_modes_df['transportasi'].tolist() if not transport_modes_df.empty else []
-        selected_modes = st.multiselect("Moda Transportasi:", options=available_modes, placeholder="Pilih Opsi", key='transport_mode_filter')
+        selected_modes = canonical_filter(st.multiselect("Moda Transportasi:", options=available_modes, placeholder="Pilih Opsi", key='transport_mode_filter'))
+        facet_slots['modes'] = facet_slot(available_modes)
     
     with filter_col3:
-        fakultas_df = run_sql("SELECT DISTINCT fakultas FROM v_informasi_fakultas_mahasiswa WHERE fakultas IS NOT NULL AND fakultas <> '' ORDER BY fakultas")
+        fakultas_df = filter_options['fakultas']
         available_fakultas = fakultas_df['fakultas'].tolist() if not fakultas_df.empty else []
-        selected_fakultas = st.multiselect("Fakultas:", options=available_fakultas, placeholder="Pilih Opsi", key='transport_fakultas_filter')
+        selected_fakultas = canonical_filter(st.multiselect("Fakultas:", options=available_fakultas, placeholder="Pilih Opsi", key='transport_fakultas_filter'))
+        facet_slots['fakultas'] = facet_slot(available_fakultas)
 
     where_clause, join_needed = build_transport_where_clause(selected_modes, selected_fakultas, selected_days)
+    # Tidak mengirim ulang jika sama dengan hasil prefetch di atas.
+    loader.submit('panels', get_panel_data, selected_modes, selected_fakultas, selected_days)
     
     with export_col1:
-        data_df = get_filtered_data(where_clause, join_needed)
-        st.download_button(
-            "Data", 
-            data=data_df.to_csv(index=False), 
-            file_name=f"transport_data{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv",
-            use_container_width=True,
-            disabled=(data_df.empty)
-        )
+        with st.popover("Data", use_container_width=True):
+            export_profile = st.radio("Kolom:", options=list(EXPORT_PROFILE_LABELS), format_func=EXPORT_PROFILE_LABELS.get,
+                                      horizontal=True, key='transport_export_profile')
+            loader.submit('export', get_filtered_data, where_clause, join_needed, export_profile)
+            data_df = loader.result('export')
+            st.download_button(
+                "Unduh CSV", 
+                data=data_df.to_csv(index=False), 
+                file_name=f"transport_data{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv",
+                use_container_width=True,
+                disabled=(data_df.empty)
+            )
+    panel_data = loader.result('panels')
 
     with export_col2:
         try:
-            pdf_data = generate_pdf_report(where_clause, join_needed)
+            pdf_data = generate_pdf_report(selected_modes, selected_fakultas, selected_days)
             
             if pdf_data:
                 st.download_button(
@@ -417,180 +647,191 @@ def show():
     with loading():
         col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
-            daily_df = get_daily_trend_data(where_clause, join_needed)
+            daily_df = panel_data['daily']
             if not daily_df.empty and daily_df['emisi'].sum() > 0:
                 if selected_days: 
-                    daily_df_display = daily_df[daily_df['hari'].str.strip().isin(selected_days)]
+                    daily_df_display = daily_df[daily_df['hari'].isin(selected_days)]
                 else:
                     daily_df_display = daily_df
                 
                 if not daily_df_display.empty:
-                    day_order = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
-                    daily_df_display['order'] = pd.Categorical(daily_df_display['hari'].str.strip(), categories=day_order, ordered=True)
-                    daily_df_display = daily_df_display.sort_values('order')
+                    daily_df_display = daily_df_display.sort_values('hari') # 'hari' kategori berurutan (result_schema)
                     
-                    fig_trend = go.Figure(go.Scatter(
-                        x=daily_df_display['hari'], 
-                        y=daily_df_display['emisi'], 
-                        fill='tonexty', mode='lines+markers', 
-                        line=dict(color='#3288bd', width=2, shape='spline'), 
-                        marker=dict(size=6, color='#3288bd'), 
-                        fillcolor="rgba(102, 194, 165, 0.3)", 
-                        hovertemplate='<b>%{x}</b><br>%{y:.1f} kg CO₂<extra></extra>', 
-                        showlegend=False))
-                    fig_trend.update_layout(
-                        height=270, 
-                        margin=dict(t=30, b=0, l=0, r=30), 
-                        title=dict(text="<b>Tren Emisi Harian</b>", x=0.38, y=0.95, font=dict(size=12)),
-                        yaxis_title="Emisi (kg CO₂)", xaxis_title="Hari"
-                        )
-                    st.plotly_chart(fig_trend, config=MODEBAR_CONFIG, use_container_width=True)
+                    def build_trend():
+                        fig_trend = go.Figure(go.Scatter(
+                            x=daily_df_display['hari'], 
+                            y=daily_df_display['emisi'], 
+                            fill='tonexty', mode='lines+markers', 
+                            line=dict(color='#3288bd', width=2, shape='spline'), 
+                            marker=dict(size=6, color='#3288bd'), 
+                            fillcolor="rgba(102, 194, 165, 0.3)", 
+                            hovertemplate='<b>%{x}</b><br>%{y:.1f} kg CO₂<extra></extra>', 
+                            showlegend=False))
+                        fig_trend.update_layout(
+                            height=270, 
+                            margin=dict(t=30, b=0, l=0, r=30), 
+                            title=dict(text="<b>Tren Emisi Harian</b>", x=0.38, y=0.95, font=dict(size=12)),
+                            yaxis_title="Emisi (kg CO₂)", xaxis_title="Hari"
+                            )
+                        return fig_trend
+                    plotly_chart_cached('transportation.trend', (daily_df_display,), build_trend, config=MODEBAR_CONFIG)
             else: st.info("Tidak ada data tren untuk filter ini.")
 
         with col2:
-            fakultas_stats = get_faculty_data(where_clause)
+            fakultas_stats = panel_data['faculty']
             if not fakultas_stats.empty and fakultas_stats['total_emisi'].sum() > 0:
-                fig_fakultas = go.Figure()
-                fakultas_stats_display = fakultas_stats.sort_values('total_emisi', ascending=True).tail(13)
-                max_emisi, min_emisi = fakultas_stats_display['total_emisi'].max(), fakultas_stats_display['total_emisi'].min()
-                for i, (_, row) in enumerate(fakultas_stats_display.iterrows()):
-                    color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
-                    ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
-                    color = color_palette[int(ratio * (len(color_palette) - 1))]
-                    fig_fakultas.add_trace(go.Bar(
-                        x=[row['total_emisi']], 
-                        y=[row['fakultas']], 
-                        orientation='h', 
-                        marker=dict(color=color), 
-                        showlegend=False, 
-                        text=[f"{row['total_emisi']:.1f}"], 
-                        textposition='inside', 
-                        textfont=dict(color='white'), 
-                        hovertemplate=f'<b>{row["fakultas"]}</b><br>Total: {row["total_emisi"]:.1f} kg CO₂<br>Mahasiswa: {row["count"]}<extra></extra>'))
-                fig_fakultas.update_layout(
-                    height=270, 
-                    margin=dict(t=40, b=0, l=0, r=20), 
-                    title=dict(text="<b>Emisi per Fakultas</b>", 
-                               x=0.4, 
-                               y=0.95, 
-                               font=dict(size=12)),
-                    yaxis_title="Fakultas", xaxis_title="Emisi (kg CO₂)"
-                    )
-                st.plotly_chart(fig_fakultas, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_fakultas():
+                    fig_fakultas = go.Figure()
+                    fakultas_stats_display = fakultas_stats.sort_values('total_emisi', ascending=True).tail(13)
+                    max_emisi, min_emisi = fakultas_stats_display['total_emisi'].max(), fakultas_stats_display['total_emisi'].min()
+                    for i, (_, row) in enumerate(fakultas_stats_display.iterrows()):
+                        color_palette = ['#66c2a5', '#abdda4', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
+                        ratio = (row['total_emisi'] - min_emisi) / (max_emisi - min_emisi) if max_emisi > min_emisi else 0
+                        color = color_palette[int(ratio * (len(color_palette) - 1))]
+                        fig_fakultas.add_trace(go.Bar(
+                            x=[row['total_emisi']], 
+                            y=[row['fakultas']], 
+                            orientation='h', 
+                            marker=dict(color=color), 
+                            showlegend=False, 
+                            text=[f"{row['total_emisi']:.1f}"], 
+                            textposition='inside', 
+                            textfont=dict(color='white'), 
+                            hovertemplate=f'<b>{row["fakultas"]}</b><br>Total: {row["total_emisi"]:.1f} kg CO₂<br>Mahasiswa: {row["count"]}<extra></extra>'))
+                    fig_fakultas.update_layout(
+                        height=270, 
+                        margin=dict(t=40, b=0, l=0, r=20), 
+                        title=dict(text="<b>Emisi per Fakultas</b>", 
+                                   x=0.4, 
+                                   y=0.95, 
+                                   font=dict(size=12)),
+                        yaxis_title="Fakultas", xaxis_title="Emisi (kg CO₂)"
+                        )
+                    return fig_fakultas
+                plotly_chart_cached('transportation.fakultas', (fakultas_stats,), build_fakultas, config=MODEBAR_CONFIG)
             else: st.info("Tidak ada data fakultas untuk filter ini.")
 
         with col3:
-            transport_data = get_transport_composition_data(where_clause, join_needed)
+            transport_data = panel_data['composition']
             if not transport_data.empty:
-                colors = [TRANSPORT_COLORS.get(mode, MAIN_PALETTE[i % len(MAIN_PALETTE)]) for i, mode in enumerate(transport_data['transportasi'])]
-                fig_donut = go.Figure(data=[go.Pie(
-                    labels=transport_data['transportasi'], 
-                    values=transport_data['total_users'], 
-                    hole=0.45, marker=dict(colors=colors), 
-                    textposition='outside', 
-                    textinfo='label+percent', 
-                    hovertemplate='<b>%{label}</b><br>%{value} pengguna (%{percent})<extra></extra>')])
-                total_emisi_chart = transport_data['total_emisi'].sum()
-                center_text = f"<b style='font-size:14px'>{total_emisi_chart:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
-                fig_donut.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
-                fig_donut.update_layout(
-                    height=270, 
-                    margin=dict(t=50, b=5, l=5, r=5), 
-                    showlegend=False, 
-                    title=dict(text="<b>Proporsi Moda Transportasi</b>", 
-                               x=0.3, 
-                               y=0.95, 
-                               font=dict(size=12)))
-                st.plotly_chart(fig_donut, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_donut():
+                    colors = [TRANSPORT_COLORS.get(mode, MAIN_PALETTE[i % len(MAIN_PALETTE)]) for i, mode in enumerate(transport_data['transportasi'])]
+                    fig_donut = go.Figure(data=[go.Pie(
+                        labels=transport_data['transportasi'], 
+                        values=transport_data['total_users'], 
+                        hole=0.45, marker=dict(colors=colors), 
+                        textposition='outside', 
+                        textinfo='label+percent', 
+                        hovertemplate='<b>%{label}</b><br>%{value} pengguna (%{percent})<extra></extra>')])
+                    total_emisi_chart = transport_data['total_emisi'].sum()
+                    center_text = f"<b style='font-size:14px'>{total_emisi_chart:.1f}</b><br><span style='font-size:8px'>kg CO₂</span>"
+                    fig_donut.add_annotation(text=center_text, x=0.5, y=0.5, font_size=10, showarrow=False)
+                    fig_donut.update_layout(
+                        height=270, 
+                        margin=dict(t=50, b=5, l=5, r=5), 
+                        showlegend=False, 
+                        title=dict(text="<b>Proporsi Moda Transportasi</b>", 
+                                   x=0.3, 
+                                   y=0.95, 
+                                   font=dict(size=12)))
+                    return fig_donut
+                plotly_chart_cached('transportation.composition', (transport_data,), build_donut, config=MODEBAR_CONFIG)
             else: st.info("Tidak ada data komposisi untuk filter ini.")
     
     with loading():
         col1, col2 = st.columns([1, 1])
         with col1:
-            heatmap_df = get_heatmap_data(where_clause, join_needed)
+            heatmap_df = panel_data['heatmap']
             if not heatmap_df.empty:
-                pivot_df = heatmap_df.pivot_table(index='hari', columns='transportasi', values='pengguna', aggfunc='sum').fillna(0)
-                day_order = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
-                pivot_df = pivot_df.reindex(index=day_order, fill_value=0)
-                top_modes = pivot_df.sum(axis=0).nlargest(6).index
-                pivot_df_filtered = pivot_df[top_modes]
-                fig_heatmap = go.Figure(data=go.Heatmap(
-                    z=pivot_df_filtered.values,
-                    x=pivot_df_filtered.columns,
-                    y=pivot_df_filtered.index,   
-                    colorscale=[[0, '#fee08b'], [0.25, '#fdae61'], [0.5, '#f46d43'], [0.75, '#d53e4f'], [1, '#9e0142']],
-                    hoverongaps=False,
-                    hovertemplate='<b>%{x}</b><br>%{y}: %{z} pengguna<extra></extra>',
-                    xgap=1,  
-                    ygap=1,  
-                        colorbar=dict(
-                        title=dict(text="Pengguna", font=dict(size=9)),
-                        tickfont=dict(size=10),
-                        thickness=15,
-                        len=0.7
-                    )
-                ))
-                fig_heatmap.update_layout(
-                    height=270, 
-                    margin=dict(t=30, b=0, l=0, r=0), 
-                    title=dict(text="<b>Heatmap Penggunaan Moda per Hari</b>", 
-                               x=0.3, 
-                               y=0.95, 
-                               font=dict(size=12)),
-                    xaxis_title="Moda Transportasi", 
-                    yaxis_title="Hari")
-                st.plotly_chart(fig_heatmap, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_heatmap():
+                    pivot_df = heatmap_df.pivot_table(index='hari', columns='transportasi', values='pengguna', aggfunc='sum', observed=True).fillna(0).astype(float)
+                    day_order = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+                    pivot_df = pivot_df.reindex(index=day_order, fill_value=0)
+                    top_modes = pivot_df.sum(axis=0).nlargest(6).index
+                    pivot_df_filtered = pivot_df[top_modes]
+                    fig_heatmap = go.Figure(data=go.Heatmap(
+                        z=pivot_df_filtered.values,
+                        x=pivot_df_filtered.columns,
+                        y=pivot_df_filtered.index,   
+                        colorscale=[[0, '#fee08b'], [0.25, '#fdae61'], [0.5, '#f46d43'], [0.75, '#d53e4f'], [1, '#9e0142']],
+                        hoverongaps=False,
+                        hovertemplate='<b>%{x}</b><br>%{y}: %{z} pengguna<extra></extra>',
+                        xgap=1,  
+                        ygap=1,  
+                            colorbar=dict(
+                            title=dict(text="Pengguna", font=dict(size=9)),
+                            tickfont=dict(size=10),
+                            thickness=15,
+                            len=0.7
+                        )
+                    ))
+                    fig_heatmap.update_layout(
+                        height=270, 
+                        margin=dict(t=30, b=0, l=0, r=0), 
+                        title=dict(text="<b>Heatmap Penggunaan Moda per Hari</b>", 
+                                   x=0.3, 
+                                   y=0.95, 
+                                   font=dict(size=12)),
+                        xaxis_title="Moda Transportasi", 
+                        yaxis_title="Hari")
+                    return fig_heatmap
+                plotly_chart_cached('transportation.heatmap', (heatmap_df,), build_heatmap, config=MODEBAR_CONFIG)
             else: st.info("Tidak ada data heatmap untuk filter ini.")
         
         with col2:
-            kecamatan_df = get_kecamatan_data(where_clause, join_needed)
+            kecamatan_df = panel_data['kecamatan']
             if not kecamatan_df.empty:
                 # REVISI DISINI: Mengurutkan dan menampilkan berdasarkan TOTAL EMISI
-                kecamatan_df = kecamatan_df.sort_values('total_emisi', ascending=False)
-                fig_kecamatan = go.Figure()
-                
-                # Menentukan skala warna berdasarkan TOTAL EMISI, bukan rata-rata
-                max_emisi_total = kecamatan_df['total_emisi'].max()
-                min_emisi_total = kecamatan_df['total_emisi'].min()
-                
-                for i, (_, row) in enumerate(kecamatan_df.iterrows()):
-                    sequential_warm = ['#fee08b', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
-                    color = sequential_warm[0] # Default jika min==max
-                    if max_emisi_total != min_emisi_total:
-                        ratio = (row['total_emisi'] - min_emisi_total) / (max_emisi_total - min_emisi_total) 
-                        color_idx = min(int(ratio * (len(sequential_warm) - 1)), len(sequential_warm) - 1)
-                        color = sequential_warm[color_idx]
-                    
-                    display_name = row['kecamatan'] if len(row['kecamatan']) <= 10 else row['kecamatan'][:8] + '..'
-                    fig_kecamatan.add_trace(go.Bar(
-                        x=[display_name], 
-                        y=[row['total_emisi']], # MENGUBAH Y-AXIS KE TOTAL EMISI
-                        marker=dict(color=color), 
-                        showlegend=False, 
-                        text=[f"{row['total_emisi']:.1f}"], # TEXT DISPLAY TOTAL EMISI
-                        textposition='inside', 
-                        textfont=dict(color='#2d3748', weight='bold'), 
-                        hovertemplate=f'<b>{row["kecamatan"]}</b><br>Total Emisi: %{{y:.1f}} kg CO₂<br>Rata-rata Emisi/Mahasiswa: {row["rata_rata_emisi"]:.2f} kg CO₂<br>Jumlah Mahasiswa: {row["jumlah_mahasiswa"]}<extra></extra>', 
-                        name=row['kecamatan']))
-                
-                # Rata-rata garis horizontal juga berdasarkan TOTAL EMISI
-                avg_emisi_kec_total = kecamatan_df['total_emisi'].mean()
-                fig_kecamatan.add_hline(
-                    y=avg_emisi_kec_total, 
-                    line_dash="dash", 
-                    line_color="#5e4fa2", 
-                    line_width=2, 
-                    annotation_text=f"Rata-rata: {avg_emisi_kec_total:.1f}")
-                
-                fig_kecamatan.update_layout(
-                    height=270, 
-                    margin=dict(t=30, b=0, l=0, r=10), 
-                    title=dict(text="<b>Emisi per Kecamatan</b>", 
-                               x=0.4, y=0.95, font=dict(size=12)),
-                               xaxis_title="Kecamatan",
-                               yaxis_title="Total Emisi (kg CO₂)") # Y-AXIS TITLE KE TOTAL EMISI
-                st.plotly_chart(fig_kecamatan, config=MODEBAR_CONFIG, use_container_width=True)
+                def build_kecamatan():
+                    kecamatan_sorted = kecamatan_df.sort_values('total_emisi', ascending=False)
+                    fig_kecamatan = go.Figure()
+
+                    # Menentukan skala warna berdasarkan TOTAL EMISI, bukan rata-rata
+                    max_emisi_total = kecamatan_sorted['total_emisi'].max()
+                    min_emisi_total = kecamatan_sorted['total_emisi'].min()
+
+                    for i, (_, row) in enumerate(kecamatan_sorted.iterrows()):
+                        sequential_warm = ['#fee08b', '#fdae61', '#f46d43', '#d53e4f', '#9e0142']
+                        color = sequential_warm[0] # Default jika min==max
+                        if max_emisi_total != min_emisi_total:
+                            ratio = (row['total_emisi'] - min_emisi_total) / (max_emisi_total - min_emisi_total) 
+                            color_idx = min(int(ratio * (len(sequential_warm) - 1)), len(sequential_warm) - 1)
+                            color = sequential_warm[color_idx]
+
+                        display_name = row['kecamatan'] if len(row['kecamatan']) <= 10 else row['kecamatan'][:8] + '..'
+                        fig_kecamatan.add_trace(go.Bar(
+                            x=[display_name], 
+                            y=[row['total_emisi']], # MENGUBAH Y-AXIS KE TOTAL EMISI
+                            marker=dict(color=color), 
+                            showlegend=False, 
+                            text=[f"{row['total_emisi']:.1f}"], # TEXT DISPLAY TOTAL EMISI
+                            textposition='inside', 
+                            textfont=dict(color='#2d3748', weight='bold'), 
+                            hovertemplate=f'<b>{row["kecamatan"]}</b><br>Total Emisi: %{{y:.1f}} kg CO₂<br>Rata-rata Emisi/Mahasiswa: {row["rata_rata_emisi"]:.2f} kg CO₂<br>Jumlah Mahasiswa: {row["jumlah_mahasiswa"]}<extra></extra>', 
+                            name=row['kecamatan']))
+
+                    # Rata-rata garis horizontal juga berdasarkan TOTAL EMISI
+                    avg_emisi_kec_total = kecamatan_sorted['total_emisi'].mean()
+                    fig_kecamatan.add_hline(
+                        y=avg_emisi_kec_total, 
+                        line_dash="dash", 
+                        line_color="#5e4fa2", 
+                        line_width=2, 
+                        annotation_text=f"Rata-rata: {avg_emisi_kec_total:.1f}")
+
+                    fig_kecamatan.update_layout(
+                        height=270, 
+                        margin=dict(t=30, b=0, l=0, r=10), 
+                        title=dict(text="<b>Emisi per Kecamatan</b>", 
+                                   x=0.4, y=0.95, font=dict(size=12)),
+                                   xaxis_title="Kecamatan",
+                                   yaxis_title="Total Emisi (kg CO₂)") # Y-AXIS TITLE KE TOTAL EMISI
+                    return fig_kecamatan
+                plotly_chart_cached('transportation.kecamatan', (kecamatan_df,), build_kecamatan, config=MODEBAR_CONFIG)
             else: st.info("Tidak ada data kecamatan untuk filter ini.")
 
+    # Diisi terakhir supaya pemuatan fact table tidak menahan render filter dan panel.
+    show_facet_counts(facet_slots, loader.result('facets'))
+
 if __name__ == "__main__":
     show()
\ No newline at end of file
@@ -0,0 +1,141 @@
+# src/utils/admission.py
+
+"""
+Admission control untuk query berat (mis. ekspor CSV tanpa filter, query per-mahasiswa di overview).
+
+Hanya query yang ditandai pemanggilnya mungkin berat (run_sql/run_query dengan heavy=True) yang
+melewati admission control; query panel dan fact table langsung dikirim tanpa EXPLAIN. Sebelum query bertanda dikirim, biayanya diperkirakan:
+- dari riwayat fingerprint-nya di query_metrics (p90 latensi dan rata-rata ukuran payload), atau
+- jika riwayatnya belum cukup, dari EXPLAIN lewat RPC `explain_query_cost`
+  (supabase/migrations/20261019020000_query_cost.sql), sekali per fingerprint.
+
+Query berat hanya boleh berjalan ADMISSION_MAX_HEAVY sekaligus per proses. Sisanya antre paling
+lama ADMISSION_QUEUE_TIMEOUT detik (maksimal ADMISSION_MAX_QUEUED antrean) lalu ditolak dengan
+QueryRejected. Query ringan tidak pernah antre, sehingga panel tetap cepat saat ada ekspor.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from src.utils.query_guard import QueryCancelled, get_query_guard
+from src.utils.query_metrics import get_query_metrics, query_fingerprint
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_MAX_HEAVY = int(os.environ.get("ADMISSION_MAX_HEAVY", "2"))
+ADMISSION_MAX_QUEUED = int(os.environ.get("ADMISSION_MAX_QUEUED", "4"))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "20"))
+ADMISSION_COST_THRESHOLD = float(os.environ.get("ADMISSION_COST_THRESHOLD", "100000")) # satuan biaya planner
+ADMISSION_HEAVY_BYTES = float(os.environ.get("ADMISSION_HEAVY_BYTES", "1000000")) # perkiraan ukuran hasil
+ADMISSION_SLOW_MS = float(os.environ.get("ADMISSION_SLOW_MS", "2000"))
+ADMISSION_MIN_SAMPLES = 3 # jumlah eksekusi sebelum riwayat menggantikan perkiraan EXPLAIN
+ADMISSION_WAIT_POLL = 0.5 # detik; jeda pengecekan rerun yang digantikan selama antre
+
+REJECTED_MESSAGE = ("Server sedang memproses banyak permintaan data besar (mis. ekspor). "
+                    "Coba lagi dalam beberapa saat atau persempit filter.")
+
+class QueryRejected(Exception):
+    """Query berat ditolak karena antrean penuh atau terlalu lama menunggu. Pesannya siap ditampilkan."""
+
+class AdmissionController:
+    """
+    Membatasi jumlah query berat yang berjalan bersamaan. Satu instance per proses.
+
+    Args:
+        explain: Fungsi `explain(query) -> {'total_cost', 'plan_rows', 'plan_width'}`.
+    """
+
+    def __init__(self, explain, max_heavy: int = ADMISSION_MAX_HEAVY, max_queued: int = ADMISSION_MAX_QUEUED,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.explain = explain
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_heavy)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._plans = {} # fingerprint -> hasil EXPLAIN (None jika EXPLAIN gagal)
+        self.stats = {"light": 0, "heavy": 0, "queued": 0, "rejected": 0, "explains": 0}
+
+    def estimate(self, query: str) -> dict:
+        """Perkiraan biaya `query`: {'heavy': bool, 'source': 'history'|'explain'|'unknown', ...}."""
+        fingerprint = query_fingerprint(query)
+        profile = get_query_metrics().profile(fingerprint)
+        if profile and profile["misses"] >= ADMISSION_MIN_SAMPLES:
+            heavy = profile["p90"] >= ADMISSION_SLOW_MS or profile["avg_bytes"] >= ADMISSION_HEAVY_BYTES
+            return {"heavy": heavy, "source": "history", **profile}
+
+        with self._lock:
+            known = fingerprint in self._plans
+            plan = self._plans.get(fingerprint)
+        if not known:
+            try:
+                plan = self.explain(query)
+            except QueryCancelled:
+                raise
+            except Exception as e:
+                # Fungsi belum dimigrasikan atau query tidak bisa di-EXPLAIN: anggap ringan.
+                logging.warning(f"ADMISSION: explain_query_cost failed for [{fingerprint}]: {e}")
+                plan = None
+            with self._lock:
+                self._plans[fingerprint] = plan
+                self.stats["explains"] += 1
+        if not plan:
+            return {"heavy": False, "source": "unknown"}
+
+        estimated_bytes = (plan.get("plan_rows") or 0) * (plan.get("plan_width") or 0)
+        heavy = (plan.get("total_cost") or 0) >= ADMISSION_COST_THRESHOLD or estimated_bytes >= ADMISSION_HEAVY_BYTES
+        return {"heavy": heavy, "source": "explain", "estimated_bytes": estimated_bytes, **plan}
+
+    def run(self, query: str, send, *args, **kwargs):
+        """
+        Menjalankan `send(*args, **kwargs)`; jika `query` berat, setelah mendapat slot.
+
+        Raises:
+            QueryRejected: Jika antrean penuh atau slot tidak didapat dalam queue_timeout.
+            QueryCancelled: Jika rerun pengirim digantikan selama antre.
+        """
+        if not ADMISSION_ENABLED or not self.estimate(query)["heavy"]:
+            with self._lock:
+                self.stats["light"] += 1
+            return send(*args, **kwargs)
+
+        self._acquire(query)
+        try:
+            return send(*args, **kwargs)
+        finally:
+            self._slots.release()
+
+    def _acquire(self, query: str):
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["heavy"] += 1
+            return
+
+        with self._lock:
+            if self._queued >= self.max_queued:
+                self.stats["rejected"] += 1
+                raise QueryRejected(REJECTED_MESSAGE)
+            self._queued += 1
+            self.stats["queued"] += 1
+        logging.info(f"ADMISSION: heavy query [{query_fingerprint(query)}] queued ({self._queued} waiting)")
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            while not self._slots.acquire(timeout=ADMISSION_WAIT_POLL):
+                if get_query_guard().is_superseded():
+                    raise QueryCancelled("rerun superseded while queued for admission")
+                if time.monotonic() >= deadline:
+                    with self._lock:
+                        self.stats["rejected"] += 1
+                    raise QueryRejected(REJECTED_MESSAGE)
+            with self._lock:
+                self.stats["heavy"] += 1
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+def format_admission_stats(controller: AdmissionController) -> str:
+    """Ringkasan admission control (untuk log)."""
+    stats = controller.stats
+    return (f"{stats['light']} ringan, {stats['heavy']} berat, {stats['queued']} antre, "
+            f"{stats['rejected']} ditolak, {stats['explains']} EXPLAIN")
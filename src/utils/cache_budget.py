@@ -0,0 +1,259 @@
+# src/utils/cache_budget.py
+
+"""
+Anggaran byte bersama untuk semua cache hasil di memori proses.
+
+Setiap penyimpanan (SwrStore per fungsi ber-cache, cache entri batch, LastKnownGood) melaporkan
+entrinya ke satu CacheBudget, lengkap dengan ukuran sebenarnya (memori DataFrame termasuk isi kolom
+object, panjang bytes laporan PDF) dan biaya menghitungnya ulang (detik). Begitu total melewati
+CACHE_MAX_BYTES:
+1. entri dingin (tidak diakses selama CACHE_COMPRESS_AFTER detik, minimal COMPRESS_MIN_BYTES)
+   dikompres di tempat (pickle + zlib); akses berikutnya mendekompresnya;
+2. jika masih melewati batas, entri dibuang dengan LRU sadar biaya (GreedyDual-Size): prioritas
+   entri = L + biaya / ukuran (MB), diperbarui setiap kali diakses, dengan L prioritas entri terakhir
+   yang dibuang. Entri besar yang murah dihitung ulang keluar lebih dulu; di antara entri sebanding,
+   yang paling lama tidak dipakai. Pembuangan berlanjut sampai total <= CACHE_EVICT_TO x batas.
+
+Objek yang sama di beberapa penyimpanan (mis. DataFrame hasil query di cache query dan di
+LastKnownGood) dihitung sekali, dan baru benar-benar lepas setelah semua penyimpanan membuangnya.
+
+Penyimpanan yang ikut anggaran menyediakan:
+    _evict_charged(key, value_id)     buang entri `key` jika nilainya masih objek `value_id`
+    _compress_charged(key, value_id)  ganti nilai itu dengan CompressedValue.pack(nilai)
+dan memanggil charge/touch/release setelah melepas lock-nya sendiri.
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Kompresi entri dingin sebelum membuang entri; kosongkan variabel ini untuk menonaktifkan.
+_COMPRESS_AFTER = os.environ.get("CACHE_COMPRESS_AFTER", "300")
+CACHE_COMPRESS_AFTER = float(_COMPRESS_AFTER) if _COMPRESS_AFTER else None
+CACHE_EVICT_TO = 0.9 # setelah pembuangan, total paling banyak 90% dari batas
+COMPRESS_MIN_BYTES = 64 * 1024
+COMPRESS_LEVEL = 1 # zlib: cepat, rasio sudah cukup untuk kolom numerik/kategori
+
+_MB = 1024 * 1024
+_MIN_SIZE_FOR_PRIORITY = 1024 # entri sangat kecil tidak mendapat prioritas tak terhingga
+
+class CompressedValue:
+    """Nilai cache terkompresi (pickle + zlib)."""
+
+    __slots__ = ("blob",)
+
+    def __init__(self, blob: bytes):
+        self.blob = blob
+
+    @classmethod
+    def pack(cls, value) -> "CompressedValue":
+        return cls(zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL))
+
+    def unpack(self):
+        return pickle.loads(zlib.decompress(self.blob))
+
+def value_nbytes(value) -> int:
+    """Ukuran memori `value` (byte): DataFrame/Series deep, bytes, array, dan isi tuple/list/dict."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, CompressedValue):
+        return len(value.blob)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(value_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_nbytes(k) + value_nbytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+class _Charge:
+    __slots__ = ("owner", "key", "value_id", "nbytes", "cost", "priority", "used_at", "compressed")
+
+    def __init__(self, owner, key, value_id, nbytes, cost, compressed):
+        self.owner = owner
+        self.key = key
+        self.value_id = value_id
+        self.nbytes = nbytes
+        self.cost = cost
+        self.compressed = compressed
+        self.priority = 0.0
+        self.used_at = 0.0
+
+class CacheBudget:
+    """
+    Anggaran byte untuk entri dari beberapa penyimpanan.
+
+    Contoh (di dalam penyimpanan, setelah melepas lock-nya sendiri):
+        budget.charge(self, key, df, cost=elapsed)   # entri baru/diganti
+        budget.touch(self, key)                      # cache hit
+        budget.release(self, key, id(df))            # entri dibuang penyimpanan sendiri
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, compress_after: float = CACHE_COMPRESS_AFTER):
+        self.max_bytes = max_bytes
+        self.compress_after = compress_after
+        self._lock = threading.Lock()
+        self._enforcing = threading.Lock()
+        self._charges = {} # (id(owner), key) -> _Charge
+        self._objects = {} # id(nilai) -> [ukuran, jumlah entri yang memakainya]
+        self._inflation = 0.0 # L pada GreedyDual-Size
+        self.total_bytes = 0
+        self.stats = {"evicted": 0, "evicted_bytes": 0, "compressed": 0, "compressed_saved_bytes": 0}
+
+    def charge(self, owner, key, value, cost: float = None, compressed: bool = None):
+        """
+        Mencatat `value` sebagai nilai entri `key` milik `owner` (menggantikan catatan sebelumnya),
+        lalu menegakkan batas. `cost` dan `compressed` None: sama seperti catatan sebelumnya.
+        """
+        value_id = id(value)
+        with self._lock:
+            known = self._objects.get(value_id)
+        nbytes = known[0] if known is not None else value_nbytes(value)
+        with self._lock:
+            previous = self._charges.get((id(owner), key))
+            if previous is not None:
+                self._drop(previous)
+            if cost is None:
+                cost = previous.cost if previous is not None else 0.0
+            if compressed is None:
+                compressed = isinstance(value, CompressedValue)
+            charge = _Charge(owner, key, value_id, nbytes, cost, compressed)
+            self._touch(charge)
+            self._charges[(id(owner), key)] = charge
+            shared = self._objects.setdefault(value_id, [nbytes, 0])
+            if shared[1] == 0:
+                self.total_bytes += nbytes
+            shared[1] += 1
+            over_budget = self.total_bytes > self.max_bytes
+        if over_budget:
+            self.enforce()
+
+    def touch(self, owner, key):
+        """Mencatat akses entri (cache hit)."""
+        with self._lock:
+            charge = self._charges.get((id(owner), key))
+            if charge is not None:
+                self._touch(charge)
+
+    def release(self, owner, key, value_id: int):
+        """Menghapus catatan entri `key` jika nilainya masih objek `value_id`."""
+        with self._lock:
+            charge = self._charges.get((id(owner), key))
+            if charge is not None and charge.value_id == value_id:
+                del self._charges[(id(owner), key)]
+                self._drop(charge)
+
+    def release_all(self, owner):
+        """Menghapus semua catatan milik `owner` (mis. setelah penyimpanannya dikosongkan)."""
+        with self._lock:
+            for charge in [c for c in self._charges.values() if c.owner is owner]:
+                del self._charges[(id(owner), charge.key)]
+                self._drop(charge)
+
+    def _touch(self, charge):
+        charge.used_at = time.monotonic()
+        charge.priority = self._inflation + charge.cost / (max(charge.nbytes, _MIN_SIZE_FOR_PRIORITY) / _MB)
+
+    def _drop(self, charge):
+        shared = self._objects.get(charge.value_id)
+        if shared is None:
+            return
+        shared[1] -= 1
+        if shared[1] <= 0:
+            del self._objects[charge.value_id]
+            self.total_bytes -= shared[0]
+
+    def enforce(self):
+        """Kompresi entri dingin lalu pembuangan sampai total di bawah batas (satu thread sekaligus)."""
+        if not self._enforcing.acquire(blocking=False):
+            return # thread lain (atau pemanggilan ulang dari penyimpanan) sedang menegakkan batas
+        try:
+            if self.compress_after is not None:
+                self._compress_cold()
+            self._evict()
+        finally:
+            self._enforcing.release()
+
+    def _compress_cold(self):
+        now = time.monotonic()
+        with self._lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            # Objek yang dipakai beberapa entri tidak dikompres: memorinya tetap ditahan entri lain.
+            cold = sorted((c for c in self._charges.values()
+                           if not c.compressed and c.nbytes >= COMPRESS_MIN_BYTES
+                           and now - c.used_at >= self.compress_after and self._objects[c.value_id][1] == 1),
+                          key=lambda c: c.used_at)
+        for charge in cold:
+            with self._lock:
+                if self.total_bytes <= self.max_bytes * CACHE_EVICT_TO:
+                    return
+            before = self.total_bytes
+            try:
+                charge.owner._compress_charged(charge.key, charge.value_id)
+            except Exception as e:
+                logging.warning(f"CACHE_BUDGET: cannot compress {str(charge.key)[:100]}: {e}")
+                continue
+            with self._lock:
+                saved = before - self.total_bytes
+                if saved > 0:
+                    self.stats["compressed"] += 1
+                    self.stats["compressed_saved_bytes"] += saved
+
+    def _evict(self):
+        evicted = evicted_bytes = 0
+        while True:
+            with self._lock:
+                if self.total_bytes <= self.max_bytes * (CACHE_EVICT_TO if evicted else 1.0):
+                    break
+                if not self._charges:
+                    break
+                victim = min(self._charges.values(), key=lambda c: c.priority)
+                self._inflation = max(self._inflation, victim.priority)
+                before = self.total_bytes
+            if not victim.owner._evict_charged(victim.key, victim.value_id):
+                # Entri sudah diganti/dibuang penyimpanannya; catatan lama jangan dipilih lagi.
+                self.release(victim.owner, victim.key, victim.value_id)
+            with self._lock:
+                evicted += 1
+                evicted_bytes += max(0, before - self.total_bytes)
+        if evicted:
+            with self._lock:
+                self.stats["evicted"] += evicted
+                self.stats["evicted_bytes"] += evicted_bytes
+            logging.info(f"CACHE_BUDGET: evicted {evicted} entries ({evicted_bytes / _MB:.1f} MB), "
+                         f"{self.total_bytes / _MB:.1f} MB in use")
+
+    def usage(self) -> dict:
+        """{nama penyimpanan: (jumlah entri, byte)}; objek bersama dihitung di setiap penyimpanan."""
+        usage = {}
+        with self._lock:
+            for charge in self._charges.values():
+                name = getattr(charge.owner, "name", None) or type(charge.owner).__name__
+                entries, nbytes = usage.get(name, (0, 0))
+                usage[name] = (entries + 1, nbytes + charge.nbytes)
+        return usage
+
+def format_cache_budget_stats(budget: CacheBudget, top: int = 5) -> str:
+    """Ringkasan pemakaian memori cache (untuk log), termasuk penyimpanan terbesar."""
+    stats = budget.stats
+    usage = sorted(budget.usage().items(), key=lambda item: item[1][1], reverse=True)
+    largest = ", ".join(f"{name} {nbytes / _MB:.1f} MB ({entries})" for name, (entries, nbytes) in usage[:top])
+    return (f"{budget.total_bytes / _MB:.1f}/{budget.max_bytes / _MB:.0f} MB, "
+            f"{stats['evicted']} dibuang ({stats['evicted_bytes'] / _MB:.1f} MB), "
+            f"{stats['compressed']} dikompres (hemat {stats['compressed_saved_bytes'] / _MB:.1f} MB)"
+            + (f"; terbesar: {largest}" if largest else ""))
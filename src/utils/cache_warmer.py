@@ -0,0 +1,146 @@
+# src/utils/cache_warmer.py
+
+"""
+Pemanasan cache untuk tampilan dashboard yang paling sering dibuka.
+
+Pada rerun pertama pengguna yang sudah login setelah proses start, dan setiap kali versi data
+berubah (lihat data_version.py), thread latar mengisi cache setiap halaman untuk tampilan tanpa
+filter dan untuk CACHE_WARMER_TOP_VIEWS filter bernilai tunggal dengan mahasiswa terbanyak: data
+panel dan ekspor CSV profil default. Laporan PDF tidak dipanaskan (mahal dan jarang diminta).
+
+Thread warmer tidak punya ScriptRunContext, jadi warm_view hanya memanggil fungsi data yang
+tidak merender elemen Streamlit (tanpa loading_decorator/spinner).
+
+Setiap halaman di WARMUP_PAGES menyediakan:
+    get_warmup_views(limit) -> daftar tuple argumen filter (lihat filters.top_value_views)
+    warm_view(*filters) -> mengisi cache data satu tampilan
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import streamlit as st
+
+from src.utils.db_connector import get_data_version_tracker, register_stats
+from src.utils.swr import fresh_only
+
+CACHE_WARMER_ENABLED = os.environ.get("CACHE_WARMER_ENABLED", "1") == "1"
+CACHE_WARMER_CONCURRENCY = int(os.environ.get("CACHE_WARMER_CONCURRENCY", "2"))
+CACHE_WARMER_TOP_VIEWS = int(os.environ.get("CACHE_WARMER_TOP_VIEWS", "3")) # per halaman, selain tampilan tanpa filter
+WARMUP_PAGES = ("overview", "transportation", "electronic", "food_drink_waste")
+THREAD_NAME_PREFIX = "cache_warmer"
+
+def _warm_fresh(warm_view, *view):
+    # Warmer menunggu hasil baru alih-alih memakai hasil usang, supaya cache halaman benar-benar terisi.
+    with fresh_only():
+        warm_view(*view)
+
+class CacheWarmer:
+    """
+    Menjalankan warm_view semua halaman di thread latar dengan paling banyak `concurrency`
+    tampilan sekaligus. Pemicu saat warmer masih berjalan dijalankan sekali lagi setelahnya.
+
+    Args:
+        load_pages: Fungsi tanpa argumen yang mengembalikan {nama: modul halaman}.
+    """
+
+    def __init__(self, load_pages, concurrency: int = CACHE_WARMER_CONCURRENCY, top_views: int = CACHE_WARMER_TOP_VIEWS):
+        self.load_pages = load_pages
+        self.concurrency = concurrency
+        self.top_views = top_views
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending = None
+        self.last_run = None
+        self.stats = {"runs": 0, "views": 0, "failed": 0}
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def trigger(self, reason: str):
+        """Memulai pemanasan di thread latar (tidak menunggu)."""
+        with self._lock:
+            if self._running:
+                self._pending = reason
+                return
+            self._running = True
+        threading.Thread(target=self._run, args=(reason,), daemon=True, name=THREAD_NAME_PREFIX).start()
+
+    def _run(self, reason: str):
+        while reason:
+            try:
+                self.warm(reason)
+            except Exception as e:
+                logging.error(f"CACHE_WARMER: run after {reason} failed: {e}")
+            with self._lock:
+                reason, self._pending = self._pending, None
+                if not reason:
+                    self._running = False
+
+    def warm(self, reason: str = "manual") -> dict:
+        """Memanaskan semua tampilan dan mengembalikan ringkasannya (juga disimpan di last_run)."""
+        start = time.perf_counter()
+        jobs = []
+        failed = 0
+        for name, page in self.load_pages().items():
+            try:
+                jobs += [(name, page.warm_view, view) for view in page.get_warmup_views(self.top_views)]
+            except Exception as e:
+                failed += 1
+                logging.error(f"CACHE_WARMER: cannot list views of '{name}': {e}")
+
+        warmed = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=THREAD_NAME_PREFIX) as pool:
+            futures = {pool.submit(_warm_fresh, warm_view, *view): (name, view) for name, warm_view, view in jobs}
+            for future in as_completed(futures):
+                name, view = futures[future]
+                try:
+                    future.result()
+                    warmed[name] = warmed.get(name, 0) + 1
+                except Exception as e:
+                    failed += 1
+                    logging.warning(f"CACHE_WARMER: {name} {view} failed: {e}")
+
+        summary = {"reason": reason, "views": warmed, "failed": failed,
+                   "seconds": time.perf_counter() - start, "finished_at": time.time()}
+        with self._lock:
+            self.last_run = summary
+            self.stats["runs"] += 1
+            self.stats["views"] += sum(warmed.values())
+            self.stats["failed"] += failed
+        logging.info(f"CACHE_WARMER: warmed {sum(warmed.values())} view(s) after {reason} in "
+                     f"{summary['seconds']:.1f} s ({', '.join(f'{n}: {c}' for n, c in warmed.items())}), "
+                     f"{failed} failed")
+        return summary
+
+def _load_pages() -> dict:
+    return {name: importlib.import_module(f"src.pages.{name}") for name in WARMUP_PAGES}
+
+@st.cache_resource
+def get_cache_warmer() -> CacheWarmer:
+    """
+    CacheWarmer bersama untuk proses ini. Dipanggil di setiap rerun pengguna yang sudah login; pada
+    pemanggilan pertama langsung memanaskan cache dan mendaftar ke perubahan versi data.
+    """
+    warmer = CacheWarmer(_load_pages)
+    if CACHE_WARMER_ENABLED:
+        get_data_version_tracker().add_listener(lambda: warmer.trigger("perubahan versi data"))
+        warmer.trigger("start")
+    return warmer
+
+def format_cache_warmer_stats(warmer: CacheWarmer) -> str:
+    """Ringkasan pemanasan terakhir (untuk log)."""
+    if warmer.is_running and warmer.last_run is None:
+        return "sedang berjalan"
+    run = warmer.last_run
+    if run is None:
+        return "belum berjalan" if CACHE_WARMER_ENABLED else "nonaktif"
+    return (f"{sum(run['views'].values())} tampilan dipanaskan dalam {run['seconds']:.1f} s "
+            f"(setelah {run['reason']}, {run['failed']} gagal){', sedang berjalan' if warmer.is_running else ''}")
+
+register_stats("Cache warmer", lambda: format_cache_warmer_stats(get_cache_warmer()))
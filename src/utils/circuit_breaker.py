@@ -0,0 +1,237 @@
+# src/utils/circuit_breaker.py
+
+"""
+Circuit breaker untuk query dashboard ke Supabase, dengan cadangan hasil terakhir yang berhasil.
+
+Setelah CIRCUIT_FAILURE_THRESHOLD kegagalan backend berturut-turut (error koneksi, timeout,
+atau query yang lebih lambat dari CIRCUIT_SLOW_CALL_MS), circuit terbuka: query berikutnya
+langsung gagal (CircuitOpenError) tanpa menunggu timeout jaringan, dan db_connector
+menyajikan hasil terakhir yang berhasil untuk query tersebut (ditandai stale).
+Selama terbuka, thread latar mengirim query uji setiap CIRCUIT_PROBE_INTERVAL detik dan
+menutup circuit begitu backend kembali merespons.
+
+Error SQL biasa (mis. kolom tidak ada) bukan kegagalan backend dan tidak dihitung.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+from postgrest.exceptions import APIError
+
+from src.utils.cache_budget import CompressedValue
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_SLOW_CALL_MS = float(os.environ.get("CIRCUIT_SLOW_CALL_MS", "10000"))
+CIRCUIT_PROBE_INTERVAL = float(os.environ.get("CIRCUIT_PROBE_INTERVAL", "15"))
+LAST_KNOWN_GOOD_MAX_ENTRIES = 512
+STALE_SERVED_RETENTION = 600 # detik; catatan hasil stale per sesi hanya perlu bertahan selama satu rerun
+
+# SQLSTATE kelas 08 (koneksi), 53 (sumber daya habis), 57 (dibatalkan/timeout/shutdown)
+# dan error koneksi PostgREST (PGRST000-PGRST003).
+BACKEND_FAILURE_CODES = ("08", "53", "57", "PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+class CircuitOpenError(Exception):
+    """Query tidak dikirim karena circuit sedang terbuka (backend dianggap tidak tersedia)."""
+
+def is_backend_failure(error) -> bool:
+    """True jika `error` menandakan backend tidak tersedia/lambat, bukan kesalahan query."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, APIError):
+        code = str(error.code or "")
+        # _handle_response memakai status HTTP sebagai kode jika respons bukan JSON (mis. 502/503 dari gateway).
+        return code.startswith(BACKEND_FAILURE_CODES) or (len(code) == 3 and code.startswith("5"))
+    return False
+
+class CircuitBreaker:
+    """
+    Status circuit bersama untuk proses ini.
+
+    Args:
+        probe: Fungsi tanpa argumen yang mengirim query uji ringan; gagal dengan exception.
+        on_close: Dipanggil setelah circuit tertutup kembali (mis. membersihkan cache yang
+            terisi hasil cadangan selama gangguan).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(self, probe, on_close=None, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 slow_call_ms: float = CIRCUIT_SLOW_CALL_MS, probe_interval: float = CIRCUIT_PROBE_INTERVAL):
+        self.probe = probe
+        self.on_close = on_close
+        self.failure_threshold = failure_threshold
+        self.slow_call_ms = slow_call_ms
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self.opened_at = None
+        self._stale_served_by_session = {} # session_id -> waktu hasil stale terakhir disajikan ke sesi itu
+        self.stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "trips": 0, "stale_served": 0}
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self._state == self.OPEN
+
+    def call(self, send, *args, **kwargs):
+        """
+        Menjalankan `send(*args, **kwargs)` jika circuit tertutup.
+
+        Raises:
+            CircuitOpenError: Jika circuit sedang terbuka.
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"circuit terbuka sejak {time.strftime('%H:%M:%S', time.localtime(self.opened_at))}")
+            self.stats["calls"] += 1
+
+        start = time.perf_counter()
+        try:
+            result = send(*args, **kwargs)
+        except Exception as e:
+            if is_backend_failure(e):
+                self._record_failure(f"{type(e).__name__}: {e}")
+            raise
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        # gather_rpc(return_exceptions=True) mengembalikan error sebagai elemen hasil.
+        if isinstance(result, list) and result and all(is_backend_failure(item) for item in result):
+            self._record_failure(f"semua panggilan gagal: {result[0]}")
+        elif latency_ms >= self.slow_call_ms:
+            with self._lock:
+                self.stats["slow_calls"] += 1
+            self._record_failure(f"lambat ({latency_ms:.0f} ms)")
+        else:
+            with self._lock:
+                self._consecutive_failures = 0
+        return result
+
+    def _record_failure(self, reason: str):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._consecutive_failures += 1
+            trip = self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+            if trip:
+                self._state = self.OPEN
+                self.opened_at = time.time()
+                self.stats["trips"] += 1
+        if trip:
+            logging.error(f"CIRCUIT_BREAKER: open after {self._consecutive_failures} consecutive failures (last: {reason})")
+            threading.Thread(target=self._probe_loop, daemon=True, name="circuit_breaker_probe").start()
+
+    def _probe_loop(self):
+        while self.is_open:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe()
+            except Exception as e:
+                logging.warning(f"CIRCUIT_BREAKER: probe failed, staying open: {e}")
+                continue
+            with self._lock:
+                self._state = self.CLOSED
+                self._consecutive_failures = 0
+            logging.info(f"CIRCUIT_BREAKER: closed after {time.time() - self.opened_at:.0f} s")
+            if self.on_close is not None:
+                try:
+                    self.on_close()
+                except Exception as e:
+                    logging.error(f"CIRCUIT_BREAKER: on_close failed: {e}")
+
+    def record_stale_served(self, session_id: str = None):
+        """Mencatat hasil stale yang disajikan, untuk sesi `session_id` (None: di luar sesi, mis. thread latar)."""
+        now = time.time()
+        with self._lock:
+            self.stats["stale_served"] += 1
+            if session_id is not None:
+                self._stale_served_by_session[session_id] = now
+            expired = [key for key, served_at in self._stale_served_by_session.items()
+                       if served_at < now - STALE_SERVED_RETENTION]
+            for key in expired:
+                del self._stale_served_by_session[key]
+
+    def stale_served_since(self, session_id: str, timestamp: float) -> bool:
+        """True jika sesi `session_id` mendapat hasil stale sejak `timestamp` (epoch detik)."""
+        with self._lock:
+            served_at = self._stale_served_by_session.get(session_id)
+        return served_at is not None and served_at >= timestamp
+
+class LastKnownGood:
+    """
+    Hasil terakhir yang berhasil per query: {kunci: (waktu_ambil, DataFrame)}, LRU terbatas.
+
+    Args:
+        budget: CacheBudget opsional (lihat cache_budget.py). Entri dicatat tanpa biaya, jadi hasil
+            cadangan yang tidak lagi dipakai cache lain termasuk yang pertama dikompres/dibuang.
+    """
+
+    def __init__(self, max_entries: int = LAST_KNOWN_GOOD_MAX_ENTRIES, budget=None):
+        self.max_entries = max_entries
+        self.budget = budget
+        self.name = "last_known_good"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set(self, key: str, df):
+        with self._lock:
+            self._entries[key] = (time.time(), df)
+            self._entries.move_to_end(key)
+            dropped = []
+            while len(self._entries) > self.max_entries:
+                dropped.append(self._entries.popitem(last=False))
+        if self.budget is not None:
+            for dropped_key, (_, dropped_df) in dropped:
+                self.budget.release(self, dropped_key, id(dropped_df))
+            self.budget.charge(self, key, df, cost=0.0)
+
+    def get_stale(self, key: str):
+        """
+        Salinan hasil terakhir untuk `key` dengan df.attrs['stale'] = True dan
+        df.attrs['fetched_at'] (epoch detik), atau None jika belum pernah berhasil.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        fetched_at, df = entry
+        stale = df.unpack() if isinstance(df, CompressedValue) else df.copy()
+        stale.attrs["stale"] = True
+        stale.attrs["fetched_at"] = fetched_at
+        return stale
+
+    def _evict_charged(self, key, value_id) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or id(entry[1]) != value_id:
+                return False
+            del self._entries[key]
+        self.budget.release(self, key, value_id)
+        return True
+
+    def _compress_charged(self, key, value_id):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or id(entry[1]) != value_id:
+                return
+        packed = CompressedValue.pack(entry[1])
+        with self._lock:
+            replaced = self._entries.get(key) is entry
+            if replaced:
+                self._entries[key] = (entry[0], packed)
+        if replaced:
+            self.budget.charge(self, key, packed, compressed=True)
+
+def format_circuit_stats(breaker: CircuitBreaker) -> str:
+    """Ringkasan status circuit breaker (untuk log)."""
+    stats = breaker.stats
+    return (f"{breaker.state}, {stats['calls']} query, {stats['failures']} gagal/lambat, "
+            f"{stats['rejected']} ditolak saat terbuka, {stats['stale_served']} hasil stale disajikan")
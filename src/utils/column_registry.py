@@ -0,0 +1,98 @@
+# src/utils/column_registry.py
+
+"""
+Daftar kolom yang dipakai dashboard per tabel dan per halaman.
+
+Query tidak memakai SELECT * / t.*, sehingga kolom baru di tabel tidak ikut terkirim
+lewat jaringan atau disimpan di DataFrame sampai didaftarkan di sini.
+Kolom tabel mengikuti hasil akhir etl_script.transform_all_data.
+"""
+
+TABLE_COLUMNS = {
+    'mahasiswa': ('id_mahasiswa', 'nama', 'program_studi', 'hari_datang'),
+    'transportasi': (
+        'id_mahasiswa', 'transportasi', 'kecamatan', 'hari_datang', 'jarak', 'konsumsi',
+        'jenis_bbm', 'faktor_emisi_per_km', 'emisi_transportasi',
+    ),
+    'elektronik': (
+        'id_mahasiswa', 'hari_datang', 'penggunaan_hp', 'durasi_hp', 'penggunaan_laptop', 'durasi_laptop',
+        'penggunaan_tab', 'durasi_tab', 'emisi_elektronik_pribadi', 'emisi_elektronik',
+    ),
+    'sampah_makanan': (
+        'id_mahasiswa', 'hari_datang', 'tempat_makan',
+        'emisi_sampah_makanan_senin', 'emisi_sampah_makanan_selasa', 'emisi_sampah_makanan_rabu',
+        'emisi_sampah_makanan_kamis', 'emisi_sampah_makanan_jumat', 'emisi_sampah_makanan_sabtu',
+        'emisi_sampah_makanan_minggu',
+    ),
+    'aktivitas_harian': (
+        'id_mahasiswa', 'hari', 'waktu', 'kegiatan', 'lokasi', 'penggunaan_ac',
+        'emisi_ac', 'emisi_lampu', 'emisi_sampah_makanan_per_waktu',
+    ),
+}
+
+FOOD_DAY_COLUMNS = TABLE_COLUMNS['sampah_makanan'][3:]
+
+# Kolom ekspor CSV per halaman: alias -> ekspresi SQL (alias tabel mengikuti query ekspor halaman).
+EXPORT_COLUMNS = {
+    'transportation': {
+        **{col: f"t.{col}" for col in TABLE_COLUMNS['transportasi']},
+        'fakultas': "COALESCE(r.fakultas, 'N/A')",
+        'emisi_mingguan': "COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi",
+    },
+    'electronic': {
+        'id_mahasiswa': "e.id_mahasiswa",
+        'fakultas': "COALESCE(r.fakultas, 'N/A')",
+        'hari_datang': "e.hari_datang",
+        'durasi_hp': "COALESCE(e.durasi_hp, 0)",
+        'durasi_laptop': "COALESCE(e.durasi_laptop, 0)",
+        'durasi_tab': "COALESCE(e.durasi_tab, 0)",
+        'emisi_elektronik_pribadi': "COALESCE(e.emisi_elektronik_pribadi, 0)",
+        'emisi_elektronik': "COALESCE(e.emisi_elektronik, 0)",
+    },
+    'food_drink_waste': {
+        'id_mahasiswa': "s.id_mahasiswa",
+        'fakultas': "COALESCE(r.fakultas, 'N/A')",
+        'hari_datang': "s.hari_datang",
+        'tempat_makan': "s.tempat_makan",
+        **{col: f"s.{col}" for col in FOOD_DAY_COLUMNS},
+        'emisi_sampah_makanan_mingguan': " + ".join(f"COALESCE(s.{col}, 0)" for col in FOOD_DAY_COLUMNS),
+    },
+}
+
+# Profil ekspor: 'summary' untuk kolom yang dipakai chart/KPI, 'full' untuk data mentah lengkap.
+EXPORT_PROFILES = {
+    'transportation': {
+        'summary': ['id_mahasiswa', 'fakultas', 'transportasi', 'kecamatan', 'hari_datang', 'emisi_transportasi', 'emisi_mingguan'],
+        'full': [*TABLE_COLUMNS['transportasi'], 'fakultas', 'emisi_mingguan'],
+    },
+    'electronic': {
+        'summary': ['id_mahasiswa', 'fakultas', 'hari_datang', 'emisi_elektronik_pribadi', 'emisi_elektronik'],
+        'full': ['id_mahasiswa', 'fakultas', 'hari_datang', 'durasi_hp', 'durasi_laptop', 'durasi_tab',
+                 'emisi_elektronik_pribadi', 'emisi_elektronik'],
+    },
+    'food_drink_waste': {
+        'summary': ['id_mahasiswa', 'fakultas', 'hari_datang', 'tempat_makan', 'emisi_sampah_makanan_mingguan'],
+        'full': ['id_mahasiswa', 'fakultas', 'hari_datang', 'tempat_makan', *FOOD_DAY_COLUMNS],
+    },
+}
+
+EXPORT_PROFILE_LABELS = {'summary': 'Ringkas', 'full': 'Lengkap'}
+DEFAULT_EXPORT_PROFILE = 'summary'
+
+def get_table_columns(table_name: str) -> tuple:
+    """Kolom terdaftar untuk `table_name`."""
+    try:
+        return TABLE_COLUMNS[table_name]
+    except KeyError:
+        raise KeyError(f"Tabel '{table_name}' belum terdaftar di column_registry.TABLE_COLUMNS") from None
+
+def build_export_select(page: str, profile: str = DEFAULT_EXPORT_PROFILE) -> str:
+    """
+    Menyusun daftar kolom SELECT untuk ekspor CSV `page` dengan profil `profile`.
+
+    Returns:
+        str: Mis. "t.id_mahasiswa AS id_mahasiswa,\n    COALESCE(r.fakultas, 'N/A') AS fakultas".
+    """
+    columns = EXPORT_COLUMNS[page]
+    profile_columns = EXPORT_PROFILES[page].get(profile) or EXPORT_PROFILES[page][DEFAULT_EXPORT_PROFILE]
+    return ",\n        ".join(f"{columns[alias]} AS {alias}" for alias in profile_columns)
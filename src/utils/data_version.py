@@ -0,0 +1,103 @@
+# src/utils/data_version.py
+
+"""
+Versi data dashboard untuk kunci cache.
+
+Versi dibaca dari RPC `get_data_version` (supabase/migrations/20261019030000_data_version.sql),
+yang naik setiap kali tabel sumber berubah (mis. ETL). Hasil query di-cache per versi: cache
+berlaku selama versi tidak berubah dan langsung usang setelah ETL, alih-alih kedaluwarsa
+serentak setiap jam. Versi dicek ulang paling sering sekali per DATA_VERSION_POLL_INTERVAL
+detik per proses, oleh thread yang kebetulan membutuhkannya.
+
+Jika versi belum pernah berhasil dibaca (mis. migrasi belum dijalankan), kunci cache memakai
+slot waktu DATA_VERSION_FALLBACK_TTL detik, sama seperti TTL satu jam sebelumnya.
+"""
+
+import logging
+import os
+import threading
+import time
+
+DATA_VERSION_POLL_INTERVAL = float(os.environ.get("DATA_VERSION_POLL_INTERVAL", "30"))
+DATA_VERSION_FALLBACK_TTL = 3600
+
+class DataVersionTracker:
+    """
+    Versi data terakhir yang diketahui proses ini.
+
+    Args:
+        fetch: Fungsi tanpa argumen yang mengembalikan versi data saat ini; gagal dengan exception.
+        on_change: Dipanggil setelah versi berubah (mis. membuang entri cache versi lama),
+            sebelum listener dari add_listener.
+    """
+
+    def __init__(self, fetch, on_change=None, poll_interval: float = DATA_VERSION_POLL_INTERVAL):
+        self.fetch = fetch
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        self._refreshing = False
+        self._listeners = []
+        self.stats = {"checks": 0, "changes": 0, "failures": 0}
+
+    @property
+    def version(self):
+        """Versi terakhir yang berhasil dibaca (None jika belum pernah)."""
+        return self._version
+
+    def add_listener(self, callback):
+        """Mendaftarkan `callback()` yang dipanggil setiap kali versi data berubah (mis. cache warmer)."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def current(self):
+        """Versi untuk kunci cache; mengecek ulang ke database jika sudah waktunya."""
+        with self._lock:
+            due = not self._refreshing and (self._checked_at is None
+                                            or time.monotonic() - self._checked_at >= self.poll_interval)
+            if due:
+                self._refreshing = True
+        if due:
+            self._refresh()
+        version = self._version
+        if version is None:
+            return f"ttl:{int(time.time() // DATA_VERSION_FALLBACK_TTL)}"
+        return version
+
+    def _refresh(self):
+        version = None
+        try:
+            version = self.fetch()
+        except Exception as e:
+            # Versi terakhir tetap dipakai; error backend ditangani circuit breaker.
+            logging.warning(f"DATA_VERSION: check failed, keeping version {self._version}: {e}")
+            with self._lock:
+                self.stats["failures"] += 1
+        finally:
+            with self._lock:
+                self.stats["checks"] += 1
+                self._checked_at = time.monotonic()
+                self._refreshing = False
+        with self._lock:
+            previous = self._version
+            changed = version is not None and version != previous
+            if changed:
+                self._version = version
+                self.stats["changes"] += previous is not None
+        if changed and previous is not None:
+            logging.info(f"DATA_VERSION: data changed ({previous} -> {version}), cached results invalidated")
+            with self._lock:
+                callbacks = [self.on_change] + self._listeners if self.on_change is not None else list(self._listeners)
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logging.error(f"DATA_VERSION: on_change failed: {e}")
+
+def format_data_version_stats(tracker: DataVersionTracker) -> str:
+    """Ringkasan versi data (untuk log)."""
+    stats = tracker.stats
+    return (f"versi {tracker.version if tracker.version is not None else 'tidak diketahui'}, "
+            f"{stats['checks']} pengecekan, {stats['changes']} perubahan, {stats['failures']} gagal")
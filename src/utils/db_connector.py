@@ -1,82 +1,826 @@
 # src/utils/db_connector.py
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 from supabase import create_client, Client
 import logging
 import os
+import threading
+import time
+import json
+import functools
+import copy
+from src.utils.http_transport import PostgrestTransport, measure_response_bytes, format_transport_stats
+from src.utils.query_guard import QueryCancelled, get_query_guard, format_query_guard_stats
+from src.utils.column_registry import get_table_columns
+from src.utils.query_metrics import track_query, record_batch_entry, format_query_metrics
+from src.utils.circuit_breaker import (CircuitBreaker, CircuitOpenError, LastKnownGood, is_backend_failure,
+                                       format_circuit_stats)
+from src.utils.admission import AdmissionController, QueryRejected, format_admission_stats
+from src.utils.cache_budget import CacheBudget, format_cache_budget_stats
+from src.utils.data_version import DataVersionTracker, format_data_version_stats
+from src.utils.disk_cache import ParquetDiskCache, DISK_CACHE_ENABLED, format_disk_cache_stats
+from src.utils.partial_aggregates import PartialAggregateCache, format_partial_aggregate_stats
+from src.utils.figure_cache import FigureCache, FIGURE_CACHE_MAX_ENTRIES, format_figure_cache_stats
+from src.utils.fact_engine import FactEngine, format_fact_engine_stats
+from src.utils.local_replica import LocalReplica, LOCAL_REPLICA_ENABLED, format_local_replica_stats
+from src.utils.readonly_frame import freeze_frame, frame_fingerprint
+from src.utils.single_flight import SingleFlight, format_single_flight_stats
+from src.utils.swr import (SwrStore, Revalidator, FRESH, STALE, track_stale_reads, record_stale_read,
+                           stale_reads_allowed, format_swr_stats)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 
+def _get_supabase_credentials():
+    """Mengambil SUPABASE_URL dan SUPABASE_KEY dari st.secrets atau variabel lingkungan."""
+    # Coba ambil dari st.secrets dengan format flat (direkomendasikan di Streamlit Cloud)
+    supabase_url = st.secrets.get("SUPABASE_URL")
+    supabase_key = st.secrets.get("SUPABASE_KEY")
+
+    # Jika format flat tidak ada, coba format nested (opsional, jika Anda punya)
+    if not supabase_url or not supabase_key:
+        try:
+            supabase_url = st.secrets["supabase"]["url"]
+            supabase_key = st.secrets["supabase"]["key"]
+        except KeyError:
+            pass # Biarkan none jika nested juga tidak ada
+
+    # Fallback untuk development local menggunakan .env (jika file .env ada dan dotenv terinstal)
+    # Di Streamlit Cloud, blok ini tidak akan tereksekusi jika secrets sudah benar.
+    if not supabase_url or not supabase_key:
+        try:
+            from dotenv import load_dotenv
+            load_dotenv() # Memuat variabel dari .env
+            supabase_url = os.environ.get("SUPABASE_URL")
+            supabase_key = os.environ.get("SUPABASE_KEY")
+        except ImportError:
+            # Jika dotenv tidak diinstal, maka os.environ.get() akan tetap mengembalikan None
+            pass 
+        
+    if not supabase_url or not supabase_key:
+        st.error("SUPABASE_URL atau SUPABASE_KEY tidak ditemukan dalam konfigurasi Streamlit Secrets atau variabel lingkungan.")
+        st.stop() # Hentikan aplikasi jika secrets tidak ditemukan
+
+    return supabase_url, supabase_key
+
 @st.cache_resource
 def init_supabase_connection() -> Client:
     """Initializes a connection to the Supabase client."""
     try:
-        # Coba ambil dari st.secrets dengan format flat (direkomendasikan di Streamlit Cloud)
-        supabase_url = st.secrets.get("SUPABASE_URL")
-        supabase_key = st.secrets.get("SUPABASE_KEY")
-
-        # Jika format flat tidak ada, coba format nested (opsional, jika Anda punya)
-        if not supabase_url or not supabase_key:
-            try:
-                supabase_url = st.secrets["supabase"]["url"]
-                supabase_key = st.secrets["supabase"]["key"]
-            except KeyError:
-                pass # Biarkan none jika nested juga tidak ada
-
-        # Fallback untuk development local menggunakan .env (jika file .env ada dan dotenv terinstal)
-        # Di Streamlit Cloud, blok ini tidak akan tereksekusi jika secrets sudah benar.
-        if not supabase_url or not supabase_key:
-            try:
-                from dotenv import load_dotenv
-                load_dotenv() # Memuat variabel dari .env
-                supabase_url = os.environ.get("SUPABASE_URL")
-                supabase_key = os.environ.get("SUPABASE_KEY")
-            except ImportError:
-                # Jika dotenv tidak diinstal, maka os.environ.get() akan tetap mengembalikan None
-                pass 
-            
-        if not supabase_url or not supabase_key:
-            st.error("SUPABASE_URL atau SUPABASE_KEY tidak ditemukan dalam konfigurasi Streamlit Secrets atau variabel lingkungan.")
-            st.stop() # Hentikan aplikasi jika secrets tidak ditemukan
-            
+        supabase_url, supabase_key = _get_supabase_credentials()
         return create_client(supabase_url, supabase_key)
     except Exception as e:
         st.error(f"Gagal terhubung ke Supabase: {e}. Pastikan URL dan KEY Supabase Anda benar.")
         st.stop() # Hentikan aplikasi jika ada error koneksi
 
-@st.cache_data(ttl=3600)
-def run_query(table_name: str) -> pd.DataFrame:
-    """Runs a SELECT * query on the specified Supabase table and returns a DataFrame."""
-    logging.info(f"Running SELECT * on table: {table_name}")
-    supabase = init_supabase_connection() # Memanggil fungsi cache untuk mendapatkan klien
+@st.cache_resource(show_spinner=False)
+def init_postgrest_transport() -> PostgrestTransport:
+    """
+    Initializes the shared HTTP/2 PostgREST transport used for dashboard reads.
+    Auth tetap memakai klien Supabase dari init_supabase_connection.
+    """
+    supabase_url, supabase_key = _get_supabase_credentials()
+    return PostgrestTransport(supabase_url, supabase_key)
+
+@st.cache_resource(show_spinner=False)
+def init_cancel_transport():
+    """
+    Transport ber-key service_role khusus untuk RPC cancel_dashboard_queries, yang tidak
+    di-GRANT ke anon/authenticated. None jika SUPABASE_SERVICE_ROLE_KEY tidak dikonfigurasi;
+    query rerun lama lalu tidak dibatalkan dan hanya dibatasi statement_timeout.
+    """
+    service_role_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not service_role_key:
+        try:
+            service_role_key = st.secrets.get("SUPABASE_SERVICE_ROLE_KEY")
+        except FileNotFoundError:
+            pass # Tidak ada secrets.toml
+    if not service_role_key:
+        logging.info("SUPABASE_SERVICE_ROLE_KEY not set; superseded queries will not be cancelled")
+        return None
+    supabase_url, _ = _get_supabase_credentials()
+    return PostgrestTransport(supabase_url, service_role_key)
+
+CIRCUIT_PROBE_SQL = "SELECT 1 AS ok"
+
+class _QueryFailed(Exception):
+    """Query gagal. Dilempar dari fungsi ber-cache supaya kegagalan tidak ikut di-cache."""
+
+@st.cache_resource(show_spinner=False)
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Circuit breaker bersama untuk semua query dashboard (lihat src/utils/circuit_breaker.py).
+    Setelah backend pulih, cache halaman dibersihkan (clear_data_caches) karena selama
+    gangguan cache itu bisa terisi hasil stale/kosong.
+    """
+    transport = init_postgrest_transport()
+    return CircuitBreaker(probe=lambda: transport.rpc('exec_sql', {'query': CIRCUIT_PROBE_SQL}),
+                          on_close=clear_data_caches)
+
+@st.cache_resource(show_spinner=False)
+def get_cache_budget() -> CacheBudget:
+    """
+    Anggaran byte bersama untuk semua cache hasil di memori (fungsi versioned_cache_data,
+    cache entri batch, LastKnownGood); lihat src/utils/cache_budget.py.
+    """
+    return CacheBudget()
+
+@st.cache_resource(show_spinner=False)
+def _get_last_known_good() -> LastKnownGood:
+    return LastKnownGood(budget=get_cache_budget())
+
+def _send(send, *args, **kwargs):
+    """Mengirim query lewat circuit breaker dan query guard."""
+    return get_circuit_breaker().call(get_query_guard().call, send, *args, **kwargs)
+
+def _admit(heavy: bool, query: str, send, *args, **kwargs):
+    """_send, lewat admission control jika pemanggil menandai `query` mungkin berat."""
+    if heavy:
+        return get_admission_controller().run(query, _send, send, *args, **kwargs)
+    return _send(send, *args, **kwargs)
+
+@st.cache_resource(show_spinner=False)
+def get_admission_controller() -> AdmissionController:
+    """Admission control untuk query tunggal yang berat (lihat src/utils/admission.py)."""
+    transport = init_postgrest_transport()
+
+    def explain(query):
+        # Ukuran respons EXPLAIN tidak ikut dihitung sebagai payload query yang diukur.
+        with measure_response_bytes():
+            return _send(transport.rpc, 'explain_query_cost', {'query': query})
+
+    return AdmissionController(explain=explain)
+
+DATA_CACHE_MAX_ENTRIES = 256 # per fungsi; entri tidak lagi kedaluwarsa selama versi data sama
+
+# Stale-while-revalidate lapisan query (run_sql, run_query, run_sql_batch, run_rpc_batch):
+# setelah versi data berubah, hasil lama masih disajikan paling lama QUERY_MAX_STALE detik
+# sambil diperbarui di latar (lihat src/utils/swr.py). QUERY_FRESH_FOR (detik, opsional)
+# membatasi umur hasil walaupun versi data tidak berubah.
+QUERY_MAX_STALE = float(os.environ.get("QUERY_MAX_STALE", "600"))
+QUERY_FRESH_FOR = float(os.environ["QUERY_FRESH_FOR"]) if os.environ.get("QUERY_FRESH_FOR") else None
+
+# Penyimpanan fungsi versioned_cache_data tanpa max_stale (nama -> SwrStore), untuk clear_data_caches.
+_version_only_stores = {}
+
+def clear_data_caches():
+    """
+    Mengosongkan cache hasil halaman: st.cache_data dan penyimpanan fungsi versioned_cache_data
+    tanpa max_stale. Penyimpanan SWR (lapisan query, cache batch) sengaja dipertahankan.
+    """
+    st.cache_data.clear()
+    for store in list(_version_only_stores.values()):
+        store.clear()
+
+def _on_data_version_change():
+    # Kunci cache sudah memuat versi, jadi ini hanya membuang entri versi lama dari memori.
+    clear_data_caches()
+
+@st.cache_resource(show_spinner=False)
+def get_data_version_tracker() -> DataVersionTracker:
+    """Versi data bersama untuk proses ini (lihat src/utils/data_version.py)."""
+    transport = init_postgrest_transport()
+
+    def fetch():
+        # Tidak terikat rerun sesi mana pun (tanpa query guard) dan tidak dihitung sebagai payload query.
+        with measure_response_bytes():
+            return get_circuit_breaker().call(transport.rpc, 'get_data_version')
+
+    return DataVersionTracker(fetch, on_change=_on_data_version_change)
+
+def get_data_version():
+    """Versi data saat ini untuk kunci cache."""
+    return get_data_version_tracker().current()
+
+@st.cache_resource(show_spinner=False)
+def get_revalidator() -> Revalidator:
+    """Pembaruan latar bersama untuk entri usang (lihat src/utils/swr.py)."""
+    return Revalidator()
+
+@st.cache_resource(show_spinner=False)
+def get_single_flight() -> SingleFlight:
+    """
+    Penggabungan query identik yang berjalan bersamaan, lintas sesi dan thread
+    (lihat src/utils/single_flight.py). Kunci selalu memuat versi data.
+    """
+    return SingleFlight()
+
+@st.cache_resource(show_spinner=False)
+def get_disk_cache():
+    """Cache Parquet di disk di belakang penyimpanan SWR (lihat src/utils/disk_cache.py); None jika nonaktif."""
+    return ParquetDiskCache() if DISK_CACHE_ENABLED else None
+
+@st.cache_resource(show_spinner=False)
+def get_local_replica():
+    """
+    Replika DuckDB lokal untuk SQL_BACKEND=duckdb (lihat src/utils/local_replica.py); None jika nonaktif.
+    Snapshot diambil sekali per versi data lewat exec_sql.
+    """
+    if not LOCAL_REPLICA_ENABLED:
+        return None
+    transport = init_postgrest_transport()
+
+    def fetch(query):
+        # Dibagi semua sesi: tidak terikat rerun sesi mana pun (tanpa query guard dan admission
+        # control) dan tidak dihitung sebagai payload query yang memicunya.
+        with measure_response_bytes():
+            return pd.DataFrame(get_circuit_breaker().call(transport.rpc, 'exec_sql', {'query': query}))
+
+    return LocalReplica(get_data_version, fetch)
+
+@st.cache_resource(show_spinner=False)
+def _get_function_store(name: str, max_entries: int, persist: bool) -> SwrStore:
+    # Per fungsi, dan bertahan saat modul halaman di-reload di setiap rerun.
+    return SwrStore(max_entries, disk=get_disk_cache() if persist else None, disk_prefix=f"{name}:",
+                    budget=get_cache_budget(), name=name)
+
+def _stable_arg(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # repr DataFrame terpotong, jadi dua frame berbeda bisa punya repr yang sama.
+        return f"<{type(value).__name__} {value.shape} {frame_fingerprint(value)}>"
+    if type(value) in (list, tuple):
+        return type(value)(_stable_arg(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _stable_arg(item) for key, item in value.items()}
+    return value
+
+def _cache_key(args: tuple, kwargs: dict) -> str:
+    """Kunci cache dari argumen fungsi: repr, dengan DataFrame/Series diwakili sidik jari isinya."""
+    return repr((_stable_arg(args), sorted((name, _stable_arg(value)) for name, value in kwargs.items())))
+
+def versioned_cache_data(func=None, *, fresh_for: float = None, max_stale: float = 0, persist: bool = False,
+                         readonly: bool = False, max_entries: int = DATA_CACHE_MAX_ENTRIES):
+    """
+    Seperti st.cache_data, tetapi versi data (get_data_version) ikut menjadi kunci cache,
+    sehingga hasil berlaku sampai data berubah alih-alih sampai TTL habis.
+
+    Hasil disimpan di penyimpanan per fungsi (SwrStore) yang ikut anggaran byte bersama
+    get_cache_budget(): saat memori cache penuh, entri dingin dikompres lalu entri yang paling
+    murah dihitung ulang per byte dibuang. Kunci cache adalah repr argumen (DataFrame/Series
+    diwakili sidik jari isinya), jadi argumen lain harus punya repr yang stabil.
+
+    Args:
+        fresh_for (float): Umur maksimum hasil (detik) walaupun versi data tidak berubah.
+        max_stale (float): Jika > 0, stale-while-revalidate: hasil usang (versi lama atau
+            melewati fresh_for) masih dikembalikan paling lama `max_stale` detik sambil
+            diperbarui di latar.
+        persist (bool): Mode stale-while-revalidate saja: hasil DataFrame juga disimpan di cache
+            disk (get_disk_cache), sehingga tetap ada setelah proses restart.
+        readonly (bool): Hasil DataFrame disimpan sekali per proses sebagai frame hanya-baca
+            (src/utils/readonly_frame.py) dan setiap pemanggil menerima objek yang sama tanpa
+            salinan, alih-alih salinan baru di setiap cache hit. Untuk frame besar yang hanya
+            dibaca; menambah kolom harus lewat df.copy(deep=False).
+        max_entries (int): Jumlah entri maksimum fungsi ini (LRU), di samping anggaran byte.
+
+    Hasil yang dihitung dari nilai usang atau hasil pengganti (query gagal/ditolak) di lapisan
+    bawah dikembalikan tetapi tidak di-cache.
+
+    Sidik jari isi argumen DataFrame dihitung ulang di setiap pemanggilan (O(ukuran frame)),
+    kecuali untuk frame hanya-baca yang menyimpannya. Untuk fungsi yang argumennya frame turunan,
+    pakai fn.by_key(fingerprint, load): kunci cache hanya `fingerprint` (nilai murah yang
+    menentukan isi argumen, mis. filter kanonik dan frame_fingerprint frame sumber hanya-baca;
+    versi data ditambahkan otomatis), dan load() -> tuple argumen baru dipanggil saat cache miss.
+
+    Contoh:
+        @versioned_cache_data
+        def get_faculty_data(selected_fakultas): ...
+
+        @versioned_cache_data(max_stale=600, persist=True)
+        def _run_sql_cached(sql_query): ...
+
+        @versioned_cache_data(readonly=True)
+        def get_all_student_periodic_emissions(): ...
+
+        pdf = generate_overview_pdf_report.by_key(
+            overview_report_key(periodic_df, daily_df, ...), lambda: build_overview_view(...))
+    """
+    def decorate(func):
+        return _store_cache_data(func, fresh_for, max_stale, max_entries, persist, readonly)
+
+    return decorate(func) if func is not None else decorate
+
+def _store_cache_data(func, fresh_for, max_stale, max_entries, persist, readonly):
+    """Implementasi versioned_cache_data (stale-while-revalidate: lihat src/utils/swr.py)."""
+    name = f"{func.__module__}.{func.__qualname__}"
+    # Seperti st.cache_data: pemanggil menerima salinan, bukan objek yang disimpan. Frame hanya-baca
+    # dibagikan apa adanya karena tidak bisa diubah.
+    share = (lambda value: value) if readonly else copy.deepcopy
+
+    def compute(store, key, version, call):
+        def execute():
+            started = time.perf_counter()
+            with track_stale_reads() as stale_reads:
+                result = call()
+            if readonly and isinstance(result, pd.DataFrame):
+                result = freeze_frame(result)
+            if not stale_reads:
+                store.set(key, version, result, cost=time.perf_counter() - started)
+            return result, bool(stale_reads)
+
+        # Pemanggil bersamaan dengan kunci yang sama menunggu satu eksekusi. Pembatalan query
+        # leader (sesinya rerun) tidak berlaku untuk follower: follower mencoba lagi sendiri.
+        result, stale = get_single_flight().do((name, key, version), execute, retry_on=(QueryCancelled,))
+        if stale:
+            record_stale_read(name)
+        return result
+
+    def cached(key, call):
+        store = _get_function_store(name, max_entries, persist)
+        if max_stale == 0:
+            _version_only_stores[name] = store
+        version = get_data_version()
+        value, state = store.lookup(key, version, fresh_for, max_stale)
+        if state == FRESH:
+            return share(value)
+        if state == STALE and stale_reads_allowed():
+            return share(get_revalidator().serve_stale(
+                (name, key), value, lambda: compute(store, key, version, call)))
+        return share(compute(store, key, version, call))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return cached(_cache_key(args, kwargs), lambda: func(*args, **kwargs))
+
+    def by_key(fingerprint, load):
+        """Hasil untuk argumen load() dengan kunci cache `fingerprint` saja; load() hanya dipanggil saat miss."""
+        return cached(repr(("by_key", fingerprint)), lambda: func(*load()))
+
+    wrapper.by_key = by_key
+    wrapper.clear = lambda: _get_function_store(name, max_entries, persist).clear()
+    return wrapper
+
+def _session_id():
+    """Id sesi Streamlit pemanggil; worker PanelLoader membawa ScriptRunContext sesinya. None di thread latar."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+def _serve_fallback(key: str, error: Exception, message: str) -> pd.DataFrame:
+    """Hasil terakhir yang berhasil untuk `key` (ditandai stale), atau DataFrame kosong dan st.error."""
+    # Hasil pengganti tidak boleh ikut di-cache fungsi versioned_cache_data di atasnya.
+    record_stale_read(key)
+    stale = _get_last_known_good().get_stale(key)
+    if stale is not None:
+        get_circuit_breaker().record_stale_served(_session_id())
+        logging.warning(f"Serving last known good result for {' '.join(key.split())[:100]}: {error}")
+        return stale
+    st.error(message)
+    return pd.DataFrame()
+
+def stale_results_served_since(timestamp: float) -> bool:
+    """True jika sesi ini mendapat hasil stale sejak `timestamp` (epoch detik); sesi lain tidak dihitung."""
+    session_id = _session_id()
+    return session_id is not None and get_circuit_breaker().stale_served_since(session_id, timestamp)
+
+def begin_query_rerun():
+    """
+    Dipanggil di awal setiap rerun script: query milik rerun sebelumnya dari sesi ini
+    yang masih berjalan dibatalkan di server (lihat src/utils/query_guard.py).
+    """
+    get_query_guard().begin_rerun(init_cancel_transport())
+
+def run_query(table_name: str, columns: tuple = None, heavy: bool = False) -> pd.DataFrame:
+    """
+    Runs a SELECT on the specified Supabase table and returns a DataFrame.
+    Only `columns` are fetched; by default the columns registered for the table
+    in column_registry.TABLE_COLUMNS.
+    heavy=True menandai query yang mungkin berat (lihat run_sql).
+    """
+    columns = tuple(columns or get_table_columns(table_name))
+    with track_query('select', f"SELECT {', '.join(columns)} FROM {table_name}") as call:
+        try:
+            df = _run_query_cached(table_name, columns, heavy)
+        except QueryRejected as e:
+            st.warning(str(e))
+            record_stale_read(table_name) # hasil kosong pengganti tidak di-cache di lapisan atas
+            df = pd.DataFrame()
+        except (_QueryFailed, CircuitOpenError) as e:
+            df = _serve_fallback(f"select:{table_name}:{','.join(columns)}", e,
+                                 f"Error saat mengambil data dari tabel '{table_name}': {e}")
+        call['rows'] = len(df)
+    return df
+
+@versioned_cache_data(fresh_for=QUERY_FRESH_FOR, max_stale=QUERY_MAX_STALE, persist=True)
+def _run_query_cached(table_name: str, columns: tuple, heavy: bool = False) -> pd.DataFrame:
+    logging.info(f"Running SELECT {', '.join(columns)} on table: {table_name}")
+    replica = get_local_replica()
+    df = replica.query(f"SELECT {', '.join(columns)} FROM {table_name}") if replica is not None else None
+    if df is not None:
+        return df
+    transport = init_postgrest_transport() # Memanggil fungsi cache untuk mendapatkan transport
     try:
-        response = supabase.table(table_name).select("*").execute()
-        return pd.DataFrame(response.data)
+        df = pd.DataFrame(_admit(heavy, f"SELECT {', '.join(columns)} FROM {table_name}",
+                                 transport.select, table_name, ",".join(columns)),
+                          columns=list(columns))
+    except (QueryCancelled, CircuitOpenError, QueryRejected):
+        raise # Jangan di-cache: hasil rerun lama memang sudah tidak dipakai / backend sedang tidak tersedia
     except Exception as e:
-        st.error(f"Error saat mengambil data dari tabel '{table_name}': {e}")
-        return pd.DataFrame()
+        logging.error(f"SELECT on table '{table_name}' failed: {e}")
+        raise _QueryFailed(str(e)) from e
+    _get_last_known_good().set(f"select:{table_name}:{','.join(columns)}", df)
+    return df
 
-@st.cache_data(ttl=3600)
-def run_sql(sql_query: str) -> pd.DataFrame:
+def run_sql(sql_query: str, heavy: bool = False) -> pd.DataFrame:
     """
     Runs a raw SQL query using Supabase's PostgREST RPC function.
     NOTE: Requires a `public.exec_sql` function in your Supabase DB.
     
     Args:
         sql_query (str): The raw SQL query to execute.
+        heavy (bool): Query mungkin berat (ekspor, data per mahasiswa): biayanya diperkirakan dan
+            query berat antre di admission control. Query panel tidak ditandai dan langsung dikirim.
 
     Returns:
         pd.DataFrame: A pandas DataFrame containing the query results.
     """
+    with track_query('sql', sql_query) as call:
+        try:
+            df = _run_sql_cached(sql_query, heavy)
+        except QueryRejected as e:
+            st.warning(str(e)) # Tidak di-cache: permintaan berikutnya dicoba lagi
+            record_stale_read(sql_query)
+            df = pd.DataFrame()
+        except (_QueryFailed, CircuitOpenError) as e:
+            df = _serve_fallback(f"sql:{sql_query}", e, f"Gagal menjalankan query SQL: {e}. Periksa koneksi internet Anda.")
+        call['rows'] = len(df)
+    return df
+
+@versioned_cache_data(fresh_for=QUERY_FRESH_FOR, max_stale=QUERY_MAX_STALE, persist=True)
+def _run_sql_cached(sql_query: str, heavy: bool = False) -> pd.DataFrame:
     logging.info(f"Executing raw SQL query: {sql_query[:150]}...") # Log 150 char pertama
-    supabase = init_supabase_connection() # Memanggil fungsi cache untuk mendapatkan klien
+    replica = get_local_replica()
+    df = replica.query(sql_query) if replica is not None else None
+    if df is not None:
+        return df # Replika lokal; None jika replika tidak bisa menjawab query ini
+    transport = init_postgrest_transport() # Memanggil fungsi cache untuk mendapatkan transport
     try:
         # Panggil Remote Procedure Call (RPC) 'exec_sql'
-        response = supabase.rpc('exec_sql', {'query': sql_query}).execute()
-        return pd.DataFrame(response.data)
+        df = pd.DataFrame(_admit(heavy, sql_query, transport.rpc, 'exec_sql', {'query': sql_query}))
+    except (QueryCancelled, CircuitOpenError, QueryRejected):
+        raise # Jangan di-cache: hasil rerun lama memang sudah tidak dipakai / backend sedang tidak tersedia
     except Exception as e:
-        st.error(f"Gagal menjalankan query SQL: {e}. Periksa koneksi internet Anda.")
         logging.error(f"SQL Query failed: {sql_query}\nError: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        raise _QueryFailed(str(e)) from e # Kegagalan tidak di-cache; run_sql menyajikan hasil terakhir jika ada
+    _get_last_known_good().set(f"sql:{sql_query}", df)
+    return df
+
+# Mode query panel halaman: 'rpc' memanggil fungsi bertipe per panel
+# (supabase/migrations/*_dashboard_panel_functions_v1.sql), 'sql' mengirim teks SQL ke exec_sql,
+# 'fused' mengirim satu query GROUPING SETS per halaman (tiap tabel dasar dibaca sekali),
+# 'local' menghitung panel di proses dari fact table yang dimuat sekali per versi data
+# (src/utils/fact_engine.py). Di mode 'rpc'/'local', panel yang gagal otomatis memakai SQL.
+# Dengan SQL_BACKEND=duckdb, SQL dijalankan di replika lokal dan mode 'rpc' langsung memakai SQL.
+# Default 'sql' karena mode 'rpc' memerlukan migrasi fungsi panel di database.
+PANEL_QUERY_MODE = os.environ.get("PANEL_QUERY_MODE", "sql")
+RPC_FUNCTION_NOT_FOUND = "PGRST202" # PostgREST: fungsi tidak ada di schema cache (migrasi belum dijalankan)
+
+# Fungsi RPC yang tidak ditemukan di database. Diingat per proses supaya mode 'rpc' tanpa migrasi
+# tidak mengirim ulang panggilan yang pasti gagal di setiap load; panel itu langsung memakai SQL.
+_missing_rpc_functions = set()
+
+# Cache hasil per-entry untuk run_sql_batch dan run_rpc_batch. Disimpan di level proses (dibagi antar sesi)
+# supaya query yang sama dari batch berbeda (mis. panel vs laporan PDF) tidak diulang.
+BATCH_MAX_ENTRIES_PER_CALL = 50 # json_build_object dibatasi 100 argumen (50 pasangan nama/nilai)
+
+BATCH_CACHE_MAX_ENTRIES = 2048 # entri versi lama tetap disimpan untuk stale-while-revalidate
+
+@st.cache_resource(show_spinner=False)
+def _get_batch_entry_cache() -> SwrStore:
+    return SwrStore(BATCH_CACHE_MAX_ENTRIES, disk=get_disk_cache(), disk_prefix="batch:",
+                    budget=get_cache_budget(), name="batch")
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache() -> FigureCache:
+    """JSON figure Plotly per panel dan sidik jari datanya (lihat src/utils/figure_cache.py)."""
+    return FigureCache(SwrStore(FIGURE_CACHE_MAX_ENTRIES, budget=get_cache_budget(), name="figures"))
+
+@st.cache_resource(show_spinner=False)
+def get_fact_engine() -> FactEngine:
+    """Fact table halaman untuk PANEL_QUERY_MODE=local, dimuat ulang saat versi data berubah."""
+    return FactEngine(get_data_version)
+
+PARTIAL_CACHE_MAX_ENTRIES = 4096 # agregat per panel, biasanya beberapa puluh baris
+
+@st.cache_resource(show_spinner=False)
+def get_partial_aggregate_cache() -> PartialAggregateCache:
+    """
+    Partial panel per nilai filter untuk menyusun pilihan multi-select tanpa query
+    (lihat src/utils/partial_aggregates.py). Entri versi data lama tidak dipakai.
+    """
+    store = SwrStore(PARTIAL_CACHE_MAX_ENTRIES, budget=get_cache_budget(), name="partials")
+    return PartialAggregateCache(store, get_data_version)
+
+def _lookup_batch_entry(cache_key: str, version, refresh):
+    """
+    DataFrame entri batch dari cache, atau None jika harus diambil. Entri usang disajikan
+    sementara `refresh()` mengambil nilai barunya di latar.
+    """
+    df, state = _get_batch_entry_cache().lookup(cache_key, version, QUERY_FRESH_FOR, QUERY_MAX_STALE)
+    if state == FRESH:
+        return df.copy()
+    if state == STALE and stale_reads_allowed():
+        return get_revalidator().serve_stale(cache_key, df, refresh).copy()
+    return None
+
+def _refresh_sql_entry(sql_query: str, version):
+    def fetch():
+        started = time.perf_counter()
+        df = pd.DataFrame(_send(init_postgrest_transport().rpc, 'exec_sql', {'query': sql_query}))
+        _get_batch_entry_cache().set(sql_query, version, df, cost=time.perf_counter() - started)
+        _get_last_known_good().set(f"sql:{sql_query}", df)
+        return df
+    get_single_flight().do((sql_query, version), fetch)
+
+def _refresh_rpc_entry(cache_key: str, fn: str, params: dict, version):
+    def fetch():
+        started = time.perf_counter()
+        df = pd.DataFrame(_send(init_postgrest_transport().rpc, fn, params) or [])
+        _get_batch_entry_cache().set(cache_key, version, df, cost=time.perf_counter() - started)
+        _get_last_known_good().set(cache_key, df)
+        return df
+    get_single_flight().do((cache_key, version), fetch)
+
+def _claim_batch_entries(entries: dict, version):
+    """
+    Membagi entri batch yang belum ada di cache menjadi yang dikirim sendiri (leader) dan yang
+    menunggu eksekusi identik milik pemanggil lain. `entries`: nama -> kunci cache.
+    Mengembalikan (led, waiting), masing-masing nama -> call single-flight.
+    """
+    flight = get_single_flight()
+    led, waiting = {}, {}
+    for name, cache_key in entries.items():
+        call, leader = flight.begin((cache_key, version))
+        (led if leader else waiting)[name] = call
+    return led, waiting
+
+def _wait_batch_entry(kind: str, query: str, name: str, call):
+    """Hasil entri yang dieksekusi pemanggil lain, atau None jika eksekusi itu gagal."""
+    waited_at = time.perf_counter()
+    try:
+        df = get_single_flight().wait(call)
+    except Exception:
+        return None # Pemanggil mengambilnya sendiri lewat jalur biasa (dengan fallback-nya)
+    # Dicatat sebagai cache hit: tidak ada respons yang diterima oleh pemanggil ini.
+    record_batch_entry(kind, query, (time.perf_counter() - waited_at) * 1000, len(df), 0,
+                       cache_hit=True, panel=name)
+    return df.copy()
+
+def _json_size(data) -> int:
+    """Perkiraan ukuran payload JSON satu entri batch (respons batch tidak bisa dipecah per entri)."""
+    return len(json.dumps(data, separators=(',', ':'), default=str)) if data else 0
+
+def _build_batch_sql(queries: dict) -> str:
+    """Menggabungkan beberapa query menjadi satu SELECT yang mengembalikan satu objek JSON."""
+    parts = []
+    for name, sql_query in queries.items():
+        body = sql_query.strip().rstrip(';')
+        parts.append(f"'{name}', (SELECT COALESCE(json_agg(b), '[]'::json) FROM ({body}) b)")
+    return f"SELECT json_build_object({', '.join(parts)}) AS batch"
+
+def _parse_batch_response(data) -> dict:
+    """Mengambil objek hasil batch dari respons exec_sql."""
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    if isinstance(data, dict) and 'batch' in data:
+        data = data['batch']
+    return data or {}
+
+def run_sql_batch(queries: dict) -> dict:
+    """
+    Runs several named SQL queries in a single `exec_sql` RPC call.
+    Each entry is cached individually, so only queries that are not cached yet
+    are sent to the database.
+
+    Args:
+        queries (dict): Mapping of name -> raw SQL query.
+
+    Returns:
+        dict: Mapping of name -> pd.DataFrame, in the same order as `queries`.
+    """
+    if LOCAL_REPLICA_ENABLED:
+        # Tanpa jaringan tidak ada yang dihemat dengan menggabungkan query; tiap query di-cache di run_sql.
+        return {name: run_sql(sql_query) for name, sql_query in queries.items()}
+    cache = _get_batch_entry_cache()
+    version = get_data_version()
+    results = {}
+    missing = {}
+    for name, sql_query in queries.items():
+        looked_up_at = time.perf_counter()
+        cached_df = _lookup_batch_entry(sql_query, version,
+                                        functools.partial(_refresh_sql_entry, sql_query, version))
+        if cached_df is not None:
+            results[name] = cached_df
+            record_batch_entry('sql_batch', sql_query, (time.perf_counter() - looked_up_at) * 1000,
+                               len(cached_df), 0, cache_hit=True, panel=name)
+        else:
+            missing[name] = sql_query
+
+    # Entri yang sedang diambil pemanggil lain (sesi/thread lain) tidak dikirim ulang; ditunggu di akhir.
+    flight = get_single_flight()
+    led, waiting = _claim_batch_entries(missing, version)
+    try:
+        names = list(led.keys())
+        for start in range(0, len(names), BATCH_MAX_ENTRIES_PER_CALL):
+            chunk = {name: missing[name] for name in names[start:start + BATCH_MAX_ENTRIES_PER_CALL]}
+            logging.info(f"Executing SQL batch ({len(chunk)} query): {', '.join(chunk.keys())}")
+            transport = init_postgrest_transport()
+            try:
+                sent_at = time.perf_counter()
+                batch_data = _parse_batch_response(_send(transport.rpc, 'exec_sql', {'query': _build_batch_sql(chunk)}))
+                latency_ms = (time.perf_counter() - sent_at) * 1000
+                for name, sql_query in chunk.items():
+                    rows = batch_data.get(name) or []
+                    df = pd.DataFrame(rows)
+                    cache.set(sql_query, version, df, cost=latency_ms / 1000 / len(chunk))
+                    _get_last_known_good().set(f"sql:{sql_query}", df)
+                    flight.finish((sql_query, version), led.pop(name), result=df)
+                    results[name] = df.copy()
+                    # Semua entri berbagi satu request: latensi = latensi request, ukuran = perkiraan JSON entri.
+                    record_batch_entry('sql_batch', sql_query, latency_ms, len(df), _json_size(rows),
+                                       cache_hit=False, panel=name)
+            except QueryCancelled:
+                raise
+            except Exception as e:
+                for name, sql_query in chunk.items():
+                    if name in led:
+                        flight.finish((sql_query, version), led.pop(name), error=e)
+                if isinstance(e, CircuitOpenError) or is_backend_failure(e):
+                    # Backend tidak tersedia: mengirim ulang satu per satu hanya menumpuk timeout.
+                    logging.error(f"SQL batch failed, serving last known good results: {e}")
+                    for name, sql_query in chunk.items():
+                        results[name] = _serve_fallback(f"sql:{sql_query}", e,
+                                                        f"Gagal menjalankan query SQL: {e}. Periksa koneksi internet Anda.")
+                    continue
+                # Satu query yang gagal menggagalkan seluruh batch; jalankan ulang satu per satu
+                # agar panel lain tetap tampil dan error hanya muncul untuk query yang bermasalah.
+                logging.error(f"SQL batch failed, falling back to single queries: {e}")
+                for name, sql_query in chunk.items():
+                    results[name] = run_sql(sql_query)
+    finally:
+        # Batch berhenti di tengah (mis. dibatalkan): follower mengambil entrinya sendiri.
+        for name, call in led.items():
+            flight.finish((missing[name], version), call, error=_QueryFailed("batch leader stopped"))
+
+    for name, call in waiting.items():
+        df = _wait_batch_entry('sql_batch', missing[name], name, call)
+        results[name] = df if df is not None else run_sql(missing[name])
+
+    return {name: results[name] for name in queries}
+
+def run_rpc_batch(calls: dict) -> dict:
+    """
+    Calls several typed Postgres functions concurrently over the shared HTTP/2 transport.
+    Each entry is cached individually (same cache as run_sql_batch).
+
+    Args:
+        calls (dict): Mapping of name -> (function_name, params).
+
+    Returns:
+        dict: Mapping of name -> pd.DataFrame, in the same order as `calls`.
+              Entries whose call failed are None, so the caller can fall back to SQL.
+    """
+    if LOCAL_REPLICA_ENABLED:
+        # Fungsi panel hanya ada di Postgres; halaman memakai SQL-nya, yang dijalankan di replika lokal.
+        return {name: None for name in calls}
+    cache = _get_batch_entry_cache()
+    version = get_data_version()
+    results = {}
+    missing = {}
+    for name, (fn, params) in calls.items():
+        if fn in _missing_rpc_functions:
+            results[name] = None
+            continue
+        looked_up_at = time.perf_counter()
+        cache_key = f"rpc:{fn}:{json.dumps(params, sort_keys=True)}"
+        cached_df = _lookup_batch_entry(cache_key, version,
+                                        functools.partial(_refresh_rpc_entry, cache_key, fn, params, version))
+        if cached_df is not None:
+            results[name] = cached_df
+            record_batch_entry('rpc', f"rpc:{fn}", (time.perf_counter() - looked_up_at) * 1000,
+                               len(cached_df), 0, cache_hit=True, panel=name)
+        else:
+            missing[name] = (cache_key, fn, params)
+
+    flight = get_single_flight()
+    led, waiting = _claim_batch_entries({name: cache_key for name, (cache_key, _, _) in missing.items()}, version)
+    try:
+        if led:
+            logging.info(f"Executing RPC batch ({len(led)} call): {', '.join(missing[name][1] for name in led)}")
+            transport = init_postgrest_transport()
+            sent_at = time.perf_counter()
+            try:
+                responses = _send(transport.gather_rpc, [missing[name][1:] for name in led],
+                                  return_exceptions=True)
+            except CircuitOpenError as e:
+                responses = [e] * len(led)
+            latency_ms = (time.perf_counter() - sent_at) * 1000
+            last_known_good = _get_last_known_good()
+            for name, data in zip(list(led), responses):
+                cache_key, fn, params = missing[name]
+                if isinstance(data, Exception):
+                    flight.finish((cache_key, version), led.pop(name), error=data)
+                    if getattr(data, 'code', None) == RPC_FUNCTION_NOT_FOUND:
+                        if fn not in _missing_rpc_functions:
+                            _missing_rpc_functions.add(fn)
+                            logging.warning(f"RPC '{fn}' not found (migration not applied?); using SQL for it from now on")
+                        results[name] = None
+                        continue
+                    stale = None
+                    if isinstance(data, CircuitOpenError) or is_backend_failure(data):
+                        stale = last_known_good.get_stale(cache_key)
+                    if stale is not None:
+                        get_circuit_breaker().record_stale_served(_session_id())
+                        record_stale_read(cache_key)
+                        results[name] = stale
+                    else:
+                        logging.error(f"RPC '{fn}' failed: {data}")
+                        results[name] = None
+                    continue
+                df = pd.DataFrame(data or [])
+                cache.set(cache_key, version, df, cost=latency_ms / 1000)
+                last_known_good.set(cache_key, df)
+                flight.finish((cache_key, version), led.pop(name), result=df)
+                results[name] = df.copy()
+                record_batch_entry('rpc', f"rpc:{fn}", latency_ms, len(df), _json_size(data),
+                                   cache_hit=False, panel=name, detail=f"rpc:{fn} {json.dumps(params)}")
+    finally:
+        for name, call in led.items():
+            flight.finish((missing[name][0], version), call, error=_QueryFailed("batch leader stopped"))
+
+    # Entri yang gagal di eksekusi pemanggil lain menjadi None, jadi halaman memakai SQL untuknya.
+    for name, call in waiting.items():
+        results[name] = _wait_batch_entry('rpc', f"rpc:{missing[name][1]}", name, call)
+
+    return {name: results[name] for name in calls}
+
+STATS_LOG_INTERVAL = float(os.environ.get("STATS_LOG_INTERVAL", "300")) # detik antar ringkasan statistik di level INFO
+
+# Nama -> fungsi tanpa argumen yang mengembalikan ringkasan satu baris, dicatat oleh log_stats.
+# Fitur baru menambahkan entrinya di sini (atau lewat register_stats dari modulnya sendiri),
+# bukan baris log baru di main.py.
+STATS = {
+    "Query guard": format_query_guard_stats,
+    "Query metrics": format_query_metrics,
+    "HTTP transport": lambda: format_transport_stats(init_postgrest_transport()),
+    "Circuit breaker": lambda: format_circuit_stats(get_circuit_breaker()),
+    "Admission": lambda: format_admission_stats(get_admission_controller()),
+    "Data version": lambda: format_data_version_stats(get_data_version_tracker()),
+    "Stale-while-revalidate": lambda: format_swr_stats(get_revalidator()),
+    "Disk cache": lambda: format_disk_cache_stats(get_disk_cache()),
+    "Single-flight": lambda: format_single_flight_stats(get_single_flight()),
+    "Cache memory": lambda: format_cache_budget_stats(get_cache_budget()),
+    "Partial aggregates": lambda: format_partial_aggregate_stats(get_partial_aggregate_cache()),
+    "Figure cache": lambda: format_figure_cache_stats(get_figure_cache()),
+    "Fact engine": lambda: format_fact_engine_stats(get_fact_engine()),
+    "Local replica": lambda: format_local_replica_stats(get_local_replica()),
+}
+
+_stats_lock = threading.Lock()
+_stats_logged_at = None
+
+def register_stats(name: str, summary):
+    """Menambahkan `summary()` -> str ke STATS (untuk modul yang tidak diimpor db_connector)."""
+    STATS[name] = summary
+
+def log_stats():
+    """
+    Mencatat semua ringkasan STATS dalam satu entri log. Dipanggil di akhir setiap rerun: level
+    INFO paling sering sekali per STATS_LOG_INTERVAL detik per proses, selain itu DEBUG.
+    """
+    global _stats_logged_at
+    now = time.monotonic()
+    with _stats_lock:
+        due = _stats_logged_at is None or now - _stats_logged_at >= STATS_LOG_INTERVAL
+        if due:
+            _stats_logged_at = now
+    level = logging.INFO if due else logging.DEBUG
+    if not logging.getLogger().isEnabledFor(level):
+        return
+    lines = []
+    for name, summary in list(STATS.items()):
+        try:
+            lines.append(f"{name}: {summary()}")
+        except Exception as e:
+            lines.append(f"{name}: gagal dibaca ({e})")
+    logging.log(level, "STATS:\n  " + "\n  ".join(lines))
+
+def split_grouped_result(df: pd.DataFrame, panel: str, columns: dict, int_columns=()) -> pd.DataFrame:
+    """
+    Takes the rows of one panel out of a fused (GROUPING SETS) result.
+
+    Args:
+        df (pd.DataFrame): Fused result with a `panel` column naming the grouping set of each row.
+        panel (str): Panel to take.
+        columns (dict): Mapping of fused column -> panel column name.
+        int_columns: Panel columns to cast back to int (NULLs from other panels make them float).
+
+    Returns:
+        pd.DataFrame: The panel's rows with its original column names.
+    """
+    if df.empty or 'panel' not in df.columns:
+        return pd.DataFrame(columns=list(columns.values()))
+    part = df.loc[df['panel'] == panel, list(columns)].rename(columns=columns).reset_index(drop=True)
+    for col in int_columns:
+        part[col] = part[col].astype('int64')
+    return part
@@ -0,0 +1,166 @@
+# src/utils/disk_cache.py
+
+"""
+Cache hasil query di disk (Parquet terkompresi) yang bertahan saat proses restart.
+
+Cache Streamlit hanya ada di memori, jadi setiap redeploy, crash, atau sleep/wake di Streamlit
+Cloud dimulai dengan cache kosong dan lonjakan query. Tier ini berada di belakang cache memori
+lapisan query (lihat SwrStore di swr.py): entri yang tidak ada di memori dicari di disk saat
+pertama kali diminta (tidak ada pemuatan di awal), dan setiap hasil baru ikut ditulis ke disk.
+
+File bernama sidik jari (SHA-256) dari teks query lengkap; versi data dan waktu tulis disimpan
+di metadata Parquet. Entri dari versi lama tetap dibaca dan diperlakukan sebagai usang oleh
+SwrStore (disajikan sambil diperbarui). Beberapa proses Streamlit di host yang sama boleh
+memakai direktori yang sama: penulisan atomik (file sementara lalu os.replace), waktu akses
+dicatat di mtime file, dan entri yang paling lama tidak diakses dihapus begitu ukuran total
+melewati DISK_CACHE_MAX_BYTES.
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DISK_CACHE_ENABLED = os.environ.get("DISK_CACHE_ENABLED", "1") == "1" and pq is not None
+DISK_CACHE_DIR = os.environ.get("DISK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "dashboard_query_cache"))
+DISK_CACHE_MAX_BYTES = int(os.environ.get("DISK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DISK_CACHE_COMPRESSION = "zstd"
+DISK_CACHE_EVICT_TO = 0.8 # setelah pembersihan, ukuran total paling banyak 80% dari batas
+
+_METADATA_KEY = b"dashboard_cache"
+
+class ParquetDiskCache:
+    """
+    Direktori berisi satu file Parquet per kunci.
+
+    Contoh:
+        cache = ParquetDiskCache("/tmp/dashboard_query_cache")
+        cache.set("sql:SELECT ...", version, df)
+        version, df, written_at = cache.get("sql:SELECT ...")
+    """
+
+    def __init__(self, directory: str = DISK_CACHE_DIR, max_bytes: int = DISK_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes = None # dihitung saat penulisan pertama, lalu diperkirakan dari penulisan sendiri
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0, "errors": 0}
+
+    @property
+    def approx_bytes(self):
+        """Perkiraan ukuran total direktori (None sebelum penulisan pertama)."""
+        return self._approx_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".parquet")
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, key: str):
+        """(versi, DataFrame, waktu tulis epoch) untuk `key`, atau None jika tidak ada/tidak terbaca."""
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+            meta = json.loads(table.schema.metadata[_METADATA_KEY])
+            if meta["key"] != key:
+                raise ValueError("kunci tidak cocok")
+            df = table.to_pandas()
+            os.utime(path) # waktu akses untuk LRU (atime sering dimatikan di mount)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except Exception as e:
+            # File rusak/terpotong (mis. proses mati saat menulis tanpa os.replace) dibuang saja.
+            logging.warning(f"DISK_CACHE: dropping unreadable entry {os.path.basename(path)}: {e}")
+            self._count("errors")
+            self._remove(path)
+            return None
+        self._count("hits")
+        return meta["version"], df, meta["written_at"]
+
+    def set(self, key: str, version, df):
+        """Menyimpan `df` (hanya DataFrame) untuk `key`; kegagalan hanya dicatat di log."""
+        if not isinstance(df, pd.DataFrame):
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            meta = json.dumps({"key": key, "version": version, "written_at": time.time()})
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: meta})
+            pq.write_table(table, tmp_path, compression=DISK_CACHE_COMPRESSION)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"DISK_CACHE: cannot write entry for {' '.join(key.split())[:100]}: {e}")
+            self._count("errors")
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            self.stats["writes"] += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            over_budget = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Menghapus entri yang paling lama tidak diakses sampai ukuran total di bawah batas."""
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".parquet"):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue # dihapus proses lain
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        if total > self.max_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes * DISK_CACHE_EVICT_TO:
+                    break
+                self._remove(path)
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._approx_bytes = total
+            self.stats["evicted"] += evicted
+        if evicted:
+            logging.info(f"DISK_CACHE: evicted {evicted} least recently used entries, {total / 1024 / 1024:.1f} MB left")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def format_disk_cache_stats(cache) -> str:
+    """Ringkasan cache disk (untuk log)."""
+    if cache is None:
+        return "nonaktif"
+    stats = cache.stats
+    size = f", ~{cache.approx_bytes / 1024 / 1024:.1f} MB" if cache.approx_bytes is not None else ""
+    return (f"{stats['hits']} hit, {stats['misses']} miss, {stats['writes']} ditulis, "
+            f"{stats['evicted']} dibuang, {stats['errors']} error{size}")
@@ -0,0 +1,48 @@
+# src/utils/emission_factors.py
+
+"""
+Faktor emisi perangkat elektronik pribadi, satu sumber untuk semua mode query panel elektronik:
+SQL per panel dan query fused (personal_emission_sql) serta fact engine lokal (personal_emission).
+
+Fungsi RPC bertipe electronic_personal_emission_v1 (supabase/migrations/
+20261019000000_dashboard_panel_functions_v1.sql) menulis angka yang sama dalam SQL;
+tests/test_panel_parity.py memeriksa keduanya tetap sama.
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+GRID_EMISSION_FACTOR = 0.829 # kg CO2 per kWh listrik
+
+# Perangkat -> (kolom durasi pemakaian per hari di tabel elektronik, daya dalam watt)
+PERSONAL_DEVICE_POWER = {
+    'HP': ('durasi_hp', 4),
+    'Laptop': ('durasi_laptop', 50),
+    'Tablet': ('durasi_tab', 10),
+}
+
+def personal_emission_sql(devices, alias: str = "t") -> str:
+    """
+    Ekspresi SQL emisi harian (kg CO2) perangkat pribadi `devices` untuk satu baris elektronik.
+
+    Contoh:
+        personal_emission_sql(['HP', 'Tablet'])
+        -> "((COALESCE(t.durasi_hp, 0)*4 + COALESCE(t.durasi_tab, 0)*10) * 0.829 / 1000)"
+    """
+    prefix = f"{alias}." if alias else ""
+    terms = [f"COALESCE({prefix}{column}, 0)*{power}"
+             for device, (column, power) in PERSONAL_DEVICE_POWER.items() if device in devices]
+    return f"(({' + '.join(terms) if terms else '0'}) * {GRID_EMISSION_FACTOR} / 1000)"
+
+def personal_emission(durations: dict, devices):
+    """
+    Padanan personal_emission_sql untuk array NumPy.
+
+    Args:
+        durations (dict): Perangkat -> durasi per baris (NULL sudah diganti 0).
+        devices: Perangkat yang dihitung.
+    """
+    usage = 0
+    for device, (_, power) in PERSONAL_DEVICE_POWER.items():
+        if device in devices:
+            usage = usage + durations[device] * power
+    return usage * GRID_EMISSION_FACTOR / 1000
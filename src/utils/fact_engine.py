@@ -0,0 +1,349 @@
+# src/utils/fact_engine.py
+
+"""
+Mesin analitik di proses: fact table kolumnar NumPy dengan indeks bitmap per nilai dimensi.
+
+Semua filter dashboard memakai dimensi kecil (7 hari, belasan fakultas, beberapa moda, 5 perangkat,
+4 waktu makan, 11 kantin), tetapi setiap kombinasi filter baru tetap dikirim ke database. Dengan
+PANEL_QUERY_MODE=local, halaman memuat fact table-nya sekali per versi data (satu SELECT tanpa
+filter), lalu setiap kombinasi filter dijawab di proses:
+- filter IN menjadi OR dari bitmap nilai-nilainya (array bool per baris, dibuat saat tabel dimuat),
+  antar-filter AND; filter ILIKE '%nilai%' dibuat sekali per nilai lalu disimpan seperti bitmap lain;
+- agregat GROUP BY dihitung dengan np.bincount atas kode grup (SUM, COUNT, COUNT(*), AVG,
+  COUNT(DISTINCT)), dengan semantik NULL seperti SQL (SUM tanpa nilai = NULL, NULL membentuk grup);
+- kolom daftar seperti hari_datang ('Senin, Rabu') dipecah sekali menjadi tabel per hari
+  (padanan TRIM(unnest(string_to_array(...)))).
+
+FactTable.grouping_sets menghasilkan frame berbentuk sama dengan query GROUPING SETS mode fused
+(kolom `panel`), jadi halaman memakai split_fused_panel_data yang sama untuk memecahnya.
+facet_counts memakai bitmap yang sama untuk jumlah mahasiswa per opsi filter (di semua mode query).
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from src.utils.swr import track_stale_reads, record_stale_read
+
+_DENSE_GROUPS = 1 << 20 # lebih dari ini kombinasi kunci grup, kode grup dipadatkan dengan np.unique
+_MB = 1024 * 1024
+
+class FactTable:
+    """
+    Satu fact table: kolom frame sebagai array NumPy, kode per kolom dimensi, dan bitmap per nilai.
+
+    Args:
+        df (pd.DataFrame): Baris fact table (hasil SELECT tanpa filter).
+        dimensions: Kolom filter/grup yang bitmap-nya dibuat saat tabel dimuat; kolom lain dibuat
+            saat pertama dipakai.
+
+    Contoh:
+        mask = facts.where(isin={'fakultas': ['FTI']}, ilike_any={'hari_datang': ['Senin']})
+        df = facts.aggregate(['transportasi'], mask, total_emisi=('sum', 'emisi_mingguan'))
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions=()):
+        self.frame = df
+        self.n_rows = len(df)
+        self._values = {} # kolom -> array float64 (NULL = NaN)
+        self._codes = {} # kolom -> (kode int64 per baris, nilai unik; NULL punya kode sendiri)
+        self._bitmaps = {} # (kolom, operator, nilai) -> array bool per baris
+        self._exploded = {}
+        self._lock = threading.Lock()
+        for column in dimensions:
+            codes, uniques = self.codes(column)
+            for code, value in enumerate(uniques):
+                self._bitmaps[(column, "=", _null_key(value))] = codes == code
+
+    def __len__(self):
+        return self.n_rows
+
+    def column(self, name: str) -> np.ndarray:
+        """Isi kolom `name` apa adanya (object untuk teks)."""
+        return self.frame[name].to_numpy()
+
+    def values(self, name: str) -> np.ndarray:
+        """Kolom numerik `name` sebagai float64, NULL = NaN."""
+        values = self._values.get(name)
+        if values is None:
+            values = pd.to_numeric(self.frame[name], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            self._values[name] = values
+        return values
+
+    def codes(self, name: str):
+        """
+        (kode int64 per baris, array nilai unik terurut) kolom `name`; NULL menjadi nilai terakhir.
+        Grup hasil aggregate mengikuti urutan ini, jadi nilai seri di panel "N teratas" deterministik.
+        """
+        entry = self._codes.get(name)
+        if entry is None:
+            codes, uniques = pd.factorize(self.frame[name], sort=True, use_na_sentinel=False)
+            entry = self._codes[name] = (codes.astype("int64"), np.asarray(uniques, dtype=object))
+        return entry
+
+    def bitmap(self, name: str, value) -> np.ndarray:
+        """Bitmap baris dengan `name` = `value` (None untuk IS NULL)."""
+        key = (name, "=", _null_key(value))
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            codes, uniques = self.codes(name)
+            matches = [code for code, unique in enumerate(uniques) if _null_key(unique) == key[2]]
+            bitmap = codes == matches[0] if matches else np.zeros(self.n_rows, dtype=bool)
+            self._bitmaps[key] = bitmap
+        return bitmap
+
+    def ilike_bitmap(self, name: str, pattern: str) -> np.ndarray:
+        """Bitmap baris dengan `name` ILIKE '%pattern%' (NULL tidak cocok)."""
+        key = (name, "ilike", pattern.lower())
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            text = self.frame[name].astype("string")
+            bitmap = text.str.contains(pattern, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+            self._bitmaps[key] = bitmap
+        return bitmap
+
+    def where(self, isin: dict = None, ilike_any: dict = None) -> np.ndarray:
+        """
+        Mask baris untuk filter halaman: setiap kolom di `isin` harus salah satu nilainya, setiap kolom
+        di `ilike_any` harus mengandung salah satu nilainya. Daftar kosong/None berarti tanpa filter,
+        sama seperti pembangun klausa WHERE di halaman.
+        """
+        mask = np.ones(self.n_rows, dtype=bool)
+        for terms, bitmap in (((isin or {}), self.bitmap), ((ilike_any or {}), self.ilike_bitmap)):
+            for name, selected in terms.items():
+                if not selected:
+                    continue
+                matches = np.zeros(self.n_rows, dtype=bool)
+                for value in selected:
+                    matches |= bitmap(name, value)
+                mask &= matches
+        return mask
+
+    def distinct(self, name: str) -> list:
+        """Nilai unik kolom `name` yang tidak NULL, terurut (mis. opsi filter untuk facet_counts)."""
+        _, uniques = self.codes(name)
+        return [value for value in uniques if _null_key(value) is not None]
+
+    def count_distinct(self, name: str, mask: np.ndarray) -> int:
+        """COUNT(DISTINCT name) atas baris `mask` (NULL tidak dihitung)."""
+        codes, uniques = self.codes(name)
+        present = np.bincount(codes[mask], minlength=len(uniques)) > 0
+        return int(np.count_nonzero(present & ~pd.isna(uniques))) if len(uniques) else 0
+
+    def take(self, mask: np.ndarray) -> pd.DataFrame:
+        """Baris frame asal yang lolos `mask` (urutan tetap, indeks baru)."""
+        return self.frame.iloc[np.flatnonzero(mask)].reset_index(drop=True)
+
+    def explode(self, name: str, as_name: str) -> "FactTable":
+        """
+        Tabel satu baris per elemen daftar `name` (dipisah koma, di-TRIM) di kolom `as_name`, padanan
+        TRIM(unnest(string_to_array(name, ','))). NULL dan teks kosong tidak menghasilkan baris.
+        Kolom lain ikut tersalin; mask/nilai per baris asal dipetakan dengan from_parent.
+        """
+        key = (name, as_name)
+        with self._lock:
+            exploded = self._exploded.get(key)
+            if exploded is None:
+                parent_rows, items = [], []
+                for row, text in enumerate(self.column(name)):
+                    if not isinstance(text, str) or text == "":
+                        continue
+                    for item in text.split(","):
+                        parent_rows.append(row)
+                        items.append(item.strip(" "))
+                parent_rows = np.asarray(parent_rows, dtype="int64")
+                frame = self.frame.iloc[parent_rows].reset_index(drop=True)
+                frame[as_name] = pd.Series(items, dtype=object)
+                exploded = self._exploded[key] = FactTable(frame, dimensions=[as_name])
+                exploded.parent_rows = parent_rows
+        return exploded
+
+    def from_parent(self, per_row: np.ndarray) -> np.ndarray:
+        """Memetakan mask/nilai per baris tabel asal ke baris tabel hasil explode."""
+        return per_row[self.parent_rows]
+
+    def aggregate(self, by: list, mask: np.ndarray, **aggregates) -> pd.DataFrame:
+        """
+        GROUP BY `by` atas baris `mask`.
+
+        Args:
+            by (list): Kolom kunci grup; kosong untuk satu baris total (selalu ada, seperti SQL).
+            mask (np.ndarray): Baris yang ikut (hasil where).
+            **aggregates: kolom_hasil=(fungsi, kolom atau array per baris), fungsi salah satu dari
+                'sum', 'mean', 'count' (nilai tidak NULL), 'size' (COUNT(*)), 'nunique' (COUNT DISTINCT).
+
+        Returns:
+            pd.DataFrame: Kolom `by` lalu kolom agregat, satu baris per grup yang punya baris.
+        """
+        group_codes, n_groups, keys = self._group_codes(by, mask)
+        if by:
+            present = np.bincount(group_codes, minlength=n_groups) > 0
+            groups = np.flatnonzero(present)
+        else:
+            groups = np.zeros(1, dtype="int64")
+        result = keys(groups)
+        for output, (func, source) in aggregates.items():
+            result[output] = self._aggregate_one(func, source, mask, group_codes, n_groups)[groups]
+        return pd.DataFrame(result, columns=list(by) + list(aggregates))
+
+    def grouping_sets(self, sets: dict, mask: np.ndarray, **aggregates) -> pd.DataFrame:
+        """
+        Beberapa aggregate sekaligus, ditumpuk dengan kolom `panel` berisi nama set, seperti
+        GROUP BY GROUPING SETS dengan label panel di mode fused. Kolom kunci dari set lain bernilai NULL.
+
+        Args:
+            sets (dict): Nama panel -> kolom kunci grup.
+        """
+        frames = [self.aggregate(by, mask, **aggregates).assign(panel=panel) for panel, by in sets.items()]
+        return pd.concat(frames, ignore_index=True)
+
+    def _group_codes(self, by: list, mask: np.ndarray):
+        """(kode grup baris `mask`, jumlah grup, fungsi kode grup -> {kolom: nilai kunci})."""
+        columns = [self.codes(name) for name in by]
+        sizes = [len(uniques) for _, uniques in columns]
+        combined = np.zeros(int(mask.sum()), dtype="int64")
+        for (codes, _), size in zip(columns, sizes):
+            combined = combined * size + codes[mask]
+        space = int(np.prod(sizes, dtype="float64")) if by else 1
+        compact = None
+        if space > _DENSE_GROUPS:
+            compact, combined = np.unique(combined, return_inverse=True)
+            space = len(compact)
+
+        def keys(groups):
+            flat = compact[groups] if compact is not None else groups
+            decoded = {}
+            for name, (_, uniques), size in reversed(list(zip(by, columns, sizes))):
+                flat, code = np.divmod(flat, size)
+                decoded[name] = uniques[code]
+            return {name: decoded[name] for name in by}
+
+        return combined, space, keys
+
+    def _aggregate_one(self, func: str, source, mask, group_codes, n_groups) -> np.ndarray:
+        if func == "size":
+            return np.bincount(group_codes, minlength=n_groups)
+        if func == "nunique":
+            codes, uniques = self.codes(source)
+            codes = codes[mask]
+            known = ~pd.isna(uniques)[codes] if len(uniques) else np.zeros(0, dtype=bool)
+            pairs = np.unique(group_codes[known] * len(uniques) + codes[known])
+            return np.bincount(pairs // max(len(uniques), 1), minlength=n_groups)
+        values = (self.values(source) if isinstance(source, str) else np.asarray(source, dtype="float64"))[mask]
+        known = ~np.isnan(values)
+        counts = np.bincount(group_codes[known], minlength=n_groups)
+        if func == "count":
+            return counts
+        sums = np.bincount(group_codes[known], weights=values[known], minlength=n_groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if func == "sum":
+                return np.where(counts > 0, sums, np.nan)
+            if func == "mean":
+                return np.where(counts > 0, sums / counts, np.nan)
+        raise ValueError(f"Unknown aggregate: {func}")
+
+    def nbytes(self) -> int:
+        """Perkiraan memori frame, kolom numerik, kode, dan bitmap (byte)."""
+        total = int(self.frame.memory_usage(index=True, deep=True).sum())
+        total += sum(values.nbytes for values in self._values.values())
+        total += sum(codes.nbytes for codes, _ in self._codes.values())
+        total += sum(bitmap.nbytes for bitmap in self._bitmaps.values())
+        return total + sum(exploded.nbytes() for exploded in self._exploded.values())
+
+def facet_counts(options: dict, selected: dict, count) -> dict:
+    """
+    Jumlah facet untuk caption di bawah filter (filters.show_facet_counts, mis. 'FTI 312'): untuk setiap
+    opsi setiap filter, count() dengan filter itu diganti opsi tersebut dan filter lain tetap seperti pilihan aktif.
+
+    Args:
+        options (dict): Nama filter -> opsi yang ditampilkan.
+        selected (dict): Nama filter -> pilihan aktif (kosong berarti tanpa filter).
+        count: count(pilihan) -> int untuk dict nama filter -> nilai, dihitung dari bitmap fact table.
+
+    Returns:
+        dict: Nama filter -> {opsi: jumlah}.
+    """
+    return {name: {option: count({**selected, name: [option]}) for option in values}
+            for name, values in options.items()}
+
+def _null_key(value):
+    """Kunci bitmap: NaN/None/NA disatukan sebagai NULL."""
+    return None if value is None or (not isinstance(value, str) and pd.isna(value)) else value
+
+class FactEngine:
+    """
+    Fact table bernama, dimuat sekali per `version()` (lihat FactTable).
+
+    Contoh:
+        facts = engine.table('transportation', lambda: run_sql(FACT_SQL), dimensions=['transportasi'])
+        if facts is not None:
+            with engine.measure_query():
+                ...
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self._tables = {} # nama -> (versi, FactTable)
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "load_ms": 0.0, "queries": 0, "query_ms": 0.0}
+
+    def table(self, name: str, load, dimensions=()):
+        """
+        Fact table `name` untuk versi data saat ini; load() -> DataFrame hanya dipanggil saat versi
+        berubah. None jika load() kosong (mis. query gagal), supaya halaman memakai SQL.
+        Tabel dari hasil usang (lihat src/utils/swr.py) dipakai sekali tetapi tidak disimpan.
+        """
+        version = self.version()
+        entry = self._tables.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            entry = self._tables.get(name)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            started = time.perf_counter()
+            with track_stale_reads() as stale_reads:
+                df = load()
+            for key in stale_reads:
+                record_stale_read(key) # hasil turunan tabel ini juga usang bagi cache di atasnya
+            if df is None or df.empty:
+                return None
+            facts = FactTable(df, dimensions)
+            if not stale_reads:
+                self._tables[name] = (version, facts)
+            with self._lock:
+                self.stats["loads"] += 1
+                self.stats["load_ms"] += (time.perf_counter() - started) * 1000
+        return facts
+
+    @contextmanager
+    def measure_query(self):
+        """Mengukur satu jawaban filter dari fact table (untuk format_fact_engine_stats)."""
+        started = time.perf_counter()
+        yield
+        with self._lock:
+            self.stats["queries"] += 1
+            self.stats["query_ms"] += (time.perf_counter() - started) * 1000
+
+    def loaded(self) -> dict:
+        """{nama: (baris, byte)} fact table yang tersimpan."""
+        return {name: (len(facts), facts.nbytes()) for name, (_, facts) in list(self._tables.items())}
+
+def format_fact_engine_stats(engine: FactEngine) -> str:
+    """Ringkasan fact engine (untuk log)."""
+    stats = engine.stats
+    loaded = engine.loaded()
+    avg_query_ms = stats["query_ms"] / stats["queries"] if stats["queries"] else 0.0
+    avg_load_ms = stats["load_ms"] / stats["loads"] if stats["loads"] else 0.0
+    return (f"{len(loaded)} tabel ({sum(rows for rows, _ in loaded.values())} baris, "
+            f"{sum(nbytes for _, nbytes in loaded.values()) / _MB:.1f} MB), "
+            f"{stats['loads']} dimuat (rata-rata {avg_load_ms:.0f} ms), "
+            f"{stats['queries']} jawaban filter (rata-rata {avg_query_ms:.1f} ms)")
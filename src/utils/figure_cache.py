@@ -0,0 +1,81 @@
+# src/utils/figure_cache.py
+
+"""
+Cache spesifikasi JSON figure Plotly per panel dan sidik jari datanya.
+
+Setiap rerun (termasuk yang dipicu widget lain atau navigasi sidebar) membangun ulang semua
+figure di Python, lalu st.plotly_chart memvalidasi dan menyerialisasinya lagi ke JSON, walaupun
+data panel dan filter tidak berubah. FigureCache menyimpan JSON figure per (id panel, sidik jari
+data); cache hit melewati pembuatan figure dan serialisasinya.
+
+`data` harus memuat semua masukan figure: DataFrame panel (sidik jari isinya, lihat
+frame_fingerprint) dan nilai lain yang memengaruhi figure (filter, angka KPI) lewat repr-nya.
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import os
+import threading
+import time
+
+import pandas as pd
+import plotly.io
+
+from src.utils.readonly_frame import frame_fingerprint
+from src.utils.swr import FRESH
+
+FIGURE_CACHE_MAX_ENTRIES = int(os.environ.get("FIGURE_CACHE_MAX_ENTRIES", "512"))
+
+_VERSION = 0 # figure hanya bergantung pada datanya, bukan pada versi data
+
+def figure_to_json(fig) -> str:
+    """JSON figure, sama seperti yang dikirim st.plotly_chart (to_dict memvalidasi figure)."""
+    return plotly.io.to_json(fig.to_dict(), validate=False)
+
+def data_fingerprint(data) -> str:
+    """Sidik jari masukan figure: DataFrame/Series lewat isinya, list/tuple/dict per elemen, selain itu repr."""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return f"<{type(data).__name__} {data.shape} {frame_fingerprint(data)}>"
+    if type(data) in (list, tuple):
+        return repr([data_fingerprint(item) for item in data])
+    if isinstance(data, dict):
+        return repr(sorted((repr(key), data_fingerprint(value)) for key, value in data.items()))
+    return repr(data)
+
+class FigureCache:
+    """
+    JSON figure per (id panel, sidik jari data) di `store` (SwrStore, ikut anggaran memori cache).
+
+    Contoh:
+        spec = cache.spec('transportation.trend', (daily_df,), lambda: build_trend_figure(daily_df))
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "build_ms": 0.0}
+
+    def spec(self, panel_id: str, data, build):
+        """JSON figure dari build() untuk `data`; None jika build() tidak menghasilkan figure."""
+        key = repr((panel_id, data_fingerprint(data)))
+        value, state = self.store.lookup(key, _VERSION)
+        if state == FRESH:
+            with self._lock:
+                self.stats["hits"] += 1
+            return value
+        started = time.perf_counter()
+        fig = build()
+        spec = figure_to_json(fig) if fig is not None else None
+        elapsed = time.perf_counter() - started
+        self.store.set(key, _VERSION, spec, cost=elapsed)
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["build_ms"] += elapsed * 1000
+        return spec
+
+def format_figure_cache_stats(cache: FigureCache) -> str:
+    """Ringkasan cache figure (untuk log)."""
+    stats = cache.stats
+    avg_build_ms = stats["build_ms"] / stats["misses"] if stats["misses"] else 0.0
+    return (f"{stats['hits']} hit, {stats['misses']} miss "
+            f"(rata-rata {avg_build_ms:.1f} ms membangun + serialisasi), {len(cache.store)} figure")
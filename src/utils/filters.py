@@ -0,0 +1,83 @@
+# src/utils/filters.py
+
+"""
+Normalisasi nilai filter (multiselect) sebelum dipakai sebagai argumen loader ber-cache.
+
+st.cache_data membedakan ['Senin', 'Selasa'] dan ['Selasa', 'Senin'], padahal SQL-nya
+menghasilkan data yang sama. Dengan canonical_filter kedua urutan klik itu menjadi satu
+kunci cache (dan satu teks SQL/fingerprint): nilai diurutkan, duplikat dan nilai kosong
+dibuang. Urutan mengikuti `order` (mis. DAY_ORDER) jika diberikan, selain itu alfabetis.
+"""
+
+import streamlit as st
+
+def canonical_filter(values, order=None, strip: bool = False) -> list:
+    """
+    Bentuk kanonik dari nilai filter.
+
+    Args:
+        values: Nilai terpilih (list/tuple, boleh None).
+        order (list): Urutan acuan; nilai di luar `order` diletakkan di akhir secara alfabetis.
+        strip (bool): Buang spasi di awal/akhir nilai. Hanya untuk filter yang dibandingkan
+            dengan TRIM(...) di SQL; kolom lain (mis. fakultas di transportasi) dicocokkan apa adanya.
+
+    Contoh:
+        canonical_filter(['Selasa', 'Senin', 'Selasa'], DAY_ORDER) -> ['Senin', 'Selasa']
+    """
+    cleaned = {value.strip() if strip and isinstance(value, str) else value for value in values or []}
+    cleaned.discard("")
+    cleaned.discard(None)
+    if order is None:
+        return sorted(cleaned)
+    rank = {value: index for index, value in enumerate(order)}
+    return sorted(cleaned, key=lambda value: (rank.get(value, len(rank)), str(value)))
+
+def session_filter(key: str, order=None, strip: bool = False) -> list:
+    """canonical_filter dari nilai widget `key` di session_state (untuk prefetch sebelum widget dirender)."""
+    return canonical_filter(st.session_state.get(key, []), order, strip)
+
+def facet_slot(options) -> tuple:
+    """
+    Placeholder caption jumlah facet di bawah multiselect, diisi belakangan oleh show_facet_counts.
+    Jumlah facet dihitung dari fact table yang bisa lambat dimuat (mis. setelah versi data berubah),
+    jadi filter dan panel dirender dulu tanpa menunggunya.
+    """
+    return st.empty(), list(options)
+
+def show_facet_counts(slots: dict, facets: dict):
+    """
+    Mengisi placeholder facet_slot dengan jumlah facet per opsi, mis. 'Senin 30 · Selasa 28'.
+    Jumlah sengaja tidak dimasukkan ke label opsi (format_func): Streamlit menurunkan identitas widget
+    dari label itu, sehingga widget dibuat ulang (dan dropdown yang terbuka tertutup) setiap kali
+    jumlahnya berubah. Tanpa jumlah (mis. fact table gagal dimuat) placeholder dibiarkan kosong.
+
+    Args:
+        slots (dict): Nama filter -> hasil facet_slot.
+        facets (dict): Nama filter -> {opsi: jumlah}; opsi yang tidak ada berarti 0.
+    """
+    for name, (placeholder, options) in slots.items():
+        counts = facets.get(name)
+        if counts and options:
+            placeholder.caption(" · ".join(f"{option} {counts.get(option, 0)}" for option in options))
+
+def top_value_views(facets: dict, names: list, limit: int) -> list:
+    """
+    Tampilan tanpa filter lalu `limit` filter bernilai tunggal (filter lain kosong) dengan jumlah
+    facet terbesar, untuk cache_warmer.
+
+    Args:
+        facets (dict): Nama filter -> {opsi: jumlah} (mis. hasil get_facet_counts tanpa filter).
+        names (list): Nama filter sesuai urutan argumen warm_view.
+        limit (int): Jumlah tampilan bernilai tunggal.
+
+    Contoh:
+        top_value_views({'modes': {'Motor': 40, 'Bus': 12}, 'days': {'Senin': 30}}, ['modes', 'days'], 2)
+        -> [([], []), (['Motor'], []), ([], ['Senin'])]
+    """
+    ranked = sorted(((count, index, option) for index, name in enumerate(names)
+                     for option, count in (facets.get(name) or {}).items() if count),
+                    key=lambda item: -item[0])
+    views = [tuple([] for _ in names)]
+    for _, index, option in ranked[:limit]:
+        views.append(tuple([option] if i == index else [] for i in range(len(names))))
+    return views
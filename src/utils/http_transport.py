@@ -0,0 +1,235 @@
+# src/utils/http_transport.py
+
+"""
+Transport HTTP untuk PostgREST (Supabase REST API).
+
+Satu koneksi HTTP/2 persisten dipakai bersama oleh semua pemanggil, sehingga query
+yang berjalan bersamaan (mis. dari PanelLoader) dimultipleks di koneksi yang sama
+alih-alih membuka koneksi baru. Respons diminta dalam bentuk terkompresi (gzip, dan
+brotli jika paket `brotli` terpasang).
+
+Modul ini sengaja tidak bergantung pada Streamlit supaya bisa dipakai juga oleh ETL.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from contextlib import contextmanager
+
+import httpx
+from postgrest.exceptions import APIError
+
+try:
+    import brotli  # noqa: F401  (dipakai httpx untuk decode Content-Encoding: br)
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
+
+TRANSPORT_TIMEOUT = 120 # Sama dengan timeout default klien postgrest
+TRANSPORT_MAX_CONNECTIONS = 10
+TRANSPORT_KEEPALIVE_EXPIRY = 300
+
+# Ukuran respons yang diterima di dalam blok measure_response_bytes (per thread/task).
+_response_sizes = contextvars.ContextVar("response_sizes", default=None)
+
+@contextmanager
+def measure_response_bytes():
+    """
+    Mengumpulkan ukuran (byte setelah dekompresi) tiap respons yang diterima di dalam blok.
+
+    Contoh:
+        with measure_response_bytes() as sizes:
+            transport.rpc('exec_sql', {'query': sql})
+        payload_bytes = sum(sizes)
+    """
+    sizes = []
+    token = _response_sizes.set(sizes)
+    try:
+        yield sizes
+    finally:
+        _response_sizes.reset(token)
+
+def _build_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=TRANSPORT_MAX_CONNECTIONS,
+        max_keepalive_connections=TRANSPORT_MAX_CONNECTIONS,
+        keepalive_expiry=TRANSPORT_KEEPALIVE_EXPIRY,
+    )
+
+class PostgrestTransport:
+    """
+    Klien PostgREST ringan di atas httpx dengan HTTP/2 dan kompresi respons.
+
+    API sinkron (`rpc`, `select`, `insert`) aman dipanggil dari banyak thread sekaligus.
+    API asyncio (`arpc`, `ainsert`, `agather_rpc`) memakai AsyncClient terpisah
+    per event loop.
+
+    Args:
+        url (str): SUPABASE_URL, mis. https://xyz.supabase.co
+        key (str): SUPABASE_KEY (anon/service key).
+        http1 (bool): Set False untuk memaksa HTTP/2 tanpa TLS (h2c), mis. ke server lokal.
+    """
+
+    def __init__(self, url: str, key: str, http1: bool = True, timeout=TRANSPORT_TIMEOUT):
+        self.base_url = f"{url.rstrip('/')}/rest/v1"
+        self.headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Content-Type": "application/json",
+        }
+        self.http1 = http1
+        self.timeout = timeout
+        self._client = None
+        self._async_clients = {}
+        self._loop = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "bytes_downloaded": 0, "bytes_decoded": 0}
+
+    # --- Klien httpx ---
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url=self.base_url, headers=self.headers, http1=self.http1, http2=True,
+                    timeout=self.timeout, limits=_build_limits(),
+                )
+            return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # AsyncClient terikat pada event loop tempat ia dibuat.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    base_url=self.base_url, headers=self.headers, http1=self.http1, http2=True,
+                    timeout=self.timeout, limits=_build_limits(),
+                )
+                self._async_clients[loop] = client
+            return client
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # --- Respons ---
+
+    def _handle_response(self, response: httpx.Response):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_downloaded"] += response.num_bytes_downloaded
+            self.stats["bytes_decoded"] += len(response.content)
+        sizes = _response_sizes.get()
+        if sizes is not None:
+            sizes.append(len(response.content))
+        if response.is_success:
+            return response.json() if response.content else None
+        try:
+            error = response.json()
+        except ValueError:
+            error = {"message": response.text, "code": str(response.status_code)}
+        raise APIError(error if isinstance(error, dict) else {"message": str(error)})
+
+    @staticmethod
+    def _insert_headers(upsert_on: str = None) -> dict:
+        # return=minimal: PostgREST tidak mengirim ulang baris yang baru dimasukkan.
+        prefer = "return=minimal"
+        if upsert_on:
+            prefer += ",resolution=merge-duplicates"
+        return {"Prefer": prefer}
+
+    # --- API sinkron ---
+
+    def rpc(self, fn: str, params: dict = None, headers: dict = None):
+        """Memanggil fungsi Postgres `fn` lewat /rpc dan mengembalikan JSON hasilnya."""
+        return self._handle_response(self.client.post(f"/rpc/{fn}", json=params or {}, headers=headers))
+
+    def select(self, table_name: str, columns: str = "*", headers: dict = None):
+        """SELECT `columns` dari `table_name`."""
+        return self._handle_response(self.client.get(f"/{table_name}", params={"select": columns}, headers=headers))
+
+    def insert(self, table_name: str, records: list, upsert_on: str = None):
+        """INSERT (atau UPSERT jika `upsert_on` diisi) baris ke `table_name`."""
+        params = {"on_conflict": upsert_on} if upsert_on else None
+        response = self.client.post(f"/{table_name}", json=records, params=params,
+                                    headers=self._insert_headers(upsert_on))
+        return self._handle_response(response)
+
+    # --- API asyncio ---
+
+    async def arpc(self, fn: str, params: dict = None, headers: dict = None):
+        """Versi asyncio dari `rpc`."""
+        client = self._get_async_client()
+        return self._handle_response(await client.post(f"/rpc/{fn}", json=params or {}, headers=headers))
+
+    async def ainsert(self, table_name: str, records: list, upsert_on: str = None):
+        """Versi asyncio dari `insert`."""
+        client = self._get_async_client()
+        params = {"on_conflict": upsert_on} if upsert_on else None
+        response = await client.post(f"/{table_name}", json=records, params=params,
+                                     headers=self._insert_headers(upsert_on))
+        return self._handle_response(response)
+
+    async def agather_rpc(self, calls: list, return_exceptions: bool = False, headers: dict = None) -> list:
+        """
+        Menjalankan beberapa panggilan RPC bersamaan di satu koneksi HTTP/2.
+
+        Args:
+            calls (list): Daftar tuple (fn, params).
+            headers (dict): Header tambahan untuk setiap panggilan.
+
+        Returns:
+            list: Hasil tiap panggilan, urut sesuai `calls`.
+        """
+        return await asyncio.gather(*(self.arpc(fn, params, headers=headers) for fn, params in calls),
+                                    return_exceptions=return_exceptions)
+
+    def _get_background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True, name="postgrest_transport").start()
+            return self._loop
+
+    def gather_rpc(self, calls: list, return_exceptions: bool = False, headers: dict = None) -> list:
+        """
+        Versi sinkron dari `agather_rpc` untuk kode non-async (mis. halaman Streamlit).
+        Dijalankan di event loop latar milik transport, jadi AsyncClient dan koneksinya
+        dipakai ulang antar pemanggilan. Task-nya berjalan di salinan context pemanggil,
+        jadi measure_response_bytes pemanggil juga mencatat respons batch ini.
+        """
+        loop = self._get_background_loop()
+        done = concurrent.futures.Future()
+
+        def start():
+            task = loop.create_task(self.agather_rpc(calls, return_exceptions=return_exceptions, headers=headers))
+            task.add_done_callback(lambda task: _copy_task_result(task, done))
+
+        loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+        return done.result()
+
+def _copy_task_result(task: asyncio.Task, future: concurrent.futures.Future):
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+def format_transport_stats(transport: PostgrestTransport) -> str:
+    """Ringkasan jumlah request dan byte yang ditransfer (untuk log)."""
+    stats = transport.stats
+    ratio = stats["bytes_downloaded"] / stats["bytes_decoded"] if stats["bytes_decoded"] else 1.0
+    return (f"{stats['requests']} request, {stats['bytes_downloaded']} byte diunduh "
+            f"({stats['bytes_decoded']} byte setelah dekompresi, rasio {ratio:.2f})")
@@ -0,0 +1,318 @@
+# src/utils/local_replica.py
+
+"""
+Replika lokal (DuckDB tertanam) dari tabel dan view dashboard, untuk menjalankan SQL halaman di proses.
+
+Dengan SQL_BACKEND=duckdb, run_sql/run_sql_batch/run_query tidak mengirim query ke exec_sql,
+melainkan menjalankannya di DuckDB (eksekusi vektor, tanpa latensi jaringan). Isi replika adalah
+snapshot semua relasi di REPLICA_RELATIONS: tabel dasar dan view diambil apa adanya (definisi view
+hanya ada di database, jadi hasilnya disalin sebagai tabel). Snapshot dibuat sekali per versi data,
+ditulis sebagai Parquet di LOCAL_REPLICA_DIR (satu direktori per versi), lalu dimuat ke DuckDB.
+
+Jika snapshot versi saat ini tidak bisa diambil (mis. database tidak terjangkau), snapshot terbaru
+di disk yang dipakai dan hasilnya ditandai usang (record_stale_read), jadi dashboard tetap jalan
+offline, mis. untuk benchmark; pengambilan snapshot dicoba lagi dengan jeda yang bertambah. Query yang gagal di DuckDB (dialek belum didukung shim) mengembalikan
+None, dan pemanggil mengirimnya ke Postgres seperti biasa.
+
+Shim dialek (translate_sql) hanya menangani konstruksi Postgres yang dipakai query halaman:
+- `x ILIKE ANY (ARRAY['a', 'b'])` menjadi `(x ILIKE 'a' OR x ILIKE 'b')`;
+- `SELECT TRIM(unnest(string_to_array(t.kolom, ','))) AS hari, SUM(...) FROM tabel t ... GROUP BY hari`
+  (DuckDB tidak menerima unnest di SELECT yang berisi agregat): unnest dipindah ke subquery tabel t;
+- string_to_array('') adalah array kosong di Postgres (DuckDB: ['']), lewat macro pg_string_to_array;
+- pembagian bilangan bulat dan urutan NULL di ORDER BY mengikuti Postgres (setelan koneksi).
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from src.utils.swr import record_stale_read
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+SQL_BACKEND = os.environ.get("SQL_BACKEND", "postgres") # 'postgres' (exec_sql) atau 'duckdb' (replika lokal)
+LOCAL_REPLICA_ENABLED = SQL_BACKEND == "duckdb" and duckdb is not None
+LOCAL_REPLICA_DIR = os.environ.get("LOCAL_REPLICA_DIR", os.path.join(tempfile.gettempdir(), "dashboard_replica"))
+LOCAL_REPLICA_KEEP = 2 # snapshot yang disimpan di disk, termasuk versi saat ini (yang lama dipakai saat offline)
+LOCAL_REPLICA_RETRY_SECONDS = (5, 300) # jeda awal dan maksimum sebelum mencoba lagi snapshot yang gagal diambil
+
+if SQL_BACKEND == "duckdb" and duckdb is None:
+    logging.warning("LOCAL_REPLICA: SQL_BACKEND=duckdb but duckdb is not installed, using Postgres")
+
+REPLICA_RELATIONS = (
+    'mahasiswa', 'transportasi', 'elektronik', 'sampah_makanan', 'aktivitas_harian',
+    'v_informasi_fakultas_mahasiswa', 'v_aktivitas_makanan', 'v_emisi_per_mahasiswa',
+)
+
+# Tipe Postgres (information_schema.columns.data_type) -> dtype pandas, supaya tipe kolom di
+# Parquet/DuckDB tidak bergantung pada isi JSON (mis. kolom teks yang semuanya NULL).
+_PANDAS_DTYPES = {
+    'smallint': 'Int64', 'integer': 'Int64', 'bigint': 'Int64',
+    'real': 'float64', 'double precision': 'float64', 'numeric': 'float64',
+    'boolean': 'boolean', 'text': 'string', 'character varying': 'string', 'character': 'string',
+}
+
+_DUCKDB_SETUP = (
+    "SET integer_division = true",
+    "SET default_null_order = 'nulls_last_on_asc_first_on_desc'",
+    "CREATE MACRO pg_string_to_array(s, d) AS CASE WHEN s = '' THEN []::VARCHAR[] ELSE string_split(s, d) END",
+)
+
+_ILIKE_ANY = re.compile(r"([\w.]+)\s+ILIKE\s+ANY\s*\(\s*ARRAY\s*\[([^\]]*)\]\s*\)", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_UNNEST_SELECT = re.compile(r"SELECT\s+TRIM\(\s*unnest\(\s*string_to_array\(\s*(\w+)\.(\w+)\s*,\s*('[^']*')\s*\)\s*\)\s*\)"
+                            r"\s+AS\s+(\w+)\s*,(.*?)\bFROM\s+(\w+)\s+\1\b", re.IGNORECASE | re.DOTALL)
+_STRING_TO_ARRAY = re.compile(r"\bstring_to_array\s*\(", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def translate_sql(sql_query: str) -> str:
+    """SQL halaman (dialek Postgres) -> SQL DuckDB; lihat docstring modul."""
+    def ilike_any(match):
+        patterns = _STRING_LITERAL.findall(match.group(2))
+        if not patterns:
+            return "FALSE"
+        return "(" + " OR ".join(f"{match.group(1)} ILIKE {pattern}" for pattern in patterns) + ")"
+
+    def unnest_select(match):
+        alias, column, separator, name, select_rest, table = match.groups()
+        return (f"SELECT {alias}._unnest_{column} AS {name},{select_rest}FROM (SELECT *, "
+                f"TRIM(unnest(string_to_array({column}, {separator}))) AS _unnest_{column} FROM {table}) {alias}")
+
+    sql_query = _ILIKE_ANY.sub(ilike_any, sql_query)
+    sql_query = _UNNEST_SELECT.sub(unnest_select, sql_query)
+    return _STRING_TO_ARRAY.sub("pg_string_to_array(", sql_query)
+
+def _version_dir(directory: str, version) -> str:
+    return os.path.join(directory, hashlib.sha256(repr(version).encode("utf-8")).hexdigest()[:16])
+
+class LocalReplica:
+    """
+    Snapshot REPLICA_RELATIONS di DuckDB untuk `version()` saat ini.
+
+    Args:
+        version: Fungsi tanpa argumen yang mengembalikan versi data saat ini.
+        fetch: fetch(sql) -> DataFrame hasil query di Postgres (untuk mengambil snapshot).
+
+    Contoh:
+        replica = LocalReplica(get_data_version, fetch)
+        df = replica.query("SELECT fakultas, COUNT(*) AS n FROM v_informasi_fakultas_mahasiswa GROUP BY 1")
+    """
+
+    def __init__(self, version, fetch, directory: str = LOCAL_REPLICA_DIR, relations=REPLICA_RELATIONS):
+        self.version = version
+        self.fetch = fetch
+        self.directory = directory
+        self.relations = tuple(relations)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._version = None # versi yang dipenuhi snapshot yang dimuat (None jika snapshot lama dari disk)
+        self._snapshot_version = None # versi snapshot yang sedang dimuat (bisa lebih lama jika offline)
+        self._building = None # threading.Event selama satu thread membangun/memuat snapshot
+        self._failures = 0
+        self._retry_at = 0.0 # time.monotonic() sebelum snapshot versi baru dicoba lagi setelah gagal
+        self.stats = {"queries": 0, "fallbacks": 0, "loads": 0, "snapshots": 0, "stale": 0,
+                      "query_ms": 0.0, "load_ms": 0.0}
+
+    def _count(self, stat: str, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def query(self, sql_query: str):
+        """Hasil `sql_query` dari replika, atau None jika replika tidak bisa menjawabnya."""
+        try:
+            connection, stale = self._current()
+        except Exception as e:
+            logging.warning(f"LOCAL_REPLICA: no snapshot available, using Postgres: {e}")
+            self._count("fallbacks")
+            return None
+        started = time.perf_counter()
+        try:
+            # Koneksi DuckDB tidak boleh dipakai bersamaan oleh beberapa thread: satu cursor per query.
+            cursor = connection.cursor()
+            try:
+                df = cursor.execute(translate_sql(sql_query)).df()
+            finally:
+                cursor.close()
+        except duckdb.Error as e:
+            logging.warning(f"LOCAL_REPLICA: query not supported locally, using Postgres: "
+                            f"{' '.join(sql_query.split())[:100]}: {e}")
+            self._count("fallbacks")
+            return None
+        if stale:
+            # Snapshot versi lama: hasilnya tidak boleh di-cache sebagai hasil versi saat ini.
+            record_stale_read(sql_query)
+            self._count("stale")
+        with self._lock:
+            self.stats["queries"] += 1
+            self.stats["query_ms"] += (time.perf_counter() - started) * 1000
+        return df
+
+    def _current(self):
+        """
+        (koneksi DuckDB, apakah snapshot lebih lama dari versi saat ini).
+
+        Snapshot versi baru dibangun di luar lock oleh satu thread saja (klaim lewat `_building`);
+        thread lain memakai snapshot yang sudah dimuat (ditandai usang), atau menunggu jika belum
+        ada snapshot sama sekali. Setelah gagal, versi baru baru dicoba lagi setelah jeda yang
+        bertambah (LOCAL_REPLICA_RETRY_SECONDS).
+        """
+        version = self.version()
+        with self._lock:
+            building = self._building
+            leader = (building is None and self._version != version
+                      and time.monotonic() >= self._retry_at)
+            if leader:
+                building = self._building = threading.Event()
+            elif building is None or self._connection is not None:
+                if self._connection is None:
+                    raise RuntimeError(f"snapshot gagal diambil, dicoba lagi dalam "
+                                       f"{self._retry_at - time.monotonic():.0f} detik")
+                return self._connection, self._snapshot_version != version
+        if not leader:
+            building.wait()
+        else:
+            try:
+                self._refresh(version)
+            finally:
+                with self._lock:
+                    self._building = None
+                building.set()
+        with self._lock:
+            if self._connection is None:
+                raise RuntimeError("snapshot tidak tersedia")
+            return self._connection, self._snapshot_version != version
+
+    def _refresh(self, version):
+        """Mengambil (jika perlu) dan memuat snapshot `version`; dipanggil tanpa memegang lock."""
+        path = _version_dir(self.directory, version)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            try:
+                self._write_snapshot(version, path)
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                    delay = min(LOCAL_REPLICA_RETRY_SECONDS[0] * 2 ** (self._failures - 1),
+                                LOCAL_REPLICA_RETRY_SECONDS[1])
+                    self._retry_at = time.monotonic() + delay
+                    loaded = self._connection is not None
+                if loaded:
+                    # Snapshot yang sudah dimuat tetap dipakai (usang); `_version` tidak diubah,
+                    # jadi versi ini dicoba lagi setelah jeda.
+                    logging.warning(f"LOCAL_REPLICA: cannot snapshot version {version}, "
+                                    f"retrying in {delay:.0f} s: {e}")
+                    return
+                fallback = self._latest_snapshot()
+                if fallback is None:
+                    raise
+                logging.warning(f"LOCAL_REPLICA: cannot snapshot version {version}, using {fallback}, "
+                                f"retrying in {delay:.0f} s: {e}")
+                self._load(fallback, version=None)
+                return
+        self._load(path, version)
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0.0
+
+    def _load(self, path: str, version):
+        """Memuat snapshot di `path` ke koneksi DuckDB baru lalu menukarnya dengan koneksi lama."""
+        started = time.perf_counter()
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        connection = duckdb.connect(":memory:")
+        for statement in _DUCKDB_SETUP:
+            connection.execute(statement)
+        for relation in self.relations:
+            parquet_path = os.path.join(path, f"{relation}.parquet").replace("'", "''")
+            connection.execute(f"CREATE TABLE {relation} AS SELECT * FROM read_parquet('{parquet_path}')")
+        load_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            # Koneksi lama tidak ditutup: query yang masih berjalan memegang referensinya, dan
+            # koneksi itu dilepas saat referensi terakhir hilang.
+            self._connection = connection
+            self._version = version
+            self._snapshot_version = manifest["version"]
+            self.stats["loads"] += 1
+            self.stats["load_ms"] += load_ms
+        logging.info(f"LOCAL_REPLICA: loaded snapshot of version {manifest['version']} in {load_ms:.0f} ms")
+
+    def _schema(self) -> dict:
+        """Relasi -> [(kolom, tipe Postgres)] sesuai urutan kolomnya."""
+        names = ", ".join(f"'{relation}'" for relation in self.relations)
+        df = self.fetch(f"""
+            SELECT table_name, column_name, data_type FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name IN ({names})
+            ORDER BY table_name, ordinal_position
+        """)
+        schema = {relation: [] for relation in self.relations}
+        for row in df.itertuples(index=False):
+            schema[row.table_name].append((row.column_name, row.data_type))
+        missing = [relation for relation, columns in schema.items() if not columns]
+        if missing:
+            raise ValueError(f"relasi tidak ditemukan: {', '.join(missing)}")
+        return schema
+
+    def _write_snapshot(self, version, path: str):
+        """Menulis semua relasi sebagai Parquet ke `path` (direktori sementara lalu os.replace)."""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for relation, columns in self._schema().items():
+                names = [name for name, _ in columns]
+                df = self.fetch(f"SELECT {', '.join(names)} FROM {relation}")
+                df = df.reindex(columns=names) # hasil kosong dari exec_sql tidak punya kolom
+                for name, data_type in columns:
+                    df[name] = df[name].astype(_PANDAS_DTYPES.get(data_type, 'object'))
+                df.to_parquet(os.path.join(tmp_path, f"{relation}.parquet"), index=False)
+            with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({"version": version, "written_at": time.time()}, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        self._count("snapshots")
+        self._prune(keep=path)
+
+    def _snapshots(self) -> list:
+        """Direktori snapshot lengkap, terbaru lebih dulu."""
+        found = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    manifest = os.path.join(entry.path, "manifest.json")
+                    if entry.is_dir() and not entry.name.endswith(".tmp") and os.path.exists(manifest):
+                        found.append((os.path.getmtime(manifest), entry.path))
+        except FileNotFoundError:
+            pass
+        return [path for _, path in sorted(found, reverse=True)]
+
+    def _latest_snapshot(self):
+        snapshots = self._snapshots()
+        return snapshots[0] if snapshots else None
+
+    def _prune(self, keep: str):
+        for path in [path for path in self._snapshots() if path != keep][LOCAL_REPLICA_KEEP - 1:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+def format_local_replica_stats(replica) -> str:
+    """Ringkasan replika lokal (untuk log)."""
+    if replica is None:
+        return "nonaktif"
+    stats = replica.stats
+    avg_query_ms = stats["query_ms"] / stats["queries"] if stats["queries"] else 0.0
+    return (f"{stats['queries']} query (rata-rata {avg_query_ms:.1f} ms), {stats['fallbacks']} ke Postgres, "
+            f"{stats['stale']} dari snapshot lama, {stats['loads']} dimuat ({stats['load_ms']:.0f} ms), "
+            f"{stats['snapshots']} snapshot diambil")
@@ -0,0 +1,74 @@
+# src/utils/panel_loader.py
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+import logging
+from src.utils.query_guard import QueryCancelled, get_query_guard
+
+PANEL_LOADER_MAX_WORKERS = 4
+PANEL_LOADER_POLL_INTERVAL = 0.1 # detik; jeda antar pengecekan rerun yang sudah digantikan saat menunggu hasil
+
+@st.cache_resource
+def _get_executor() -> ThreadPoolExecutor:
+    """Thread pool bersama (per proses) untuk memuat data panel."""
+    return ThreadPoolExecutor(max_workers=PANEL_LOADER_MAX_WORKERS, thread_name_prefix="panel_loader")
+
+def _run_with_ctx(ctx, rerun, fn, args, kwargs):
+    """Menjalankan fn di worker thread dengan ScriptRunContext milik sesi pemanggil,
+    supaya st.cache_data dan st.error tetap bekerja seperti di script thread.
+    Query di dalamnya ditandai sebagai milik rerun pengirim (lihat query_guard)."""
+    thread = threading.current_thread()
+    add_script_run_ctx(thread, ctx)
+    try:
+        with get_query_guard().rerun_scope(rerun):
+            return fn(*args, **kwargs)
+    finally:
+        # Worker thread dipakai ulang oleh sesi lain, jadi konteks harus dilepas.
+        add_script_run_ctx(thread, None)
+
+class PanelLoader:
+    """
+    Mengirim loader data panel ke thread pool begitu filter diketahui,
+    lalu panel mengambil hasilnya saat dirender.
+
+    Contoh:
+        loader = PanelLoader()
+        loader.submit('panels', get_panel_data, where_clause, join_needed)
+        ...
+        panel_data = loader.result('panels')
+    """
+
+    def __init__(self):
+        self._executor = _get_executor()
+        self._ctx = get_script_run_ctx()
+        self._rerun = get_query_guard().current_rerun()
+        self._futures = {}
+        self._keys = {}
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Mengirim loader. Pemanggilan ulang dengan argumen yang sama tidak mengirim ulang query."""
+        key = (fn, args, tuple(sorted(kwargs.items())))
+        if self._keys.get(name) == key:
+            return self._futures[name]
+        self._keys[name] = key
+        self._futures[name] = self._executor.submit(_run_with_ctx, self._ctx, self._rerun, fn, args, kwargs)
+        return self._futures[name]
+
+    def result(self, name):
+        """
+        Menunggu dan mengembalikan hasil loader `name`.
+
+        Raises:
+            QueryCancelled: Jika rerun yang mengirim loader sudah digantikan rerun baru selama menunggu.
+        """
+        future = self._futures[name]
+        if not future.done():
+            logging.info(f"PANEL_LOADER: waiting for '{name}'")
+        guard = get_query_guard()
+        while not wait([future], timeout=PANEL_LOADER_POLL_INTERVAL).done:
+            with guard.rerun_scope(self._rerun):
+                if guard.is_superseded():
+                    raise QueryCancelled(f"rerun {self._rerun} superseded while waiting for '{name}'")
+        return future.result()
@@ -0,0 +1,164 @@
+# src/utils/partial_aggregates.py
+
+"""
+Cache agregat parsial: panel untuk pilihan multi-select disusun dari hasil per nilai filter.
+
+Sebagian besar panel halaman adalah SUM/COUNT per kelompok, dan banyak filter membagi baris
+menjadi bagian yang tidak beririsan (mis. setiap baris transportasi punya satu moda dan satu
+fakultas). Untuk filter seperti itu, panel dengan fakultas = [A, B] sama dengan panel fakultas = [A]
+ditambah panel fakultas = [B], dijumlahkan per kunci grup. Hasil panel untuk pilihan satu nilai
+(partial) disimpan per versi data; pilihan multi-nilai berikutnya disusun dari partial di pandas
+tanpa query. Jika hanya satu partial yang belum ada (pola umum: pengguna menambah satu nilai),
+partial itu diambil lalu disimpan untuk dipakai lagi; jika lebih, seluruh pilihan diambil lewat
+query seperti biasa.
+
+Ukuran yang tidak bisa dijumlahkan tidak disusun dan selalu diambil lewat query:
+- AVG, median, dan panel "N teratas" (LIMIT) tidak dideklarasikan sebagai panel yang bisa disusun;
+- COUNT(DISTINCT mahasiswa) hanya dijumlahkan untuk filter yang membagi mahasiswa (setiap
+  mahasiswa hanya punya satu nilai filter itu, mis. fakultas), bukan untuk filter seperti hari
+  atau waktu makan yang bisa dimiliki satu mahasiswa berkali-kali.
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import itertools
+
+import pandas as pd
+
+from src.utils.swr import FRESH, track_stale_reads
+
+PARTIAL_MAX_PARTS = 64 # lebih dari ini (kombinasi beberapa filter), pilihan diambil lewat query
+PARTIAL_MAX_MISSING = 1 # partial yang boleh diambil dulu sebelum menyusun
+
+class PanelAggregate:
+    """
+    Cara menjumlahkan partial satu panel.
+
+    Args:
+        keys (list): Kolom GROUP BY panel (kosong untuk satu baris total).
+        sums (list): Kolom SUM/COUNT(*); selalu bisa dijumlahkan.
+        distinct (list): Kolom COUNT(DISTINCT mahasiswa); hanya dijumlahkan untuk filter yang
+            membagi mahasiswa.
+        order_by (tuple): (kolom, ascending) jika query panel memakai ORDER BY.
+    """
+
+    def __init__(self, keys=(), sums=(), distinct=(), order_by=None):
+        self.keys = list(keys)
+        self.sums = list(sums)
+        self.distinct = list(distinct)
+        self.order_by = order_by
+
+    def can_combine(self, dimensions: list, partitions_students: dict) -> bool:
+        return not self.distinct or all(partitions_students[dim] for dim in dimensions)
+
+    def combine(self, parts: list):
+        """Menjumlahkan partial (DataFrame mentah dari query panel) per kunci grup."""
+        if all(part is None for part in parts):
+            return None # panel tidak aktif untuk filter ini
+        frames = [part for part in parts if part is not None and len(part.columns) > 0]
+        if not frames:
+            return pd.DataFrame()
+        columns = list(frames[0].columns)
+        measures = self.sums + self.distinct
+        combined = pd.concat(frames, ignore_index=True)
+        for column in measures:
+            combined[column] = pd.to_numeric(combined[column])
+        if self.keys:
+            # min_count=1: kelompok yang semua nilainya NULL tetap NULL, seperti SUM di SQL.
+            # Urutan kunci mengikuti kemunculan pertamanya (mis. urutan UNION ALL di query).
+            result = combined.groupby(self.keys, dropna=False, sort=False)[measures].sum(min_count=1).reset_index()
+        else:
+            result = pd.DataFrame([combined[measures].sum(min_count=1)])
+        result = result[columns]
+        if self.order_by is not None:
+            column, ascending = self.order_by
+            result = result.sort_values(column, ascending=ascending, kind='stable').reset_index(drop=True)
+        return result
+
+class PartialAggregateSpec:
+    """
+    Deklarasi satu halaman.
+
+    Args:
+        page (str): Nama halaman (bagian kunci partial).
+        dimensions (dict): Filter yang membagi baris panel tanpa irisan -> apakah filter itu juga
+            membagi mahasiswa (boleh menjumlahkan COUNT DISTINCT). Filter lain tetap menjadi
+            bagian kunci partial apa adanya.
+        panels (dict): Nama panel -> PanelAggregate untuk panel yang bisa disusun.
+    """
+
+    def __init__(self, page: str, dimensions: dict, panels: dict):
+        self.page = page
+        self.dimensions = dimensions
+        self.panels = panels
+
+    def is_partial(self, filters: dict) -> bool:
+        """True jika hasil untuk `filters` adalah partial: setiap dimensi paling banyak satu nilai."""
+        counts = [len(filters.get(dim) or []) for dim in self.dimensions]
+        return max(counts) == 1
+
+class PartialAggregateCache:
+    """
+    Partial per halaman/panel/filter di `store` (SwrStore), berlaku untuk `version()` saat ini.
+
+    Contoh:
+        panels = cache.get_panels(SPEC, {'modes': [...], 'fakultas': [...], 'days': [...]}, query)
+    dengan query(filters, skip) -> {panel: DataFrame mentah} untuk semua panel kecuali `skip`.
+    """
+
+    def __init__(self, store, version):
+        self.store = store
+        self.version = version
+        self.stats = {"composed": 0, "partials_used": 0, "partials_fetched": 0, "queried": 0}
+
+    def _key(self, spec, panel: str, filters: dict) -> str:
+        return repr((spec.page, panel, sorted((name, list(values or [])) for name, values in filters.items())))
+
+    def _lookup(self, spec, filters: dict, panels: list, version):
+        """{panel: DataFrame/None} jika semua panel partial `filters` tersimpan, selain itu None."""
+        found = {}
+        for panel in panels:
+            value, state = self.store.lookup(self._key(spec, panel, filters), version)
+            if state != FRESH:
+                return None
+            found[panel] = value
+        return found
+
+    def _query(self, spec, filters: dict, query, skip, version) -> dict:
+        with track_stale_reads() as stale_reads:
+            results = query(filters, skip)
+        # Hasil dari data usang atau hasil pengganti saat query gagal tidak disimpan sebagai partial.
+        if not stale_reads and spec.is_partial(filters):
+            for panel in spec.panels:
+                if panel in results:
+                    self.store.set(self._key(spec, panel, filters), version, results[panel])
+        return results
+
+    def get_panels(self, spec: PartialAggregateSpec, filters: dict, query) -> dict:
+        version = self.version()
+        split = [dim for dim in spec.dimensions if len(filters.get(dim) or []) > 1]
+        composable = [panel for panel, aggregate in spec.panels.items()
+                      if aggregate.can_combine(split, spec.dimensions)] if split else []
+        parts = [{**filters, **{dim: [value] for dim, value in zip(split, values)}}
+                 for values in itertools.product(*(filters[dim] for dim in split))]
+        if composable and len(parts) <= PARTIAL_MAX_PARTS:
+            found = [self._lookup(spec, part, composable, version) for part in parts]
+            missing = [i for i, part_panels in enumerate(found) if part_panels is None]
+            if len(missing) <= PARTIAL_MAX_MISSING:
+                for i in missing:
+                    found[i] = self._query(spec, parts[i], query, (), version)
+                    self.stats["partials_fetched"] += 1
+                self.stats["composed"] += 1
+                self.stats["partials_used"] += len(parts) - len(missing)
+                panels = {panel: spec.panels[panel].combine([part_panels.get(panel) for part_panels in found])
+                          for panel in composable}
+                # Panel lain (AVG, N teratas, ...) tetap diambil untuk seluruh pilihan.
+                return {**query(filters, tuple(composable)), **panels}
+        self.stats["queried"] += 1
+        return self._query(spec, filters, query, (), version)
+
+def format_partial_aggregate_stats(cache: PartialAggregateCache) -> str:
+    """Ringkasan cache agregat parsial (untuk log)."""
+    stats = cache.stats
+    return (f"{stats['composed']} pilihan disusun dari {stats['partials_used']} partial tersimpan "
+            f"(+{stats['partials_fetched']} diambil), {stats['queried']} lewat query, {len(cache.store)} partial")
@@ -0,0 +1,198 @@
+# src/utils/query_guard.py
+
+"""
+Pembatalan query yang sudah digantikan dan batas waktu eksekusi query dashboard.
+
+Setiap query dari sesi Streamlit dikirim dengan header X-Query-Tag berisi
+`dash:<session_id>:<rerun>` dan X-Statement-Timeout. Fungsi pre-request PostgREST
+(supabase/migrations/20261019010000_query_guard.sql) memasang tag itu sebagai
+application_name dan menerapkan statement_timeout untuk request tersebut.
+
+Saat sesi memulai rerun baru (mis. user mengubah filter), query milik rerun lama yang
+masih berjalan dibatalkan di server lewat RPC `cancel_dashboard_queries` (pg_cancel_backend),
+karena hasilnya toh akan dibuang. RPC itu hanya boleh dipanggil service_role, jadi pembatalan
+memerlukan SUPABASE_SERVICE_ROLE_KEY (lihat db_connector.init_cancel_transport).
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from postgrest.exceptions import APIError
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+CANCEL_SUPERSEDED_QUERIES = os.environ.get("CANCEL_SUPERSEDED_QUERIES", "1") == "1"
+STATEMENT_TIMEOUT_MS = int(os.environ.get("STATEMENT_TIMEOUT_MS", "30000"))
+QUERY_TAG_PREFIX = "dash"
+QUERY_CANCELED_SQLSTATE = "57014" # query_canceled: pg_cancel_backend maupun statement_timeout
+QUERY_GUARD_SESSION_TTL = float(os.environ.get("QUERY_GUARD_SESSION_TTL", "3600")) # detik tanpa rerun sebelum status sesi dibuang
+
+class QueryCancelled(Exception):
+    """Query dibatalkan karena rerun yang mengirimnya sudah digantikan rerun baru."""
+
+def _is_query_canceled(error) -> bool:
+    return isinstance(error, APIError) and error.code == QUERY_CANCELED_SQLSTATE
+
+class QueryGuard:
+    """
+    Mencatat rerun terakhir tiap sesi dan query yang sedang berjalan per rerun.
+    Satu instance per proses, dipakai bersama oleh semua sesi dan thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reruns = {} # session_id -> nomor rerun terbaru
+        self._seen = {} # session_id -> waktu (monotonic) rerun terakhir, untuk membuang sesi yang sudah tidak aktif
+        self._inflight = {} # (session_id, rerun) -> jumlah query yang sedang berjalan
+        self.stats = {"queries": 0, "cancelled": 0, "skipped": 0, "timeouts": 0, "cancel_requests": 0}
+
+    # --- Rerun ---
+
+    def current_rerun(self):
+        """Nomor rerun yang berlaku untuk thread ini (None di luar sesi Streamlit)."""
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            return rerun
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None:
+            return None
+        with self._lock:
+            return self._reruns.get(ctx.session_id, 0)
+
+    @contextmanager
+    def rerun_scope(self, rerun):
+        """Menandai query di blok ini sebagai milik `rerun` (dipakai worker PanelLoader)."""
+        previous = getattr(self._local, "rerun", None)
+        self._local.rerun = rerun
+        try:
+            yield
+        finally:
+            self._local.rerun = previous
+
+    def begin_rerun(self, transport):
+        """
+        Dipanggil di awal setiap rerun script. Menaikkan nomor rerun sesi ini dan
+        membatalkan query rerun sebelumnya yang masih berjalan lewat `transport`
+        (ber-key service_role; None berarti pembatalan dilewati).
+        """
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return
+        with self._lock:
+            rerun = self._reruns.get(ctx.session_id, 0) + 1
+            self._reruns[ctx.session_id] = rerun
+            self._seen[ctx.session_id] = time.monotonic()
+            self._prune_sessions()
+            stale = [self._tag(session_id, old) for (session_id, old), count in self._inflight.items()
+                     if session_id == ctx.session_id and old < rerun and count > 0]
+        if not stale or not CANCEL_SUPERSEDED_QUERIES or transport is None:
+            return
+        try:
+            cancelled = transport.rpc('cancel_dashboard_queries', {'tags': stale})
+            with self._lock:
+                self.stats["cancel_requests"] += 1
+            logging.info(f"QUERY_GUARD: cancelled {cancelled} running query(s) for {', '.join(stale)}")
+        except Exception as e:
+            logging.error(f"QUERY_GUARD: cancel_dashboard_queries failed: {e}")
+
+    def _prune_sessions(self):
+        """
+        Membuang nomor rerun sesi yang tidak rerun selama QUERY_GUARD_SESSION_TTL dan tidak punya query
+        yang sedang berjalan (dipanggil dengan _lock dipegang). Tanpa ini _reruns tumbuh per sesi
+        selama proses hidup; sesi yang kembali setelahnya mulai lagi dari rerun 1.
+        """
+        cutoff = time.monotonic() - QUERY_GUARD_SESSION_TTL
+        busy = {session_id for session_id, _ in self._inflight}
+        for session_id in [session_id for session_id, seen_at in self._seen.items()
+                           if seen_at < cutoff and session_id not in busy]:
+            del self._seen[session_id]
+            self._reruns.pop(session_id, None)
+
+    def is_superseded(self) -> bool:
+        """True jika rerun yang berlaku untuk thread ini sudah digantikan rerun baru."""
+        ctx = get_script_run_ctx(suppress_warning=True)
+        rerun = self.current_rerun()
+        if ctx is None or rerun is None:
+            return False
+        return self._is_superseded(ctx.session_id, rerun)
+
+    # --- Eksekusi ---
+
+    @staticmethod
+    def _tag(session_id: str, rerun: int) -> str:
+        return f"{QUERY_TAG_PREFIX}:{session_id}:{rerun}"
+
+    def _is_superseded(self, session_id: str, rerun: int) -> bool:
+        with self._lock:
+            return rerun < self._reruns.get(session_id, 0)
+
+    def call(self, send, *args, **kwargs):
+        """
+        Menjalankan `send(*args, headers=..., **kwargs)` (mis. transport.rpc) dengan tag dan
+        statement_timeout milik rerun saat ini.
+
+        Raises:
+            QueryCancelled: Jika rerun pengirim sudah digantikan, baik sebelum query dikirim
+                maupun saat query dibatalkan di server.
+        """
+        ctx = get_script_run_ctx(suppress_warning=True)
+        rerun = self.current_rerun()
+        if ctx is None or rerun is None:
+            return send(*args, **kwargs)
+
+        key = (ctx.session_id, rerun)
+        if self._is_superseded(*key):
+            with self._lock:
+                self.stats["skipped"] += 1
+            raise QueryCancelled(f"rerun {rerun} superseded before the query was sent")
+
+        headers = {"X-Query-Tag": self._tag(*key), "X-Statement-Timeout": str(STATEMENT_TIMEOUT_MS)}
+        with self._lock:
+            self.stats["queries"] += 1
+            self._inflight[key] = self._inflight.get(key, 0) + 1
+        try:
+            result = send(*args, headers=headers, **kwargs)
+        except APIError as e:
+            if _is_query_canceled(e):
+                self._record_canceled(key)
+                if self._is_superseded(*key):
+                    raise QueryCancelled(f"rerun {rerun} superseded") from e
+            raise
+        finally:
+            with self._lock:
+                self._inflight[key] -= 1
+                if not self._inflight[key]:
+                    del self._inflight[key]
+
+        # gather_rpc(return_exceptions=True) mengembalikan error sebagai elemen hasil.
+        if isinstance(result, list) and any(_is_query_canceled(item) for item in result):
+            for item in result:
+                if _is_query_canceled(item):
+                    self._record_canceled(key)
+            if self._is_superseded(*key):
+                raise QueryCancelled(f"rerun {rerun} superseded")
+        return result
+
+    def _record_canceled(self, key):
+        # Kode yang sama dipakai untuk pg_cancel_backend dan statement_timeout;
+        # dibedakan dari apakah rerun pengirim sudah digantikan.
+        session_id, rerun = key
+        with self._lock:
+            superseded = rerun < self._reruns.get(session_id, 0)
+            self.stats["cancelled" if superseded else "timeouts"] += 1
+
+_guard = QueryGuard()
+
+def get_query_guard() -> QueryGuard:
+    """QueryGuard bersama untuk proses ini."""
+    return _guard
+
+def format_query_guard_stats(guard: QueryGuard = None) -> str:
+    """Ringkasan metrik pembatalan dan timeout (untuk log)."""
+    stats = (guard or _guard).stats
+    return (f"{stats['queries']} query bertag, {stats['cancelled']} dibatalkan (digantikan rerun baru), "
+            f"{stats['skipped']} tidak dikirim, {stats['timeouts']} timeout, "
+            f"{stats['cancel_requests']} request pembatalan")
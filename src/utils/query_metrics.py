@@ -0,0 +1,216 @@
+# src/utils/query_metrics.py
+
+"""
+Instrumentasi query dashboard.
+
+Setiap pemanggilan run_query/run_sql/run_sql_batch/run_rpc_batch dicatat dengan halaman dan
+panel pemanggil, fingerprint query (SQL dengan literal dinormalisasi), latensi, jumlah baris,
+ukuran payload, dan apakah hasilnya berasal dari cache. Agregatnya (persentil latensi dsb.)
+tersedia per fingerprint lewat get_query_metrics().
+
+Query yang lebih lambat dari SLOW_QUERY_MS dicatat beserta SQL lengkapnya ke logger
+`slow_query`; set SLOW_QUERY_LOG_FILE untuk menuliskannya juga ke file.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from src.utils.http_transport import measure_response_bytes
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "1000"))
+SLOW_QUERY_LOG_FILE = os.environ.get("SLOW_QUERY_LOG_FILE")
+QUERY_METRICS_WINDOW = 500 # jumlah latensi terakhir per fingerprint yang dipakai untuk persentil
+QUERY_METRICS_RECENT = 200 # jumlah catatan terakhir yang disimpan utuh
+PERCENTILES = (50, 90, 99)
+
+slow_query_logger = logging.getLogger("slow_query")
+if SLOW_QUERY_LOG_FILE and not slow_query_logger.handlers:
+    _handler = logging.FileHandler(SLOW_QUERY_LOG_FILE)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_logger.addHandler(_handler)
+
+# --- Fingerprint ---
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ARRAY_LITERAL = re.compile(r"\bARRAY\s*\[\s*\?(?:\s*,\s*\?)*\s*\]", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(sql: str) -> str:
+    """
+    Mengganti literal string/angka dengan `?`, daftar nilai dengan `(?)` dan literal array
+    dengan `ARRAY[?]`, sehingga query yang sama dengan filter berbeda punya teks yang sama.
+
+    Contoh:
+        "WHERE fakultas IN ('STEI', 'FTI') AND jarak > 5" -> "WHERE fakultas IN (?) AND jarak > ?"
+        "hari_datang ILIKE ANY (ARRAY['%Senin%', '%Rabu%'])" -> "hari_datang ILIKE ANY (ARRAY[?])"
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _VALUE_LIST.sub("(?)", sql)
+    sql = _ARRAY_LITERAL.sub("ARRAY[?]", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def query_fingerprint(query: str) -> str:
+    """Hash pendek dari normalize_sql(query)."""
+    return hashlib.sha1(normalize_sql(query).encode()).hexdigest()[:12]
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+# --- Pemanggil ---
+
+def _find_caller():
+    """(halaman, fungsi) pertama di stack yang berasal dari modul src/pages/."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(("src.pages.", "pages.")):
+            return module.rsplit(".", 1)[-1], frame.f_code.co_name
+        frame = frame.f_back
+    return None, None
+
+class QueryMetrics:
+    """Agregat metrik query per fingerprint. Satu instance per proses, aman dipakai banyak thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_fingerprint = {}
+        self.recent = deque(maxlen=QUERY_METRICS_RECENT)
+
+    def record(self, kind: str, query: str, latency_ms: float, rows: int, payload_bytes: int,
+               cache_hit: bool, page: str = None, panel: str = None, detail: str = None):
+        """
+        Mencatat satu pemanggilan query.
+
+        Args:
+            kind (str): 'sql', 'select', 'sql_batch', atau 'rpc'.
+            query (str): Teks SQL (atau nama tabel/fungsi) yang dieksekusi.
+            latency_ms (float): Waktu tunggu pemanggil, termasuk pembacaan cache.
+            rows (int): Jumlah baris hasil.
+            payload_bytes (int): Ukuran respons (0 jika dari cache).
+            cache_hit (bool): True jika hasil tidak diambil dari database.
+            detail (str): Teks lengkap untuk slow-query log jika berbeda dari `query` (mis. parameter RPC).
+        """
+        fingerprint = query_fingerprint(query)
+        entry = {
+            "time": time.time(), "page": page, "panel": panel, "kind": kind, "fingerprint": fingerprint,
+            "latency_ms": latency_ms, "rows": rows, "bytes": payload_bytes, "cache_hit": cache_hit,
+        }
+        with self._lock:
+            stats = self._by_fingerprint.get(fingerprint)
+            if stats is None:
+                stats = self._by_fingerprint[fingerprint] = {
+                    "fingerprint": fingerprint, "kind": kind, "query": normalize_sql(query),
+                    "calls": 0, "hits": 0, "misses": 0, "slow": 0, "rows": 0, "bytes": 0,
+                    "panels": set(), "latencies": deque(maxlen=QUERY_METRICS_WINDOW),
+                }
+            stats["calls"] += 1
+            stats["hits" if cache_hit else "misses"] += 1
+            stats["rows"] += rows or 0
+            stats["bytes"] += payload_bytes or 0
+            if page or panel:
+                stats["panels"].add(f"{page}.{panel}")
+            # Persentil latensi hanya dari query yang benar-benar dikirim ke database.
+            if not cache_hit:
+                stats["latencies"].append(latency_ms)
+            slow = not cache_hit and latency_ms >= SLOW_QUERY_MS
+            if slow:
+                stats["slow"] += 1
+            self.recent.append(entry)
+
+        if slow:
+            slow_query_logger.warning(
+                f"SLOW_QUERY {latency_ms:.0f} ms [{fingerprint}] {page}.{panel} ({kind}, {rows} baris, "
+                f"{payload_bytes} byte)\n{detail or query}")
+        return entry
+
+    def percentiles(self, fingerprint: str) -> dict:
+        """Persentil latensi (ms) query `fingerprint`, mis. {'p50': 120.0, 'p90': 410.0, 'p99': 900.0}."""
+        with self._lock:
+            stats = self._by_fingerprint.get(fingerprint)
+            values = sorted(stats["latencies"]) if stats else []
+        return {f"p{pct}": _percentile(values, pct) for pct in PERCENTILES}
+
+    def profile(self, fingerprint: str):
+        """
+        Riwayat query `fingerprint` yang pernah dikirim ke database:
+        {'misses': n, 'p90': ms, 'avg_bytes': byte}, atau None jika belum pernah.
+        """
+        with self._lock:
+            stats = self._by_fingerprint.get(fingerprint)
+            if not stats or not stats["misses"]:
+                return None
+            values = sorted(stats["latencies"])
+            # Byte hanya tercatat saat miss, jadi rata-rata dihitung per miss.
+            return {"misses": stats["misses"], "p90": _percentile(values, 90),
+                    "avg_bytes": stats["bytes"] / stats["misses"]}
+
+    def summary(self) -> list:
+        """Agregat per fingerprint, diurutkan dari p90 terbesar."""
+        with self._lock:
+            rows = [{**{k: v for k, v in stats.items() if k not in ("latencies", "panels")},
+                     "panels": sorted(stats["panels"]), "latencies": sorted(stats["latencies"])}
+                    for stats in self._by_fingerprint.values()]
+        for row in rows:
+            latencies = row.pop("latencies")
+            row.update({f"p{pct}": _percentile(latencies, pct) for pct in PERCENTILES})
+            row["hit_ratio"] = row["hits"] / row["calls"] if row["calls"] else 0.0
+        return sorted(rows, key=lambda row: row["p90"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._by_fingerprint.clear()
+            self.recent.clear()
+
+_metrics = QueryMetrics()
+
+def get_query_metrics() -> QueryMetrics:
+    """QueryMetrics bersama untuk proses ini."""
+    return _metrics
+
+@contextmanager
+def track_query(kind: str, query: str, panel: str = None):
+    """
+    Mengukur satu pemanggilan query di dalam blok. Hasil dianggap dari cache jika
+    tidak ada respons HTTP yang diterima selama blok berjalan.
+
+    Contoh:
+        with track_query('sql', sql_query) as call:
+            df = _run_sql_cached(sql_query)
+            call['rows'] = len(df)
+    """
+    page, caller = _find_caller()
+    call = {"rows": 0}
+    start = time.perf_counter()
+    with measure_response_bytes() as sizes:
+        yield call
+    _metrics.record(kind, query, (time.perf_counter() - start) * 1000, call["rows"], sum(sizes),
+                    cache_hit=not sizes, page=page, panel=panel or caller)
+
+def record_batch_entry(kind: str, query: str, latency_ms: float, rows: int, payload_bytes: int,
+                       cache_hit: bool, panel: str, detail: str = None):
+    """Mencatat satu entri run_sql_batch/run_rpc_batch (halaman diambil dari stack pemanggil)."""
+    page, _ = _find_caller()
+    _metrics.record(kind, query, latency_ms, rows, payload_bytes, cache_hit, page=page, panel=panel, detail=detail)
+
+def format_query_metrics(metrics: QueryMetrics = None, top: int = 3) -> str:
+    """Ringkasan untuk log: total pemanggilan, rasio cache hit, dan fingerprint paling lambat."""
+    summary = (metrics or _metrics).summary()
+    calls = sum(row["calls"] for row in summary)
+    hits = sum(row["hits"] for row in summary)
+    slowest = ", ".join(f"[{row['fingerprint']}] p50 {row['p50']:.0f} ms / p90 {row['p90']:.0f} ms"
+                        for row in summary[:top] if row["misses"])
+    return (f"{calls} query ({hits} dari cache), {sum(row['slow'] for row in summary)} lambat"
+            + (f"; paling lambat: {slowest}" if slowest else ""))
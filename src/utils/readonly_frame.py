@@ -0,0 +1,173 @@
+# src/utils/readonly_frame.py
+
+"""
+DataFrame hanya-baca untuk hasil ber-cache yang dibagikan tanpa disalin.
+
+st.cache_data mem-pickle hasil saat disimpan dan membuat salinan baru di setiap cache hit.
+Untuk frame besar yang hanya dibaca (mis. emisi per mahasiswa di overview), salinan itu
+dibayar di setiap rerun. Dengan freeze_frame, frame disimpan sekali per proses dan semua
+pemanggil menerima objek yang sama, sehingga mutasi tidak sengaja harus gagal alih-alih diam-diam
+mengubah data semua sesi:
+- operasi yang mengubah struktur (df['x'] = ..., del, insert, pop, inplace=True, .loc/.iloc/.at/.iat
+  untuk menulis) melempar ReadOnlyFrameError;
+- buffer numpy setiap kolom ditandai tidak bisa ditulis, jadi penulisan lewat view
+  (mis. df['x'].values[0] = 1) gagal dengan ValueError dari numpy.
+
+Frame turunan (filter, groupby, copy(), assign(), ...) adalah DataFrame biasa yang boleh diubah.
+copy(deep=False) menghasilkan DataFrame biasa yang berbagi kolom tanpa menyalin; kolom baru
+boleh ditambahkan, kolom lama tetap hanya-baca.
+
+Karena isinya tidak berubah, sidik jari isi frame hanya-baca (frame_fingerprint) dihitung sekali
+lalu disimpan di frame itu.
+"""
+
+import hashlib
+import pickle
+
+import numpy as np
+import pandas as pd
+
+class ReadOnlyFrameError(TypeError):
+    """Percobaan mengubah frame hanya-baca yang dibagikan dari cache."""
+
+_INPLACE_METHODS = ("drop", "rename", "fillna", "replace", "sort_values", "sort_index", "reset_index",
+                    "set_index", "dropna", "drop_duplicates", "where", "mask", "clip", "interpolate",
+                    "ffill", "bfill", "eval", "query", "set_axis", "update")
+
+def _refuse(action: str):
+    raise ReadOnlyFrameError(
+        f"{action}: frame ini dibagikan dari cache dan hanya-baca. "
+        f"Buat salinan dulu (df.copy(), atau df.copy(deep=False) untuk menambah kolom tanpa menyalin data).")
+
+class _ReadOnlyIndexer:
+    """Pembungkus .loc/.iloc/.at/.iat yang hanya mengizinkan pembacaan."""
+
+    def __init__(self, name, indexer):
+        self._name = name
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        _refuse(f".{self._name}[...] = ...")
+
+    def __call__(self, *args, **kwargs):
+        return _ReadOnlyIndexer(self._name, self._indexer(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._indexer, name)
+
+class ReadOnlyFrame(pd.DataFrame):
+    """DataFrame yang tidak bisa diubah (lihat freeze_frame). Buffer kolomnya dikunci saat dibuat."""
+
+    _fingerprint = None # diisi frame_fingerprint saat pertama kali diminta
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for block in self._mgr.blocks:
+            _lock_array(block.values)
+
+    @property
+    def _constructor(self):
+        # Hasil operasi apa pun adalah DataFrame biasa.
+        return pd.DataFrame
+
+    def __setitem__(self, key, value):
+        _refuse(f"df[{key!r}] = ...")
+
+    def __delitem__(self, key):
+        _refuse(f"del df[{key!r}]")
+
+    def __setattr__(self, name, value):
+        if not name.startswith("_") and name in getattr(self, "columns", ()):
+            _refuse(f"df.{name} = ...")
+        super().__setattr__(name, value)
+
+    def insert(self, *args, **kwargs):
+        _refuse("df.insert(...)")
+
+    def pop(self, item):
+        _refuse(f"df.pop({item!r})")
+
+    def __reduce__(self):
+        # Pickle, dan hashing argumen st.cache_data (yang hanya mengenali tipe DataFrame persis),
+        # melihat DataFrame biasa yang dibekukan ulang saat dimuat.
+        return ReadOnlyFrame, (pd.DataFrame(self, copy=False),)
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer("loc", super().loc)
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer("iloc", super().iloc)
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer("at", super().at)
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer("iat", super().iat)
+
+def _make_inplace_guard(name):
+    method = getattr(pd.DataFrame, name)
+
+    def guarded(self, *args, **kwargs):
+        if kwargs.get("inplace"):
+            _refuse(f"df.{name}(..., inplace=True)")
+        return method(self, *args, **kwargs)
+
+    guarded.__name__ = name
+    guarded.__doc__ = method.__doc__
+    return guarded
+
+for _name in _INPLACE_METHODS:
+    setattr(ReadOnlyFrame, _name, _make_inplace_guard(_name))
+
+def _lock_array(values):
+    """Menandai buffer numpy di balik satu kolom/blok sebagai tidak bisa ditulis."""
+    if isinstance(values, np.ndarray):
+        values.flags.writeable = False
+    elif isinstance(values, pd.Categorical):
+        values._ndarray.flags.writeable = False # buffer kode kategori
+    elif hasattr(values, "_data") and hasattr(values, "_mask"): # Int64/boolean/Float (masked)
+        values._data.flags.writeable = False
+        values._mask.flags.writeable = False
+    elif hasattr(values, "_ndarray"): # string/datetime berbasis numpy
+        values._ndarray.flags.writeable = False
+
+def freeze_frame(df: pd.DataFrame) -> ReadOnlyFrame:
+    """
+    Versi hanya-baca dari `df` tanpa menyalin data. `df` tidak boleh dipakai lagi untuk
+    menulis setelahnya (buffer-nya ikut terkunci).
+    """
+    if isinstance(df, ReadOnlyFrame):
+        return df
+    return ReadOnlyFrame(df, copy=False)
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Ukuran data frame (byte), termasuk isi kolom object."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def frame_fingerprint(value) -> str:
+    """
+    Sidik jari isi DataFrame/Series: hash setiap baris (termasuk index), nama kolom, dan tipe.
+    O(ukuran frame), kecuali untuk ReadOnlyFrame yang menyimpan hasilnya setelah dihitung sekali.
+    """
+    if isinstance(value, ReadOnlyFrame) and value._fingerprint is not None:
+        return value._fingerprint
+    try:
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    except TypeError: # isi kolom tidak bisa di-hash (mis. list)
+        digest = hashlib.sha256(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    if isinstance(value, pd.DataFrame):
+        columns, dtypes = list(value.columns), list(value.dtypes)
+    else:
+        columns, dtypes = [value.name], [value.dtype]
+    digest.update(repr((columns, [str(dtype) for dtype in dtypes])).encode())
+    fingerprint = digest.hexdigest()[:32]
+    if isinstance(value, ReadOnlyFrame):
+        value._fingerprint = fingerprint
+    return fingerprint
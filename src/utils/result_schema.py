@@ -0,0 +1,80 @@
+# src/utils/result_schema.py
+
+"""
+Tipe kolom hasil query per panel, diterapkan sekali saat data diambil.
+
+Hasil exec_sql/RPC datang dari JSON (teks sebagai object, angka sebagai float64/int64).
+Dengan tipe yang tepat, frame yang di-cache lebih kecil dan operasi groupby/pivot/sort
+di halaman lebih cepat:
+- hari: kategori berurutan Senin..Minggu (sort_values('hari') langsung urut kalender)
+- dimensi teks lain: category
+- emisi: float32
+- jumlah/count: Int64 (nullable)
+
+Catatan untuk kode halaman: groupby/pivot_table pada kolom kategori harus memakai
+observed=True, supaya kategori yang tidak ada di data tidak muncul sebagai baris kosong.
+"""
+
+import pandas as pd
+
+DAY_ORDER = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+
+DAY = 'day'
+CATEGORY = 'category'
+EMISSION = 'float32'
+COUNT = 'Int64'
+
+# float32 hanya presisi ~7 digit; format ini mencegah artefak seperti 14.900001 di ekspor CSV.
+CSV_FLOAT_FORMAT = '%.7g'
+
+RESULT_SCHEMAS = {
+    # Halaman transportasi
+    'transportation.daily': {'hari': DAY, 'emisi': EMISSION},
+    'transportation.faculty': {'fakultas': CATEGORY, 'total_emisi': EMISSION, 'count': COUNT},
+    'transportation.composition': {'transportasi': CATEGORY, 'total_users': COUNT, 'total_emisi': EMISSION},
+    'transportation.heatmap': {'hari': DAY, 'transportasi': CATEGORY, 'pengguna': COUNT},
+    'transportation.kecamatan': {'kecamatan': CATEGORY, 'rata_rata_emisi': EMISSION, 'jumlah_mahasiswa': COUNT, 'total_emisi': EMISSION},
+    'transportation.unique_students': {'count': COUNT},
+    # Halaman elektronik
+    'electronic.daily': {'hari': DAY, 'total_emisi': EMISSION},
+    'electronic.faculty': {'fakultas': CATEGORY, 'total_emisi': EMISSION, 'total_count': COUNT},
+    'electronic.devices': {'device': CATEGORY, 'emisi': EMISSION},
+    'electronic.heatmap': {'hari': DAY, 'time_range': CATEGORY, 'total_emisi': EMISSION},
+    'electronic.classroom': {'lokasi': CATEGORY, 'session_count': COUNT, 'total_emisi': EMISSION, 'avg_emisi_per_session': EMISSION},
+    'electronic.unique_students': {'count': COUNT},
+    # Halaman sampah makanan
+    'food_drink_waste.daily': {'hari': DAY, 'total_emisi': EMISSION, 'activity_count': COUNT},
+    'food_drink_waste.faculty': {'fakultas': CATEGORY, 'total_emisi': EMISSION, 'activity_count': COUNT},
+    'food_drink_waste.period': {'meal_period': CATEGORY, 'activity_count': COUNT, 'total_emisi': EMISSION},
+    'food_drink_waste.heatmap': {'lokasi': CATEGORY, 'time_slot': CATEGORY, 'total_emisi': EMISSION},
+    'food_drink_waste.canteen': {'lokasi': CATEGORY, 'total_emisi': EMISSION, 'avg_emisi': EMISSION, 'activity_count': COUNT},
+    # Dashboard utama
+    'overview.periodic': {'fakultas': CATEGORY, 'transportasi': EMISSION, 'elektronik': EMISSION, 'sampah_makanan': EMISSION},
+    'overview.daily': {'fakultas': CATEGORY, 'hari': DAY, 'kategori': CATEGORY, 'emisi': EMISSION},
+}
+
+def _to_day(series: pd.Series) -> pd.Series:
+    """Kategori hari berurutan. Nilai di luar DAY_ORDER tetap disimpan (di urutan akhir)."""
+    values = series.str.strip()
+    extra = sorted(set(values.dropna()) - set(DAY_ORDER))
+    return values.astype(pd.CategoricalDtype(DAY_ORDER + extra, ordered=True))
+
+def apply_schema(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Mengubah tipe kolom `df` sesuai RESULT_SCHEMAS[name].
+    Kolom yang tidak ada di `df` (mis. hasil kosong karena error) dilewati.
+    """
+    schema = RESULT_SCHEMAS.get(name)
+    if not schema or df.empty:
+        return df
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        df[col] = _to_day(df[col]) if dtype == DAY else df[col].astype(dtype)
+    return df
+
+def apply_panel_schemas(panel_data: dict, page: str) -> dict:
+    """apply_schema untuk setiap panel di hasil get_panel_data halaman `page`."""
+    return {name: apply_schema(df, f"{page}.{name}") if df is not None else df
+            for name, df in panel_data.items()}
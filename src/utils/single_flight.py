@@ -0,0 +1,107 @@
+# src/utils/single_flight.py
+
+"""
+Penggabungan (single-flight) eksekusi query identik yang berjalan bersamaan.
+
+Saat banyak sesi membuka halaman yang sama bersamaan (mis. saat presentasi, atau tepat setelah
+versi data berubah), setiap sesi menemukan cache kosong untuk query yang sama. Dengan
+SingleFlight hanya pemanggil pertama (leader) yang mengirim query; pemanggil lain dengan kunci
+yang sama (teks query + versi data), dari sesi atau thread mana pun di proses ini, menunggu
+eksekusi itu dan memakai hasilnya.
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import threading
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    Eksekusi yang sedang berjalan per kunci.
+
+    Contoh:
+        flight = SingleFlight()
+        df = flight.do(("sql", sql_query, version), lambda: fetch(sql_query))
+
+    Untuk batch (satu request berisi banyak entri) pakai begin/finish per entri:
+        call, leader = flight.begin(key)
+        if leader:
+            flight.finish(key, call, result=df)   # atau error=e; wajib dipanggil
+        else:
+            df = flight.wait(call)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"executions": 0, "coalesced": 0, "retried": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def begin(self, key):
+        """(call, True) jika pemanggil menjadi leader untuk `key`, selain itu (call leader, False)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.stats["coalesced"] += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.stats["executions"] += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error: BaseException = None):
+        """Menyelesaikan eksekusi leader dan membangunkan semua follower."""
+        call.result, call.error = result, error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    @staticmethod
+    def wait(call):
+        """Hasil eksekusi leader; exception leader dilempar ulang."""
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn, retry_on=()):
+        """
+        Menjalankan `fn()` sekali untuk semua pemanggil `key` yang bersamaan.
+
+        Args:
+            retry_on: Exception leader yang tidak berlaku untuk follower (mis. query leader
+                dibatalkan karena sesinya rerun); follower lalu mencoba lagi sendiri.
+        """
+        while True:
+            call, leader = self.begin(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self.finish(key, call, error=e)
+                    raise
+                self.finish(key, call, result=result)
+                return result
+            try:
+                return self.wait(call)
+            except retry_on:
+                with self._lock:
+                    self.stats["retried"] += 1
+
+def format_single_flight_stats(flight: SingleFlight) -> str:
+    """Ringkasan penggabungan query (untuk log)."""
+    stats = flight.stats
+    return (f"{stats['executions']} eksekusi, {stats['coalesced']} pemanggil digabung "
+            f"({stats['retried']} diulang, {flight.in_flight} berjalan)")
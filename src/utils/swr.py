@@ -0,0 +1,311 @@
+# src/utils/swr.py
+
+"""
+Stale-while-revalidate untuk hasil query ber-cache.
+
+Entri cache menjadi usang (stale) ketika versi data berubah (lihat data_version.py) atau,
+jika fungsi memakai `fresh_for`, setelah umurnya melewati `fresh_for` detik. Selama belum
+usang lebih dari `max_stale` detik, entri usang langsung dikembalikan dan diperbarui oleh
+thread latar (paling banyak satu pembaruan per kunci); nilai baru menggantikannya begitu
+siap. Entri yang terlalu usang diperlakukan seperti tidak ada: pemanggil menunggu query baru.
+
+Hasil yang dihitung dari data usang tidak boleh di-cache sebagai hasil versi baru. Setiap
+pembacaan usang dicatat (record_stale_read) supaya cache di lapisan atas (mis. laporan PDF)
+bisa melewatkan penyimpanan hasil itu (lihat track_stale_reads).
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from src.utils.cache_budget import CompressedValue
+
+SWR_REFRESH_WORKERS = int(os.environ.get("SWR_REFRESH_WORKERS", "2"))
+THREAD_NAME_PREFIX = "swr_refresh"
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+# Daftar pembacaan usang di dalam blok track_stale_reads (per thread), dan penanda blok fresh_only.
+_stale_reads = contextvars.ContextVar("stale_reads", default=None)
+_fresh_only = contextvars.ContextVar("fresh_only", default=False)
+
+@contextmanager
+def track_stale_reads():
+    """
+    Mengumpulkan pembacaan usang yang terjadi di dalam blok.
+
+    Contoh:
+        with track_stale_reads() as stale_reads:
+            result = build_report()
+        if not stale_reads:
+            cache[key] = result
+    """
+    reads = []
+    token = _stale_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _stale_reads.reset(token)
+
+def record_stale_read(key=None):
+    """Mencatat bahwa nilai usang dipakai (untuk blok track_stale_reads yang sedang aktif)."""
+    reads = _stale_reads.get()
+    if reads is not None:
+        reads.append(key)
+
+@contextmanager
+def fresh_only():
+    """Di dalam blok ini entri usang tidak disajikan; pemanggil menunggu nilai baru (mis. cache warmer)."""
+    token = _fresh_only.set(True)
+    try:
+        yield
+    finally:
+        _fresh_only.reset(token)
+
+def stale_reads_allowed() -> bool:
+    return not _fresh_only.get()
+
+class _MissingContextFilter(logging.Filter):
+    def __init__(self, thread_name_prefix: str):
+        super().__init__()
+        self.thread_name_prefix = thread_name_prefix
+
+    def filter(self, record):
+        return not record.threadName.startswith(self.thread_name_prefix)
+
+def ignore_missing_script_context(thread_name_prefix: str):
+    """
+    Thread latar (pembaruan SWR, cache warmer) berjalan tanpa ScriptRunContext; peringatan
+    Streamlit soal itu tidak relevan untuk thread dengan awalan nama `thread_name_prefix`.
+    """
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        _MissingContextFilter(thread_name_prefix))
+
+ignore_missing_script_context(THREAD_NAME_PREFIX)
+
+class _Entry:
+    __slots__ = ("value", "version", "stored_at", "stale_since")
+
+    def __init__(self, value, version, stored_at):
+        self.value = value
+        self.version = version
+        self.stored_at = stored_at
+        self.stale_since = None
+
+class SwrStore:
+    """
+    Penyimpanan {kunci: nilai} per versi data dengan lock, dibatasi `max_entries` (LRU).
+    Entri versi lama tidak dibuang saat versi berubah, supaya masih bisa disajikan sebagai
+    nilai usang sampai pembaruannya selesai.
+
+    Args:
+        disk: Tier kedua opsional dengan get(kunci) -> (versi, nilai, waktu tulis epoch) | None
+            dan set(kunci, versi, nilai) (lihat disk_cache.ParquetDiskCache). Entri yang tidak
+            ada di memori dicari di sana, dan setiap set ikut ditulis ke sana.
+        disk_prefix (str): Awalan kunci di tier disk (membedakan penyimpanan yang memakai disk yang sama).
+        budget: CacheBudget opsional (lihat cache_budget.py) yang membatasi total byte semua
+            penyimpanan; entri bisa dikompres atau dibuang olehnya.
+        name (str): Nama penyimpanan di laporan pemakaian anggaran.
+    """
+
+    def __init__(self, max_entries: int = None, disk=None, disk_prefix: str = "", budget=None, name: str = ""):
+        self.max_entries = max_entries
+        self.disk = disk
+        self.disk_prefix = disk_prefix
+        self.budget = budget
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key, version, fresh_for: float = None, max_stale: float = 0):
+        """
+        Mengembalikan (nilai, status) dengan status FRESH, STALE, atau MISS (nilai None).
+
+        Args:
+            version: Versi data saat ini; entri versi lain usang sejak pertama kali terlihat.
+            fresh_for (float): Umur maksimum entri yang masih segar (detik); None berarti
+                segar sampai versi data berubah.
+            max_stale (float): Berapa lama (detik) entri usang masih boleh disajikan.
+        """
+        with self._lock:
+            found = key in self._entries
+        if not found and self.disk is not None:
+            loaded = self.disk.get(self.disk_prefix + key)
+            if loaded is not None:
+                stored_version, value, written_at = loaded
+                entry = _Entry(value, stored_version, time.monotonic() - max(0.0, time.time() - written_at))
+                with self._lock:
+                    inserted = key not in self._entries
+                    dropped = self._insert(key, entry) if inserted else []
+                self._release(dropped)
+                if inserted:
+                    self._charge(key, entry)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, MISS
+            if entry.version != version and entry.stale_since is None:
+                entry.stale_since = now
+            stale_since = entry.stale_since
+            if fresh_for is not None and now - entry.stored_at >= fresh_for:
+                expired_at = entry.stored_at + fresh_for
+                stale_since = expired_at if stale_since is None else min(stale_since, expired_at)
+            if stale_since is None:
+                state = FRESH
+            elif now - stale_since < max_stale:
+                state = STALE
+            else:
+                del self._entries[key]
+                state = MISS
+            if state != MISS:
+                self._entries.move_to_end(key)
+            value = entry.value
+        if state == MISS:
+            self._release([(key, entry)])
+            return None, MISS
+        if isinstance(value, CompressedValue):
+            value = self._inflate(key, entry, value)
+        elif self.budget is not None:
+            self.budget.touch(self, key)
+        return value, state
+
+    def set(self, key, version, value, cost: float = 0.0):
+        """Menyimpan `value`; `cost` adalah lama menghitungnya (detik), untuk anggaran byte."""
+        entry = _Entry(value, version, time.monotonic())
+        with self._lock:
+            dropped = self._insert(key, entry)
+        self._release(dropped)
+        self._charge(key, entry, cost) # menggantikan catatan nilai lama untuk `key`
+        if self.disk is not None:
+            self.disk.set(self.disk_prefix + key, version, value)
+
+    def _insert(self, key, entry):
+        """Memasukkan entri; mengembalikan [(kunci, entri)] yang dibuang karena max_entries."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        dropped = []
+        while self.max_entries is not None and len(self._entries) > self.max_entries:
+            dropped.append(self._entries.popitem(last=False))
+        return dropped
+
+    def _charge(self, key, entry, cost: float = 0.0):
+        if self.budget is not None:
+            self.budget.charge(self, key, entry.value, cost=cost)
+
+    def _release(self, dropped):
+        if self.budget is not None:
+            for key, entry in dropped:
+                self.budget.release(self, key, id(entry.value))
+
+    def _inflate(self, key, entry, packed):
+        """Dekompresi entri yang dikompres anggaran; entri kembali disimpan utuh."""
+        value = packed.unpack()
+        with self._lock:
+            replaced = self._entries.get(key) is entry and entry.value is packed
+            if replaced:
+                entry.value = value
+        if replaced and self.budget is not None:
+            self.budget.charge(self, key, value, compressed=False)
+        return value
+
+    def _evict_charged(self, key, value_id) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or id(entry.value) != value_id:
+                return False
+            del self._entries[key]
+        self.budget.release(self, key, value_id)
+        return True
+
+    def _compress_charged(self, key, value_id):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or id(entry.value) != value_id:
+                return
+            value = entry.value
+        packed = CompressedValue.pack(value)
+        with self._lock:
+            replaced = self._entries.get(key) is entry and entry.value is value
+            if replaced:
+                entry.value = packed
+        if replaced:
+            self.budget.charge(self, key, packed, compressed=True)
+
+    def clear(self):
+        """Mengosongkan memori; tier disk tidak ikut dihapus."""
+        with self._lock:
+            self._entries.clear()
+        if self.budget is not None:
+            self.budget.release_all(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+class Revalidator:
+    """
+    Menjalankan pembaruan entri usang di thread latar, paling banyak satu per kunci.
+    Pembaruan berjalan di dalam fresh_only, jadi tidak ikut memakai nilai usang lain.
+    """
+
+    def __init__(self, max_workers: int = SWR_REFRESH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=THREAD_NAME_PREFIX)
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self.stats = {"stale_served": 0, "refreshes": 0, "deduplicated": 0, "failed": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def serve_stale(self, key, value, refresh):
+        """
+        Mencatat penyajian nilai usang `value`, menjadwalkan `refresh()`, dan mengembalikan `value`
+        (bukan salinan; pemanggil yang menyalin jika perlu).
+        """
+        with self._lock:
+            self.stats["stale_served"] += 1
+        self.schedule(key, refresh)
+        record_stale_read(key)
+        return value
+
+    def schedule(self, key, refresh) -> bool:
+        """Menjadwalkan `refresh()` untuk `key`; False jika pembaruan kunci itu sudah berjalan."""
+        with self._lock:
+            if key in self._in_flight:
+                self.stats["deduplicated"] += 1
+                return False
+            self._in_flight.add(key)
+        self._executor.submit(self._run, key, refresh)
+        return True
+
+    def _run(self, key, refresh):
+        try:
+            with fresh_only():
+                refresh()
+            with self._lock:
+                self.stats["refreshes"] += 1
+        except Exception as e:
+            # Entri usang tetap disajikan; akses berikutnya menjadwalkan pembaruan lagi.
+            logging.warning(f"SWR: refresh of {str(key)[:100]} failed: {e}")
+            with self._lock:
+                self.stats["failed"] += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+def format_swr_stats(revalidator: Revalidator) -> str:
+    """Ringkasan stale-while-revalidate (untuk log)."""
+    stats = revalidator.stats
+    return (f"{stats['stale_served']} nilai usang disajikan, {stats['refreshes']} diperbarui di latar "
+            f"({stats['deduplicated']} digabung, {stats['failed']} gagal, {revalidator.in_flight} berjalan)")
@@ -0,0 +1,329 @@
+-- supabase/migrations/20261019000000_dashboard_panel_functions_v1.sql
+--
+-- Fungsi bertipe untuk setiap panel dashboard (versi 1).
+-- Klien hanya mengirim parameter filter (bukan teks SQL), sehingga Postgres bisa
+-- memakai ulang plan per fungsi. Array filter kosong/NULL berarti "tanpa filter".
+-- Versi baru dibuat sebagai fungsi *_v2 dst. supaya klien lama tetap berjalan.
+
+-- ============================================================
+-- Helper filter
+-- ============================================================
+
+-- TRUE jika `hari_datang` (mis. 'Senin, Rabu') memuat salah satu hari di p_days.
+CREATE OR REPLACE FUNCTION public.dashboard_match_days_v1(hari_datang text, p_days text[])
+RETURNS boolean LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(cardinality(p_days), 0) = 0
+        OR EXISTS (SELECT 1 FROM unnest(p_days) d WHERE hari_datang ILIKE '%' || d || '%')
+$$;
+
+-- TRUE jika mahasiswa termasuk salah satu fakultas di p_fakultas.
+CREATE OR REPLACE FUNCTION public.dashboard_match_fakultas_v1(p_id_mahasiswa bigint, p_fakultas text[])
+RETURNS boolean LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(cardinality(p_fakultas), 0) = 0
+        OR EXISTS (
+            SELECT 1 FROM public.v_informasi_fakultas_mahasiswa r
+            WHERE r.id_mahasiswa = p_id_mahasiswa AND r.fakultas = ANY(p_fakultas)
+        )
+$$;
+
+-- Emisi harian perangkat pribadi (kg CO2) untuk perangkat yang dipilih. Satu-satunya tempat daya
+-- perangkat dan faktor emisi di migrasi ini; harus sama dengan src/utils/emission_factors.py
+-- (diperiksa tests/test_panel_parity.py).
+CREATE OR REPLACE FUNCTION public.electronic_personal_emission_v1(
+    durasi_hp double precision, durasi_laptop double precision, durasi_tab double precision, p_devices text[])
+RETURNS double precision LANGUAGE sql IMMUTABLE AS $$
+    SELECT ((CASE WHEN 'HP' = ANY(p_devices) THEN COALESCE(durasi_hp, 0) * 4 ELSE 0 END
+           + CASE WHEN 'Laptop' = ANY(p_devices) THEN COALESCE(durasi_laptop, 0) * 50 ELSE 0 END
+           + CASE WHEN 'Tablet' = ANY(p_devices) THEN COALESCE(durasi_tab, 0) * 10 ELSE 0 END) * 0.829 / 1000)
+$$;
+
+-- Emisi fasilitas (AC/lampu) untuk perangkat yang dipilih.
+CREATE OR REPLACE FUNCTION public.electronic_facility_emission_v1(
+    emisi_ac double precision, emisi_lampu double precision, p_devices text[])
+RETURNS double precision LANGUAGE sql IMMUTABLE AS $$
+    SELECT (CASE WHEN 'AC' = ANY(p_devices) THEN COALESCE(emisi_ac, 0) ELSE 0 END
+          + CASE WHEN 'Lampu' = ANY(p_devices) THEN COALESCE(emisi_lampu, 0) ELSE 0 END)
+$$;
+
+-- ============================================================
+-- Transportasi
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.transport_daily_trend_v1(p_modes text[], p_fakultas text[], p_days text[])
+RETURNS TABLE (hari text, emisi double precision) LANGUAGE sql STABLE AS $$
+    SELECT TRIM(unnest(string_to_array(t.hari_datang, ',')))::text AS hari,
+           SUM(t.emisi_transportasi)::double precision AS emisi
+    FROM public.transportasi t
+    WHERE (COALESCE(cardinality(p_modes), 0) = 0 OR t.transportasi = ANY(p_modes))
+      AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+      AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+    GROUP BY 1
+$$;
+
+CREATE OR REPLACE FUNCTION public.transport_faculty_emissions_v1(p_modes text[], p_fakultas text[], p_days text[])
+RETURNS TABLE (fakultas text, total_emisi double precision, count bigint) LANGUAGE sql STABLE AS $$
+    SELECT r.fakultas::text,
+           SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi)::double precision AS total_emisi,
+           COUNT(DISTINCT t.id_mahasiswa) AS count
+    FROM public.transportasi t
+    JOIN public.v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+    WHERE (COALESCE(cardinality(p_modes), 0) = 0 OR t.transportasi = ANY(p_modes))
+      AND (COALESCE(cardinality(p_fakultas), 0) = 0 OR r.fakultas = ANY(p_fakultas))
+      AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+    GROUP BY r.fakultas
+    ORDER BY total_emisi ASC
+$$;
+
+CREATE OR REPLACE FUNCTION public.transport_composition_v1(p_modes text[], p_fakultas text[], p_days text[])
+RETURNS TABLE (transportasi text, total_users bigint, total_emisi double precision) LANGUAGE sql STABLE AS $$
+    SELECT t.transportasi::text,
+           COUNT(DISTINCT t.id_mahasiswa) AS total_users,
+           SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi)::double precision AS total_emisi
+    FROM public.transportasi t
+    WHERE (COALESCE(cardinality(p_modes), 0) = 0 OR t.transportasi = ANY(p_modes))
+      AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+      AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+    GROUP BY t.transportasi
+$$;
+
+CREATE OR REPLACE FUNCTION public.transport_heatmap_v1(p_modes text[], p_fakultas text[], p_days text[])
+RETURNS TABLE (hari text, transportasi text, pengguna bigint) LANGUAGE sql STABLE AS $$
+    SELECT TRIM(unnest(string_to_array(t.hari_datang, ',')))::text AS hari,
+           t.transportasi::text,
+           COUNT(t.id_mahasiswa) AS pengguna
+    FROM public.transportasi t
+    WHERE (COALESCE(cardinality(p_modes), 0) = 0 OR t.transportasi = ANY(p_modes))
+      AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+      AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+    GROUP BY 1, t.transportasi
+$$;
+
+CREATE OR REPLACE FUNCTION public.transport_kecamatan_v1(p_modes text[], p_fakultas text[], p_days text[])
+RETURNS TABLE (kecamatan text, rata_rata_emisi double precision, jumlah_mahasiswa bigint, total_emisi double precision)
+LANGUAGE sql STABLE AS $$
+    SELECT t.kecamatan::text,
+           AVG(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi)::double precision AS rata_rata_emisi,
+           COUNT(DISTINCT t.id_mahasiswa) AS jumlah_mahasiswa,
+           SUM(COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) * t.emisi_transportasi)::double precision AS total_emisi
+    FROM public.transportasi t
+    WHERE (COALESCE(cardinality(p_modes), 0) = 0 OR t.transportasi = ANY(p_modes))
+      AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+      AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+      AND t.kecamatan IS NOT NULL AND t.kecamatan <> ''
+    GROUP BY t.kecamatan
+    ORDER BY jumlah_mahasiswa DESC
+    LIMIT 8
+$$;
+
+-- KPI satu nilai dikembalikan sebagai json [{"count": n}]: PostgREST menganggap fungsi
+-- dengan satu kolom output sebagai skalar, sehingga bentuk responsnya berbeda dari panel lain.
+CREATE OR REPLACE FUNCTION public.transport_unique_students_v1(p_modes text[], p_fakultas text[], p_days text[])
+RETURNS json LANGUAGE sql STABLE AS $$
+    SELECT json_build_array(json_build_object('count', COUNT(DISTINCT t.id_mahasiswa)))
+    FROM public.transportasi t
+    WHERE (COALESCE(cardinality(p_modes), 0) = 0 OR t.transportasi = ANY(p_modes))
+      AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+      AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+$$;
+
+-- ============================================================
+-- Elektronik
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.electronic_daily_trend_v1(p_fakultas text[], p_days text[], p_devices text[])
+RETURNS TABLE (hari text, total_emisi double precision) LANGUAGE sql STABLE AS $$
+    WITH personal_daily AS (
+        SELECT TRIM(unnest(string_to_array(t.hari_datang, ','))) AS hari,
+               SUM(public.electronic_personal_emission_v1(t.durasi_hp, t.durasi_laptop, t.durasi_tab, p_devices)) AS emisi
+        FROM public.elektronik t
+        WHERE p_devices && ARRAY['HP', 'Laptop', 'Tablet']
+          AND t.hari_datang IS NOT NULL AND TRIM(t.hari_datang) <> ''
+          AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+          AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+        GROUP BY 1
+    ), facility_daily AS (
+        SELECT a.hari,
+               SUM(public.electronic_facility_emission_v1(a.emisi_ac, a.emisi_lampu, p_devices)) AS emisi
+        FROM public.aktivitas_harian a
+        WHERE p_devices && ARRAY['AC', 'Lampu']
+          AND a.hari IS NOT NULL AND TRIM(a.hari) <> ''
+          AND (COALESCE(cardinality(p_days), 0) = 0 OR a.hari = ANY(p_days))
+          AND public.dashboard_match_fakultas_v1(a.id_mahasiswa, p_fakultas)
+        GROUP BY a.hari
+    )
+    SELECT COALESCE(p.hari, f.hari)::text AS hari,
+           (COALESCE(p.emisi, 0) + COALESCE(f.emisi, 0))::double precision AS total_emisi
+    FROM personal_daily p FULL OUTER JOIN facility_daily f ON p.hari = f.hari
+$$;
+
+CREATE OR REPLACE FUNCTION public.electronic_faculty_emissions_v1(p_fakultas text[], p_days text[], p_devices text[])
+RETURNS TABLE (fakultas text, total_emisi double precision, total_count bigint) LANGUAGE sql STABLE AS $$
+    WITH personal_agg AS (
+        SELECT r.fakultas,
+               SUM(public.electronic_personal_emission_v1(t.durasi_hp, t.durasi_laptop, t.durasi_tab, p_devices)
+                   * COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0)) AS emisi
+        FROM public.elektronik t
+        JOIN public.v_informasi_fakultas_mahasiswa r ON t.id_mahasiswa = r.id_mahasiswa
+        WHERE p_devices && ARRAY['HP', 'Laptop', 'Tablet']
+          AND public.dashboard_match_days_v1(t.hari_datang, p_days)
+          AND (COALESCE(cardinality(p_fakultas), 0) = 0 OR r.fakultas = ANY(p_fakultas))
+        GROUP BY r.fakultas
+    ), facility_agg AS (
+        SELECT r.fakultas,
+               SUM(public.electronic_facility_emission_v1(a.emisi_ac, a.emisi_lampu, p_devices)) AS emisi
+        FROM public.aktivitas_harian a
+        JOIN public.v_informasi_fakultas_mahasiswa r ON a.id_mahasiswa = r.id_mahasiswa
+        WHERE p_devices && ARRAY['AC', 'Lampu']
+          AND (COALESCE(cardinality(p_days), 0) = 0 OR a.hari = ANY(p_days))
+          AND (COALESCE(cardinality(p_fakultas), 0) = 0 OR r.fakultas = ANY(p_fakultas))
+        GROUP BY r.fakultas
+    ), responden_count AS (
+        SELECT r.fakultas, COUNT(DISTINCT r.id_mahasiswa) AS total_count
+        FROM public.v_informasi_fakultas_mahasiswa r
+        GROUP BY r.fakultas
+    )
+    SELECT COALESCE(p.fakultas, f.fakultas)::text AS fakultas,
+           (COALESCE(p.emisi, 0) + COALESCE(f.emisi, 0))::double precision AS total_emisi,
+           rc.total_count
+    FROM personal_agg p
+    FULL OUTER JOIN facility_agg f ON p.fakultas = f.fakultas
+    JOIN responden_count rc ON rc.fakultas = COALESCE(p.fakultas, f.fakultas)
+    ORDER BY total_emisi ASC
+$$;
+
+CREATE OR REPLACE FUNCTION public.electronic_device_emissions_v1(p_fakultas text[], p_days text[])
+RETURNS TABLE (device text, emisi double precision) LANGUAGE sql STABLE AS $$
+    WITH personal AS (
+        SELECT t.*, COALESCE(array_length(string_to_array(t.hari_datang, ','), 1), 0) AS n_hari
+        FROM public.elektronik t
+        WHERE public.dashboard_match_days_v1(t.hari_datang, p_days)
+          AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+    ), facility AS (
+        SELECT a.*
+        FROM public.aktivitas_harian a
+        WHERE (COALESCE(cardinality(p_days), 0) = 0 OR a.hari = ANY(p_days))
+          AND public.dashboard_match_fakultas_v1(a.id_mahasiswa, p_fakultas)
+    )
+    SELECT 'Laptop', SUM(public.electronic_personal_emission_v1(durasi_hp, durasi_laptop, durasi_tab, ARRAY['Laptop']) * n_hari)::double precision FROM personal UNION ALL
+    SELECT 'HP', SUM(public.electronic_personal_emission_v1(durasi_hp, durasi_laptop, durasi_tab, ARRAY['HP']) * n_hari)::double precision FROM personal UNION ALL
+    SELECT 'Tablet', SUM(public.electronic_personal_emission_v1(durasi_hp, durasi_laptop, durasi_tab, ARRAY['Tablet']) * n_hari)::double precision FROM personal UNION ALL
+    SELECT 'AC', SUM(COALESCE(emisi_ac, 0))::double precision FROM facility UNION ALL
+    SELECT 'Lampu', SUM(COALESCE(emisi_lampu, 0))::double precision FROM facility
+$$;
+
+CREATE OR REPLACE FUNCTION public.electronic_heatmap_v1(p_fakultas text[], p_days text[], p_devices text[])
+RETURNS TABLE (hari text, time_range text, total_emisi double precision) LANGUAGE sql STABLE AS $$
+    SELECT a.hari::text,
+           CONCAT(SPLIT_PART(a.waktu, '-', 1), ':00-', SPLIT_PART(a.waktu, '-', 2), ':00') AS time_range,
+           SUM(public.electronic_facility_emission_v1(a.emisi_ac, a.emisi_lampu, p_devices))::double precision AS total_emisi
+    FROM public.aktivitas_harian a
+    WHERE (COALESCE(cardinality(p_days), 0) = 0 OR a.hari = ANY(p_days))
+      AND public.dashboard_match_fakultas_v1(a.id_mahasiswa, p_fakultas)
+    GROUP BY a.hari, 2
+$$;
+
+CREATE OR REPLACE FUNCTION public.electronic_classroom_v1(p_fakultas text[], p_days text[], p_devices text[])
+RETURNS TABLE (lokasi text, session_count bigint, total_emisi double precision) LANGUAGE sql STABLE AS $$
+    SELECT a.lokasi::text,
+           COUNT(*) AS session_count,
+           SUM(public.electronic_facility_emission_v1(a.emisi_ac, a.emisi_lampu, p_devices))::double precision AS total_emisi
+    FROM public.aktivitas_harian a
+    WHERE (COALESCE(cardinality(p_days), 0) = 0 OR a.hari = ANY(p_days))
+      AND public.dashboard_match_fakultas_v1(a.id_mahasiswa, p_fakultas)
+      AND a.kegiatan ILIKE '%kelas%'
+    GROUP BY a.lokasi
+    ORDER BY session_count DESC
+    LIMIT 10
+$$;
+
+-- Lihat catatan json pada transport_unique_students_v1.
+-- Catatan: tanpa filter apa pun, query SQL lama tidak menerapkan syarat "durasi/emisi > 0"
+-- (syaratnya jatuh ke klausa ON dari LEFT JOIN). Perilaku itu dipertahankan di sini.
+CREATE OR REPLACE FUNCTION public.electronic_unique_students_v1(p_fakultas text[], p_days text[])
+RETURNS json LANGUAGE sql STABLE AS $$
+    WITH filtered_students AS (
+        SELECT t.id_mahasiswa FROM public.elektronik t
+        WHERE public.dashboard_match_days_v1(t.hari_datang, p_days)
+          AND public.dashboard_match_fakultas_v1(t.id_mahasiswa, p_fakultas)
+          AND (COALESCE(cardinality(p_days), 0) + COALESCE(cardinality(p_fakultas), 0) = 0
+               OR COALESCE(t.durasi_hp, 0) > 0 OR COALESCE(t.durasi_laptop, 0) > 0 OR COALESCE(t.durasi_tab, 0) > 0)
+        UNION
+        SELECT a.id_mahasiswa FROM public.aktivitas_harian a
+        WHERE (COALESCE(cardinality(p_days), 0) = 0 OR a.hari = ANY(p_days))
+          AND public.dashboard_match_fakultas_v1(a.id_mahasiswa, p_fakultas)
+          AND (COALESCE(cardinality(p_days), 0) + COALESCE(cardinality(p_fakultas), 0) = 0
+               OR COALESCE(a.emisi_ac, 0) > 0 OR COALESCE(a.emisi_lampu, 0) > 0)
+    )
+    SELECT json_build_array(json_build_object('count', COUNT(DISTINCT id_mahasiswa))) FROM filtered_students
+$$;
+
+-- ============================================================
+-- Sampah makanan
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.food_daily_trend_v1(p_days text[], p_periods text[], p_fakultas text[])
+RETURNS TABLE (hari text, total_emisi double precision, activity_count bigint) LANGUAGE sql STABLE AS $$
+    SELECT m.hari::text,
+           SUM(m.emisi_sampah_makanan_per_waktu)::double precision AS total_emisi,
+           COUNT(m.id_mahasiswa) AS activity_count
+    FROM public.v_aktivitas_makanan m
+    WHERE (COALESCE(cardinality(p_days), 0) = 0 OR m.hari = ANY(p_days))
+      AND (COALESCE(cardinality(p_periods), 0) = 0 OR m.meal_period = ANY(p_periods))
+      AND public.dashboard_match_fakultas_v1(m.id_mahasiswa, p_fakultas)
+    GROUP BY m.hari
+$$;
+
+CREATE OR REPLACE FUNCTION public.food_faculty_emissions_v1(p_days text[], p_periods text[], p_fakultas text[])
+RETURNS TABLE (fakultas text, total_emisi double precision, activity_count bigint) LANGUAGE sql STABLE AS $$
+    SELECT r.fakultas::text,
+           SUM(m.emisi_sampah_makanan_per_waktu)::double precision AS total_emisi,
+           COUNT(m.id_mahasiswa) AS activity_count
+    FROM public.v_aktivitas_makanan m
+    JOIN public.v_informasi_fakultas_mahasiswa r ON m.id_mahasiswa = r.id_mahasiswa
+    WHERE (COALESCE(cardinality(p_days), 0) = 0 OR m.hari = ANY(p_days))
+      AND (COALESCE(cardinality(p_periods), 0) = 0 OR m.meal_period = ANY(p_periods))
+      AND (COALESCE(cardinality(p_fakultas), 0) = 0 OR r.fakultas = ANY(p_fakultas))
+    GROUP BY r.fakultas
+    ORDER BY total_emisi ASC
+$$;
+
+CREATE OR REPLACE FUNCTION public.food_period_v1(p_days text[], p_periods text[], p_fakultas text[])
+RETURNS TABLE (meal_period text, activity_count bigint, total_emisi double precision) LANGUAGE sql STABLE AS $$
+    SELECT m.meal_period::text,
+           COUNT(m.id_mahasiswa) AS activity_count,
+           SUM(m.emisi_sampah_makanan_per_waktu)::double precision AS total_emisi
+    FROM public.v_aktivitas_makanan m
+    WHERE (COALESCE(cardinality(p_days), 0) = 0 OR m.hari = ANY(p_days))
+      AND (COALESCE(cardinality(p_periods), 0) = 0 OR m.meal_period = ANY(p_periods))
+      AND public.dashboard_match_fakultas_v1(m.id_mahasiswa, p_fakultas)
+    GROUP BY m.meal_period
+$$;
+
+CREATE OR REPLACE FUNCTION public.food_canteen_heatmap_v1(p_days text[], p_periods text[], p_fakultas text[], p_canteens text[])
+RETURNS TABLE (lokasi text, time_slot text, total_emisi double precision) LANGUAGE sql STABLE AS $$
+    SELECT m.lokasi::text,
+           m.time_slot::text,
+           SUM(m.emisi_sampah_makanan_per_waktu)::double precision AS total_emisi
+    FROM public.v_aktivitas_makanan m
+    WHERE (COALESCE(cardinality(p_days), 0) = 0 OR m.hari = ANY(p_days))
+      AND (COALESCE(cardinality(p_periods), 0) = 0 OR m.meal_period = ANY(p_periods))
+      AND public.dashboard_match_fakultas_v1(m.id_mahasiswa, p_fakultas)
+      AND m.lokasi = ANY(p_canteens)
+    GROUP BY m.lokasi, m.time_slot
+$$;
+
+CREATE OR REPLACE FUNCTION public.food_canteen_emissions_v1(p_days text[], p_periods text[], p_fakultas text[], p_canteens text[])
+RETURNS TABLE (lokasi text, total_emisi double precision, avg_emisi double precision, activity_count bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT m.lokasi::text,
+           SUM(m.emisi_sampah_makanan_per_waktu)::double precision AS total_emisi,
+           AVG(m.emisi_sampah_makanan_per_waktu)::double precision AS avg_emisi,
+           COUNT(m.id_mahasiswa) AS activity_count
+    FROM public.v_aktivitas_makanan m
+    WHERE (COALESCE(cardinality(p_days), 0) = 0 OR m.hari = ANY(p_days))
+      AND (COALESCE(cardinality(p_periods), 0) = 0 OR m.meal_period = ANY(p_periods))
+      AND public.dashboard_match_fakultas_v1(m.id_mahasiswa, p_fakultas)
+      AND m.lokasi = ANY(p_canteens)
+    GROUP BY m.lokasi
+    ORDER BY total_emisi DESC
+$$;
@@ -0,0 +1,54 @@
+-- supabase/migrations/20261019010000_query_guard.sql
+--
+-- Tag dan batas waktu per request untuk query dashboard (lihat src/utils/query_guard.py).
+--
+-- Dashboard mengirim header X-Query-Tag (dash:<session_id>:<rerun>) dan X-Statement-Timeout (ms).
+-- dashboard_pre_request() dijalankan PostgREST sebelum query utama di transaksi yang sama,
+-- sehingga statement_timeout berlaku untuk query utama (SET di dalam fungsi yang sedang
+-- berjalan, mis. exec_sql, tidak memengaruhi statement yang sudah dimulai).
+--
+-- Aktifkan sekali per project:
+--   ALTER ROLE authenticator SET pgrst.db_pre_request = 'public.dashboard_pre_request';
+--   NOTIFY pgrst, 'reload config';
+
+CREATE OR REPLACE FUNCTION public.dashboard_pre_request()
+RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+    headers json := NULLIF(current_setting('request.headers', true), '')::json;
+    query_tag text := headers ->> 'x-query-tag';
+    requested_ms text := headers ->> 'x-statement-timeout';
+    current_ms int := (SELECT setting::int FROM pg_settings WHERE name = 'statement_timeout');
+BEGIN
+    -- Tag hanya untuk query dashboard; application_name dibatasi 63 karakter oleh Postgres.
+    IF query_tag LIKE 'dash:%' THEN
+        PERFORM set_config('application_name', left(query_tag, 63), true);
+    END IF;
+
+    -- Header hanya boleh memperketat batas waktu role (anon/authenticated), tidak melonggarkannya.
+    IF requested_ms ~ '^[0-9]{1,9}$' AND requested_ms::int > 0
+       AND (current_ms = 0 OR requested_ms::int < current_ms) THEN
+        PERFORM set_config('statement_timeout', requested_ms || 'ms', true);
+    END IF;
+END;
+$$;
+
+-- Membatalkan query dashboard yang masih berjalan dengan tag tertentu.
+-- SECURITY DEFINER karena pg_cancel_backend butuh hak atas backend milik role lain;
+-- hanya backend dengan application_name 'dash:%' yang bisa dibatalkan.
+-- Tag tidak membuktikan pemilik sesi (application_name terlihat di pg_stat_activity), jadi fungsi
+-- ini hanya untuk service_role: dashboard memanggilnya dengan SUPABASE_SERVICE_ROLE_KEY.
+CREATE OR REPLACE FUNCTION public.cancel_dashboard_queries(tags text[])
+RETURNS integer LANGUAGE sql SECURITY DEFINER SET search_path = pg_catalog AS $$
+    SELECT count(*) FILTER (WHERE pg_cancel_backend(a.pid))::integer
+    FROM (
+        SELECT pid
+        FROM pg_stat_activity
+        WHERE application_name = ANY (tags)
+          AND application_name LIKE 'dash:%'
+          AND state = 'active'
+          AND pid <> pg_backend_pid()
+    ) a;
+$$;
+
+REVOKE ALL ON FUNCTION public.cancel_dashboard_queries(text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.cancel_dashboard_queries(text[]) TO service_role;
@@ -0,0 +1,24 @@
+-- supabase/migrations/20261019020000_query_cost.sql
+--
+-- Perkiraan biaya query dari planner untuk admission control dashboard (src/utils/admission.py).
+-- EXPLAIN tanpa ANALYZE: query tidak dijalankan, hanya direncanakan.
+
+CREATE OR REPLACE FUNCTION public.explain_query_cost(query text)
+RETURNS json LANGUAGE plpgsql AS $$
+DECLARE
+    plan json;
+BEGIN
+    -- Hanya query baca tunggal (sama seperti yang dikirim ke exec_sql oleh dashboard).
+    IF query !~* '^\s*(select|with)\s' OR position(';' IN rtrim(query, E'; \n\t')) > 0 THEN
+        RAISE EXCEPTION 'explain_query_cost hanya menerima satu query SELECT';
+    END IF;
+    EXECUTE 'EXPLAIN (FORMAT JSON) ' || query INTO plan;
+    RETURN json_build_object(
+        'total_cost', (plan -> 0 -> 'Plan' ->> 'Total Cost')::float8,
+        'plan_rows', (plan -> 0 -> 'Plan' ->> 'Plan Rows')::float8,
+        'plan_width', (plan -> 0 -> 'Plan' ->> 'Plan Width')::int
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.explain_query_cost(text) TO anon, authenticated;
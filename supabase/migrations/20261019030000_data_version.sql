@@ -0,0 +1,46 @@
+-- supabase/migrations/20261019030000_data_version.sql
+--
+-- Versi data dashboard (lihat versioned_cache_data di src/utils/db_connector.py).
+--
+-- Setiap statement yang mengubah tabel sumber (ETL maupun edit manual) menaikkan versi di
+-- transaksi yang sama, jadi versi baru baru terlihat bersamaan dengan datanya. Dashboard
+-- memasukkan versi ke kunci cache: cache berlaku selama versi tidak berubah, dan langsung
+-- diperbarui setelah ETL selesai.
+
+CREATE TABLE IF NOT EXISTS public.dashboard_data_version (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id), -- tabel satu baris
+    version bigint NOT NULL DEFAULT 1,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.dashboard_data_version (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.get_data_version()
+RETURNS bigint LANGUAGE sql STABLE AS $$
+    SELECT version FROM public.dashboard_data_version WHERE id;
+$$;
+
+-- SECURITY DEFINER: role yang menulis tabel sumber tidak perlu hak UPDATE atas tabel versi.
+CREATE OR REPLACE FUNCTION public.bump_data_version()
+RETURNS trigger LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE public.dashboard_data_version SET version = version + 1, updated_at = now() WHERE id;
+    RETURN NULL;
+END;
+$$;
+
+-- FOR EACH STATEMENT: satu kenaikan per batch INSERT/DELETE, bukan per baris.
+DO $$
+DECLARE
+    source_table text;
+BEGIN
+    FOREACH source_table IN ARRAY ARRAY['mahasiswa', 'transportasi', 'elektronik', 'sampah_makanan', 'aktivitas_harian'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS bump_data_version ON public.%I', source_table);
+        EXECUTE format('CREATE TRIGGER bump_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.%I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION public.bump_data_version()', source_table);
+    END LOOP;
+END;
+$$;
+
+GRANT SELECT ON public.dashboard_data_version TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_data_version() TO anon, authenticated;
@@ -0,0 +1,88 @@
+# tests/conftest.py
+
+"""
+Fixture bersama: database DuckDB di memori berisi tabel dan view dashboard dalam bentuk kecil,
+untuk menjalankan SQL halaman (dialek Postgres, lewat shim local_replica.translate_sql) tanpa Supabase.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DAY_ORDER = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+N_STUDENTS = 60
+SLOTS = ['06-08', '08-10', '10-12', '12-14', '14-16', '16-18', '18-20']
+
+def _fixture_frames() -> dict:
+    """Data deterministik kecil dengan kasus tepi: hari kosong, NULL, mahasiswa tanpa fakultas."""
+    mahasiswa, transportasi, elektronik, aktivitas = [], [], [], []
+    for i in range(1, N_STUDENTS + 1):
+        days = [day for o, day in enumerate(DAY_ORDER) if (i * 7 + o * 3) % 5 < 3]
+        hari_datang = '' if i % 19 == 0 else ', '.join(days)
+        mahasiswa.append({'id_mahasiswa': i, 'nama': f'Mhs {i}', 'program_studi': 'Prodi', 'hari_datang': hari_datang,
+                          'fakultas': ['FTI', 'STEI', 'FMIPA', 'SBM', ' FSRD '][i % 5]})
+        transportasi.append({'id_mahasiswa': i, 'transportasi': ['Mobil', 'Motor', 'Angkutan Umum', 'Sepeda'][i % 4],
+                             'kecamatan': ['Coblong', 'Sukajadi', 'Cidadap', 'Lengkong', ''][i % 5],
+                             'hari_datang': hari_datang, 'emisi_transportasi': (i % 13) * 0.37})
+        elektronik.append({'id_mahasiswa': i, 'hari_datang': hari_datang,
+                           'penggunaan_hp': True, 'durasi_hp': float(i % 5),
+                           'penggunaan_laptop': i % 7 > 0, 'durasi_laptop': float(i % 7) if i % 11 else None,
+                           'penggunaan_tab': i % 3 == 0, 'durasi_tab': float(i % 3)})
+        for day in ([] if i % 19 == 0 else days):
+            for s, waktu in enumerate(SLOTS):
+                if (i + s) % 2:
+                    continue
+                kegiatan = ['Kelas', 'Makan', 'Belajar'][(i + s) % 3]
+                lokasi = (['Kantin SBM', 'Pratama Corner', 'Warung Luar'][(i + s) % 3] if kegiatan == 'Makan'
+                          else ['GKU Barat', 'Labtek V', 'Oktagon'][(i * s) % 3])
+                aktivitas.append({'id_mahasiswa': i, 'hari': day, 'waktu': waktu, 'kegiatan': kegiatan, 'lokasi': lokasi,
+                                  'penggunaan_ac': kegiatan == 'Kelas', 'emisi_ac': 1.66 if kegiatan == 'Kelas' else 0.0,
+                                  'emisi_lampu': 0.24 if kegiatan != 'Belajar' else 0.0,
+                                  'emisi_sampah_makanan_per_waktu': 0.95 if kegiatan == 'Makan' else 0.0})
+    return {'mahasiswa': pd.DataFrame(mahasiswa), 'transportasi': pd.DataFrame(transportasi),
+            'elektronik': pd.DataFrame(elektronik), 'aktivitas_harian': pd.DataFrame(aktivitas)}
+
+_VIEWS = (
+    "CREATE VIEW v_informasi_fakultas_mahasiswa AS "
+    "SELECT id_mahasiswa, fakultas, program_studi FROM mahasiswa WHERE id_mahasiswa % 17 <> 0",
+    "CREATE VIEW v_aktivitas_makanan AS SELECT id_mahasiswa, hari, lokasi, waktu, "
+    "CONCAT(SPLIT_PART(waktu, '-', 1), ':00-', SPLIT_PART(waktu, '-', 2), ':00') AS time_slot, "
+    "CASE WHEN waktu IN ('06-08', '08-10') THEN 'Pagi' WHEN waktu IN ('10-12', '12-14') THEN 'Siang' "
+    "WHEN waktu IN ('14-16', '16-18') THEN 'Sore' ELSE 'Malam' END AS meal_period, "
+    "emisi_sampah_makanan_per_waktu FROM aktivitas_harian WHERE kegiatan ILIKE '%makan%'",
+)
+
+@pytest.fixture(scope="session")
+def duck():
+    """Koneksi DuckDB di memori dengan setelan dialek replika lokal dan data fixture."""
+    duckdb = pytest.importorskip("duckdb")
+    from src.utils.local_replica import _DUCKDB_SETUP
+
+    connection = duckdb.connect(":memory:")
+    for statement in _DUCKDB_SETUP:
+        connection.execute(statement)
+    for name, frame in _fixture_frames().items():
+        connection.register(f"{name}_frame", frame)
+        connection.execute(f"CREATE TABLE {name} AS SELECT * FROM {name}_frame")
+        connection.unregister(f"{name}_frame")
+    for statement in _VIEWS:
+        connection.execute(statement)
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def run_sql(duck):
+    """run_sql(sql) -> DataFrame, seperti db_connector.run_sql tetapi di DuckDB fixture."""
+    from src.utils.local_replica import translate_sql
+
+    def run(sql_query):
+        cursor = duck.cursor()
+        try:
+            return cursor.execute(translate_sql(sql_query)).df()
+        finally:
+            cursor.close()
+    return run
@@ -0,0 +1,124 @@
+# tests/test_panel_parity.py
+
+"""
+Paritas data panel antar mode query (PANEL_QUERY_MODE): query fused (GROUPING SETS) dan fact
+engine lokal harus menghasilkan panel yang sama dengan SQL per panel, begitu juga panel yang
+disusun dari partial per nilai filter (partial_aggregates). Mode rpc memanggil fungsi di
+migrasi Supabase yang tidak bisa dijalankan di DuckDB; untuk mode itu diperiksa bahwa rumus
+emisi di migrasi memakai angka yang sama dengan src/utils/emission_factors.py.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pages import electronic, food_drink_waste, transportation
+from src.utils.emission_factors import GRID_EMISSION_FACTOR, PERSONAL_DEVICE_POWER
+from src.utils.fact_engine import FactEngine
+from src.utils.partial_aggregates import PartialAggregateCache
+from src.utils.swr import SwrStore
+
+MIGRATION = os.path.join(os.path.dirname(__file__), '..', 'supabase', 'migrations',
+                         '20261019000000_dashboard_panel_functions_v1.sql')
+
+ALL_DEVICES = ['HP', 'Laptop', 'Tablet', 'AC', 'Lampu']
+
+# Halaman -> argumen get_panel_data yang diuji
+CASES = {
+    transportation: [
+        ([], [], []),
+        (['Motor'], [], ['Senin']),
+        ([], ['STEI', 'FTI'], ['Rabu', 'Kamis']),
+        (['Mobil', 'Sepeda'], ['SBM'], []),
+    ],
+    electronic: [
+        ([], [], ALL_DEVICES),
+        (['STEI'], ['Senin'], ['HP', 'AC']),
+        ([], ['Rabu'], ['Laptop']),
+        (['FMIPA'], [], ['Lampu']),
+        ([], [], ['Tablet', 'Lampu']),
+    ],
+    food_drink_waste: [
+        ([], [], []),
+        (['Senin'], [], []),
+        ([], ['Pagi', 'Siang'], ['STEI']),
+        (['Selasa', 'Rabu'], ['Malam'], ['SBM', 'FTI']),
+    ],
+}
+
+# Halaman -> (pilihan tunggal yang di-cache lebih dulu, pilihan multi-nilai yang disusun darinya)
+COMPOSED_CASES = {
+    transportation: ((['Motor'], [], []), (['Motor', 'Mobil'], [], [])),
+    electronic: ((['STEI'], [], ALL_DEVICES), (['STEI', 'FTI'], [], ALL_DEVICES)),
+    food_drink_waste: ((['Senin'], [], []), (['Senin', 'Selasa'], [], [])),
+}
+
+def _case_id(value):
+    return value.__name__.rsplit('.', 1)[-1] if hasattr(value, '__name__') else None
+
+@pytest.fixture
+def panels(monkeypatch, run_sql):
+    """panels(page, mode, args, cache=None) -> hasil page.get_panel_data di DuckDB fixture."""
+    def get(page, mode, args, cache=None):
+        monkeypatch.setattr(page, 'PANEL_QUERY_MODE', mode)
+        monkeypatch.setattr(page, 'run_sql', run_sql)
+        monkeypatch.setattr(page, 'run_sql_batch', lambda queries: {name: run_sql(sql) for name, sql in queries.items()})
+        monkeypatch.setattr(page, 'get_fact_engine', lambda: FactEngine(lambda: 1))
+        cache = cache or PartialAggregateCache(SwrStore(), lambda: 1)
+        monkeypatch.setattr(page, 'get_partial_aggregate_cache', lambda: cache)
+        return page.get_panel_data(*args)
+    return get
+
+def _normalize(df):
+    if df is None:
+        return None
+    df = df.reset_index(drop=True)
+    if df.empty:
+        return df
+    keys = [column for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])]
+    return df.sort_values(keys or list(df.columns), kind='stable').reset_index(drop=True)
+
+def assert_same_panels(expected: dict, actual: dict):
+    assert expected.keys() == actual.keys()
+    for name in expected:
+        left, right = _normalize(expected[name]), _normalize(actual[name])
+        if left is None or right is None:
+            assert left is None and right is None, name
+            continue
+        assert list(left.columns) == list(right.columns), name
+        assert len(left) == len(right), name
+        for column in left.columns:
+            if pd.api.types.is_numeric_dtype(left[column]):
+                np.testing.assert_allclose(left[column].astype(float), right[column].astype(float),
+                                           rtol=1e-9, atol=1e-9, err_msg=f"{name}.{column}")
+            else:
+                assert left[column].astype(str).tolist() == right[column].astype(str).tolist(), f"{name}.{column}"
+
+@pytest.mark.parametrize('mode', ['fused', 'local'])
+@pytest.mark.parametrize('page, args', [(page, args) for page, cases in CASES.items() for args in cases], ids=_case_id)
+def test_mode_matches_sql(panels, page, args, mode):
+    assert_same_panels(panels(page, 'sql', args), panels(page, mode, args))
+
+@pytest.mark.parametrize('mode', ['sql', 'fused', 'local'])
+@pytest.mark.parametrize('page', list(COMPOSED_CASES), ids=_case_id)
+def test_composed_partials_match_query(panels, page, mode):
+    single, multi = COMPOSED_CASES[page]
+    cache = PartialAggregateCache(SwrStore(), lambda: 1)
+    panels(page, mode, single, cache)
+    composed = panels(page, mode, multi, cache)
+    assert cache.stats['composed'] == 1
+    assert_same_panels(panels(page, 'sql', multi), composed)
+
+def test_rpc_migration_uses_emission_factors():
+    with open(MIGRATION, encoding='utf-8') as f:
+        migration = f.read()
+    function = re.search(r"FUNCTION public\.electronic_personal_emission_v1\(.*?\$\$(.*?)\$\$", migration, re.DOTALL).group(1)
+    powers = {device: (column, int(power)) for device, column, power in
+              re.findall(r"'(\w+)' = ANY\(p_devices\) THEN COALESCE\((\w+), 0\) \* (\d+)", function)}
+    assert powers == PERSONAL_DEVICE_POWER
+    assert float(re.search(r"\* ([\d.]+) / 1000", function).group(1)) == GRID_EMISSION_FACTOR
+    # Angka itu hanya ditulis di fungsi tersebut; fungsi lain memanggilnya.
+    assert migration.count(str(GRID_EMISSION_FACTOR)) == 1